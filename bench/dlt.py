@@ -0,0 +1,102 @@
+"""
+Minimal stand-in for the Databricks `dlt` module, so the pipeline's Python tables can be
+imported and run on local Spark by the benchmark harness (pipeline.py).
+
+@dlt.table registers the decorated function under its table name together with the
+expectations attached by the @dlt.expect* decorators below it; dlt.read and
+dlt.read_stream resolve to the tables the harness has already materialized (the
+benchmark runs every table as a batch, like a full refresh). @dlt.view becomes a temp view,
+recomputed by every reader as in the pipeline. dlt.apply_changes registers its target as a table holding the latest row
+per key of the whole source, which is what a full refresh of the keyed upsert produces.
+state.py passes streaming DataFrames to use() so that read_stream returns those instead.
+"""
+
+import sys
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Union
+
+
+class Expectation(NamedTuple):
+    name: str
+    condition: str
+    action: Optional[str]  # "drop", "fail" or None (warn only), as ON VIOLATION in SQL
+
+
+class TableFunction(NamedTuple):
+    name: str
+    function: Callable[[], Any]
+    expectations: List[Expectation]
+    comment: Optional[str]
+    table_properties: Dict[str, str]
+    sources: List[str] = []  # tables read other than through dlt.read / dlt.read_stream
+    view: bool = False
+
+
+TABLES: Dict[str, TableFunction] = {}
+TARGETS: Dict[str, Any] = {}  # create_streaming_table() declarations: name -> (comment, properties)
+spark: Any = None
+streams: Dict[str, Any] = {}
+
+
+def use(session: Any, stream_sources: Optional[Dict[str, Any]] = None) -> None:
+    """Set the SparkSession that read/read_stream resolve tables in, and optional streaming sources"""
+    global spark, streams
+    spark = session
+    streams = dict(stream_sources or {})
+
+def _expect(name: str, condition: str, action: Optional[str]) -> Callable:
+    def decorate(function: Callable) -> Callable:
+        # decorators apply bottom-up; keep the order they are written in
+        function.__dict__.setdefault("_expectations", []).insert(0, Expectation(name, condition, action))
+        return function
+    return decorate
+
+def expect(name: str, condition: str) -> Callable:
+    return _expect(name, condition, None)
+
+def expect_or_drop(name: str, condition: str) -> Callable:
+    return _expect(name, condition, "drop")
+
+def expect_or_fail(name: str, condition: str) -> Callable:
+    return _expect(name, condition, "fail")
+
+def table(name: Optional[str] = None, comment: Optional[str] = None,
+          table_properties: Optional[Dict[str, str]] = None, _view: bool = False, **_: Any) -> Callable:
+    def decorate(function: Callable) -> Callable:
+        table_name = name or function.__name__
+        TABLES[table_name] = TableFunction(
+            table_name, function, list(function.__dict__.get("_expectations", [])), comment,
+            dict(table_properties or {}), view=_view,
+        )
+        return function
+    return decorate
+
+def view(name: Optional[str] = None, comment: Optional[str] = None, **_: Any) -> Callable:
+    return table(name, comment, _view=True)
+
+def create_streaming_table(name: str, comment: Optional[str] = None,
+                           table_properties: Optional[Dict[str, str]] = None, **_: Any) -> None:
+    TARGETS[name] = (comment, dict(table_properties or {}))
+
+def apply_changes(target: str, source: str, keys: Sequence[str], sequence_by: Union[str, Any],
+                  except_column_list: Optional[Sequence[str]] = None, **_: Any) -> None:
+    """SCD type 1 upsert, as a batch: the row with the highest sequence_by per key"""
+    def latest() -> Any:
+        from pyspark.sql import Window
+        from pyspark.sql import functions as F
+
+        order = F.col(sequence_by) if isinstance(sequence_by, str) else sequence_by
+        ranked = read(source).withColumn(
+            "__rank", F.row_number().over(Window.partitionBy(*keys).orderBy(order.desc()))
+        )
+        return ranked.where("__rank = 1").drop("__rank", *(except_column_list or []))
+
+    # group the target with the module that declared it
+    latest.__module__ = sys._getframe(1).f_globals["__name__"]
+    comment, table_properties = TARGETS.get(target, (None, {}))
+    TABLES[target] = TableFunction(target, latest, [], comment, table_properties, [source])
+
+def read(name: str) -> Any:
+    return spark.table(name)
+
+def read_stream(name: str) -> Any:
+    return streams[name] if name in streams else spark.table(name)
@@ -0,0 +1,46 @@
+"""
+Event-log output for the local runner (run.py / state.py --events).
+
+Writes flow_progress events shaped like the Lakeflow / DLT event log, one JSON object per
+line, so src/jobs/pipeline_telemetry.py (psp_telemetry.collect) reads local runs and
+pipeline updates the same way. Besides the event log's own metrics (num_output_rows,
+backlog_files, data_quality), local events carry duration_ms, state_rows,
+state_memory_bytes and dropped_by_watermark.
+"""
+
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class EventWriter:
+    """Appends flow_progress events for one local run (one update_id per pipeline pass)"""
+
+    def __init__(self, path: str, pipeline_name: str = "psp-local"):
+        self.path = path
+        self.pipeline_name = pipeline_name
+
+    def flow_progress(self, table: str, update_id: str, metrics: Dict[str, Any],
+                      data_quality: Optional[Dict[str, Any]] = None, status: str = "COMPLETED",
+                      timestamp: Optional[str] = None) -> None:
+        progress: Dict[str, Any] = {"status": status, "metrics": metrics}
+        if data_quality:
+            progress["data_quality"] = data_quality
+        event = {
+            "id": str(uuid.uuid4()),
+            "timestamp": timestamp or now(),
+            "event_type": "flow_progress",
+            "level": "INFO",
+            "origin": {"pipeline_name": self.pipeline_name, "update_id": update_id,
+                       "flow_name": table, "dataset_name": table},
+            "details": {"flow_progress": progress},
+        }
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(event, default=str) + "\n")
+
+def new_update_id(label: str) -> str:
+    return f"{label}-{uuid.uuid4().hex[:8]}"
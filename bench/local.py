@@ -0,0 +1,635 @@
+"""
+Run the pipeline (bronze -> silver -> gold) in-process on DuckDB over the generator's landing
+files, for iterating on the silver and gold SQL without a cluster or a JVM.
+
+SQL files are parsed as in pipeline.py (LIVE./STREAM() references become plain tables,
+cloud_files() a view over the landing files, read with the schema option's fixed types) and
+their Spark SQL is translated to DuckDB: the functions whose name or semantics differ
+(SPARK_FUNCTIONS, e.g. datediff, dayofweek, from_unixtime, FIRST(...) IGNORE NULLS) are
+rewritten call by call. The Python tables cannot be imported without pyspark, so each has a
+DuckDB equivalent here (PYTHON_TABLES) built from the same shared definitions:
+psp_unified for the unified column layout, psp_risk.rules for the risk scores, the
+velocity_check.py self-join for the velocity features, and psp_reconciliation for the payout
+reconciliation. Pipeline settings
+(psp.unified.layout, psp.unified.join_mode, ...) are read from the Python sources with
+their defaults and can be overridden with --conf. Like run.py, every table is a full
+refresh: apply_changes targets keep the latest row per key, views stay views.
+
+With --compare the tables are cross-checked against another run's Parquet output, e.g. the
+Spark runner's warehouse (run.py --warehouse): row counts, and per column the non-NULL
+count and the sum (numbers, booleans) or distinct count (everything else).
+
+    python3 local.py --sf 1
+    python3 local.py --sf 1 --output .data/local --compare .data/warehouse
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pipeline import LAYERS, PIPELINE_DIR, ROOT, TableDef, dependency_order, landing_view, load_variants, parse_sql
+from run import REPORT_DIR, dataset, skew_args, write_report
+
+sys.path.append(os.path.join(ROOT, "src"))
+
+from psp_reconciliation import (
+    OUTPUT_COLUMNS as RECONCILIATION_COLUMNS, REVERSED, SETTLED, SETTLEMENT_STATES, SNAPSHOT_SETTLED, status_sql,
+)
+from psp_risk import rules, velocity
+from psp_unified import CONSUMERS, DIMENSIONS, DISPUTE_COLUMNS, RISK_PASSTHROUGH, STATE_COLUMNS, late_columns, stored
+from velocity_check import window_sql
+
+SETTING = re.compile(r'^\w+ = \("(psp\.[\w.]+)", "([^"]*)"\)', re.M)
+PY_TABLE = re.compile(r'\bname="(\w+)"')
+CALL = re.compile(r"'(?:[^']|'')*'|\b(\w+)\s*\(")
+IGNORE_NULLS = re.compile(r"\s*IGNORE\s+NULLS\b", re.I)
+RLIKE = re.compile(r"([\w.]+)\s+RLIKE\s+('(?:[^']|'')*')", re.I)
+SPARK_TYPE = re.compile(r"STRUCT<(.*)>$", re.I | re.S)
+EPOCH = "TIMESTAMP '1970-01-01 00:00:00'"
+NOW = "CAST(current_timestamp AS TIMESTAMP)"
+# Columns that differ between any two runs (run time, file paths, arbitrary FIRST() picks)
+VOLATILE = {
+    "ingestion_timestamp", "silver_processed_at", "source_file", "_rescued_data", "unified_created_at",
+    "gold_created_at", "snapshot_date", "metrics_calculated_at", "late_detected_at",
+    "most_recent_channel", "sample_merchant",
+}
+
+# Spark SQL functions rewritten for DuckDB, by lower-case name: arguments -> DuckDB expression
+SPARK_FUNCTIONS: Dict[str, Callable[[List[str]], str]] = {
+    "current_timestamp": lambda args: NOW,
+    "current_date": lambda args: "current_date",
+    "date": lambda args: f"CAST({args[0]} AS DATE)",
+    "datediff": lambda args: f"date_diff('day', CAST({args[1]} AS DATE), CAST({args[0]} AS DATE))",
+    # Spark: 1 = Sunday ... 7 = Saturday; DuckDB counts from 0
+    "dayofweek": lambda args: f"(dayofweek({args[0]}) + 1)",
+    "from_unixtime": lambda args: f"strftime(to_timestamp({args[0]}), '%Y-%m-%d %H:%M:%S')",
+    "unix_timestamp": lambda args: f"CAST(floor(epoch({args[0]})) AS BIGINT)",
+    "first": lambda args: f"first({args[0]})",
+}
+DUCKDB_TYPES = {"STRING": "VARCHAR"}
+
+# Pipeline settings read by the DuckDB equivalents
+JOIN_MODE = "psp.unified.join_mode"
+TXN_WATERMARK = "psp.unified.transaction_watermark"
+AUTH_WINDOW = "psp.unified.auth_window"
+UNIFIED_LAYOUT = "psp.unified.layout"
+SETTLEMENT_WINDOW = "psp.reconciliation.settlement_window_days"
+TOLERANCE = "psp.reconciliation.tolerance_cents"
+
+
+def call_arguments(sql: str, start: int) -> Tuple[List[str], int]:
+    """Top-level arguments of the call whose "(" ends at start, and the index after its ")" """
+    arguments, depth, quoted, begin = [], 1, False, start
+    for index in range(start, len(sql)):
+        char = sql[index]
+        if char == "'":
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                arguments.append(sql[begin:index].strip())
+                return [argument for argument in arguments if argument], index + 1
+        elif char == "," and depth == 1:
+            arguments.append(sql[begin:index].strip())
+            begin = index + 1
+    raise ValueError(f"unbalanced parentheses after: {sql[max(start - 40, 0):start]}")
+
+def translate(sql: str) -> str:
+    """Spark SQL -> DuckDB SQL: rewrites RLIKE and the SPARK_FUNCTIONS calls, innermost arguments first"""
+    sql = RLIKE.sub(r"regexp_full_match(\1, \2)", sql)
+    pieces, position = [], 0
+    while True:
+        match = CALL.search(sql, position)
+        if match is None:
+            break
+        name = (match.group(1) or "").lower()
+        if name not in SPARK_FUNCTIONS:
+            pieces.append(sql[position:match.end()])
+            position = match.end()
+            continue
+        arguments, end = call_arguments(sql, match.end())
+        arguments = [translate(argument) for argument in arguments]
+        ignore_nulls = IGNORE_NULLS.match(sql, end) if name == "first" else None
+        if ignore_nulls:
+            rewritten, end = f"any_value({arguments[0]})", ignore_nulls.end()
+        else:
+            rewritten = SPARK_FUNCTIONS[name](arguments)
+        pieces.append(sql[position:match.start()] + rewritten)
+        position = end
+    return "".join(pieces) + sql[position:]
+
+def split_fields(spec: str) -> List[str]:
+    """Split "a STRING, b STRUCT<x: STRING, y: BIGINT>" at the top-level commas"""
+    fields, depth, begin = [], 0, 0
+    for index, char in enumerate(spec):
+        depth += {"<": 1, ">": -1}.get(char, 0)
+        if char == "," and depth == 0:
+            fields.append(spec[begin:index].strip())
+            begin = index + 1
+    fields.append(spec[begin:].strip())
+    return [field for field in fields if field]
+
+def duckdb_type(spark_type: str) -> str:
+    struct = SPARK_TYPE.match(spark_type.strip())
+    if struct:
+        members = [field.split(":", 1) for field in split_fields(struct.group(1))]
+        return "STRUCT(" + ", ".join(f'"{name.strip()}" {duckdb_type(kind)}' for name, kind in members) + ")"
+    return DUCKDB_TYPES.get(spark_type.strip().upper(), spark_type.strip().upper())
+
+def landing_files(data_dir: str, pattern: str) -> str:
+    """DuckDB list of a landing glob's files; matched directories (gen.py --partition-by-date) are read recursively"""
+    globs = [
+        os.path.join(path, "**") if os.path.isdir(path) else path
+        for path in sorted(glob.glob(os.path.join(data_dir, pattern)))
+    ] or [os.path.join(data_dir, pattern)]
+    return "[" + ", ".join("'" + path.replace("'", "''") + "'" for path in globs) + "]"
+
+def landing_sql(connection: Any, table: TableDef, data_dir: str) -> str:
+    """The view over the table's landing files that its rewritten query reads"""
+    source = table.source
+    files = landing_files(data_dir, source.pattern)
+    # event_date=... directories are not columns: Auto Loader reads the bronze columns only
+    if source.format == "json":
+        columns = ", ".join(
+            f"'{column}': '{duckdb_type(spark_type)}'"
+            for column, spark_type in (field.split(None, 1) for field in split_fields(source.options["schema"]))
+        )
+        relation = (f"read_json({files}, format = 'newline_delimited', columns = {{{columns}}}, filename = true, "
+                    f"hive_partitioning = false)")
+    else:
+        relation = f"read_parquet({files}, filename = true, hive_partitioning = false)"
+    # the Spark runner reads timestamps as TIMESTAMP in a UTC session
+    zoned = [row[0] for row in connection.execute(f"DESCRIBE SELECT * FROM {relation}").fetchall()
+             if row[1] == "TIMESTAMP WITH TIME ZONE"]
+    replace = f" REPLACE ({', '.join(f'CAST({column} AS TIMESTAMP) AS {column}' for column in zoned)})" if zoned else ""
+    rescued = source.options.get("rescuedDataColumn")
+    return (
+        f"SELECT * EXCLUDE (filename){replace}, filename AS __file_path"
+        + (f", CAST(NULL AS VARCHAR) AS {rescued}" if rescued else "")
+        + f" FROM {relation}"
+    )
+
+
+def latest(source: str, keys: List[str], order: str) -> str:
+    """SCD type 1 apply_changes as a batch: the row with the highest order per key"""
+    return f"SELECT * FROM {source} QUALIFY row_number() OVER (PARTITION BY {', '.join(keys)} ORDER BY {order}) = 1"
+
+def silver_transactions(settings: Dict[str, str]) -> str:
+    # STATE_SEQUENCE of silver/transactions.py
+    return latest("silver_transaction_events", ["txn_id"],
+                  "state_timestamp_ms DESC, state_ordinal DESC, ingestion_timestamp DESC")
+
+def silver_disputes_latest(settings: Dict[str, str]) -> str:
+    # DISPUTE_SEQUENCE of silver/unified_transactions.py
+    return latest("silver_disputes", ["txn_id"], "dispute_opened_at DESC, ingestion_timestamp DESC, dispute_id DESC")
+
+def silver_unified_transactions_base(settings: Dict[str, str]) -> str:
+    columns = stored(settings[UNIFIED_LAYOUT])
+    order_match = "t.order_id = o.order_id"
+    if settings[JOIN_MODE] == "bounded":
+        order_match += (f" AND t.transaction_authorized_at BETWEEN o.order_created_at"
+                        f" AND o.order_created_at + INTERVAL '{settings[AUTH_WINDOW]}'")
+    joined = ", ".join(f"{column.source}.{column.expression} AS {column.name}"
+                       for column in columns if not column.derived)
+    derived = "".join(f", {translate(column.expression)} AS {column.name}" for column in columns if column.derived)
+    # a transaction is joined on the first of its state events
+    return f"""
+        SELECT *{derived} FROM (
+            SELECT {joined}
+            FROM ({latest("silver_transaction_events", ["txn_id"], "state_timestamp_ms, state_ordinal")}) t
+            JOIN silver_orders o ON {order_match}
+            JOIN silver_merchants m ON o.merchant_id = m.merchant_id
+            JOIN silver_customers c ON o.customer_id = c.customer_id
+            JOIN silver_payments p ON t.payment_id = p.payment_id
+        )
+        WHERE txn_id IS NOT NULL AND order_id IS NOT NULL AND merchant_id IS NOT NULL AND customer_id IS NOT NULL
+    """
+
+def with_changes(settings: Dict[str, str]) -> str:
+    """Select list of with_changes() in unified_transactions.py, over u, s and d"""
+    state = {name: f"coalesce(s.{name}, u.{name})" for name in STATE_COLUMNS}
+    return ", ".join(
+        [f"{state[column.name]} AS {column.name}" if column.name in state else f"u.{column.name}"
+         for column in stored(settings[UNIFIED_LAYOUT])]
+        + [f"d.{source} AS {name}" for source, name in DISPUTE_COLUMNS]
+        + ["d.dispute_id IS NOT NULL AS has_dispute",
+           "struct_pack(state_timestamp_ms := coalesce(s.state_timestamp_ms, "
+           "epoch_ms(CAST(u.state_timestamp AS TIMESTAMP))), "
+           "state_ordinal := coalesce(s.state_ordinal, -1), "
+           f"dispute_opened_at := coalesce(d.dispute_opened_at, {EPOCH}), "
+           f"ingestion_timestamp := coalesce(d.ingestion_timestamp, {EPOCH}), "
+           f"dispute_id := coalesce(d.dispute_id, '')) AS change_sequence"]
+    )
+
+def unified_transaction_changes(settings: Dict[str, str]) -> str:
+    select = with_changes(settings)
+    return f"""
+        SELECT {select} FROM silver_unified_transactions_base u
+        LEFT JOIN silver_transactions s ON u.txn_id = s.txn_id
+        LEFT JOIN silver_disputes_latest d ON u.txn_id = d.txn_id
+        UNION ALL
+        SELECT {select} FROM silver_transaction_events s
+        JOIN silver_unified_transactions_base u ON u.txn_id = s.txn_id
+        LEFT JOIN silver_disputes_latest d ON u.txn_id = d.txn_id
+        UNION ALL
+        SELECT {select} FROM silver_disputes d
+        JOIN silver_unified_transactions_base u ON u.txn_id = d.txn_id
+        LEFT JOIN silver_transactions s ON u.txn_id = s.txn_id
+    """
+
+def silver_unified_transactions(settings: Dict[str, str]) -> str:
+    return (f"SELECT * EXCLUDE (change_sequence) FROM "
+            f"({latest('unified_transaction_changes', ['txn_id'], 'change_sequence DESC')})")
+
+def unified_view(consumer: str) -> Callable[[Dict[str, str]], str]:
+    """The unified_<consumer> projection; the narrow layout joins the dimensions on late"""
+    def projection(settings: Dict[str, str]) -> str:
+        names = ", ".join(CONSUMERS[consumer])
+        if settings[UNIFIED_LAYOUT] != "narrow":
+            return f"SELECT {names} FROM silver_unified_transactions"
+        late = late_columns(CONSUMERS[consumer])
+        joins = "".join(
+            f" LEFT JOIN {DIMENSIONS[alias][0]} {alias} ON u.{DIMENSIONS[alias][1]} = {alias}.{DIMENSIONS[alias][1]}"
+            for alias in sorted({column.source for column in late if not column.derived})
+        )
+        looked_up = "".join(f", {column.source}.{column.expression} AS {column.name}"
+                            for column in late if not column.derived)
+        derived = "".join(f", {translate(column.expression)} AS {column.name}" for column in late if column.derived)
+        return (f"SELECT {names} FROM (SELECT *{derived} FROM "
+                f"(SELECT u.*{looked_up} FROM silver_unified_transactions u{joins}))")
+    return projection
+
+def silver_unified_transactions_late(settings: Dict[str, str]) -> str:
+    window = f"INTERVAL '{settings[AUTH_WINDOW]}'"
+    return f"""
+        SELECT t.txn_id, t.order_id, t.payment_id, o.merchant_id, o.customer_id,
+            t.transaction_authorized_at, o.order_created_at,
+            CASE
+                WHEN o.order_created_at IS NULL THEN 'order_missing'
+                WHEN m.known_merchant_id IS NULL THEN 'merchant_missing'
+                WHEN c.known_customer_id IS NULL THEN 'customer_missing'
+                WHEN p.known_payment_id IS NULL THEN 'payment_missing'
+                WHEN '{settings[JOIN_MODE]}' = 'bounded' AND NOT (t.transaction_authorized_at
+                    BETWEEN o.order_created_at AND o.order_created_at + {window}) THEN 'outside_auth_window'
+                ELSE 'late'
+            END AS late_reason,
+            {NOW} AS late_detected_at
+        FROM silver_transactions t
+        CROSS JOIN (SELECT max(transaction_authorized_at) AS horizon FROM silver_transactions) h
+        LEFT JOIN silver_orders o ON t.order_id = o.order_id
+        LEFT JOIN (SELECT merchant_id AS known_merchant_id FROM silver_merchants) m ON o.merchant_id = m.known_merchant_id
+        LEFT JOIN (SELECT customer_id AS known_customer_id FROM silver_customers) c ON o.customer_id = c.known_customer_id
+        LEFT JOIN (SELECT payment_id AS known_payment_id FROM silver_payments) p ON t.payment_id = p.known_payment_id
+        WHERE NOT EXISTS (SELECT 1 FROM silver_unified_transactions_base u WHERE u.txn_id = t.txn_id)
+          AND t.transaction_authorized_at < h.horizon - INTERVAL '{settings[TXN_WATERMARK]}' - {window}
+          AND ('{settings[JOIN_MODE]}' = 'bounded' OR o.order_created_at IS NULL OR m.known_merchant_id IS NULL
+               OR c.known_customer_id IS NULL OR p.known_payment_id IS NULL)
+    """
+
+def silver_velocity_features(settings: Dict[str, str]) -> str:
+    # one batch holds every event, so nothing is behind the watermark and the per-key
+    # windows see exactly what the self-join counts
+    keys = ", ".join(velocity.ENTITIES)
+    events = (f"(SELECT txn_id, epoch_ms(transaction_authorized_at) AS event_time_ms, "
+              f"CAST(amount_cents AS BIGINT) AS amount_cents, {keys} FROM silver_unified_transactions_base)")
+    features = ", ".join(f"CAST(f.{feature} AS BIGINT) AS {feature}" for feature in velocity.FEATURES)
+    return " UNION ALL ".join(f"""
+        SELECT f.txn_id, f.entity, CAST(e.{entity} AS VARCHAR) AS entity_value, e.event_time_ms, {features},
+            epoch_ms(e.event_time_ms) AS transaction_authorized_at, {NOW} AS silver_processed_at
+        FROM ({window_sql(events, entity)}) f JOIN {events} e ON f.txn_id = e.txn_id
+    """ for entity in velocity.ENTITIES)
+
+def gold_risk_fraud_monitoring(settings: Dict[str, str]) -> str:
+    names = [velocity.column_name(entity, feature) for entity, feature in velocity.RISK_COLUMNS]
+    pivot = ", ".join(f"max(CASE WHEN entity = '{entity}' THEN {feature} END) AS {name}"
+                      for (entity, feature), name in zip(velocity.RISK_COLUMNS, names))
+    scores = ", ".join(f"{translate(expression)} AS {name}" for name, expression in rules.sql_columns())
+    derived = dict(rules.sql_derived_columns())
+    outputs = ", ".join(f"{translate(derived[name])} AS {name}" if name in derived else name
+                        for name in rules.OUTPUT_COLUMNS)
+    return f"""
+        SELECT {', '.join(RISK_PASSTHROUGH)}, psp_revenue AS transaction_fees, merchant_net_revenue,
+            {outputs}, {', '.join(names)},
+            {NOW} AS gold_created_at, current_date AS snapshot_date, {NOW} AS metrics_calculated_at
+        FROM (
+            SELECT *, {scores} FROM unified_risk_fraud_monitoring
+            LEFT JOIN (SELECT txn_id, {pivot} FROM silver_velocity_features GROUP BY txn_id) USING (txn_id)
+        )
+    """
+
+def gold_payout_reconciliation(settings: Dict[str, str]) -> str:
+    # psp_reconciliation.reconcile: daily settled buckets, batches expanded into their covered days
+    window = int(settings[SETTLEMENT_WINDOW])
+    states = ", ".join(f"'{state}'" for state in SETTLEMENT_STATES)
+    batch = "merchant_id, currency, payout_batch_date"
+    bucket = "merchant_id, currency, settlement_date"
+    unpaid = {
+        "reconciliation_date": f"settlement_date + {window}", "reconciliation_type": "'unpaid'",
+        "payout_ids": "CAST(NULL AS VARCHAR[])", "payout_batch_date": "CAST(NULL AS DATE)",
+        "coverage_start_date": "settlement_date", "coverage_end_date": "settlement_date",
+        "settled_days": "1", "gross_difference_cents": "-settled_gross_cents",
+        "transaction_count_difference": "-settled_transaction_count", "reconciliation_status": "'unpaid'",
+        **{name: "0" for name in ["payout_count", "failed_payout_count", "payout_gross_cents",
+                                  "payout_fees_cents", "payout_transaction_count"]},
+    }
+    return f"""
+        WITH relevant AS (
+            SELECT DISTINCT ON (txn_id, transaction_state) *,
+                CASE WHEN transaction_state = '{REVERSED}' THEN -1 ELSE 1 END AS sign
+            FROM silver_transaction_events
+            WHERE transaction_state IN ({states})
+        ),
+        entries AS (
+            SELECT * FROM relevant WHERE transaction_state != '{SNAPSHOT_SETTLED}'
+            UNION ALL
+            SELECT * FROM relevant
+            WHERE transaction_state = '{SNAPSHOT_SETTLED}'
+                AND txn_id NOT IN (SELECT txn_id FROM relevant WHERE transaction_state = '{SETTLED}')
+        ),
+        daily AS (
+            SELECT o.merchant_id, t.transaction_currency AS currency,
+                CAST(CAST(t.state_timestamp AS TIMESTAMP) AS DATE) AS settlement_date,
+                CAST(sum(t.sign) AS BIGINT) AS settled_transaction_count,
+                CAST(sum(t.sign * t.amount_cents) AS BIGINT) AS settled_gross_cents,
+                CAST(sum(t.sign * t.fees_total_cents) AS BIGINT) AS settled_fees_cents
+            FROM entries t JOIN silver_orders o ON t.order_id = o.order_id
+            GROUP BY ALL
+        ),
+        batches AS (
+            SELECT *, payout_batch_date AS coverage_end_date,
+                greatest(coalesce(lag(payout_batch_date) OVER (PARTITION BY merchant_id, currency
+                    ORDER BY payout_batch_date) + 1, payout_batch_date - {window - 1}),
+                    payout_batch_date - {window - 1}) AS coverage_start_date
+            FROM (
+                SELECT merchant_id, payout_currency AS currency, payout_batch_date,
+                    list_sort(list(payout_id)) AS payout_ids, count(*) AS payout_count,
+                    CAST(sum(CAST(is_payout_failed AS INTEGER)) AS BIGINT) AS failed_payout_count,
+                    CAST(sum(gross_cents) AS BIGINT) AS payout_gross_cents,
+                    CAST(sum(fees_cents) AS BIGINT) AS payout_fees_cents,
+                    CAST(sum(payout_transaction_count) AS BIGINT) AS payout_transaction_count
+                FROM silver_payouts
+                GROUP BY ALL
+            )
+        ),
+        covered AS (
+            SELECT {batch}, CAST(unnest(generate_series(coverage_start_date, coverage_end_date,
+                INTERVAL 1 DAY)) AS DATE) AS settlement_date
+            FROM batches
+        ),
+        settled AS (
+            SELECT {batch}, CAST(sum(settled_transaction_count) AS BIGINT) AS settled_transaction_count,
+                CAST(sum(settled_gross_cents) AS BIGINT) AS settled_gross_cents,
+                CAST(sum(settled_fees_cents) AS BIGINT) AS settled_fees_cents, count(*) AS settled_days
+            FROM covered JOIN daily USING ({bucket})
+            GROUP BY ALL
+        ),
+        paid AS (
+            SELECT *, {status_sql(int(settings[TOLERANCE]))} AS reconciliation_status FROM (
+                SELECT b.*, payout_batch_date AS reconciliation_date, 'payout' AS reconciliation_type,
+                    coalesce(s.settled_transaction_count, 0) AS settled_transaction_count,
+                    coalesce(s.settled_gross_cents, 0) AS settled_gross_cents,
+                    coalesce(s.settled_fees_cents, 0) AS settled_fees_cents,
+                    coalesce(s.settled_days, 0) AS settled_days,
+                    payout_gross_cents - coalesce(s.settled_gross_cents, 0) AS gross_difference_cents,
+                    payout_transaction_count - coalesce(s.settled_transaction_count, 0)
+                        AS transaction_count_difference
+                FROM batches b LEFT JOIN settled s USING ({batch})
+            )
+        )
+        SELECT {', '.join(RECONCILIATION_COLUMNS)}, {NOW} AS gold_created_at, current_date AS snapshot_date
+        FROM paid
+        UNION ALL BY NAME
+        SELECT {', '.join(f"{unpaid.get(name, name)} AS {name}" for name in RECONCILIATION_COLUMNS)},
+            {NOW} AS gold_created_at, current_date AS snapshot_date
+        FROM daily ANTI JOIN covered USING ({bucket})
+    """
+
+# DuckDB equivalents of the pipeline's Python tables: name -> (layer, source file, reads, view, query)
+PYTHON_TABLES: Dict[str, Tuple[str, str, List[str], bool, Callable[[Dict[str, str]], str]]] = {
+    "silver_transactions": ("silver", "silver/transactions.py", ["silver_transaction_events"], False,
+                            silver_transactions),
+    "silver_unified_transactions_base": (
+        "silver", "silver/unified_transactions.py",
+        ["silver_transaction_events", "silver_orders", "silver_merchants", "silver_customers", "silver_payments"],
+        False, silver_unified_transactions_base),
+    "silver_disputes_latest": ("silver", "silver/unified_transactions.py", ["silver_disputes"], False,
+                               silver_disputes_latest),
+    "unified_transaction_changes": (
+        "silver", "silver/unified_transactions.py",
+        ["silver_unified_transactions_base", "silver_transactions", "silver_transaction_events",
+         "silver_disputes", "silver_disputes_latest"],
+        True, unified_transaction_changes),
+    "silver_unified_transactions": ("silver", "silver/unified_transactions.py", ["unified_transaction_changes"],
+                                    False, silver_unified_transactions),
+    **{
+        f"unified_{consumer}": ("silver", "silver/unified_transactions.py",
+                                ["silver_unified_transactions", "silver_merchants", "silver_customers",
+                                 "silver_payments"], True, unified_view(consumer))
+        for consumer in CONSUMERS
+    },
+    "silver_unified_transactions_late": (
+        "silver", "silver/unified_transactions.py",
+        ["silver_transactions", "silver_unified_transactions_base", "silver_orders", "silver_merchants",
+         "silver_customers", "silver_payments"],
+        False, silver_unified_transactions_late),
+    "silver_velocity_features": ("silver", "silver/velocity_features.py", ["silver_unified_transactions_base"],
+                                 False, silver_velocity_features),
+    "gold_risk_fraud_monitoring": ("gold", "gold/risk_fraud_monitoring.py",
+                                   ["unified_risk_fraud_monitoring", "silver_velocity_features"], False,
+                                   gold_risk_fraud_monitoring),
+    "gold_payout_reconciliation": ("gold", "gold/payout_reconciliation.py",
+                                   ["silver_payouts", "silver_transaction_events", "silver_orders"], False,
+                                   gold_payout_reconciliation),
+}
+
+
+def pipeline_settings(pipeline_dir: str, conf: List[str]) -> Dict[str, str]:
+    """Setting defaults declared in the pipeline's Python files, overridden by KEY=VALUE items"""
+    settings: Dict[str, str] = {}
+    for layer in LAYERS:
+        folder = os.path.join(pipeline_dir, layer)
+        for filename in sorted(os.listdir(folder)):
+            if filename.endswith(".py"):
+                with open(os.path.join(folder, filename)) as f:
+                    settings.update(SETTING.findall(f.read()))
+    settings.update(setting.partition("=")[::2] for setting in conf)
+    return settings
+
+def load_local(settings: Dict[str, str], pipeline_dir: str = PIPELINE_DIR, bronze: str = "bronze") -> List[TableDef]:
+    """Every table of the pipeline with a DuckDB query, in dependency order"""
+    tables: Dict[str, TableDef] = {}
+    for layer in LAYERS:
+        folder = os.path.join(pipeline_dir, bronze if layer == "bronze" else layer)
+        for filename in sorted(os.listdir(folder)):
+            path = os.path.join(folder, filename)
+            if filename.endswith(".sql"):
+                table = parse_sql(path, layer)
+                tables[table.name] = table._replace(query=translate(table.query))
+            elif filename.endswith(".py"):
+                with open(path) as f:
+                    unknown = set(PY_TABLE.findall(f.read())) - set(PYTHON_TABLES)
+                if unknown:
+                    raise ValueError(f"{path}: no DuckDB equivalent for {', '.join(sorted(unknown))} in local.py")
+    for name, (layer, source, reads, view, query) in PYTHON_TABLES.items():
+        tables[name] = TableDef(name, layer, os.path.join(pipeline_dir, source), "python", query(settings), None,
+                                [], reads, None, view)
+    return dependency_order(tables)
+
+def run_table(connection: Any, table: TableDef, data_dir: str) -> Dict[str, Any]:
+    """Create one table (or view) from its DuckDB query; expectations as in pipeline.apply_expectations"""
+    started = time.perf_counter()
+    if table.source is not None:
+        connection.execute(f"CREATE OR REPLACE TEMP VIEW {landing_view(table.name)} AS "
+                           f"{landing_sql(connection, table, data_dir)}")
+    query = table.query
+    for expectation in table.expectations:
+        condition = translate(expectation.condition)
+        if expectation.action == "drop":
+            query = f"SELECT * FROM ({query}) WHERE coalesce(({condition}), false)"
+        elif expectation.action == "fail":
+            violations = connection.execute(
+                f"SELECT count(*) FROM ({query}) WHERE NOT coalesce(({condition}), false)").fetchone()[0]
+            if violations:
+                raise RuntimeError(f"expectation {expectation.name} failed")
+    connection.execute(f"CREATE OR REPLACE {'TEMP VIEW' if table.view else 'TABLE'} {table.name} AS {query}")
+    rows = connection.execute(f"SELECT count(*) FROM {table.name}").fetchone()[0]
+    seconds = time.perf_counter() - started
+    return {
+        "layer": table.layer,
+        "seconds": round(seconds, 3),
+        "rows": rows,
+        "rows_per_sec": round(rows / seconds) if seconds > 0 else None,
+    }
+
+def save(connection: Any, table: TableDef, output: str) -> None:
+    """Write a table as <output>/<table>/part-0.parquet, the layout of the Spark warehouse"""
+    folder = os.path.join(output, table.name)
+    os.makedirs(folder, exist_ok=True)
+    connection.execute(f"COPY {table.name} TO '{os.path.join(folder, 'part-0.parquet')}' (FORMAT parquet)")
+
+def fingerprint(connection: Any, relation: str) -> Dict[str, Any]:
+    """Row count and per-column (non-NULL count, sum or distinct count) of a relation"""
+    types = {row[0]: row[1] for row in connection.execute(f"DESCRIBE SELECT * FROM {relation}").fetchall()}
+    numeric = re.compile(r"^(BOOLEAN|TINYINT|SMALLINT|INTEGER|BIGINT|HUGEINT|FLOAT|DOUBLE|DECIMAL.*)$")
+    measures = []
+    for column, kind in types.items():
+        if column in VOLATILE:
+            continue
+        if kind == "BOOLEAN":
+            summary = f"sum(CAST({column} AS INTEGER))"
+        elif numeric.match(kind):
+            summary = f"sum(CAST({column} AS DOUBLE))"
+        else:
+            summary = f"count(DISTINCT {column})"
+        measures.append((column, f"count({column}), {summary}"))
+    row = connection.execute(
+        f"SELECT count(*), {', '.join(sql for _, sql in measures) or '0'} FROM {relation}").fetchone()
+    return {"rows": row[0], "columns": {column: row[1 + 2 * index:3 + 2 * index]
+                                        for index, (column, _) in enumerate(measures)}}
+
+def compare(connection: Any, table: TableDef, other: str, tolerance: float) -> List[str]:
+    """Differences of a table against the same table in another run's Parquet output"""
+    folder = os.path.join(other, table.name)
+    if not os.path.isdir(folder):
+        return []
+    mine = fingerprint(connection, table.name)
+    theirs = fingerprint(connection, f"read_parquet('{os.path.join(folder, '*.parquet')}')")
+    differences = []
+    if mine["rows"] != theirs["rows"]:
+        differences.append(f"rows {theirs['rows']} -> {mine['rows']}")
+    for column in sorted(set(mine["columns"]) ^ set(theirs["columns"])):
+        differences.append(f"{column} only in {'this run' if column in mine['columns'] else other}")
+    for column in mine["columns"].keys() & theirs["columns"].keys():
+        (count, value), (other_count, other_value) = mine["columns"][column], theirs["columns"][column]
+        if count != other_count:
+            differences.append(f"{column}: non-NULL {other_count} -> {count}")
+        elif value is not None and other_value is not None and \
+                abs(value - other_value) > tolerance * max(abs(value), abs(other_value), 1):
+            differences.append(f"{column}: {other_value} -> {value}")
+    return differences
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the PSP medallion pipeline on DuckDB, without Spark")
+    parser.add_argument("--sf", type=float, default=1.0, help="scale factor (1 = 4 MB per entity)")
+    parser.add_argument("--format", default="jsonl", choices=["jsonl", "jsonl.gz", "jsonl.zst", "parquet"],
+                        help="landing file format; parquet runs the bronze-parquet tables")
+    parser.add_argument("--data-dir", help="landing files to read instead of a generated scale factor")
+    parser.add_argument("--data-root", default=os.path.join(ROOT, "bench", ".data"),
+                        help="where generated datasets are cached")
+    parser.add_argument("--gen-workers", type=int, default=os.cpu_count() or 1, help="gen.py --workers")
+    parser.add_argument("--skew", action="append", default=[], metavar="CHILD.PARENT=DIST",
+                        help="gen.py --skew for the dataset, e.g. orders.merchants=zipf:1.1")
+    parser.add_argument("--hot-merchants", type=int, default=0, help="gen.py --hot-merchants for the dataset")
+    parser.add_argument("--conf", action="append", default=[], metavar="KEY=VALUE",
+                        help="pipeline setting, e.g. psp.unified.layout=narrow")
+    parser.add_argument("--variants", action="store_true",
+                        help="also run the bench-only query variants in bench/variants")
+    parser.add_argument("--threads", type=int, help="DuckDB threads (default: all cores)")
+    parser.add_argument("--output", help="write every table as Parquet under this folder")
+    parser.add_argument("--compare", metavar="WAREHOUSE",
+                        help="Parquet output of another run to cross-check against (run.py --warehouse, --output)")
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="allowed relative difference of column sums")
+    parser.add_argument("--report", default=os.path.join(REPORT_DIR, "local-report.json"), help="JSON report path")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import duckdb
+
+    args = parse_args(argv)
+    settings = pipeline_settings(PIPELINE_DIR, args.conf)
+    tables = load_local(settings, bronze="bronze-parquet" if args.format == "parquet" else "bronze")
+    if args.variants:
+        tables += [table._replace(query=translate(table.query)) for table in load_variants()]
+    data_dir = args.data_dir or dataset(args.sf, args.data_root, args.format, args.gen_workers, skew_args(args))
+
+    connection = duckdb.connect()
+    connection.execute("SET TimeZone = 'UTC'")
+    if args.threads:
+        connection.execute(f"SET threads = {args.threads}")
+
+    print(f"{len(tables)} tables from {data_dir} on DuckDB {duckdb.__version__}")
+    results: Dict[str, Dict[str, Any]] = {}
+    mismatched = 0
+    for table in tables:
+        result = results[table.name] = run_table(connection, table, data_dir)
+        print(f"  {table.name:36} {result['seconds']:8.2f}s {result['rows']:>12,} rows "
+              f"{result['rows_per_sec'] or 0:>10,} rows/s{'  (view)' if table.view else ''}")
+        if table.view:
+            continue
+        if args.output:
+            save(connection, table, args.output)
+        if args.compare:
+            differences = result["differences"] = compare(connection, table, args.compare, args.tolerance)
+            mismatched += bool(differences)
+            for line in differences:
+                print(f"    DIFFERS {line}")
+    total = round(sum(result["seconds"] for result in results.values()), 3)
+    print(f"Total {total:.2f}s")
+
+    report = {
+        "created_at": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        "duckdb_version": duckdb.__version__,
+        "data_dir": data_dir,
+        "settings": settings,
+        "compare": args.compare,
+        "seconds": total,
+        "tables": results,
+    }
+    write_report(args.report, report)
+    print(f"Wrote {args.report}")
+    if args.compare:
+        print(f"{mismatched} tables differ from {args.compare}")
+        return 1 if mismatched else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
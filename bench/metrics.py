@@ -0,0 +1,80 @@
+"""
+Per-table Spark metrics from the application's monitoring REST API (the Spark UI).
+
+Each table is run under its own job group; once the group's jobs have finished, the
+stages they ran are summed into shuffle, input, spill and task-time totals, and the
+largest stage peakExecutionMemory is taken as the table's peak memory. Task-time balance
+is read from the task summary of the table's slowest stage.
+"""
+
+import json
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+# StageData fields summed over a table's stages
+SUMMED = {
+    "inputBytes": "input_bytes",
+    "shuffleReadBytes": "shuffle_read_bytes",
+    "shuffleWriteBytes": "shuffle_write_bytes",
+    "memoryBytesSpilled": "memory_spilled_bytes",
+    "diskBytesSpilled": "disk_spilled_bytes",
+    "executorRunTime": "executor_run_ms",
+    "numCompleteTasks": "tasks",
+}
+
+
+def _get(spark: Any, endpoint: str) -> Any:
+    context = spark.sparkContext
+    url = f"{context.uiWebUrl}/api/v1/applications/{context.applicationId}/{endpoint}"
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return json.load(response)
+
+def group_stages(spark: Any, group: str, timeout: float = 30.0) -> List[Dict[str, Any]]:
+    """Stage data of every stage run by a job group, once the UI has recorded them all"""
+    deadline = time.time() + timeout
+    while True:
+        jobs = [job for job in _get(spark, "jobs") if job.get("jobGroup") == group]
+        stage_ids = {stage_id for job in jobs for stage_id in job["stageIds"]}
+        stages = [stage for stage in _get(spark, "stages") if stage["stageId"] in stage_ids]
+        settled = all(job["status"] != "RUNNING" for job in jobs) and all(
+            stage["status"] in ("COMPLETE", "SKIPPED", "FAILED") for stage in stages
+        )
+        if settled or time.time() > deadline:
+            return [stage for stage in stages if stage["status"] != "SKIPPED"]
+        time.sleep(0.2)
+
+def stage_metrics(stages: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Totals over stages plus the largest per-stage peak execution memory"""
+    metrics = {name: sum(stage.get(field, 0) for stage in stages) for field, name in SUMMED.items()}
+    metrics["stages"] = len(stages)
+    metrics["peak_execution_memory_bytes"] = max((stage.get("peakExecutionMemory", 0) for stage in stages), default=0)
+    return metrics
+
+def task_times(spark: Any, stages: List[Dict[str, Any]]) -> Dict[str, Optional[float]]:
+    """Max and median task duration of the stage with the longest task, and their ratio.
+
+    Stages with a single task are skipped when there are others; a skewed key shows up as
+    one task running far longer than the median of its stage.
+    """
+    candidates = [stage for stage in stages if stage.get("numTasks", 0) > 1] or stages
+    worst: Dict[str, Optional[float]] = {"max_task_ms": None, "median_task_ms": None, "task_skew": None}
+    for stage in candidates:
+        summary = _get(spark, f"stages/{stage['stageId']}/{stage['attemptId']}/taskSummary?quantiles=0.5,1.0")
+        median, longest = summary["duration"]
+        if worst["max_task_ms"] is None or longest > worst["max_task_ms"]:
+            worst = {
+                "max_task_ms": round(longest),
+                "median_task_ms": round(median),
+                "task_skew": round(longest / median, 2) if median else None,
+            }
+    return worst
+
+def jvm_peak_memory(spark: Any) -> Dict[str, int]:
+    """Peak JVM heap and off-heap usage of the (local-mode) driver so far"""
+    peaks = {"jvm_heap_peak_bytes": 0, "jvm_off_heap_peak_bytes": 0}
+    for executor in _get(spark, "executors"):
+        memory = executor.get("peakMemoryMetrics") or {}
+        peaks["jvm_heap_peak_bytes"] = max(peaks["jvm_heap_peak_bytes"], memory.get("JVMHeapMemory", 0))
+        peaks["jvm_off_heap_peak_bytes"] = max(peaks["jvm_off_heap_peak_bytes"], memory.get("JVMOffHeapMemory", 0))
+    return peaks
@@ -0,0 +1,250 @@
+"""
+Load the DLT pipeline (src/psp-payment-system-analytics) and run it as plain Spark batch jobs.
+
+SQL files are parsed into a table name, its EXPECT constraints and the query after AS;
+LIVE.<table> and STREAM(LIVE.<table>) become plain table references and cloud_files(...)
+becomes a temp view over local landing files. Python files are imported with the dlt
+stand-in (dlt.py) on sys.path. Tables are then run in dependency order, each written to
+the session warehouse before its dependents read it.
+"""
+
+import importlib.util
+import inspect
+import os
+import re
+import sys
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import dlt
+from dlt import Expectation
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIPELINE_DIR = os.path.join(ROOT, "src", "psp-payment-system-analytics")
+# the psp_* packages the Python tables import; the pipeline finds them from its working directory
+sys.path.append(os.path.join(ROOT, "src"))
+# Bench-only query variants of pipeline tables, under names of their own
+VARIANTS_DIR = os.path.join(ROOT, "bench", "variants")
+LAYERS = ["bronze", "silver", "gold"]
+
+HEADER = re.compile(r"CREATE\s+OR\s+REFRESH\s+(STREAMING\s+)?LIVE\s+TABLE\s+(\w+)", re.I)
+CONSTRAINT = re.compile(
+    r"CONSTRAINT\s+(\w+)\s+EXPECT\s*\((.*)\)(?:\s+ON\s+VIOLATION\s+(DROP\s+ROW|FAIL\s+UPDATE))?\s*,?\s*$",
+    re.I | re.M,
+)
+QUERY_START = re.compile(r"^AS\b", re.M)
+LIVE_REF = re.compile(r"STREAM\s*\(\s*LIVE\.(\w+)\s*\)|LIVE\.(\w+)", re.I)
+CLOUD_FILES = re.compile(
+    r'cloud_files\(\s*"([^"]+)"\s*,\s*"(\w+)"\s*(?:,\s*map\((.*?)\))?\s*\)', re.I | re.S
+)
+OPTION = re.compile(r'"([^"]+)"\s*,\s*"([^"]*)"')
+PY_REF = re.compile(r'dlt\.read(?:_stream)?\(\s*"(\w+)"')
+
+
+class LandingSource(NamedTuple):
+    """A cloud_files() source: file glob (basename of the volume path), format and options"""
+    pattern: str
+    format: str
+    options: Dict[str, str]
+
+
+class TableDef(NamedTuple):
+    name: str
+    layer: str
+    path: str
+    kind: str  # "sql" or "python"
+    query: Optional[str]
+    function: Optional[Callable[[], Any]]
+    expectations: List[Expectation]
+    dependencies: List[str]
+    source: Optional[LandingSource]
+    view: bool = False  # a @dlt.view: a temp view, not saved
+
+
+def landing_view(table: str) -> str:
+    return f"__landing_{table}"
+
+def parse_sql(path: str, layer: str) -> TableDef:
+    """Parse one CREATE OR REFRESH [STREAMING] LIVE TABLE file"""
+    with open(path) as f:
+        text = f.read()
+    header = HEADER.search(text)
+    start = QUERY_START.search(text, header.end() if header else 0)
+    if header is None or start is None:
+        raise ValueError(f"{path}: not a CREATE OR REFRESH LIVE TABLE ... AS <query> definition")
+    name = header.group(2)
+
+    expectations = []
+    for match in CONSTRAINT.finditer(text, header.end(), start.start()):
+        action = match.group(3)
+        action = None if action is None else ("drop" if action.upper().startswith("DROP") else "fail")
+        expectations.append(Expectation(match.group(1), match.group(2), action))
+
+    query = text[start.end():].strip().rstrip(";")
+    source = None
+    cloud_files = CLOUD_FILES.search(query)
+    if cloud_files:
+        options = dict(OPTION.findall(cloud_files.group(3) or ""))
+        source = LandingSource(os.path.basename(cloud_files.group(1)), cloud_files.group(2).lower(), options)
+        query = query[:cloud_files.start()] + landing_view(name) + query[cloud_files.end():]
+        # _metadata is not visible through the temp view; the view carries the path instead
+        query = query.replace("_metadata.file_path", "__file_path")
+
+    dependencies = sorted({stream or live for stream, live in LIVE_REF.findall(query)})
+    query = LIVE_REF.sub(lambda m: m.group(1) or m.group(2), query)
+    return TableDef(name, layer, path, "sql", query, None, expectations, dependencies, source)
+
+def parse_python(path: str, layer: str) -> List[TableDef]:
+    """Import a @dlt.table module with the stand-in dlt and return its tables"""
+    module_name = "psp_pipeline_" + re.sub(r"\W", "_", os.path.relpath(path, PIPELINE_DIR))
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules.setdefault("dlt", dlt)
+    spec.loader.exec_module(module)
+    return [
+        TableDef(name, layer, path, "python", None, table.function, table.expectations,
+                 sorted((set(PY_REF.findall(inspect.getsource(table.function))) | set(table.sources)) - {name}),
+                 None, table.view)
+        for name, table in dlt.TABLES.items() if table.function.__module__ == module_name
+    ]
+
+def load_pipeline(pipeline_dir: str = PIPELINE_DIR, bronze: str = "bronze",
+                  include: Iterable[str] = ()) -> List[TableDef]:
+    """All table definitions of the pipeline, in dependency order.
+
+    bronze names the folder the bronze tables come from (bronze or bronze-parquet);
+    include adds optional gold folders such as gold-sketch.
+    """
+    tables: Dict[str, TableDef] = {}
+    folders = [(layer, bronze if layer == "bronze" else layer) for layer in LAYERS]
+    folders += [("gold", name) for name in include]
+    for layer, name in folders:
+        folder = os.path.join(pipeline_dir, name)
+        for filename in sorted(os.listdir(folder)):
+            path = os.path.join(folder, filename)
+            if filename.endswith(".sql"):
+                definitions = [parse_sql(path, layer)]
+            elif filename.endswith(".py"):
+                definitions = parse_python(path, layer)
+            else:
+                continue
+            for definition in definitions:
+                if definition.name in tables:
+                    raise ValueError(f"{definition.name} is defined in {tables[definition.name].path} and {path}")
+                tables[definition.name] = definition
+    return dependency_order(tables)
+
+def load_variants(variants_dir: str = VARIANTS_DIR) -> List[TableDef]:
+    """The SQL tables of bench/variants; they read pipeline tables, so they run after load_pipeline's"""
+    return [parse_sql(os.path.join(variants_dir, filename), "gold")
+            for filename in sorted(os.listdir(variants_dir)) if filename.endswith(".sql")]
+
+def dependency_order(tables: Dict[str, TableDef]) -> List[TableDef]:
+    """Topological order; fails on references to unknown tables or cycles"""
+    ordered: List[TableDef] = []
+    state: Dict[str, int] = {}  # 1 visiting, 2 done
+
+    def visit(name: str, chain: Tuple[str, ...]) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"dependency cycle: {' -> '.join(chain + (name,))}")
+        if name not in tables:
+            raise ValueError(f"{chain[-1]} reads unknown table {name}")
+        state[name] = 1
+        for dependency in tables[name].dependencies:
+            visit(dependency, chain + (name,))
+        state[name] = 2
+        ordered.append(tables[name])
+
+    for name in tables:
+        visit(name, ())
+    return ordered
+
+
+def schema_hint_casts(hints: str) -> List[Tuple[str, str]]:
+    """Split cloudFiles.schemaHints ("a STRING, b TIMESTAMP") into (column, type) pairs"""
+    pairs = []
+    for hint in filter(None, (part.strip() for part in hints.split(","))):
+        column, spark_type = hint.split(None, 1)
+        pairs.append((column, spark_type))
+    return pairs
+
+def register_landing(spark: Any, table: TableDef, data_dir: str) -> None:
+    """Expose the table's landing files as the temp view its rewritten query reads"""
+    from pyspark.sql import functions as F
+
+    source = table.source
+    reader = spark.read.format(source.format)
+    if "schema" in source.options:
+        # fixed types from gen/schema.py: no inference pass over the files
+        reader = reader.schema(source.options["schema"])
+    elif source.format == "json":
+        reader = reader.option("inferTimestamp", "false")
+    frame = reader.load(os.path.join(data_dir, source.pattern))
+    frame = frame.withColumn("__file_path", F.col("_metadata.file_path"))
+    rescued = source.options.get("rescuedDataColumn")
+    if rescued and rescued not in frame.columns:
+        # Auto Loader only; locally nothing is rescued
+        frame = frame.withColumn(rescued, F.lit(None).cast("string"))
+    for column, spark_type in schema_hint_casts(source.options.get("cloudFiles.schemaHints", "")):
+        if column in frame.columns:
+            frame = frame.withColumn(column, F.col(column).cast(spark_type))
+    frame.createOrReplaceTempView(landing_view(table.name))
+
+def apply_expectations(frame: Any, expectations: Iterable[Expectation]) -> Any:
+    """Drop rows failing ON VIOLATION DROP ROW constraints (a NULL result counts as a violation)"""
+    for expectation in expectations:
+        if expectation.action == "drop":
+            frame = frame.where(f"coalesce(({expectation.condition}), false)")
+        elif expectation.action == "fail":
+            violations = frame.where(f"NOT coalesce(({expectation.condition}), false)").limit(1).count()
+            if violations:
+                raise RuntimeError(f"expectation {expectation.name} failed")
+    return frame
+
+def data_quality(frame: Any, expectations: Iterable[Expectation]) -> Dict[str, Any]:
+    """Passed / failed rows per expectation and rows dropped, as in the event log's data_quality"""
+    from pyspark.sql import functions as F
+
+    expectations = list(expectations)
+    if not expectations:
+        return {}
+    passes = [F.coalesce(F.expr(f"({expectation.condition})"), F.lit(False)) for expectation in expectations]
+    drops = [passed for passed, expectation in zip(passes, expectations) if expectation.action == "drop"]
+    kept = F.lit(True)
+    for passed in drops:
+        kept = kept & passed
+    totals = frame.agg(
+        F.count(F.lit(1)).alias("rows"),
+        F.sum(F.when(~kept, 1).otherwise(0)).alias("dropped"),
+        *[F.sum(F.when(passed, 1).otherwise(0)).alias(f"passed_{index}") for index, passed in enumerate(passes)]
+    ).first()
+    return {
+        "dropped_records": totals["dropped"] or 0,
+        "expectations": [
+            {"name": expectation.name, "passed_records": totals[f"passed_{index}"] or 0,
+             "failed_records": totals["rows"] - (totals[f"passed_{index}"] or 0)}
+            for index, expectation in enumerate(expectations)
+        ],
+    }
+
+def unchecked(spark: Any, table: TableDef, data_dir: str) -> Any:
+    """The DataFrame a table definition produces, before its expectations"""
+    if table.source is not None:
+        register_landing(spark, table, data_dir)
+    if table.kind == "sql":
+        return spark.sql(table.query)
+    dlt.use(spark)
+    return table.function()
+
+def build(spark: Any, table: TableDef, data_dir: str) -> Any:
+    """The DataFrame a table definition produces, with its expectations applied"""
+    return apply_expectations(unchecked(spark, table, data_dir), table.expectations)
+
+def materialize(spark: Any, table: TableDef, data_dir: str, table_format: str = "parquet") -> None:
+    """Run one table and save it in the session warehouse under its pipeline name (views stay temp views)"""
+    frame = build(spark, table, data_dir)
+    if table.view:
+        frame.createOrReplaceTempView(table.name)
+        return
+    frame.write.mode("overwrite").format(table_format).saveAsTable(table.name)
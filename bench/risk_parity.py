@@ -0,0 +1,178 @@
+"""
+Parity and latency check for the shared risk rules (src/psp_risk).
+
+Random silver_unified_transactions rows, built around every rule threshold and with NULLs in
+every input column, are scored four ways and compared column by column:
+
+- the rules' SQL expressions (what gold_risk_fraud_monitoring runs), executed by DuckDB
+- the same expressions on Spark, with --spark (needs pyspark)
+- rules.score_frame() over a pandas DataFrame
+- rules.score() row by row
+
+The online path is then timed: RiskScorer.score() over warmed lookup caches, reporting
+p50/p99/max latency per transaction.
+
+    python3 risk_parity.py --rows 200000 --spark
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from psp_risk import rules
+from psp_risk.scorer import CUSTOMER_COLUMNS, MERCHANT_COLUMNS, PAYMENT_COLUMNS, LookupCache, RiskScorer
+
+# Values around every threshold in the rules; None is SQL NULL
+VALUES: Dict[str, List[Any]] = {
+    "merchant_risk_level": ["critical", "high", "medium", "low", None],
+    "dispute_category": ["fraud_related", "authorization", "processing_error", None],
+    "customer_tenure_days": [-1, 0, 6, 7, 8, 29, 30, 31, 365, None],
+    "days_since_customer_created": [-1, 0, 1, 2, 30, None],
+    "days_since_payment_first_seen": [-1, 0, 1, 2, 30, None],
+    "order_hour": list(range(24)) + [None],
+    "transaction_amount": [0.5, 100.0, 100.01, 200.0, 200.01, 300.0, 300.01, 500.0, 500.01,
+                           1000.0, 1000.01, 4999.99, None],
+}
+BOOLEAN = [True, False, None]
+DTYPES = {"customer_tenure_days": "Int64", "days_since_customer_created": "Int64",
+          "days_since_payment_first_seen": "Int64", "order_hour": "Int64", "transaction_amount": "Float64"}
+
+
+def random_rows(rng: np.random.Generator, n: int) -> Any:
+    """A pandas DataFrame of rule inputs with nullable dtypes, so NULLs survive into DuckDB"""
+    import pandas as pd
+
+    data = {}
+    for name in rules.INPUT_COLUMNS:
+        choices = VALUES.get(name, BOOLEAN)
+        picks = rng.integers(0, len(choices), n)
+        dtype = DTYPES.get(name, "string" if name in VALUES else "boolean")
+        data[name] = pd.array([choices[i] for i in picks], dtype=dtype)
+    return pd.DataFrame(data)
+
+def duckdb_scores(df: Any) -> Any:
+    import duckdb
+
+    inner = ", ".join(f"{expression} AS {name}" for name, expression in rules.sql_columns())
+    derived = dict(rules.sql_derived_columns())
+    outer = ", ".join(f"{derived[name]} AS {name}" if name in derived else name for name in rules.OUTPUT_COLUMNS)
+    connection = duckdb.connect()
+    connection.register("silver_unified_transactions", df)
+    return connection.execute(
+        f"SELECT {outer} FROM (SELECT *, {inner} FROM silver_unified_transactions)"
+    ).df()
+
+def spark_scores(df: Any) -> Any:
+    from pyspark.sql import SparkSession
+    from pyspark.sql import functions as F
+
+    spark = SparkSession.builder.master("local[*]").appName("psp-risk-parity").getOrCreate()
+    rows = df.astype(object).where(df.notna(), None)
+    frame = spark.createDataFrame(rows.to_dict("records"), schema=spark_schema())
+    frame = frame.withColumn("__row", F.monotonically_increasing_id())
+    scored = frame.select("*", *[F.expr(expression).alias(name) for name, expression in rules.sql_columns()])
+    derived = dict(rules.sql_derived_columns())
+    result = scored.select(
+        "__row", *[F.expr(derived[name]).alias(name) if name in derived else F.col(name)
+                   for name in rules.OUTPUT_COLUMNS]
+    ).orderBy("__row").toPandas()
+    return result.drop(columns="__row")
+
+def spark_schema() -> str:
+    types = {"Int64": "INT", "Float64": "DOUBLE"}
+    return ", ".join(
+        f"{name} {types.get(DTYPES.get(name), 'STRING' if name in VALUES else 'BOOLEAN')}"
+        for name in rules.INPUT_COLUMNS
+    )
+
+def row_scores(df: Any) -> Any:
+    import pandas as pd
+
+    records = df.astype(object).where(df.notna(), None).to_dict("records")
+    return pd.DataFrame([rules.score(record) for record in records], columns=rules.OUTPUT_COLUMNS)
+
+def mismatches(expected: Any, actual: Any, label: str, inputs: Any, limit: int = 5) -> int:
+    count = 0
+    for name in rules.OUTPUT_COLUMNS:
+        left = expected[name].astype(object).to_numpy()
+        right = actual[name].astype(object).to_numpy()
+        differs = np.array([a != b for a, b in zip(left, right)])
+        for index in np.flatnonzero(differs)[:limit]:
+            print(f"  {label} {name} row {index}: sql={left[index]!r} {label}={right[index]!r} "
+                  f"inputs={inputs.iloc[index].to_dict()}")
+        count += int(differs.sum())
+    return count
+
+
+def latency(rng: np.random.Generator, n: int) -> Dict[str, float]:
+    """Per-transaction RiskScorer.score() latency in microseconds, with warm caches"""
+    entities = 10_000
+    now = datetime(2025, 6, 1, tzinfo=timezone.utc)
+    merchants = LookupCache("silver_merchants", "merchant_id", MERCHANT_COLUMNS, entities)
+    customers = LookupCache("silver_customers", "customer_id", CUSTOMER_COLUMNS, entities)
+    payments = LookupCache("silver_payments", "payment_id", PAYMENT_COLUMNS, entities)
+    merchants.warm({"merchant_id": f"m{i}", "risk_level": ["low", "medium", "high", "critical"][i % 4],
+                    "is_kyb_approved": i % 5 != 0} for i in range(entities))
+    customers.warm({"customer_id": f"c{i}", "is_flagged_customer": i % 50 == 0, "is_vip_customer": i % 20 == 0,
+                    "customer_tenure_days": i % 400, "customer_created_at": now - timedelta(days=i % 400)}
+                   for i in range(entities))
+    payments.warm({"payment_id": f"p{i}", "payment_first_seen_at": now - timedelta(days=i % 90)}
+                  for i in range(entities))
+    scorer = RiskScorer(merchants, customers, payments)
+
+    picks = rng.integers(0, entities, (n, 3))
+    amounts = rng.integers(50, 200_000, n)
+    transactions = [
+        {"merchant_id": f"m{m}", "customer_id": f"c{c}", "payment_id": f"p{p}", "amount_cents": int(amount),
+         "three_ds": "frictionless" if amount % 3 else "none", "response_code": "00" if amount % 7 else "05",
+         "authorized_at": now, "order_created_at": now - timedelta(minutes=int(amount % 600))}
+        for (m, c, p), amount in zip(picks, amounts)
+    ]
+    timings = []
+    for txn in transactions:
+        started = time.perf_counter_ns()
+        scorer.score(txn)
+        timings.append((time.perf_counter_ns() - started) / 1000)
+    timings.sort()
+    return {
+        "p50_us": statistics.median(timings),
+        "p99_us": timings[int(len(timings) * 0.99) - 1],
+        "max_us": timings[-1],
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check that every evaluation of the risk rules agrees")
+    parser.add_argument("--rows", type=int, default=100_000, help="random rule-input rows to compare")
+    parser.add_argument("--latency-rows", type=int, default=100_000, help="transactions to time online")
+    parser.add_argument("--spark", action="store_true", help="also evaluate on local Spark")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    inputs = random_rows(rng, args.rows)
+    expected = duckdb_scores(inputs)
+    candidates = {"pandas": rules.score_frame(inputs).reset_index(drop=True), "row": row_scores(inputs)}
+    if args.spark:
+        candidates["spark"] = spark_scores(inputs)
+
+    failed = 0
+    for label, actual in candidates.items():
+        count = mismatches(expected, actual, label, inputs)
+        print(f"{label:>6} vs SQL: {count} mismatching values over {args.rows:,} rows")
+        failed += count
+
+    timings = latency(rng, args.latency_rows)
+    print(f"online score(): p50 {timings['p50_us']:.1f} us, p99 {timings['p99_us']:.1f} us, "
+          f"max {timings['max_us']:.1f} us over {args.latency_rows:,} transactions")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""
+Benchmark the medallion pipeline (bronze -> silver -> silver_unified_transactions -> gold)
+on local-mode Spark at generator scale factors.
+
+Scale factor N is N x the shipped sample size (4 MB of JSON per entity), generated once
+per format with the batch engine under a fixed seed and date window and cached under
+--data-root. Every table is run as a batch job under its own Spark job group; wall time,
+output rows, rows/sec, shuffle bytes, spill and peak execution memory are recorded per
+table and written to a JSON report. With --baseline the report is compared against an
+earlier one and the run exits non-zero on regressions.
+
+    python3 run.py --sf 1 10 100 --report bench-report.json
+    python3 run.py --sf 10 --baseline bench-report.json --tolerance 0.25
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urlparse
+
+from events import EventWriter, new_update_id
+from metrics import group_stages, jvm_peak_memory, stage_metrics, task_times
+from pipeline import ROOT, TableDef, data_quality, load_pipeline, materialize, unchecked
+
+GEN_DIR = os.path.join(ROOT, "gen")
+SF_MB = 4
+# Pinned so cached datasets and reports stay comparable across days
+GEN_AS_OF = "2025-06-01"
+GEN_SEED = 42
+# Metrics compared against the baseline, besides wall time and row counts
+COMPARED = ["shuffle_read_bytes", "shuffle_write_bytes", "peak_execution_memory_bytes", "stored_bytes"]
+# Default report location, ignored by git like the cached datasets
+REPORT_DIR = os.path.join(ROOT, "bench", ".data")
+
+
+def write_report(path: str, report: Dict[str, Any], **options: Any) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, **options)
+        f.write('\n')
+
+def skew_args(args: argparse.Namespace) -> List[str]:
+    """gen.py arguments for the --skew / --hot-merchants options"""
+    gen_args = [f"--skew={spec}" for spec in args.skew]
+    if args.hot_merchants:
+        gen_args += ["--hot-merchants", str(args.hot_merchants)]
+    return gen_args
+
+def dataset(sf: float, data_root: str, output_format: str, workers: int, gen_args: Sequence[str] = ()) -> str:
+    """Generate (once) the landing files for a scale factor; returns their directory.
+
+    gen_args are extra gen.py arguments (e.g. --skew); each set gets its own cached dataset.
+    """
+    name = f"sf{sf:g}-{output_format}"
+    if gen_args:
+        name += "-" + hashlib.sha1(" ".join(gen_args).encode()).hexdigest()[:8]
+    path = os.path.join(data_root, name)
+    if os.path.exists(os.path.join(path, "_ids.json")):
+        return path
+    print(f"Generating SF{sf:g} ({SF_MB * sf:g} MB per entity, {output_format}) in {path}...")
+    subprocess.run(
+        [sys.executable, "gen.py", "--engine", "batch", "--target-mb", str(SF_MB * sf), "--seed", str(GEN_SEED),
+         "--format", output_format, "--workers", str(workers), "--output-dir", path, *gen_args],
+        cwd=GEN_DIR, env={**os.environ, "PSP_GEN_AS_OF": GEN_AS_OF}, check=True, stdout=subprocess.DEVNULL,
+    )
+    return path
+
+def directory_bytes(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+def stored_bytes(spark: Any, table: TableDef) -> int:
+    """Bytes of the table's files in the warehouse (0 for views)"""
+    if table.view:
+        return 0
+    return sum(os.path.getsize(urlparse(path).path) for path in spark.table(table.name).inputFiles())
+
+def spark_session(args: argparse.Namespace) -> Any:
+    from pyspark.sql import SparkSession
+
+    builder = (
+        SparkSession.builder
+        .master(args.master)
+        .appName("psp-bench")
+        .config("spark.driver.memory", args.driver_memory)
+        .config("spark.sql.shuffle.partitions", str(args.shuffle_partitions))
+        .config("spark.sql.warehouse.dir", args.warehouse)
+        .config("spark.sql.session.timeZone", "UTC")
+        .config("spark.ui.showConsoleProgress", "false")
+    )
+    for setting in args.conf:
+        key, _, value = setting.partition("=")
+        builder = builder.config(key, value)
+    return builder.getOrCreate()
+
+def run_table(spark: Any, table: TableDef, data_dir: str, group: str) -> Dict[str, Any]:
+    """Materialize one table under its own job group and collect its metrics"""
+    context = spark.sparkContext
+    context.setJobGroup(group, table.name)
+    started = time.perf_counter()
+    materialize(spark, table, data_dir)
+    seconds = time.perf_counter() - started
+
+    context.setJobGroup(f"{group}:count", f"{table.name} row count")
+    rows = spark.table(table.name).count()
+    context.clearJobGroup()
+    stored = stored_bytes(spark, table)
+    stages = group_stages(spark, group)
+    return {
+        "layer": table.layer,
+        "seconds": round(seconds, 3),
+        "rows": rows,
+        "rows_per_sec": round(rows / seconds) if seconds > 0 else None,
+        "stored_bytes": stored,
+        "stored_bytes_per_row": round(stored / rows, 1) if rows else None,
+        **stage_metrics(stages),
+        **task_times(spark, stages),
+    }
+
+def record_event(spark: Any, events: EventWriter, update_id: str, table: TableDef, data_dir: str,
+                 result: Dict[str, Any], group: str) -> None:
+    """Write the table's flow_progress event; expectation counts cost one extra pass over its input"""
+    spark.sparkContext.setJobGroup(f"{group}:quality", f"{table.name} expectation counts")
+    quality = data_quality(unchecked(spark, table, data_dir), table.expectations)
+    spark.sparkContext.clearJobGroup()
+    events.flow_progress(table.name, update_id, {
+        "num_output_rows": result["rows"],
+        "duration_ms": round(result["seconds"] * 1000),
+    }, quality)
+
+def run_scale_factor(spark: Any, tables: List[TableDef], sf: float, data_dir: str, repeat: int,
+                     events: Optional[EventWriter] = None) -> Dict[str, Any]:
+    """Run the whole pipeline repeat times; wall times are medians, other metrics from the last run"""
+    runs: List[Dict[str, Dict[str, Any]]] = []
+    for attempt in range(repeat):
+        results = {}
+        update_id = new_update_id(f"sf{sf:g}-{attempt}")
+        for table in tables:
+            group = f"sf{sf:g}/{attempt}/{table.name}"
+            results[table.name] = run_table(spark, table, data_dir, group)
+            if events is not None:
+                record_event(spark, events, update_id, table, data_dir, results[table.name], group)
+        runs.append(results)
+
+    tables_report = {}
+    for table in tables:
+        result = dict(runs[-1][table.name])
+        if repeat > 1:
+            times = [run[table.name]["seconds"] for run in runs]
+            result["seconds"] = round(statistics.median(times), 3)
+            result["seconds_runs"] = times
+            result["rows_per_sec"] = round(result["rows"] / result["seconds"]) if result["seconds"] > 0 else None
+        tables_report[table.name] = result
+        print(f"  {table.name:32} {result['seconds']:8.2f}s {result['rows']:>12,} rows "
+              f"{result['rows_per_sec'] or 0:>10,} rows/s  stored {mb(result['stored_bytes']):>9}  "
+              f"shuffle {mb(result['shuffle_write_bytes']):>9}  "
+              f"peak {mb(result['peak_execution_memory_bytes']):>9}")
+
+    return {
+        "data_dir": data_dir,
+        "input_bytes": directory_bytes(data_dir),
+        "seconds": round(sum(result["seconds"] for result in tables_report.values()), 3),
+        "tables": tables_report,
+        **jvm_peak_memory(spark),
+    }
+
+def mb(value: int) -> str:
+    return f"{value / (1024 * 1024):.1f} MB"
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline: Dict[str, Any], report: Dict[str, Any], tolerance: float,
+            min_seconds: float) -> List[str]:
+    """Regressions of report against baseline, as readable lines"""
+    regressions = []
+    for sf, current in report["scale_factors"].items():
+        previous = baseline.get("scale_factors", {}).get(sf)
+        if previous is None:
+            continue
+        for name, result in current["tables"].items():
+            before = previous["tables"].get(name)
+            if before is None:
+                continue
+            if result["rows"] != before["rows"]:
+                regressions.append(f"SF{sf} {name}: rows changed {before['rows']} -> {result['rows']}")
+            if (result["seconds"] > before["seconds"] * (1 + tolerance)
+                    and result["seconds"] - before["seconds"] >= min_seconds):
+                regressions.append(f"SF{sf} {name}: seconds {before['seconds']} -> {result['seconds']}")
+            for metric in COMPARED:
+                if result.get(metric, 0) > before.get(metric, 0) * (1 + tolerance) + 1024 * 1024:
+                    regressions.append(f"SF{sf} {name}: {metric} {before.get(metric, 0)} -> {result[metric]}")
+    return regressions
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the PSP medallion pipeline on local Spark")
+    parser.add_argument("--sf", type=float, nargs="+", default=[1.0], help="scale factors (1 = 4 MB per entity)")
+    parser.add_argument("--format", default="jsonl", choices=["jsonl", "jsonl.gz", "jsonl.zst", "parquet"],
+                        help="landing file format; parquet runs the bronze-parquet tables")
+    parser.add_argument("--data-root", default=os.path.join(ROOT, "bench", ".data"),
+                        help="where generated datasets are cached")
+    parser.add_argument("--warehouse", default=os.path.join(ROOT, "bench", ".data", "warehouse"),
+                        help="spark.sql.warehouse.dir for the materialized tables")
+    parser.add_argument("--gen-workers", type=int, default=os.cpu_count() or 1, help="gen.py --workers")
+    parser.add_argument("--master", default="local[*]")
+    parser.add_argument("--driver-memory", default="4g")
+    parser.add_argument("--shuffle-partitions", type=int, default=8)
+    parser.add_argument("--skew", action="append", default=[], metavar="CHILD.PARENT=DIST",
+                        help="gen.py --skew for the dataset, e.g. orders.merchants=zipf:1.1")
+    parser.add_argument("--hot-merchants", type=int, default=0, help="gen.py --hot-merchants for the dataset")
+    parser.add_argument("--include", action="append", default=[], metavar="FOLDER",
+                        help="optional pipeline folder to run after gold, e.g. gold-sketch")
+    parser.add_argument("--conf", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra Spark conf / pipeline setting, e.g. psp.unified.join_mode=bounded")
+    parser.add_argument("--repeat", type=int, default=1, help="pipeline runs per scale factor (median time)")
+    parser.add_argument("--report", default=os.path.join(REPORT_DIR, "bench-report.json"), help="JSON report path")
+    parser.add_argument("--events", help="append event-log style flow_progress events (JSONL) for "
+                                         "src/jobs/pipeline_telemetry.py; adds a pass per table for expectation counts")
+    parser.add_argument("--baseline", help="earlier report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative increase per metric")
+    parser.add_argument("--min-seconds", type=float, default=0.5,
+                        help="ignore wall-time increases smaller than this")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    spark = spark_session(args)
+    # after the session: pipeline modules may build Columns at import time
+    tables = load_pipeline(bronze="bronze-parquet" if args.format == "parquet" else "bronze",
+                           include=args.include)
+
+    report: Dict[str, Any] = {
+        "created_at": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        "git_commit": git_commit(),
+        "spark_version": spark.version,
+        "python_version": platform.python_version(),
+        "master": args.master,
+        "driver_memory": args.driver_memory,
+        "shuffle_partitions": args.shuffle_partitions,
+        "format": args.format,
+        "include": args.include,
+        "generator_args": skew_args(args),
+        "conf": dict(setting.partition("=")[::2] for setting in args.conf),
+        "repeat": args.repeat,
+        "scale_factors": {},
+    }
+    for sf in args.sf:
+        data_dir = dataset(sf, args.data_root, args.format, args.gen_workers, skew_args(args))
+        print(f"SF{sf:g}: {len(tables)} tables from {data_dir}")
+        report["scale_factors"][f"{sf:g}"] = run_scale_factor(spark, tables, sf, data_dir, args.repeat,
+                                                              EventWriter(args.events) if args.events else None)
+
+    write_report(args.report, report)
+    print(f"Wrote {args.report}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.tolerance, args.min_seconds)
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        print(f"{len(regressions)} regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
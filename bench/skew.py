@@ -0,0 +1,112 @@
+"""
+Task-time balance of the merchant-keyed tables on skewed generator output.
+
+Generates (once) a dataset whose orders pick merchants from a heavy-tailed distribution
+(gen.py --skew / --hot-merchants), materializes everything the target tables read, and then
+runs the targets once per psp.unified.skew_salt value. For each run it records wall time and
+the max and median task time of the table's slowest stage (metrics.task_times): a hot
+merchant shows up as one task running far longer than the median. The targets include
+gold_merchant_performance_join_first (bench/variants), the gold query without its
+aggregate-before-join skew handling, to compare against gold_merchant_performance.
+
+Streaming joins neither broadcast nor use adaptive skew-join splitting, so by default the
+targets run with both switched off (spark.sql.adaptive.enabled=false,
+spark.sql.autoBroadcastJoinThreshold=-1); otherwise the batch stand-in would hide the skew
+the pipeline meets. --keep-adaptive runs them with the session defaults instead.
+
+    python3 skew.py --sf 1 --skew orders.merchants=zipf:1.2 --hot-merchants 4 --salt 0 16
+"""
+
+import argparse
+import os
+import sys
+from typing import Any, Dict, List, Optional, Set
+
+from pipeline import TableDef, load_pipeline, load_variants, materialize
+from run import REPORT_DIR, dataset, run_table, skew_args, spark_session, write_report
+
+TARGETS = ["silver_unified_transactions_base", "gold_merchant_performance", "gold_merchant_performance_join_first"]
+STREAMING_LIKE = {"spark.sql.adaptive.enabled": "false", "spark.sql.autoBroadcastJoinThreshold": "-1"}
+
+
+def upstream(tables: List[TableDef], targets: List[str]) -> Set[str]:
+    """Names of every table the targets read, directly or indirectly"""
+    by_name = {table.name: table for table in tables}
+    found: Set[str] = set()
+    pending = [dependency for target in targets for dependency in by_name[target].dependencies]
+    while pending:
+        name = pending.pop()
+        if name not in found:
+            found.add(name)
+            pending.extend(by_name[name].dependencies)
+    return found
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Task-time balance of the unified and gold tables on skewed data")
+    parser.add_argument("--sf", type=float, default=1.0, help="scale factor (1 = 4 MB per entity)")
+    parser.add_argument("--skew", action="append", default=[], metavar="CHILD.PARENT=DIST",
+                        help="gen.py --skew (default orders.merchants=zipf:1.2)")
+    parser.add_argument("--hot-merchants", type=int, default=4, help="gen.py --hot-merchants")
+    parser.add_argument("--salt", type=int, nargs="+", default=[0, 16],
+                        help="psp.unified.skew_salt values to compare (0 = no salting)")
+    parser.add_argument("--target", action="append", help=f"tables to compare (default {', '.join(TARGETS)})")
+    parser.add_argument("--keep-adaptive", action="store_true",
+                        help="run the targets with adaptive execution and auto-broadcast left on")
+    parser.add_argument("--data-root", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data"),
+                        help="where generated datasets are cached")
+    parser.add_argument("--warehouse", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                            ".data", "warehouse"))
+    parser.add_argument("--gen-workers", type=int, default=os.cpu_count() or 1, help="gen.py --workers")
+    parser.add_argument("--master", default="local[*]")
+    parser.add_argument("--driver-memory", default="4g")
+    parser.add_argument("--shuffle-partitions", type=int, default=16)
+    parser.add_argument("--conf", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra Spark conf / pipeline setting, e.g. psp.unified.join_mode=bounded")
+    parser.add_argument("--report", default=os.path.join(REPORT_DIR, "skew-report.json"), help="JSON report path")
+    args = parser.parse_args(argv)
+    args.skew = args.skew or ["orders.merchants=zipf:1.2"]
+    return args
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    spark = spark_session(args)
+    tables = load_pipeline() + load_variants()
+    targets = args.target or TARGETS
+    needed = upstream(tables, targets)
+    data_dir = dataset(args.sf, args.data_root, "jsonl", args.gen_workers, skew_args(args))
+
+    print(f"SF{args.sf:g} {' '.join(skew_args(args))}: materializing {len(needed)} upstream tables")
+    for table in tables:
+        if table.name in needed:
+            materialize(spark, table, data_dir)
+    if not args.keep_adaptive:
+        for key, value in STREAMING_LIKE.items():
+            spark.conf.set(key, value)
+
+    runs: Dict[str, Dict[str, Any]] = {}
+    for salt in args.salt:
+        spark.conf.set("psp.unified.skew_salt", str(salt))
+        runs[str(salt)] = {}
+        for table in tables:
+            if table.name not in targets:
+                continue
+            result = run_table(spark, table, data_dir, f"skew/salt{salt}/{table.name}")
+            runs[str(salt)][table.name] = result
+            print(f"  salt {salt:>3}  {table.name:34} {result['seconds']:8.2f}s  "
+                  f"task max {result['max_task_ms'] or 0:>8,} ms  median {result['median_task_ms'] or 0:>6,} ms  "
+                  f"skew {result['task_skew'] or 0:>6.1f}x")
+
+    report = {
+        "sf": args.sf,
+        "generator_args": skew_args(args),
+        "data_dir": data_dir,
+        "streaming_like": not args.keep_adaptive,
+        "conf": dict(setting.partition("=")[::2] for setting in args.conf),
+        "salt": runs,
+    }
+    write_report(args.report, report)
+    print(f"Wrote {args.report}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
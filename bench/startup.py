@@ -0,0 +1,113 @@
+"""
+Compare stream startup with schema inference against the fixed schemas from gen/schema.py.
+
+For every bronze source, a file stream over the generated JSONL landing files is started
+twice: once inferring its schema (spark.sql.streaming.schemaInference, a full pass over
+the files before the query can start, like cloudFiles.inferColumnTypes) and once with the
+"schema" option of its cloud_files() call. Each run records the time to resolve the schema
+and the time until the first micro-batch has been written to a noop sink; the report also
+lists the columns whose inferred type differs from the fixed one.
+
+    python3 startup.py --sf 1 10 --repeat 3 --report .data/startup-report.json
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from pipeline import TableDef, load_pipeline
+from run import REPORT_DIR, dataset, spark_session, write_report
+
+
+def start_stream(spark: Any, table: TableDef, data_dir: str, checkpoint: str, fixed: bool) -> Dict[str, Any]:
+    """Milliseconds to resolve the schema and to finish the first micro-batch"""
+    source = table.source
+    shutil.rmtree(checkpoint, ignore_errors=True)
+    spark.conf.set("spark.sql.streaming.schemaInference", str(not fixed).lower())
+    started = time.perf_counter()
+    reader = spark.readStream.format(source.format).option("maxFilesPerTrigger", 1)
+    reader = reader.schema(source.options["schema"]) if fixed else reader.option("inferTimestamp", "true")
+    frame = reader.load(os.path.join(data_dir, source.pattern))
+    resolved = time.perf_counter()
+    query = (
+        frame.writeStream.format("noop").option("checkpointLocation", checkpoint)
+        .trigger(availableNow=True).start()
+    )
+    query.awaitTermination()
+    finished = time.perf_counter()
+    progress = query.recentProgress
+    return {
+        "schema_ms": (resolved - started) * 1000,
+        "first_batch_ms": (finished - started) * 1000,
+        "rows": progress[0]["numInputRows"] if progress else 0,
+        "schema": {field.name: field.dataType.simpleString() for field in frame.schema.fields},
+    }
+
+def compare_table(spark: Any, table: TableDef, data_dir: str, work_dir: str, repeat: int) -> Dict[str, Any]:
+    result: Dict[str, Any] = {}
+    for mode, fixed in (("inferred", False), ("fixed", True)):
+        runs = [start_stream(spark, table, data_dir, os.path.join(work_dir, table.name, mode), fixed)
+                for _ in range(repeat)]
+        result[mode] = {
+            "schema_ms": statistics.median(run["schema_ms"] for run in runs),
+            "first_batch_ms": statistics.median(run["first_batch_ms"] for run in runs),
+            "rows": runs[0]["rows"],
+        }
+        result[f"{mode}_schema"] = runs[0]["schema"]
+    inferred, fixed_schema = result.pop("inferred_schema"), result.pop("fixed_schema")
+    result["type_differences"] = {
+        name: {"inferred": inferred.get(name), "fixed": spark_type}
+        for name, spark_type in fixed_schema.items() if inferred.get(name) != spark_type
+    }
+    return result
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Stream startup time with schema inference vs fixed schemas")
+    parser.add_argument("--sf", type=float, nargs="+", default=[1.0], help="scale factors (1 = 4 MB per entity)")
+    parser.add_argument("--data-root", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data"),
+                        help="where generated datasets are cached")
+    parser.add_argument("--warehouse", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                            ".data", "warehouse"))
+    parser.add_argument("--gen-workers", type=int, default=os.cpu_count() or 1, help="gen.py --workers")
+    parser.add_argument("--master", default="local[*]")
+    parser.add_argument("--driver-memory", default="4g")
+    parser.add_argument("--shuffle-partitions", type=int, default=8)
+    parser.add_argument("--conf", action="append", default=[], metavar="KEY=VALUE", help="extra Spark conf")
+    parser.add_argument("--repeat", type=int, default=3, help="starts per table and mode (median time)")
+    parser.add_argument("--report", default=os.path.join(REPORT_DIR, "startup-report.json"), help="JSON report path")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    spark = spark_session(args)
+    bronze = [table for table in load_pipeline() if table.layer == "bronze" and table.source]
+
+    report: Dict[str, Any] = {"repeat": args.repeat, "scale_factors": {}}
+    for sf in args.sf:
+        data_dir = dataset(sf, args.data_root, "jsonl", args.gen_workers)
+        work_dir = os.path.join(args.data_root, f"startup-sf{sf:g}")
+        print(f"SF{sf:g}: {len(bronze)} bronze sources from {data_dir}")
+        tables = {}
+        for table in bronze:
+            result = compare_table(spark, table, data_dir, work_dir, args.repeat)
+            tables[table.name] = result
+            inferred, fixed = result["inferred"], result["fixed"]
+            print(f"  {table.name:22} schema ms {inferred['schema_ms']:>8,.0f} -> {fixed['schema_ms']:>6,.0f}  "
+                  f"first batch ms {inferred['first_batch_ms']:>8,.0f} -> {fixed['first_batch_ms']:>8,.0f}  "
+                  f"{len(result['type_differences'])} inferred types differ")
+        report["scale_factors"][f"{sf:g}"] = {
+            "tables": tables,
+            "inferred_first_batch_ms": sum(result["inferred"]["first_batch_ms"] for result in tables.values()),
+            "fixed_first_batch_ms": sum(result["fixed"]["first_batch_ms"] for result in tables.values()),
+        }
+
+    write_report(args.report, report)
+    print(f"Wrote {args.report}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
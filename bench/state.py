@@ -0,0 +1,216 @@
+"""
+Stream the unified join (silver_unified_transactions_base) over generated data, one event
+day per micro-batch, and record join state size and batch duration per batch for each join
+mode (psp.unified.join_mode), to check that state stays flat as days of data stream through.
+
+Bronze and silver L1 are materialized as batches first (see run.py).
+silver_transaction_events and silver_orders are then rewritten as one Parquet file per event
+day and read back as file streams with maxFilesPerTrigger=1; merchants, customers and payments are streamed
+whole in the first batch (stream mode) or looked up as static tables (bounded mode). The
+unified rows go to a Parquet sink, and silver_unified_transactions_late is computed from it
+afterwards. In bounded mode unified + late accounts for every streamed transaction; in
+stream mode late only lists the transactions still missing a parent.
+
+    python3 state.py --sf 1 --mode stream bounded --report .data/state-report.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+import dlt
+from events import EventWriter, new_update_id
+from pipeline import TableDef, apply_expectations, build, load_pipeline, materialize
+from run import REPORT_DIR, dataset, spark_session, write_report
+
+STREAMED = {"silver_transaction_events": "transaction_date", "silver_orders": "order_date"}
+DIMENSIONS = ["silver_merchants", "silver_customers", "silver_payments"]
+UNIFIED = "silver_unified_transactions_base"
+LATE = "silver_unified_transactions_late"
+
+
+def prepare_inputs(spark: Any, tables: List[TableDef], data_dir: str, work_dir: str,
+                   days: Optional[int]) -> Tuple[Dict[str, Any], int]:
+    """Materialize bronze and silver L1, then expose the unified join's inputs as streams"""
+    from pyspark.sql import functions as F
+
+    for table in tables:
+        if table.layer == "bronze" or (table.layer == "silver" and table.kind == "sql"):
+            materialize(spark, table, data_dir)
+
+    transactions = spark.table("silver_transaction_events")
+    event_days = sorted(row[0] for row in transactions.select("transaction_date").distinct().collect()
+                        if row[0] is not None)
+    if days:
+        event_days = event_days[-days:]
+
+    sources = {}
+    staging = os.path.join(work_dir, "staging")
+    for name, day_column in STREAMED.items():
+        frame = spark.table(name)
+        directory = os.path.join(work_dir, "days", name)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        for position, day in enumerate(event_days):
+            frame.where(F.col(day_column) == F.lit(day)).coalesce(1).write.mode("overwrite").parquet(staging)
+            part = next(entry for entry in sorted(os.listdir(staging)) if entry.endswith(".parquet"))
+            target = os.path.join(directory, f"{day}.parquet")
+            os.replace(os.path.join(staging, part), target)
+            # the file source picks files up in modification-time order
+            os.utime(target, (1_000_000_000 + position, 1_000_000_000 + position))
+        sources[name] = (
+            spark.readStream.schema(frame.schema).option("maxFilesPerTrigger", 1).parquet(directory)
+        )
+        # the late-row check compares against the same days that were streamed
+        spark.read.parquet(directory).createOrReplaceTempView(name)
+    # ... and so does the current state per transaction it reads
+    current = next(table for table in tables if table.name == "silver_transactions")
+    build(spark, current, data_dir).createOrReplaceTempView(current.name)
+    for name in DIMENSIONS:
+        frame = spark.table(name)
+        location = os.path.dirname(frame.inputFiles()[0])
+        sources[name] = spark.readStream.schema(frame.schema).parquet(location)
+    return sources, len(event_days)
+
+def progress_dict(progress: Any) -> Dict[str, Any]:
+    return progress if isinstance(progress, dict) else json.loads(progress.json)
+
+def batch_metrics(progress: Dict[str, Any]) -> Dict[str, Any]:
+    """State and timing of one micro-batch, summed over the query's stateful operators"""
+    operators = progress.get("stateOperators", [])
+    return {
+        "batch": progress["batchId"],
+        "input_rows": progress["numInputRows"],
+        "duration_ms": progress["durationMs"].get("triggerExecution", 0),
+        "state_rows": sum(operator.get("numRowsTotal", 0) for operator in operators),
+        "state_memory_bytes": sum(operator.get("memoryUsedBytes", 0) for operator in operators),
+        "dropped_by_watermark": sum(operator.get("numRowsDroppedByWatermark", 0) for operator in operators),
+        "watermark": progress.get("eventTime", {}).get("watermark"),
+    }
+
+def record_events(events: EventWriter, progresses: List[Dict[str, Any]], mode: str, days: int) -> None:
+    """One flow_progress event per micro-batch; the backlog is the event days not yet read"""
+    update_id = new_update_id(f"state-{mode}")
+    for progress in progresses:
+        if not progress["numInputRows"]:
+            continue
+        batch = batch_metrics(progress)
+        output_rows = (progress.get("sink") or {}).get("numOutputRows", -1)
+        metrics = {
+            "duration_ms": batch["duration_ms"],
+            "state_rows": batch["state_rows"],
+            "state_memory_bytes": batch["state_memory_bytes"],
+            "dropped_by_watermark": batch["dropped_by_watermark"],
+            # one event day (file) per trigger
+            "backlog_files": max(0, days - batch["batch"] - 1),
+        }
+        if output_rows >= 0:
+            metrics["num_output_rows"] = output_rows
+        events.flow_progress(UNIFIED, update_id, metrics, status="RUNNING", timestamp=progress["timestamp"])
+
+def stream_unified(spark: Any, tables: Dict[str, TableDef], sources: Dict[str, Any], mode: str,
+                   work_dir: str, data_dir: str, events: Optional[EventWriter] = None,
+                   days: int = 0) -> Dict[str, Any]:
+    """Run the unified join as a streaming query in one join mode and collect per-batch metrics"""
+    spark.conf.set("psp.unified.join_mode", mode)
+    output = os.path.join(work_dir, mode, "unified")
+    checkpoint = os.path.join(work_dir, mode, "checkpoint")
+    shutil.rmtree(os.path.join(work_dir, mode), ignore_errors=True)
+
+    dlt.use(spark, sources)
+    unified = tables[UNIFIED]
+    frame = apply_expectations(unified.function(), unified.expectations)
+    query = (
+        frame.writeStream.format("parquet")
+        .option("path", output)
+        .option("checkpointLocation", checkpoint)
+        .trigger(availableNow=True)
+        .start()
+    )
+    query.awaitTermination()
+    progresses = [progress_dict(progress) for progress in query.recentProgress]
+    batches = [batch_metrics(progress) for progress in progresses]
+    batches = [batch for batch in batches if batch["input_rows"]]
+    if events is not None:
+        record_events(events, progresses, mode, days)
+
+    dlt.use(spark)
+    spark.read.parquet(output).createOrReplaceTempView(UNIFIED)
+    late = build(spark, tables[LATE], data_dir).groupBy("late_reason").count().collect()
+    return {
+        "mode": mode,
+        "unified_rows": spark.table(UNIFIED).count(),
+        "late_rows": {row["late_reason"]: row["count"] for row in late},
+        "summary": summarize(batches),
+        "batches": batches,
+    }
+
+def summarize(batches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """State rows and median batch time in the first and last quarter of the run"""
+    if not batches:
+        return {}
+    quarter = max(1, len(batches) // 4)
+    first, last = batches[:quarter], batches[-quarter:]
+    return {
+        "batches": len(batches),
+        "first_quarter_state_rows": max(batch["state_rows"] for batch in first),
+        "last_quarter_state_rows": max(batch["state_rows"] for batch in last),
+        "max_state_memory_bytes": max(batch["state_memory_bytes"] for batch in batches),
+        "first_quarter_median_ms": statistics.median(batch["duration_ms"] for batch in first),
+        "last_quarter_median_ms": statistics.median(batch["duration_ms"] for batch in last),
+        "dropped_by_watermark": sum(batch["dropped_by_watermark"] for batch in batches),
+    }
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure unified-join state growth on local Spark streaming")
+    parser.add_argument("--sf", type=float, default=1.0, help="scale factor (1 = 4 MB per entity)")
+    parser.add_argument("--mode", nargs="+", default=["stream", "bounded"], choices=["stream", "bounded"],
+                        help="psp.unified.join_mode values to run")
+    parser.add_argument("--days", type=int, help="stream only the last N event days")
+    parser.add_argument("--data-root", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data"),
+                        help="where generated datasets are cached")
+    parser.add_argument("--warehouse", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                            ".data", "warehouse"))
+    parser.add_argument("--gen-workers", type=int, default=os.cpu_count() or 1, help="gen.py --workers")
+    parser.add_argument("--master", default="local[*]")
+    parser.add_argument("--driver-memory", default="4g")
+    parser.add_argument("--shuffle-partitions", type=int, default=8)
+    parser.add_argument("--conf", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra Spark conf / pipeline setting, e.g. psp.unified.transaction_watermark=2 hours")
+    parser.add_argument("--report", default=os.path.join(REPORT_DIR, "state-report.json"), help="JSON report path")
+    parser.add_argument("--events", help="append event-log style flow_progress events (JSONL), one per batch")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    data_dir = dataset(args.sf, args.data_root, "jsonl", args.gen_workers)
+    work_dir = os.path.join(args.data_root, f"state-sf{args.sf:g}")
+
+    spark = spark_session(args)
+    pipeline = load_pipeline()
+    tables = {table.name: table for table in pipeline}
+    sources, days = prepare_inputs(spark, pipeline, data_dir, work_dir, args.days)
+    spark.conf.set("spark.sql.streaming.numRecentProgressUpdates", str(days + 10))
+    print(f"SF{args.sf:g}: streaming {days} event days")
+
+    report: Dict[str, Any] = {"scale_factor": args.sf, "days": days, "modes": {}}
+    for mode in args.mode:
+        result = stream_unified(spark, tables, sources, mode, work_dir, data_dir,
+                                EventWriter(args.events) if args.events else None, days)
+        report["modes"][mode] = result
+        summary = result["summary"]
+        print(f"  {mode:8} state rows {summary.get('first_quarter_state_rows', 0):>12,} -> "
+              f"{summary.get('last_quarter_state_rows', 0):>12,}  batch ms "
+              f"{summary.get('first_quarter_median_ms', 0):>8,.0f} -> {summary.get('last_quarter_median_ms', 0):>8,.0f}  "
+              f"unified {result['unified_rows']:,}  late {sum(result['late_rows'].values()):,}")
+
+    write_report(args.report, report, default=str)
+    print(f"Wrote {args.report}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Correctness and state-size check for the velocity counters (src/psp_risk/velocity.py).
+
+Random transactions over a few days, with skewed payment, customer, card BIN and merchant
+keys, are fed through velocity.Window in micro-batches the way silver_velocity_features
+does: per key in event-time order, evicting behind the watermark after each batch. The
+features are compared with a brute-force DuckDB self-join:
+
+- 1m / 1h counts and amounts must match exactly
+- 24h figures must match the minute-bucket definition (events from the minute 24h back,
+  exclusive, up to the event) and are reported against the exact 24h window
+
+The largest per-key state seen is printed, to show it stays bounded by the watermark.
+
+    python3 velocity_check.py --rows 200000 --days 3 --batch-seconds 60
+"""
+
+import argparse
+import heapq
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from psp_risk import velocity
+
+KEY_COUNTS = {"payment_id": 20_000, "customer_id": 10_000, "card_bin": 300, "merchant_id": 200}
+
+
+def random_events(rng: np.random.Generator, rows: int, days: int) -> Any:
+    import pandas as pd
+
+    start = 1_748_736_000_000  # 2025-06-01
+    times = np.sort(rng.integers(start, start + days * velocity.DAY_MS, rows))
+    data: Dict[str, Any] = {"txn_id": [f"t{i}" for i in range(rows)], "event_time_ms": times.tolist(),
+                            "amount_cents": rng.integers(100, 100_000, rows).tolist()}
+    for entity, count in KEY_COUNTS.items():
+        # Zipf-like skew, so some keys are hot
+        picks = np.minimum(rng.zipf(1.3, rows), count) - 1
+        data[entity] = [f"{entity[0]}{i}" for i in picks]
+    return pd.DataFrame(data)
+
+def run_windows(events: Any, batch_ms: int, watermark_delay_ms: int) -> Any:
+    """Features per (txn_id, entity), micro-batch by micro-batch"""
+    import pandas as pd
+
+    windows: Dict[Any, velocity.Window] = {}
+    expiries: List[Any] = []  # (timeout, key) heap, as GroupState.setTimeoutTimestamp
+    largest = {entity: 0 for entity in velocity.ENTITIES}
+    rows: List[Dict[str, Any]] = []
+    txn_ids = events["txn_id"].tolist()
+    times = events["event_time_ms"].tolist()
+    amounts = events["amount_cents"].tolist()
+    payments = events["payment_id"].tolist()
+    keys = {entity: events[entity].tolist() for entity in velocity.ENTITIES}
+    # events are sorted by time, so each batch is a contiguous slice
+    bounds = np.flatnonzero(np.diff(events["event_time_ms"].to_numpy() // batch_ms)) + 1
+    for start, end in zip([0, *bounds], [*bounds, len(times)]):
+        watermark = times[end - 1] - watermark_delay_ms
+        for entity in velocity.ENTITIES:
+            groups: Dict[Any, List[int]] = {}
+            for index in range(start, end):
+                groups.setdefault(keys[entity][index], []).append(index)
+            for value, indexes in groups.items():
+                window = windows.setdefault((entity, value), velocity.Window())
+                for index in indexes:
+                    rows.append({"txn_id": txn_ids[index], "entity": entity,
+                                 **window.add(times[index], amounts[index], payments[index])})
+                # only keys with data in the batch are visited, like applyInPandasWithState
+                window.evict(watermark)
+                largest[entity] = max(largest[entity], len(window))
+                heapq.heappush(expiries, (window.latest_ms() + velocity.DAY_MS, (entity, value)))
+        while expiries and expiries[0][0] < watermark:
+            _, key = heapq.heappop(expiries)
+            window = windows.get(key)
+            if window is not None and window.latest_ms() + velocity.DAY_MS < watermark:
+                del windows[key]
+    print("largest state per key (events + buckets + payment ids): "
+          + ", ".join(f"{entity} {size:,}" for entity, size in largest.items()))
+    return pd.DataFrame(rows)
+
+def window_sql(events: str, entity: str) -> str:
+    """Brute-force features of one entity over an events relation (txn_id, event_time_ms,
+    amount_cents, payment_id and the entity columns), plus the exact 24h count"""
+    return f"""
+        SELECT a.txn_id, '{entity}' AS entity,
+            count(*) FILTER (WHERE b.event_time_ms > a.event_time_ms - {velocity.MINUTE_MS}) AS txn_count_1m,
+            count(*) FILTER (WHERE b.event_time_ms > a.event_time_ms - {velocity.HOUR_MS}) AS txn_count_1h,
+            count(*) FILTER (WHERE b.event_time_ms // {velocity.MINUTE_MS}
+                             > (a.event_time_ms - {velocity.DAY_MS}) // {velocity.MINUTE_MS}) AS txn_count_24h,
+            coalesce(sum(b.amount_cents) FILTER (WHERE b.event_time_ms > a.event_time_ms - {velocity.HOUR_MS}), 0)
+                AS amount_cents_1h,
+            coalesce(sum(b.amount_cents) FILTER (WHERE b.event_time_ms // {velocity.MINUTE_MS}
+                             > (a.event_time_ms - {velocity.DAY_MS}) // {velocity.MINUTE_MS}), 0)
+                AS amount_cents_24h,
+            count(DISTINCT b.payment_id) FILTER (WHERE b.event_time_ms > a.event_time_ms - {velocity.DAY_MS})
+                AS distinct_payments_24h,
+            count(*) FILTER (WHERE b.event_time_ms > a.event_time_ms - {velocity.DAY_MS}) AS exact_count_24h
+        FROM {events} a JOIN {events} b
+          ON a.{entity} = b.{entity}
+         AND (b.event_time_ms < a.event_time_ms OR (b.event_time_ms = a.event_time_ms AND b.txn_id <= a.txn_id))
+         AND b.event_time_ms >= a.event_time_ms - {velocity.DAY_MS} - {velocity.MINUTE_MS}
+        GROUP BY a.txn_id
+    """
+
+def brute_force(events: Any) -> Any:
+    import duckdb
+
+    connection = duckdb.connect()
+    connection.register("events", events)
+    return connection.execute(
+        " UNION ALL ".join(window_sql("events", entity) for entity in velocity.ENTITIES)
+    ).df()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check the velocity counters against a brute-force self-join")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--batch-seconds", type=int, default=60, help="micro-batch length in event time")
+    parser.add_argument("--watermark-minutes", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    events = random_events(np.random.default_rng(args.seed), args.rows, args.days)
+    actual = run_windows(events, args.batch_seconds * 1000, args.watermark_minutes * velocity.MINUTE_MS)
+    expected = brute_force(events)
+    joined = expected.merge(actual, on=["txn_id", "entity"], suffixes=("", "_window"))
+    if len(joined) != len(expected) or len(actual) != len(expected):
+        print(f"row count mismatch: brute force {len(expected):,}, windows {len(actual):,}")
+        return 1
+
+    failed = 0
+    for feature in velocity.FEATURES:
+        differs = joined[feature].astype("int64") != joined[f"{feature}_window"].astype("int64")
+        print(f"{feature:>22}: {int(differs.sum())} mismatches over {len(joined):,} rows")
+        failed += int(differs.sum())
+    drift = (joined["txn_count_24h_window"] - joined["exact_count_24h"]).abs()
+    print(f"24h count vs exact window: max off by {int(drift.max())}, "
+          f"{(drift > 0).mean():.2%} of rows differ (minute resolution)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
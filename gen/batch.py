@@ -0,0 +1,389 @@
+"""
+Columnar batch engine for the PSP generator (requires numpy).
+
+Each entity is produced N records at a time: ids are encoded in bulk from the table's
+IdAllocator, hashes and last4 come from vectorized digit/letter draws, weighted
+categoricals from precomputed cumulative weights, timestamps from integer epoch
+arrays formatted in bulk, and fee/tax/tip math is done as array ops.
+Rows are then rendered through one %-template per entity that produces the same
+JSON text as json.dumps, so the output is interchangeable with the record engine.
+
+Every field is drawn from the samplers compiled from psp.json (compiler.py, loaded by
+distributions.py), parent skew from skew.py; a seeded numpy Generator plus a fixed batch
+size makes the output reproducible. With
+--transaction-events each transaction's line holds one JSON line per state event.
+"""
+
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from distributions import (
+    CUSTOMERS, DISPUTES, MERCHANTS, ORDER_END_DATE, ORDERS, PAYMENTS, PAYOUTS, STATE_MACHINE, TRANSACTIONS,
+    check_fields,
+)
+from ids import CHAIN, IdAllocator
+from keys import KeyTable
+from skew import Bursts, Skew, SkewedKeys, rank
+
+DEFAULT_BATCH_SIZE = 16384
+EPOCH = datetime(1970, 1, 1)
+TEMPLATE_KEY = re.compile(r'"(\w+)": ')
+
+
+class RecordBatch(NamedTuple):
+    """Rendered JSONL lines plus the raw key columns to store for child entities"""
+    lines: List[str]
+    keys: Dict[str, bytes]
+
+
+def allocate(ids: IdAllocator, n: int) -> np.ndarray:
+    """Vectorized IdAllocator: the next n ids as an S<len> array"""
+    counters = ids.take(n)
+    space = ids.space
+    values = np.arange(counters.start, counters.stop, counters.step, dtype=np.int64)
+    # multiplier * counter overflows int64, so multiply the high and low 20 bits separately
+    high = (values >> 20) * space.multiplier % space.capacity
+    values = ((high << 20) + (values & 0xFFFFF) * space.multiplier + space.offset) % space.capacity
+    out = np.repeat(np.frombuffer(space.pattern.encode('ascii'), dtype=np.uint8)[None, :], n, axis=0)
+    previous = np.zeros(n, dtype=np.int64)
+    for slot in space.slots:
+        values, digits = np.divmod(values, slot.radix)
+        previous = (digits + CHAIN * previous + slot.position) % slot.radix
+        out[:, slot.position] = slot.base + previous
+    return out.view(f'S{len(space.pattern)}').ravel()
+
+def text(values: np.ndarray) -> List[str]:
+    """Decode an S<n> array into Python strings for rendering"""
+    return values.astype(f'U{values.dtype.itemsize}').tolist()
+
+def format_epochs(epochs: np.ndarray) -> List[str]:
+    """Format epoch seconds as YYYY-MM-DDTHH:MM:SS (templates append the Z)"""
+    return np.datetime_as_string(epochs.astype('datetime64[s]'), unit='s').tolist()
+
+def parse_timestamps(values: np.ndarray) -> np.ndarray:
+    """Parse an S20 array of YYYY-MM-DDTHH:MM:SSZ strings into epoch seconds"""
+    stripped = values.view(np.uint8).reshape(-1, 20)[:, :19].copy().view('S19').ravel()
+    return stripped.astype('datetime64[s]').astype(np.int64)
+
+def sample_parents(rng: np.random.Generator, table: KeyTable, n: int) -> np.ndarray:
+    """Pick n parent row indices, uniformly or by power-law rank for a SkewedKeys table"""
+    size = len(table)
+    if not size:
+        raise IndexError(f"cannot sample from empty key table {table.name}")
+    if isinstance(table, SkewedKeys):
+        return np.minimum(rank(rng.random(n), size, table.exponent).astype(np.int64) - 1, size - 1)
+    return rng.integers(0, size, n, dtype=np.int64)
+
+def parent_column(table: KeyTable, column: str, rows: np.ndarray) -> np.ndarray:
+    """Gather one key column for the given parent rows"""
+    spec = table.columns[column]
+    dtype = np.int64 if spec is int else f'S{spec}'
+    return np.frombuffer(table.buffer(column), dtype=dtype, count=len(table))[rows]
+
+def render(template: str, columns: Sequence[List[Any]]) -> List[str]:
+    return [template % row for row in zip(*columns)]
+
+def template_fields(template: str) -> List[str]:
+    """Top-level JSON keys of a record template, in order (state's own keys are nested)"""
+    return [match.group(1) for match in TEMPLATE_KEY.finditer(template)
+            if template.count("{", 0, match.start()) - template.count("}", 0, match.start()) == 1]
+
+
+MERCHANT_TEMPLATE = (
+    '{"merchant_id": "%s", "legal_name": %s, "mcc": %s, "country": %s, "kyb_status": %s, '
+    '"pricing_tier": %s, "risk_level": %s, "created_at": "%sZ"}\n'
+)
+CUSTOMER_TEMPLATE = (
+    '{"customer_id": "%s", "email_hash": "%s", "phone_hash": "%s", "customer_type": %s, '
+    '"created_at": "%sZ"}\n'
+)
+PAYMENT_TEMPLATE = (
+    '{"payment_id": "%s", "customer_id": "%s", "brand": %s, "bin": %s, "last4": "%s", '
+    '"expiry_month": %d, "expiry_year": %s, "wallet_type": %s, "status": %s, "first_seen_at": "%sZ"}\n'
+)
+ORDER_TEMPLATE = (
+    '{"order_id": "%s", "merchant_id": "%s", "customer_id": "%s", "currency": %s, '
+    '"subtotal_cents": %d, "tax_cents": %d, "tip_cents": %d, "total_amount_cents": %d, '
+    '"channel": %s, "created_at": "%sZ"}\n'
+)
+TRANSACTION_TEMPLATE = (
+    '{"txn_id": "%s", "order_id": "%s", "payment_id": "%s", "amount_cents": %d, "currency": "%s", '
+    '"state": {"state_name": %s, "timestamp": %d}, "response_code": %s, "three_ds": %s, '
+    '"authorized_at": "%sZ", "fees_total_cents": %d, "network_fee_cents": %d, "processor_name": %s}\n'
+)
+# state events render each transaction's columns once and only the state per event
+TRANSACTION_HEAD, TRANSACTION_STATE, TRANSACTION_TAIL = TRANSACTION_TEMPLATE.partition(
+    '"state": {"state_name": %s, "timestamp": %d}'
+)
+PAYOUT_TEMPLATE = (
+    '{"payout_id": "%s", "merchant_id": "%s", "batch_day": "%s", "currency": %s, "gross_cents": %d, '
+    '"fees_cents": %d, "reserve_cents": %d, "net_cents": %d, "status": %s, "paid_at": "%sZ", '
+    '"transaction_count": %d}\n'
+)
+DISPUTE_TEMPLATE = (
+    '{"dispute_id": "%s", "txn_id": "%s", "reason_code": %s, "amount_cents": %d, "stage": %s, '
+    '"opened_at": "%sZ", "closed_at": %s, "liability": %s, "status": %s}\n'
+)
+TEMPLATES = {
+    "merchants": MERCHANT_TEMPLATE, "customers": CUSTOMER_TEMPLATE, "payments": PAYMENT_TEMPLATE,
+    "orders": ORDER_TEMPLATE, "transactions": TRANSACTION_TEMPLATE, "payouts": PAYOUT_TEMPLATE,
+    "disputes": DISPUTE_TEMPLATE,
+}
+# a psp.json field the templates do not render fails the import instead of being dropped
+for template_table, template in TEMPLATES.items():
+    check_fields("batch", template_table, template_fields(template))
+
+STATES = STATE_MACHINE.states
+STATE_TOKENS = np.array([json.dumps(state) for state in STATES], dtype=object)
+STATE_STEPS = {
+    STATES.index(state): (step, np.array([STATES.index(value) for value in step.values]))
+    for state, step in STATE_MACHINE.transitions.items() if step is not None
+}
+
+
+PENDING = STATES.index(STATE_MACHINE.initial)
+TERMINAL = np.array([index not in STATE_STEPS for index in range(len(STATES))])
+# inclusive delay in ms into each state (psp.json states.<state>.timestamp)
+DELAY_BOUNDS = np.zeros((2, len(STATES)), dtype=np.int64)
+for target_state, delay in STATE_MACHINE.delays.items():
+    DELAY_BOUNDS[:, STATES.index(target_state)] = delay.bounds
+LIFECYCLE_END_MS = int((ORDER_END_DATE - EPOCH).total_seconds()) * 1000
+
+
+def final_states(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Walk the transaction state machine for n transactions at once; returns state indices"""
+    state = np.full(n, PENDING)
+    while True:
+        moved = False
+        current = state.copy()
+        for index, (step, targets) in STATE_STEPS.items():
+            rows = np.flatnonzero(current == index)
+            if rows.size:
+                state[rows] = targets[step.indices(rng, rows.size)]
+                moved = True
+        if not moved:
+            return state
+
+
+def lifecycles(rng: np.random.Generator, authorized_ms: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Walk the state machine for every transaction, keeping each state it reaches.
+
+    Returns (transaction row, state index, timestamp in ms) per event, ordered by row and
+    time; like record.lifecycle, transitions after ORDER_END_DATE are not reached.
+    """
+    row, state, stamp = np.arange(authorized_ms.size), np.full(authorized_ms.size, PENDING), authorized_ms
+    events = [(row, state, stamp)]
+    while True:
+        moving = ~TERMINAL[state]
+        row, state, stamp = row[moving], state[moving], stamp[moving]
+        if not row.size:
+            break
+        target = np.empty_like(state)
+        for index, (step, targets) in STATE_STEPS.items():
+            rows = np.flatnonzero(state == index)
+            if rows.size:
+                target[rows] = targets[step.indices(rng, rows.size)]
+        stamp = stamp + rng.integers(DELAY_BOUNDS[0, target], DELAY_BOUNDS[1, target] + 1)
+        reached = stamp <= LIFECYCLE_END_MS
+        row, state, stamp = row[reached], target[reached], stamp[reached]
+        events.append((row, state, stamp))
+    rows, states, stamps = (np.concatenate(column) for column in zip(*events))
+    order = np.argsort(rows, kind="stable")
+    return rows[order], states[order], stamps[order]
+
+def render_events(head: Sequence[List[Any]], events: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                  tail: Sequence[List[Any]]) -> List[str]:
+    """One string per transaction holding a JSON line per state event"""
+    heads, tails = render(TRANSACTION_HEAD, head), render(TRANSACTION_TAIL, tail)
+    rows, states, stamps = events
+    lines = [
+        heads[row] + TRANSACTION_STATE % (token, stamp) + tails[row]
+        for row, token, stamp in zip(rows.tolist(), STATE_TOKENS[states].tolist(), stamps.tolist())
+    ]
+    ends = np.cumsum(np.bincount(rows, minlength=len(heads))).tolist()
+    return [''.join(lines[start:end]) for start, end in zip([0] + ends[:-1], ends)]
+
+def merchant_batch(rng: np.random.Generator, n: int, ids: IdAllocator) -> RecordBatch:
+    fields = MERCHANTS.fields
+    merchant_ids = allocate(ids, n)
+    lines = render(MERCHANT_TEMPLATE, [
+        text(merchant_ids),
+        *[fields[name].sample_tokens(rng, n) for name in ("legal_name", "mcc", "country", "kyb_status",
+                                                           "pricing_tier", "risk_level")],
+        format_epochs(fields["created_at"].epochs(rng, n)),
+    ])
+    return RecordBatch(lines, {"merchant_id": merchant_ids.tobytes()})
+
+def customer_batch(rng: np.random.Generator, n: int, ids: IdAllocator) -> RecordBatch:
+    fields = CUSTOMERS.fields
+    customer_ids = allocate(ids, n)
+    lines = render(CUSTOMER_TEMPLATE, [
+        text(customer_ids),
+        text(fields["email_hash"].sample(rng, n)),
+        text(fields["phone_hash"].sample(rng, n)),
+        fields["customer_type"].sample_tokens(rng, n),
+        format_epochs(fields["created_at"].epochs(rng, n)),
+    ])
+    return RecordBatch(lines, {"customer_id": customer_ids.tobytes()})
+
+def payment_batch(rng: np.random.Generator, n: int, ids: IdAllocator, customers: KeyTable) -> RecordBatch:
+    fields = PAYMENTS.fields
+    payment_ids = allocate(ids, n)
+    lines = render(PAYMENT_TEMPLATE, [
+        text(payment_ids),
+        text(parent_column(customers, "customer_id", sample_parents(rng, customers, n))),
+        fields["brand"].sample_tokens(rng, n),
+        fields["bin"].sample_tokens(rng, n),
+        text(fields["last4"].sample(rng, n)),
+        fields["expiry_month"].sample(rng, n).tolist(),
+        *[fields[name].sample_tokens(rng, n) for name in ("expiry_year", "wallet_type", "status")],
+        format_epochs(fields["first_seen_at"].epochs(rng, n)),
+    ])
+    return RecordBatch(lines, {"payment_id": payment_ids.tobytes()})
+
+def order_batch(rng: np.random.Generator, n: int, ids: IdAllocator,
+                merchants: KeyTable, customers: KeyTable, bursts: Optional[Bursts] = None) -> RecordBatch:
+    fields = ORDERS.fields
+    variables = {name: spec.sample(rng, n) for name, spec in ORDERS.vars.items()}
+    subtotal_cents = variables["subtotal_cents"]
+    tax_cents = fields["tax_cents"].evaluate(variables)
+    tip_cents = fields["tip_cents"].evaluate(variables)
+    # the sum of the rounded parts, not psp.json's total rounded once, so silver's valid_amounts holds
+    total_amount_cents = subtotal_cents + tax_cents + tip_cents
+
+    order_ids = allocate(ids, n)
+    currency = fields["currency"]
+    currency_index = currency.indices(rng, n)
+    created_epochs = fields["created_at"].epochs(rng, n)
+    merchant_rows = sample_parents(rng, merchants, n)
+    customer_rows = sample_parents(rng, customers, n)
+    channels = fields["channel"].sample_tokens(rng, n)
+    if bursts:
+        burst_rows = np.flatnonzero(rng.random(n) < bursts.share)
+        hot = rng.integers(0, len(bursts.starts), burst_rows.size)
+        hot_rows = np.array([bursts.row(index, len(merchants)) for index in range(len(bursts.starts))])
+        merchant_rows[burst_rows] = hot_rows[hot]
+        created_epochs[burst_rows] = (np.asarray(bursts.starts, dtype=np.int64)[hot]
+                                      + rng.integers(0, bursts.seconds + 1, burst_rows.size))
+    created_at = format_epochs(created_epochs)
+    lines = render(ORDER_TEMPLATE, [
+        text(order_ids),
+        text(parent_column(merchants, "merchant_id", merchant_rows)),
+        text(parent_column(customers, "customer_id", customer_rows)),
+        currency.tokens[currency_index].tolist(),
+        subtotal_cents.tolist(),
+        tax_cents.tolist(),
+        tip_cents.tolist(),
+        total_amount_cents.tolist(),
+        channels,
+        created_at,
+    ])
+    currencies = np.array(currency.values, dtype='S3')[currency_index]
+    created_at_raw = np.char.add(np.array(created_at, dtype='S19'), b'Z')
+    return RecordBatch(lines, {
+        "order_id": order_ids.tobytes(),
+        "total_amount_cents": total_amount_cents.tobytes(),
+        "currency": currencies.tobytes(),
+        "created_at": created_at_raw.tobytes(),
+    })
+
+def transaction_batch(rng: np.random.Generator, n: int, ids: IdAllocator,
+                      orders: KeyTable, payments: KeyTable, events: bool = False) -> RecordBatch:
+    """One transaction per sampled order, authorized at the order's created_at (see record.py)"""
+    fields = TRANSACTIONS.fields
+    order_rows = sample_parents(rng, orders, n)
+    amount_cents = parent_column(orders, "total_amount_cents", order_rows)
+    authorized_epochs = parse_timestamps(parent_column(orders, "created_at", order_rows))
+
+    variables = {name: TRANSACTIONS.vars[name].sample(rng, n) for name in ("base_fee_rate", "fixed_fee")}
+    fees_total_cents = fields["fees_total_cents"].evaluate(variables, {("orders", "total_amount_cents"): amount_cents})
+
+    txn_ids = allocate(ids, n)
+    head = [
+        text(txn_ids),
+        text(parent_column(orders, "order_id", order_rows)),
+        text(parent_column(payments, "payment_id", sample_parents(rng, payments, n))),
+        amount_cents.tolist(),
+        text(parent_column(orders, "currency", order_rows)),
+    ]
+    if events:
+        states = lifecycles(rng, authorized_epochs * 1000)
+    else:
+        state = [STATE_TOKENS[final_states(rng, n)].tolist(), (authorized_epochs * 1000).tolist()]
+    tail = [
+        fields["response_code"].sample_tokens(rng, n),
+        fields["three_ds"].sample_tokens(rng, n),
+        format_epochs(authorized_epochs),
+        fees_total_cents.tolist(),
+        fields["network_fee_cents"].sample(rng, n).tolist(),
+        fields["processor_name"].sample_tokens(rng, n),
+    ]
+    lines = render_events(head, states, tail) if events else render(TRANSACTION_TEMPLATE, head + state + tail)
+    return RecordBatch(lines, {"txn_id": txn_ids.tobytes(), "amount_cents": amount_cents.tobytes()})
+
+def payout_batch(rng: np.random.Generator, n: int, ids: IdAllocator, merchants: KeyTable) -> RecordBatch:
+    fields = PAYOUTS.fields
+    variables = {name: spec.sample(rng, n) for name, spec in PAYOUTS.vars.items()}
+    gross_cents = variables["gross_amount"]
+    fees_cents = fields["fees_cents"].evaluate(variables)
+    reserve_cents = fields["reserve_cents"].evaluate(variables)
+    net_cents = gross_cents - fees_cents - reserve_cents  # see order_batch's total
+    paid_ms = fields["paid_at"].ms.evaluate(variables, rng=rng, n=n)
+
+    lines = render(PAYOUT_TEMPLATE, [
+        text(allocate(ids, n)),
+        text(parent_column(merchants, "merchant_id", sample_parents(rng, merchants, n))),
+        np.datetime_as_string(variables["batch_date_ms"].astype('datetime64[ms]'), unit='D').tolist(),
+        fields["currency"].sample_tokens(rng, n),
+        gross_cents.tolist(),
+        fees_cents.tolist(),
+        reserve_cents.tolist(),
+        net_cents.tolist(),
+        fields["status"].sample_tokens(rng, n),
+        format_epochs(paid_ms // 1000),
+        fields["transaction_count"].sample(rng, n).tolist(),
+    ])
+    return RecordBatch(lines, {})
+
+def dispute_batch(rng: np.random.Generator, n: int, ids: IdAllocator, transactions: KeyTable) -> RecordBatch:
+    fields = DISPUTES.fields
+    txn_rows = sample_parents(rng, transactions, n)
+
+    lines = render(DISPUTE_TEMPLATE, [
+        text(allocate(ids, n)),
+        text(parent_column(transactions, "txn_id", txn_rows)),
+        fields["reason_code"].sample_tokens(rng, n),
+        parent_column(transactions, "amount_cents", txn_rows).tolist(),
+        fields["stage"].sample_tokens(rng, n),
+        format_epochs(fields["opened_at"].epochs(rng, n)),
+        fields["closed_at"].sample_tokens(rng, n),
+        fields["liability"].sample_tokens(rng, n),
+        fields["status"].sample_tokens(rng, n),
+    ])
+    return RecordBatch(lines, {})
+
+BUILDERS = {
+    "merchants": merchant_batch,
+    "customers": customer_batch,
+    "payments": payment_batch,
+    "orders": order_batch,
+    "transactions": transaction_batch,
+    "payouts": payout_batch,
+    "disputes": dispute_batch,
+}
+
+def source(table: str, parents: List[KeyTable], ids: IdAllocator, rng: np.random.Generator,
+           batch_size: int = DEFAULT_BATCH_SIZE, skew: Skew = Skew(),
+           events: bool = False) -> Iterator[RecordBatch]:
+    """Endless stream of batches for one table, sampling foreign keys from the given parent tables"""
+    make_batch = BUILDERS[table]
+    parents = skew.parents(table, parents)
+    options = {"bursts": skew.bursts} if table == "orders" and skew.bursts else {}
+    if table == "transactions" and events:
+        options["events"] = True
+    while True:
+        yield make_batch(rng, batch_size, ids, *parents, **options)
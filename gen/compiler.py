@@ -0,0 +1,508 @@
+"""
+Compiler from the ShadowTraffic config (psp.json) to native samplers, so ShadowTraffic and
+both local engines draw from one definition instead of a hand-copied one.
+
+compile_config() walks every generator once and turns each spec into a sampler:
+
+- string: a bothify/numerify expression becomes a Pattern; an expression of Faker tokens
+  (FAKER) and literal text a uniform Categorical over every combination
+- oneOf / weightedOneOf: a Categorical with cumulative weights computed once; a choice
+  may itself be a sampler (a nullable timestamp)
+- uniformDistribution: a Uniform, inclusive integers when decimals is 0
+- formatDateTime: a Timestamp over its ms spec, rendered as a date or a timestamp
+- now: the generation window's end, fixed at compile time
+- math: the expression parsed once into a code object (arithmetic over its names only)
+- var, lookup: references the engine resolves from the record's vars and parent key tables
+- stateMachine: a StateMachine of per-state transition Categoricals and delay Uniforms
+
+A sampler draws one value through the random module (draw, record engine) or n values
+through a numpy Generator (sample, batch engine). Any other generator, Faker expression,
+date format, math operator or key a spec does not define (SPEC_KEYS) raises
+UnsupportedGenerator naming the field, so a config change the engines cannot honour fails
+the run instead of drifting from ShadowTraffic. Each engine also checks that it emits
+exactly the compiled fields of every table (distributions.check_fields).
+
+Compiling psp.json takes a few milliseconds and happens once, when distributions.py is
+first imported. Only the batch engine's sample methods need numpy.
+
+    python3 compiler.py                     # compile psp.json and list every field's sampler
+"""
+
+import argparse
+import ast
+import bisect
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG = os.path.join(HERE, "psp.json")
+EPOCH = datetime(1970, 1, 1)
+
+# Faker expressions the config may use, with the values the engines draw them from
+COMPANY_PREFIXES = ["Global", "United", "Premier", "First", "Elite", "Prime", "Royal", "Grand", "Superior"]
+COMPANY_MIDDLES = ["Tech", "Food", "Retail", "Services", "Solutions", "Systems", "Industries", "Group", "Partners"]
+FAKER = {
+    "Company.name": [f"{prefix} {middle}" for prefix in COMPANY_PREFIXES for middle in COMPANY_MIDDLES],
+    "Company.suffix": ["Inc", "Corp", "LLC", "Ltd", "Group", "Co"],
+}
+# ShadowTraffic (Java) date formats -> strftime
+DATE_FORMATS = {
+    "yyyy-MM-dd'T'HH:mm:ss'Z'": "%Y-%m-%dT%H:%M:%SZ",
+    "yyyy-MM-dd": "%Y-%m-%d",
+}
+EXPRESSION = re.compile(r"#\{([\w.]+)(?: '([^']*)')?\}")
+PATTERN_DIRECTIVES = {"bothify": "#?", "numerify": "#"}
+PATTERN_ALPHABETS = {'#': "0123456789", '?': "ABCDEFGHIJKLMNOPQRSTUVWXYZ"}
+# Keys each generator spec may have besides _gen; any other key would be silently ignored
+SPEC_KEYS = {
+    "string": {"expr"},
+    "oneOf": {"choices"},
+    "weightedOneOf": {"choices"},
+    "uniformDistribution": {"bounds", "decimals"},
+    "now": set(),
+    "formatDateTime": {"ms", "format"},
+    "math": {"expr", "names", "format"},
+    "var": {"var"},
+    "lookup": {"container", "keyPrefix", "path"},
+    "previousEvent": {"path"},
+    "stateMachine": {"initial", "transitions", "states"},
+}
+GENERATOR_KEYS = {"container", "containerConfigs", "vars", "data", "fork"}
+FORK_KEYS = {"key"}
+CHOICE_KEYS = {"weight", "value"}
+MATH_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Add, ast.Sub, ast.Mult, ast.Div,
+              ast.USub, ast.UAdd, ast.Name, ast.Load, ast.Constant)
+
+
+class UnsupportedGenerator(ValueError):
+    """A generator, expression or format of the config that has no native sampler"""
+
+
+def check_keys(spec: Mapping[str, Any], allowed: set, where: str) -> None:
+    unknown = set(spec) - allowed
+    if unknown:
+        raise UnsupportedGenerator(f"{where}: unsupported keys {', '.join(sorted(unknown))}")
+
+
+def is_sampler(value: Any) -> bool:
+    return hasattr(value, "draw")
+
+def resolve(value: Any) -> Any:
+    """A literal as is, a sampler as one drawn value"""
+    return value.draw() if is_sampler(value) else value
+
+
+class Categorical:
+    """Weighted categorical sampler with cumulative weights computed once (oneOf, weightedOneOf)"""
+
+    def __init__(self, choices: Sequence[tuple]):
+        weights, values = zip(*choices)
+        self.weights = list(weights)
+        self.values = list(values)
+        self._cum_weights = list(itertools.accumulate(weights))
+        self._nested = any(is_sampler(value) for value in self.values)
+
+    @cached_property
+    def cum_weights(self) -> "np.ndarray":
+        import numpy as np
+
+        return np.asarray(self._cum_weights, dtype=np.float64)
+
+    @cached_property
+    def tokens(self) -> "np.ndarray":
+        """JSON literals, so nullable choices (None -> null) render without per-row branching"""
+        import numpy as np
+
+        return np.array([None if is_sampler(value) else json.dumps(value) for value in self.values], dtype=object)
+
+    @classmethod
+    def uniform(cls, values: Sequence[Any]) -> "Categorical":
+        return cls([(1, value) for value in values])
+
+    @property
+    def choices(self) -> List[tuple]:
+        return list(zip(self.weights, self.values))
+
+    def indices(self, rng: "np.random.Generator", n: int) -> "np.ndarray":
+        import numpy as np
+
+        return np.searchsorted(self.cum_weights, rng.random(n) * self.cum_weights[-1], side='right')
+
+    def sample_tokens(self, rng: "np.random.Generator", n: int) -> List[str]:
+        """n JSON literals; a choice that is a sampler renders its own draws"""
+        import numpy as np
+
+        indices = self.indices(rng, n)
+        tokens = self.tokens[indices]
+        for index, value in enumerate(self.values):
+            if is_sampler(value):
+                rows = np.flatnonzero(indices == index)
+                tokens[rows] = value.sample_tokens(rng, rows.size)
+        return tokens.tolist()
+
+    def draw(self) -> Any:
+        value = self.values[bisect.bisect(self._cum_weights, random.random() * self._cum_weights[-1])]
+        return resolve(value) if self._nested else value
+
+
+class Pattern:
+    """bothify/numerify string: # is a digit, ? an upper-case letter"""
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self._template = pattern.replace('{', '{{').replace('}', '}}').replace('#', '{}').replace('?', '{}')
+        self._alphabets = [PATTERN_ALPHABETS[char] for char in pattern if char in PATTERN_ALPHABETS]
+
+    def draw(self) -> str:
+        return self._template.format(*[random.choice(alphabet) for alphabet in self._alphabets])
+
+    def sample(self, rng: "np.random.Generator", n: int) -> "np.ndarray":
+        """An S<len> array of n strings"""
+        import numpy as np
+
+        template = np.frombuffer(self.pattern.encode('ascii'), dtype=np.uint8)
+        out = np.repeat(template[None, :], n, axis=0)
+        digits = template == ord('#')
+        letters = template == ord('?')
+        if digits.any():
+            out[:, digits] = rng.integers(ord('0'), ord('9') + 1, (n, int(digits.sum())), dtype=np.uint8)
+        if letters.any():
+            out[:, letters] = rng.integers(ord('A'), ord('Z') + 1, (n, int(letters.sum())), dtype=np.uint8)
+        return out.view(f'S{len(self.pattern)}').ravel()
+
+
+class Uniform:
+    """uniformDistribution over inclusive bounds; integers when decimals is 0"""
+
+    def __init__(self, low: float, high: float, decimals: Optional[int] = None):
+        self.low, self.high, self.decimals = low, high, decimals
+
+    @property
+    def bounds(self) -> Tuple[float, float]:
+        return self.low, self.high
+
+    def draw(self) -> Any:
+        if self.decimals == 0:
+            return random.randint(int(self.low), int(self.high))
+        value = random.uniform(self.low, self.high)
+        return value if self.decimals is None else round(value, self.decimals)
+
+    def sample(self, rng: "np.random.Generator", n: int) -> "np.ndarray":
+        if self.decimals == 0:
+            return rng.integers(int(self.low), int(self.high) + 1, n, dtype="int64")
+        values = rng.uniform(self.low, self.high, n)
+        return values if self.decimals is None else values.round(self.decimals)
+
+
+class Var(NamedTuple):
+    """A generator var (or the fork key), drawn once per record by the engine"""
+    name: str
+
+
+class Lookup(NamedTuple):
+    """A column of a previously generated record of another table (its key table)"""
+    table: str
+    column: str
+
+
+class Previous(NamedTuple):
+    """The previous state event's value at path; only valid inside a stateMachine"""
+    path: Tuple[str, ...]
+
+
+class Math:
+    """math expression, compiled once; evaluates over scalars or numpy arrays alike"""
+
+    def __init__(self, expr: str, names: Dict[str, Any], integer: bool, where: str):
+        try:
+            tree = ast.parse(expr, mode="eval")
+        except SyntaxError as error:
+            raise UnsupportedGenerator(f"{where}: cannot parse math expression {expr!r}") from error
+        for node in ast.walk(tree):
+            if not isinstance(node, MATH_NODES):
+                raise UnsupportedGenerator(f"{where}: unsupported {type(node).__name__} in {expr!r}")
+            if isinstance(node, ast.Name) and node.id not in names:
+                raise UnsupportedGenerator(f"{where}: {node.id} is not one of the math names")
+        self.expr, self.names, self.integer = expr, names, integer
+        self.tree = tree.body
+        self.code = compile(tree, where, "eval")
+
+    def evaluate(self, variables: Mapping[str, Any], lookups: Optional[Mapping[Tuple[str, str], Any]] = None,
+                 rng: Optional["np.random.Generator"] = None, n: Optional[int] = None) -> Any:
+        """
+        The expression over its names: vars from variables, lookups from lookups keyed by
+        (table, column), anything else drawn (or sampled n times when rng is given).
+        format "#" rounds half to even, like ShadowTraffic's DecimalFormat.
+        """
+        values = {}
+        for name, spec in self.names.items():
+            if isinstance(spec, Var):
+                values[name] = variables[spec.name]
+            elif isinstance(spec, Lookup):
+                values[name] = (lookups or {})[spec.table, spec.column]
+            elif is_sampler(spec):
+                values[name] = spec.sample(rng, n) if rng is not None else spec.draw()
+            else:
+                values[name] = spec
+        value = eval(self.code, {"__builtins__": {}}, values)
+        if not self.integer:
+            return value
+        return value.round().astype("int64") if hasattr(value, "astype") else int(round(value))
+
+
+class Timestamp:
+    """formatDateTime of an epoch-ms spec (a Uniform, a var or a math expression)"""
+
+    def __init__(self, ms: Any, date_format: str, where: str):
+        if date_format not in DATE_FORMATS:
+            raise UnsupportedGenerator(f"{where}: unsupported date format {date_format!r}")
+        self.ms, self.format = ms, DATE_FORMATS[date_format]
+        self.date_only = "H" not in date_format
+
+    def window(self) -> Tuple[datetime, datetime]:
+        """First and last instant of a Uniform ms spec, as naive UTC datetimes"""
+        if not isinstance(self.ms, Uniform):
+            raise TypeError("only a uniformDistribution timestamp has a window")
+        return tuple(EPOCH + timedelta(milliseconds=bound) for bound in self.ms.bounds)
+
+    def render(self, ms: int) -> str:
+        return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime(self.format)
+
+    def draw(self) -> str:
+        return self.render(self.ms.draw())
+
+    def epochs(self, rng: "np.random.Generator", n: int) -> "np.ndarray":
+        """n uniform second-precision epoch timestamps of a Uniform ms spec"""
+        low, high = self.ms.bounds
+        return rng.integers(int(low) // 1000, int(high) // 1000 + 1, n, dtype="int64")
+
+    def sample_tokens(self, rng: "np.random.Generator", n: int) -> List[str]:
+        import numpy as np
+
+        unit = 'D' if self.date_only else 's'
+        values = np.datetime_as_string(self.epochs(rng, n).astype('datetime64[s]'), unit=unit)
+        return ['"' + value + ('"' if self.date_only else 'Z"') for value in values.tolist()]
+
+
+class StateMachine:
+    """stateMachine: per state its transition (None when terminal) and the delay into it in ms"""
+
+    def __init__(self, initial: str, transitions: Dict[str, Optional[Categorical]],
+                 delays: Dict[str, Uniform], start: Var):
+        self.initial, self.transitions, self.delays, self.start = initial, transitions, delays, start
+
+    @property
+    def states(self) -> List[str]:
+        return list(self.transitions)
+
+
+class Table(NamedTuple):
+    """The compiled generator of one table (keyPrefix)"""
+    name: str
+    vars: Dict[str, Any]
+    fields: Dict[str, Any]
+    fork: Optional[Lookup]
+
+
+class Compiler:
+    def __init__(self, config: Dict[str, Any], now_ms: int):
+        self.generators = {
+            generator["containerConfigs"]["keyPrefix"].strip("/"): generator
+            for generator in config["generators"]
+        }
+        self.now_ms = now_ms
+
+    def table(self, name: str) -> Table:
+        generator = self.generators[name]
+        check_keys(generator, GENERATOR_KEYS, name)
+        fork = generator.get("fork")
+        if fork:
+            check_keys(fork, FORK_KEYS, f"{name}.fork")
+        return Table(
+            name,
+            {var: self.spec(spec, generator, f"{name}.vars.{var}") for var, spec in generator.get("vars", {}).items()},
+            {field: self.spec(spec, generator, f"{name}.{field}") for field, spec in generator["data"].items()},
+            self.spec(fork["key"], generator, f"{name}.fork") if fork else None,
+        )
+
+    def spec(self, spec: Any, generator: Dict[str, Any], where: str) -> Any:
+        if spec is None or isinstance(spec, (bool, int, float, str)):
+            return spec
+        if not isinstance(spec, dict) or "_gen" not in spec:
+            raise UnsupportedGenerator(f"{where}: cannot compile {spec!r}")
+
+        kind = spec["_gen"]
+        if kind in SPEC_KEYS:
+            check_keys(spec, SPEC_KEYS[kind] | {"_gen"}, where)
+        if kind == "string":
+            return self.string(spec["expr"], where)
+        if kind == "oneOf":
+            return Categorical.uniform([self.spec(value, generator, where) for value in spec["choices"]])
+        if kind == "weightedOneOf":
+            for choice in spec["choices"]:
+                check_keys(choice, CHOICE_KEYS, where)
+            return Categorical([(choice["weight"], self.spec(choice["value"], generator, where))
+                                for choice in spec["choices"]])
+        if kind == "uniformDistribution":
+            low, high = (self.spec(bound, generator, where) for bound in spec["bounds"])
+            if not all(isinstance(bound, (int, float)) for bound in (low, high)):
+                raise UnsupportedGenerator(f"{where}: uniformDistribution bounds must be numbers or now")
+            return Uniform(low, high, spec.get("decimals"))
+        if kind == "now":
+            return self.now_ms
+        if kind == "formatDateTime":
+            return Timestamp(self.spec(spec["ms"], generator, where), spec["format"], where)
+        if kind == "math":
+            if spec.get("format") not in (None, "#"):
+                raise UnsupportedGenerator(f"{where}: unsupported math format {spec['format']!r}")
+            names = {name: self.spec(value, generator, f"{where}.{name}") for name, value in spec.get("names", {}).items()}
+            return Math(spec["expr"], names, spec.get("format") == "#", where)
+        if kind == "var":
+            known = set(generator.get("vars", {})) | ({"forkKey"} if "fork" in generator else set())
+            if spec["var"] not in known:
+                raise UnsupportedGenerator(f"{where}: unknown var {spec['var']!r}")
+            return Var(spec["var"])
+        if kind == "lookup":
+            return self.lookup(spec, where)
+        if kind == "previousEvent":
+            return Previous(tuple(spec["path"]))
+        if kind == "stateMachine":
+            return self.state_machine(spec, generator, where)
+        raise UnsupportedGenerator(f"{where}: unsupported generator {kind!r}")
+
+    def string(self, expr: str, where: str) -> Any:
+        """A Pattern, or a Categorical over every combination of Faker values and literal text"""
+        parts: List[Tuple[str, str]] = []
+        position = 0
+        for match in EXPRESSION.finditer(expr):
+            parts.append(("literal", expr[position:match.start()]))
+            name, argument = match.groups()
+            if name in PATTERN_DIRECTIVES and argument is not None:
+                if set(argument) & set("#?") - set(PATTERN_DIRECTIVES[name]):
+                    raise UnsupportedGenerator(f"{where}: {name} does not fill {argument!r}")
+                parts.append(("pattern", argument))
+            elif name in FAKER and argument is None:
+                parts.append(("faker", name))
+            else:
+                raise UnsupportedGenerator(f"{where}: unsupported expression {match.group(0)!r}")
+            position = match.end()
+        parts.append(("literal", expr[position:]))
+        parts = [part for part in parts if part[1]]
+
+        kinds = {kind for kind, _ in parts}
+        if "pattern" in kinds:
+            if "faker" in kinds or any(set(value) & set("#?") for kind, value in parts if kind == "literal"):
+                raise UnsupportedGenerator(f"{where}: cannot mix a pattern with {expr!r}")
+            return Pattern(''.join(value for _, value in parts))
+        options = [FAKER[value] if kind == "faker" else [value] for kind, value in parts]
+        return Categorical.uniform([''.join(combination) for combination in itertools.product(*options)])
+
+    def lookup(self, spec: Dict[str, Any], where: str) -> Lookup:
+        table, path = spec["keyPrefix"].strip("/"), spec.get("path", [])
+        if len(path) != 2 or path[0] != "data":
+            raise UnsupportedGenerator(f"{where}: unsupported lookup path {path}")
+        if table not in self.generators or path[1] not in self.generators[table]["data"]:
+            raise UnsupportedGenerator(f"{where}: lookup of unknown column {table}.{path[1]}")
+        return Lookup(table, path[1])
+
+    def state_machine(self, spec: Dict[str, Any], generator: Dict[str, Any], where: str) -> StateMachine:
+        """Transitions, and each state's timestamp as previousEvent + a uniformDistribution delay"""
+        transitions: Dict[str, Optional[Categorical]] = {}
+        for state, target in spec["transitions"].items():
+            step = self.spec(target, generator, f"{where}.transitions.{state}")
+            transitions[state] = Categorical.uniform([step]) if isinstance(step, str) else step
+            if step is not None and not isinstance(transitions[state], Categorical):
+                raise UnsupportedGenerator(f"{where}.transitions.{state}: expected a state or a choice of states")
+
+        delays: Dict[str, Uniform] = {}
+        start = None
+        for state, fields in spec["states"].items():
+            at = f"{where}.states.{state}"
+            if set(fields) != {"state_name", "timestamp"} or fields["state_name"] != state:
+                raise UnsupportedGenerator(f"{at}: a state must be exactly its state_name and timestamp")
+            timestamp = self.spec(fields["timestamp"], generator, f"{at}.timestamp")
+            if state == spec["initial"] and isinstance(timestamp, Var):
+                start = timestamp
+            elif state != spec["initial"] and isinstance(timestamp, Math) and delay_of(timestamp) is not None:
+                delays[state] = delay_of(timestamp)
+            else:
+                raise UnsupportedGenerator(f"{at}.timestamp: expected a var for the initial state and "
+                                           "previousEvent + uniformDistribution for the others")
+
+        reachable = {value for step in transitions.values() if step is not None for value in step.values}
+        missing = (reachable | {spec["initial"]}) - set(transitions) | reachable - set(delays)
+        if missing:
+            raise UnsupportedGenerator(f"{where}: states without a transition or timestamp: {sorted(missing)}")
+        return StateMachine(spec["initial"], transitions, delays, start)
+
+def delay_of(timestamp: Math) -> Optional[Uniform]:
+    """The delay of a `previous + delay` math expression, or None for any other expression"""
+    tree = timestamp.tree
+    if not (isinstance(tree, ast.BinOp) and isinstance(tree.op, ast.Add)
+            and isinstance(tree.left, ast.Name) and isinstance(tree.right, ast.Name)):
+        return None
+    operands = [timestamp.names[tree.left.id], timestamp.names[tree.right.id]]
+    previous = [value for value in operands if isinstance(value, Previous)]
+    delays = [value for value in operands if isinstance(value, Uniform)]
+    return delays[0] if len(previous) == 1 and len(delays) == 1 else None
+
+
+def compile_config(config: Dict[str, Any], now: datetime) -> Dict[str, Table]:
+    """Every generator of a ShadowTraffic config as a Table of samplers, keyed by table"""
+    compiler = Compiler(config, int((now - EPOCH).total_seconds()) * 1000)
+    return {name: compiler.table(name) for name in compiler.generators}
+
+def load(now: datetime, path: str = CONFIG) -> Dict[str, Table]:
+    with open(path) as f:
+        return compile_config(json.load(f), now)
+
+def describe(sampler: Any) -> str:
+    if isinstance(sampler, Categorical):
+        return f"Categorical({len(sampler.values)} choices)"
+    if isinstance(sampler, Pattern):
+        return f"Pattern({sampler.pattern!r})"
+    if isinstance(sampler, Uniform):
+        return f"Uniform({sampler.low}, {sampler.high}, decimals={sampler.decimals})"
+    if isinstance(sampler, Timestamp):
+        return f"Timestamp({describe(sampler.ms)}, {sampler.format!r})"
+    if isinstance(sampler, Math):
+        return f"Math({sampler.expr!r})"
+    if isinstance(sampler, StateMachine):
+        return f"StateMachine({len(sampler.transitions)} states from {sampler.initial!r})"
+    return repr(sampler)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compile psp.json into native samplers")
+    parser.add_argument("--config", default=CONFIG)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        tables = load(datetime.fromisoformat(os.environ.get("PSP_GEN_AS_OF", datetime.now().date().isoformat())),
+                      args.config)
+    except UnsupportedGenerator as error:
+        print(f"cannot compile {args.config}: {error}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+    for table in tables.values():
+        print(f"{table.name}:")
+        for kind, specs in (("var", table.vars), ("field", table.fields)):
+            for name, sampler in specs.items():
+                print(f"    {kind:5} {name:20} {describe(sampler)}")
+    print(f"compiled {len(tables)} generators in {elapsed * 1000:.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
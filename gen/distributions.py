@@ -0,0 +1,51 @@
+"""
+Value distributions shared by the record and batch generators, compiled from gen/psp.json
+(compiler.py) so the engines and ShadowTraffic read one definition. Each table's samplers
+are TABLES[table].vars / .fields; the constants below are the ones other modules need
+without drawing values.
+"""
+
+import os
+from datetime import date, datetime
+from typing import Sequence
+
+import compiler
+
+# Orders, payouts and disputes run up to today (midnight, so seeded runs repeat within a day);
+# set PSP_GEN_AS_OF=YYYY-MM-DD to pin the window and reproduce a dataset on any day.
+# This is psp.json's "now".
+ORDER_END_DATE = datetime.fromisoformat(os.environ.get("PSP_GEN_AS_OF", date.today().isoformat()))
+
+TABLES = compiler.load(ORDER_END_DATE)
+MERCHANTS, CUSTOMERS, PAYMENTS, ORDERS, TRANSACTIONS, PAYOUTS, DISPUTES = (
+    TABLES[table] for table in ("merchants", "customers", "payments", "orders", "transactions", "payouts", "disputes")
+)
+ORDER_START_DATE = ORDERS.fields["created_at"].window()[0]
+
+# Entity id column -> its bothify pattern
+ID_PATTERNS = {
+    name: sampler.pattern
+    for table in TABLES.values() for name, sampler in table.fields.items()
+    if isinstance(sampler, compiler.Pattern) and name.endswith("_id")
+}
+STATE_MACHINE = TRANSACTIONS.fields["state"]
+
+
+def check_fields(engine: str, table: str, emitted: Sequence[str]) -> None:
+    """Fail unless an engine's records of table carry exactly psp.json's fields, in its order"""
+    expected = list(TABLES[table].fields)
+    if list(emitted) == expected:
+        return
+    missing = [name for name in expected if name not in emitted]
+    extra = [name for name in emitted if name not in expected]
+    problem = "; ".join(filter(None, [
+        missing and f"psp.json fields it does not emit: {', '.join(missing)}",
+        extra and f"fields psp.json does not define: {', '.join(extra)}",
+    ])) or f"fields in another order than psp.json ({', '.join(expected)})"
+    raise compiler.UnsupportedGenerator(f"{engine} engine, {table}: {problem}")
+
+# Share of each entity in the replay event stream (gen.py --replay)
+REPLAY_MIX = {
+    "merchants": 1, "customers": 8, "payments": 8, "orders": 38,
+    "transactions": 38, "payouts": 2, "disputes": 5,
+}
@@ -0,0 +1,129 @@
+"""
+Output formats for the generated landing files: plain, gzip or zstd JSONL, and Parquet.
+
+Writers always render JSON lines (so byte and record targets mean the same thing in every
+format); the sinks here compress them on the fly or, for Parquet, parse each buffered row
+group with pyarrow's JSON reader into the typed columns schema.py derives from gen/psp.json,
+keeping the nested transaction state as a struct. zstd needs the zstandard package and Parquet needs
+pyarrow; both are imported only when that format is used.
+"""
+
+import gzip
+import io
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from schema import column_types
+
+EXTENSIONS = {
+    "jsonl": ".jsonl",
+    "jsonl.gz": ".jsonl.gz",
+    "jsonl.zst": ".jsonl.zst",
+    "parquet": ".parquet",
+}
+
+# Column types per psp.json, in Spark SQL type names (derived by schema.py)
+COLUMN_TYPES: Dict[str, List[Tuple[str, str]]] = column_types()
+
+
+def arrow_type(pa: Any, spark_type: str) -> Any:
+    """pyarrow type for a Spark SQL type name (the subset used in COLUMN_TYPES)"""
+    if spark_type.startswith("struct<"):
+        fields = [field.split(":", 1) for field in spark_type[len("struct<"):-1].split(",")]
+        return pa.struct([(name, arrow_type(pa, value)) for name, value in fields])
+    return {
+        "string": pa.string(),
+        "bigint": pa.int64(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "date": pa.date32(),
+    }[spark_type]
+
+
+class ParquetSink:
+    """Buffers JSON lines and writes one typed Parquet row group per row_group_bytes of JSON"""
+
+    def __init__(self, path: str, table: str, row_group_bytes: int, compression: str):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.json as pj
+        import pyarrow.parquet as pq
+
+        self._pa, self._pc, self._pj = pa, pc, pj
+        self.schema = pa.schema([(name, arrow_type(pa, value)) for name, value in COLUMN_TYPES[table]])
+        # the JSON reader cannot parse dates, so they are read as strings and cast
+        self._dates = [name for name, value in COLUMN_TYPES[table] if value == "date"]
+        self._read_schema = pa.schema([
+            (field.name, pa.string() if field.name in self._dates else field.type) for field in self.schema
+        ])
+        self.row_group_bytes = row_group_bytes
+        self._writer = pq.ParquetWriter(path, self.schema, compression=compression)
+        self._lines: List[str] = []
+        self._size = 0
+
+    def write(self, text: str) -> None:
+        self._lines.append(text)
+        self._size += len(text)
+        if self._size >= self.row_group_bytes:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._lines:
+            return
+        data = ''.join(self._lines).encode('ascii')
+        table = self._pj.read_json(
+            io.BytesIO(data),
+            read_options=self._pj.ReadOptions(block_size=max(len(data), 1 << 20)),
+            parse_options=self._pj.ParseOptions(
+                explicit_schema=self._read_schema, unexpected_field_behavior="error"
+            ),
+        )
+        for name in self._dates:
+            table = table.set_column(
+                table.schema.get_field_index(name), name, self._pc.cast(table[name], self._pa.date32())
+            )
+        self._writer.write_table(table.cast(self.schema), row_group_size=table.num_rows)
+        self._lines = []
+        self._size = 0
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self) -> "ParquetSink":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class OutputFormat(NamedTuple):
+    """Landing file format and its options; open() returns a text sink for JSON lines"""
+    name: str = "jsonl"
+    level: Optional[int] = None
+    row_group_bytes: int = 64 * 1024 * 1024
+    parquet_compression: str = "snappy"
+
+    @property
+    def extension(self) -> str:
+        return EXTENSIONS[self.name]
+
+    def open(self, path: str, table: str) -> Any:
+        if self.name == "jsonl":
+            return open(path, 'w', buffering=1024 * 1024)
+        if self.name == "jsonl.gz":
+            return gzip.open(path, 'wt', compresslevel=6 if self.level is None else self.level)
+        if self.name == "jsonl.zst":
+            import zstandard
+            compressor = zstandard.ZstdCompressor(level=3 if self.level is None else self.level)
+            return zstandard.open(path, 'wt', cctx=compressor)
+        if self.name == "parquet":
+            return ParquetSink(path, table, self.row_group_bytes, self.parquet_compression)
+        raise ValueError(f"unknown output format {self.name!r}")
+
+    def check(self) -> None:
+        """Fail early if the optional dependency for this format is missing"""
+        module = {"jsonl.zst": "zstandard", "parquet": "pyarrow.parquet"}.get(self.name)
+        if module:
+            try:
+                __import__(module)
+            except ImportError as exc:
+                raise SystemExit(f"--format {self.name} requires {module.split('.')[0]} ({exc})")
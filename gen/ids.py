@@ -0,0 +1,138 @@
+"""
+Collision-free ID allocation.
+
+Every entity id is derived from a per-table counter instead of random draws: the
+counter is run through a fixed affine permutation of the pattern's id space, written
+out in the pattern's mixed radix (10 per '#', 26 per '?'), and each digit is then
+offset by the previous output digit so consecutive counters differ everywhere. Every
+step is invertible, so the mapping is a bijection, so ids keep their bothify shape
+(m_#####??##, txn_#####??####, ...) and distinct counters can never collide, without
+any lookup set.
+
+Parallel shards and continuation runs only need disjoint counters: a shard s of S takes
+start + s, start + s + S, ...; a run that appends to an existing dataset starts after
+the next_id recorded in the output directory's _ids.json manifest.
+"""
+
+import json
+import math
+import os
+from typing import Any, Dict, Iterator, NamedTuple, Optional
+
+from distributions import ID_PATTERNS
+
+# Entity table -> id column whose pattern comes from ID_PATTERNS
+ID_COLUMNS = {
+    "merchants": "merchant_id",
+    "customers": "customer_id",
+    "payments": "payment_id",
+    "orders": "order_id",
+    "transactions": "txn_id",
+    "payouts": "payout_id",
+    "disputes": "dispute_id",
+}
+
+MANIFEST = "_ids.json"
+RADIX = {'#': (10, ord('0')), '?': (26, ord('A'))}
+# Golden-ratio multiplier so consecutive counters land far apart in the id space
+GOLDEN = 0.6180339887498949
+SILVER = 0.4142135623730951
+# Digit chaining factor: output digit = (digit + CHAIN * previous output digit + position) % radix
+CHAIN = 7
+# Largest id space the int64 multiply-mod in batch.allocate supports
+MAX_CAPACITY = 2 ** 40
+
+
+class Slot(NamedTuple):
+    position: int
+    radix: int
+    base: int
+
+
+class IdSpace:
+    """Bijection between counters in [0, capacity) and the strings of one bothify pattern"""
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.slots = [Slot(i, *RADIX[char]) for i, char in enumerate(pattern) if char in RADIX]
+        self.capacity = math.prod(slot.radix for slot in self.slots)
+        if not self.slots or self.capacity > MAX_CAPACITY:
+            raise ValueError(f"pattern {pattern!r} has an unsupported id space of {self.capacity}")
+        self.multiplier = max(int(self.capacity * GOLDEN), 1)
+        while math.gcd(self.multiplier, self.capacity) != 1:
+            self.multiplier += 1
+        self.offset = int(self.capacity * SILVER)
+
+    def permute(self, counter: int) -> int:
+        if not 0 <= counter < self.capacity:
+            raise OverflowError(f"id space of {self.pattern!r} exhausted at counter {counter}")
+        return (counter * self.multiplier + self.offset) % self.capacity
+
+    def encode(self, counter: int) -> str:
+        """The id for one counter"""
+        value = self.permute(counter)
+        chars = list(self.pattern)
+        previous = 0
+        for slot in self.slots:
+            value, digit = divmod(value, slot.radix)
+            previous = (digit + CHAIN * previous + slot.position) % slot.radix
+            chars[slot.position] = chr(slot.base + previous)
+        return ''.join(chars)
+
+
+class IdAllocator:
+    """Hands out the ids for counters start, start + step, start + 2 * step, ..."""
+
+    def __init__(self, pattern: str, start: int = 0, step: int = 1):
+        self.space = IdSpace(pattern)
+        self.start = start
+        self.step = step
+        self.issued = 0
+
+    @property
+    def next_counter(self) -> int:
+        """First counter of this allocator's sequence that has not been issued"""
+        return self.start + self.step * self.issued
+
+    def take(self, n: int) -> range:
+        """Reserve the next n counters"""
+        counters = range(self.next_counter, self.next_counter + self.step * n, self.step)
+        if n and counters[-1] >= self.space.capacity:
+            self.space.permute(counters[-1])  # raises OverflowError
+        self.issued += n
+        return counters
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            yield self.space.encode(self.take(1)[0])
+
+
+def allocator(table: str, start: int = 0, shard: int = 0, shards: int = 1) -> IdAllocator:
+    """Allocator for one table (or one shard of it) starting at a reserved counter"""
+    return IdAllocator(ID_PATTERNS[ID_COLUMNS[table]], start + shard, shards)
+
+
+def load_manifest(output_dir: str) -> Dict[str, Dict[str, int]]:
+    """Per-table next_id / next_part left by earlier runs in output_dir (empty if none)"""
+    path = os.path.join(output_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(output_dir: str, manifest: Dict[str, Dict[str, Any]]) -> None:
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def reserved(manifest: Dict[str, Dict[str, int]], table: str, key: str) -> int:
+    return manifest.get(table, {}).get(key, 0)
+
+def record_run(manifest: Dict[str, Dict[str, int]], table: str, next_id: int,
+               next_part: Optional[int] = None) -> None:
+    """Advance a table's reservation past the counters (and part files) a run used"""
+    entry = manifest.setdefault(table, {})
+    entry["next_id"] = max(next_id, entry.get("next_id", 0))
+    if next_part is not None:
+        entry["next_part"] = next_part
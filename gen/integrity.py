@@ -0,0 +1,318 @@
+"""
+Referential integrity and key checks for generated landing files, in bounded memory.
+
+The relationships come from psp.json. A table's first column is its key. A lookup of another
+generator's key is a foreign key, and that includes the transactions fork key. A lookup of
+any other parent column is a copied attribute, and it must equal the parent's value
+(transactions.amount_cents == orders.total_amount_cents). Checks:
+
+- unique <table>: no two records share a key (txn_id and state_name with --transaction-events)
+- fk <child>.<column>: every value is a key of the parent, and for records whose parent
+  exists, the copied attributes equal the parent's columns
+
+The checker is a partitioned hash join. The files are streamed once, table by table. Each
+record's key, foreign keys and copied attributes are written to partition files, by a hash
+of the value they are joined on. Each partition is then checked on its own, one parent table
+at a time. The parent's keys from that partition are loaded into a dict, and its children's
+rows from the same partition are probed against it. Memory is bounded by one partition of
+the largest table, so the number of partitions follows the input size and --memory-mb.
+
+    python3 integrity.py ../data
+    python3 integrity.py ./output --memory-mb 64 --report integrity.json
+"""
+
+import argparse
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import schema
+
+NULL = "\\N"
+# Bytes of decoded JSON per byte of compressed input, for sizing the partitions
+COMPRESSION_RATIO = {".gz": 6, ".zst": 6}
+
+
+class ForeignKey(NamedTuple):
+    child: str
+    column: str
+    parent: str
+    attributes: List[Tuple[str, str]]  # (child column, parent column) copied from the parent row
+
+    @property
+    def name(self) -> str:
+        return f"{self.child}.{self.column} -> {self.parent}"
+
+
+class Relationships(NamedTuple):
+    keys: Dict[str, str]  # table -> key column
+    foreign_keys: List[ForeignKey]
+
+    def parent_columns(self, table: str) -> List[str]:
+        """Columns of table that its children copy"""
+        return list(dict.fromkeys(parent_column for fk in self.foreign_keys if fk.parent == table
+                                  for _, parent_column in fk.attributes))
+
+
+def resolve(spec: Any, generator: Dict[str, Any]) -> Any:
+    """A data spec with vars (and the fork key) replaced by what they stand for"""
+    while isinstance(spec, dict) and spec.get("_gen") == "var":
+        spec = generator["fork"]["key"] if spec["var"] == "forkKey" else generator["vars"][spec["var"]]
+    return spec
+
+def relationships(registry: schema.Registry) -> Relationships:
+    """Keys and foreign keys of the generators in a ShadowTraffic config"""
+    keys = {table: next(iter(registry.generators[table]["data"])) for table in registry.tables()}
+    foreign_keys = []
+    for table in registry.tables():
+        generator = registry.generators[table]
+        lookups: Dict[str, Tuple[List[str], List[Tuple[str, str]]]] = {}
+        for column, spec in generator["data"].items():
+            spec = resolve(spec, generator)
+            if not isinstance(spec, dict) or spec.get("_gen") != "lookup":
+                continue
+            parent, parent_column = spec["keyPrefix"].strip("/"), spec["path"][-1]
+            columns, attributes = lookups.setdefault(parent, ([], []))
+            if parent_column == keys[parent]:
+                columns.append(column)
+            else:
+                attributes.append((column, parent_column))
+        for parent, (columns, attributes) in lookups.items():
+            if len(columns) != 1:
+                raise ValueError(f"{table}: expected one foreign key into {parent}, found {columns or 'none'}")
+            foreign_keys.append(ForeignKey(table, columns[0], parent, attributes))
+    return Relationships(keys, foreign_keys)
+
+
+def table_files(directory: str, tables: List[str]) -> Dict[str, List[str]]:
+    """Landing files per table, as schema.validate_dir matches them"""
+    files: Dict[str, List[str]] = {table: [] for table in tables}
+    for table, path in schema.landing_files(directory, tables):
+        files[table].append(path)
+    return files
+
+def decoded_bytes(path: str) -> int:
+    """Approximate size of a file's records once decoded"""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        metadata = pq.read_metadata(path)
+        return sum(metadata.row_group(index).total_byte_size for index in range(metadata.num_row_groups))
+    return os.path.getsize(path) * COMPRESSION_RATIO.get(os.path.splitext(path)[1], 1)
+
+def partition_count(files: Dict[str, List[str]], memory_mb: float) -> int:
+    """Partitions needed for one partition of the largest table to fit in memory_mb"""
+    largest = max((sum(decoded_bytes(path) for path in paths) for paths in files.values()), default=0)
+    return max(1, math.ceil(largest / (memory_mb * 1024 * 1024)))
+
+def rows(path: str, columns: List[str]) -> Iterator[List[Any]]:
+    """Values of columns (a.b for a struct field) per record of a landing file"""
+    paths = [column.split(".") for column in columns]
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        top = list(dict.fromkeys(parts[0] for parts in paths))
+        for batch in pq.ParquetFile(path).iter_batches(columns=top):
+            data = batch.to_pydict()
+            for index in range(batch.num_rows):
+                yield [field(data[parts[0]][index], parts[1:]) for parts in paths]
+        return
+    for record in schema.json_lines(path):
+        yield [field(record.get(parts[0]), parts[1:]) for parts in paths]
+
+def field(value: Any, parts: List[str]) -> Any:
+    for part in parts:
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+def encode(values: List[Any]) -> str:
+    return "\t".join(NULL if value is None else str(value) for value in values) + "\n"
+
+def decode(path: str) -> Iterator[List[str]]:
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        for line in f:
+            yield line.rstrip("\n").split("\t")
+
+
+class Spill:
+    """
+    Partition files of the key stream and the foreign key streams of every table.
+
+    Rows are buffered per (stream, partition) and appended to their files in batches once
+    buffer_bytes are buffered, opening one file at a time. The open file count therefore
+    stays at one whatever the partition count, and no streams x partitions handles are held
+    against RLIMIT_NOFILE.
+    """
+
+    def __init__(self, directory: str, partitions: int, buffer_bytes: int):
+        self.directory = directory
+        self.partitions = partitions
+        self.buffer_bytes = buffer_bytes
+
+    def path(self, table: str, stream: str, partition: int) -> str:
+        return os.path.join(self.directory, f"{table}.{stream}.{partition}")
+
+    def flush(self, table: str, buffers: Dict[Tuple[str, int], List[str]]) -> None:
+        for (stream, partition), lines in buffers.items():
+            with open(self.path(table, stream, partition), 'a') as f:
+                f.write(''.join(lines))
+        buffers.clear()
+
+    def write(self, table: str, paths: List[str], streams: Dict[str, Tuple[int, List[int]]],
+              columns: List[str]) -> int:
+        """Split the table's records into streams: name -> (column hashed on, columns written)"""
+        buffers: Dict[Tuple[str, int], List[str]] = {}
+        buffered = 0
+        count = 0
+        for path in paths:
+            for values in rows(path, columns):
+                count += 1
+                for stream, (on, written) in streams.items():
+                    key = values[on]
+                    partition = hash(NULL if key is None else str(key)) % self.partitions
+                    line = encode([values[index] for index in written])
+                    buffers.setdefault((stream, partition), []).append(line)
+                    buffered += len(line)
+                if buffered >= self.buffer_bytes:
+                    self.flush(table, buffers)
+                    buffered = 0
+        self.flush(table, buffers)
+        return count
+
+
+def check(directory: str, relations: Relationships, memory_mb: float, spill_dir: Optional[str] = None,
+          transaction_events: bool = False, samples: int = 3) -> Dict[str, Any]:
+    """Partition the landing files of directory and run every check; results with timings"""
+    files = table_files(directory, list(relations.keys))
+    partitions = partition_count(files, memory_mb)
+    results: Dict[str, Any] = {"partitions": partitions, "partitioning": {}, "checks": {}}
+    # an identity column besides the key, for tables whose key repeats by design
+    identity = {"transactions": "state.state_name"} if transaction_events else {}
+
+    def result(name: str, kind: str) -> Dict[str, Any]:
+        return results["checks"].setdefault(name, {"check": kind, "rows": 0, "failures": 0, "samples": [],
+                                                   "seconds": 0.0})
+
+    def fail(entry: Dict[str, Any], sample: str) -> None:
+        entry["failures"] += 1
+        if len(entry["samples"]) < samples:
+            entry["samples"].append(sample)
+
+    with tempfile.TemporaryDirectory(prefix="psp-integrity-", dir=spill_dir) as spill_path:
+        # nothing else is held while the tables are partitioned; a buffered line takes about
+        # twice its length as a str object, so half the budget is buffered text
+        spill = Spill(spill_path, partitions, int(memory_mb * 1024 * 1024 / 2))
+        for table, paths in files.items():
+            started = time.perf_counter()
+            key = relations.keys[table]
+            copied = relations.parent_columns(table)
+            outgoing = [fk for fk in relations.foreign_keys if fk.child == table]
+            columns = list(dict.fromkeys(
+                [key, *([identity[table]] if table in identity else []), *copied]
+                + [column for fk in outgoing for column in [fk.column, *(child for child, _ in fk.attributes)]]
+            ))
+            at = {column: index for index, column in enumerate(columns)}
+            streams = {"key": (at[key], [at[key], at.get(identity.get(table), at[key]), *[at[c] for c in copied]])}
+            for fk in outgoing:
+                streams[fk.column] = (at[fk.column], [at[fk.column], at[key],
+                                                      *[at[child] for child, _ in fk.attributes]])
+            records = spill.write(table, paths, streams, columns)
+            results["partitioning"][table] = {"files": len(paths), "records": records,
+                                              "seconds": round(time.perf_counter() - started, 3)}
+
+        for partition in range(partitions):
+            for table, key in relations.keys.items():
+                started = time.perf_counter()
+                unique = result(f"unique {table}.{key}" + (f", {identity[table]}" if table in identity else ""),
+                                "unique")
+                copied = relations.parent_columns(table)
+                parents: Dict[str, List[str]] = {}
+                seen = set()
+                for row in decode(spill.path(table, "key", partition)):
+                    unique["rows"] += 1
+                    value = (row[0], row[1])
+                    if value in seen:
+                        fail(unique, row[0] if table not in identity else f"{row[0]} {row[1]}")
+                    else:
+                        seen.add(value)
+                    parents.setdefault(row[0], row[2:])
+                seen.clear()
+                unique["seconds"] += time.perf_counter() - started
+
+                for fk in relations.foreign_keys:
+                    if fk.parent != table:
+                        continue
+                    started = time.perf_counter()
+                    entry = result(f"fk {fk.name}", "foreign_key")
+                    entry.setdefault("mismatches", {f"{child} = {fk.parent}.{parent_column}": 0
+                                                    for child, parent_column in fk.attributes})
+                    positions = [copied.index(parent_column) for _, parent_column in fk.attributes]
+                    labels = list(entry["mismatches"])
+                    for row in decode(spill.path(fk.child, fk.column, partition)):
+                        entry["rows"] += 1
+                        parent = parents.get(row[0])
+                        if parent is None:
+                            fail(entry, f"{row[1]} -> {row[0]}")
+                            continue
+                        for label, value, position in zip(labels, row[2:], positions):
+                            if value != parent[position]:
+                                entry["mismatches"][label] += 1
+                                fail(entry, f"{row[1]}: {label.split(' = ')[0]} {value} != {parent[position]}")
+                    entry["seconds"] += time.perf_counter() - started
+                parents.clear()
+
+    for entry in results["checks"].values():
+        entry["seconds"] = round(entry["seconds"], 3)
+    # ru_maxrss is in KiB on Linux
+    results["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Referential integrity and key checks of generated landing files")
+    parser.add_argument("directory", help="generated landing files (any gen.py --format)")
+    parser.add_argument("--config", default=schema.CONFIG)
+    parser.add_argument("--memory-mb", type=float, default=256.0,
+                        help="memory for one partition of the largest table; sets the partition count")
+    parser.add_argument("--spill-dir", help="where partition files go (default: the system temp directory)")
+    parser.add_argument("--transaction-events", action="store_true",
+                        help="files from gen.py --transaction-events: txn_id repeats once per state")
+    parser.add_argument("--samples", type=int, default=3, help="failing keys shown per check")
+    parser.add_argument("--report", help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    relations = relationships(schema.load(args.config))
+    started = time.perf_counter()
+    results = check(args.directory, relations, args.memory_mb, args.spill_dir, args.transaction_events,
+                    args.samples)
+    results["seconds"] = round(time.perf_counter() - started, 3)
+
+    print(f"{results['partitions']} partitions (--memory-mb {args.memory_mb:g})")
+    for table, entry in results["partitioning"].items():
+        print(f"  partition {table:39} {entry['files']:>4} files {entry['records']:>12,} records "
+              f"{entry['seconds']:8.2f}s")
+    failed = 0
+    for name, entry in results["checks"].items():
+        failed += entry["failures"]
+        status = "ok" if not entry["failures"] else f"{entry['failures']:,} FAILED"
+        print(f"  {name:49} {entry['rows']:>12,} rows {status:>14} {entry['seconds']:8.2f}s")
+        for label, count in entry.get("mismatches", {}).items():
+            print(f"      {label:45} {count:>12,} mismatches")
+        for sample in entry["samples"]:
+            print(f"      e.g. {sample}")
+    print(f"{len(results['checks'])} checks in {results['seconds']:.2f}s, peak RSS {results['peak_rss_mb']:g} MB")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
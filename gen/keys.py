@@ -0,0 +1,156 @@
+"""
+Compact in-memory key tables for referential integrity between generated entities.
+
+Child entities only ever need a handful of parent columns (ids, amounts, currency,
+timestamps), so instead of holding every generated record we keep those columns in
+contiguous fixed-width buffers: one bytearray per string column and one array('q')
+per integer column. For multi-process generation a finished table is copied once into
+shared memory and attached read-only by every worker.
+"""
+
+import random
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Column spec: fixed byte width for ASCII string columns, or int for 64-bit integers.
+ColumnSpec = Dict[str, Any]
+
+TABLES = ["merchants", "customers", "payments", "orders", "transactions", "payouts", "disputes"]
+
+# Foreign keys each entity samples, in the order the generators take them
+PARENTS = {
+    "merchants": [],
+    "customers": [],
+    "payments": ["customers"],
+    "orders": ["merchants", "customers"],
+    "transactions": ["orders", "payments"],
+    "payouts": ["merchants"],
+    "disputes": ["transactions"],
+}
+
+# Key columns kept for entities that have children
+KEY_COLUMNS: Dict[str, ColumnSpec] = {
+    "merchants": {"merchant_id": 11},
+    "customers": {"customer_id": 11},
+    "payments": {"payment_id": 13},
+    "orders": {"order_id": 15, "total_amount_cents": int, "currency": 3, "created_at": 20},
+    "transactions": {"txn_id": 15, "amount_cents": int},
+}
+
+
+class KeyTable:
+    """Append-only columnar store of the key columns of one generated entity"""
+
+    def __init__(self, name: str, columns: ColumnSpec):
+        self.name = name
+        self.columns = dict(columns)
+        self._size = 0
+        self._data: Dict[str, Any] = {}
+        self._blocks: List[SharedMemory] = []
+        for column, spec in self.columns.items():
+            if spec is int:
+                self._data[column] = array('q')
+            elif isinstance(spec, int) and spec > 0:
+                self._data[column] = bytearray()
+            else:
+                raise ValueError(f"{name}.{column}: column spec must be int or a positive width")
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Store the key columns of one record"""
+        for column, spec in self.columns.items():
+            value = record[column]
+            if spec is int:
+                self._data[column].append(value)
+            else:
+                encoded = value.encode('ascii')
+                if len(encoded) != spec:
+                    raise ValueError(f"{self.name}.{column}: {value!r} is not {spec} characters wide")
+                self._data[column] += encoded
+        self._size += 1
+
+    def extend_raw(self, columns: Dict[str, bytes], count: int) -> None:
+        """Store the first count rows of pre-encoded columns (fixed-width ASCII or native int64 bytes)"""
+        for column, spec in self.columns.items():
+            width = 8 if spec is int else spec
+            raw = columns[column][:count * width]
+            if len(raw) != count * width:
+                raise ValueError(f"{self.name}.{column}: expected {count} rows of {width} bytes")
+            if spec is int:
+                self._data[column].frombytes(raw)
+            else:
+                self._data[column] += raw
+        self._size += count
+
+    def drop_oldest(self, count: int) -> None:
+        """Forget the first count rows (replay keeps only a recent window of some entities)"""
+        count = min(count, self._size)
+        for column, spec in self.columns.items():
+            del self._data[column][:count * (1 if spec is int else spec)]
+        self._size -= count
+
+    def raw_columns(self) -> Dict[str, bytes]:
+        """Encoded column bytes, the inverse of extend_raw"""
+        return {column: memoryview(buf).cast('B').tobytes() for column, buf in self._data.items()}
+
+    def buffer(self, column: str) -> Any:
+        """Raw column buffer, for zero-copy views (e.g. numpy.frombuffer) by bulk samplers"""
+        return self._data[column]
+
+    def get(self, index: int, column: str) -> Any:
+        """Return one column value of the row at index"""
+        spec = self.columns[column]
+        if spec is int:
+            return self._data[column][index]
+        start = index * spec
+        return str(self._data[column][start:start + spec], 'ascii')
+
+    def row(self, index: int, columns: Optional[Iterable[str]] = None) -> Tuple[Any, ...]:
+        """Return the requested columns (all by default) of the row at index"""
+        return tuple(self.get(index, column) for column in (columns or self.columns))
+
+    def sample(self) -> int:
+        """Pick a uniformly random row index (same random stream as random.choice)"""
+        if not self._size:
+            raise IndexError(f"cannot sample from empty key table {self.name}")
+        return random.randrange(self._size)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the column buffers"""
+        return sum(memoryview(buf).nbytes for buf in self._data.values())
+
+    def share(self) -> Tuple[Dict[str, Any], List[SharedMemory]]:
+        """Copy the columns into shared memory blocks.
+
+        Returns a small picklable descriptor for KeyTable.attach and the blocks, which
+        the caller must close and unlink once no worker needs them.
+        """
+        descriptor = {"name": self.name, "columns": self.columns, "size": self._size, "blocks": {}}
+        blocks = []
+        for column, buf in self._data.items():
+            raw = memoryview(buf).cast('B')
+            block = SharedMemory(create=True, size=max(raw.nbytes, 1))
+            block.buf[:raw.nbytes] = raw
+            descriptor["blocks"][column] = block.name
+            blocks.append(block)
+        return descriptor, blocks
+
+    @classmethod
+    def attach(cls, descriptor: Dict[str, Any]) -> "KeyTable":
+        """Read-only view of a table published with share()"""
+        table = cls(descriptor["name"], descriptor["columns"])
+        table._size = descriptor["size"]
+        for column, spec in table.columns.items():
+            block = SharedMemory(name=descriptor["blocks"][column])
+            table._blocks.append(block)
+            view = block.buf[:table._size * (8 if spec is int else spec)].toreadonly()
+            table._data[column] = view.cast('q') if spec is int else view
+        return table
+
+
+def key_tables() -> Dict[str, KeyTable]:
+    """Fresh, empty key tables for every entity that has children"""
+    return {name: KeyTable(name, columns) for name, columns in KEY_COLUMNS.items()}
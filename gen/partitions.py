@@ -0,0 +1,150 @@
+"""
+Date-partitioned landing output (gen.py --partition-by-date).
+
+The event tables are written Hive-style, one directory per event date, so a batch read of
+a date range lists only that range's directories. Auto Loader ingests new files only, so
+rewriting a date's files does not restate it in bronze:
+
+    orders/event_date=2025-05-01/orders-00000.jsonl
+    transactions/event_date=2025-05-01/transactions-00000.jsonl
+    payouts/event_date=2025-05-01/payouts-00000.jsonl
+    disputes/event_date=2025-05-01/disputes-00000.jsonl
+
+PARTITION_COLUMNS names each table's date column. Transactions have no created_at and use
+authorized_at, so every state event of a transaction (--transaction-events) lands in one
+partition. Merchants, customers and payments are dimensions and stay single files.
+
+The writers still stream one file per table or shard. PartitionedSink takes the file's
+text and routes each line to its date by a string search for the date column, without
+parsing the JSON. Lines are buffered per date; when BUFFER_BYTES are buffered they are
+appended to a hidden plain-JSONL spill file per date. On close every date becomes one file
+in the output format, so memory stays bounded and the number of files is dates x shards,
+whatever the table size. Spark and Auto Loader skip files whose name starts with ".", so a
+spill file left by an interrupted run is never ingested.
+"""
+
+import os
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple
+
+from formats import OutputFormat
+
+PARTITION_KEY = "event_date"
+PARTITION_COLUMNS = {
+    "orders": "created_at",
+    "transactions": "authorized_at",
+    "payouts": "batch_day",
+    "disputes": "opened_at",
+}
+# Spark's partition value for NULL
+DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+BUFFER_BYTES = 64 * 1024 * 1024
+SPILL_READ_BYTES = 4 * 1024 * 1024
+
+
+def partition_path(path: str, day: str) -> str:
+    """<dir>/<file> -> <dir>/event_date=<day>/<file>"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f"{PARTITION_KEY}={day}", name)
+
+def pattern(path: str) -> str:
+    """Glob of every partition of a partitioned file, for reports"""
+    return partition_path(path, "*")
+
+
+class PartitionedSink:
+    """Text sink that splits JSON lines into one file per event date under path's directory"""
+
+    def __init__(self, path: str, table: str, output: OutputFormat, buffer_bytes: int = BUFFER_BYTES):
+        self.path = path
+        self.table = table
+        self.output = output
+        self.buffer_bytes = buffer_bytes
+        self.stored_bytes = 0
+        self.partitions = 0
+        self._key = f'"{PARTITION_COLUMNS[table]}": '
+        self._buffers: Dict[str, List[str]] = {}
+        self._size = 0
+        self._spilled: Dict[str, str] = {}
+
+    def _day(self, line: str) -> str:
+        start = line.find(self._key) + len(self._key)
+        if start < len(self._key) or line[start] != '"':
+            return DEFAULT_PARTITION
+        return line[start + 1:start + 11]
+
+    def write(self, text: str) -> None:
+        buffers = self._buffers
+        day_of = self._day
+        for line in text.splitlines(keepends=True):
+            day = day_of(line)
+            lines = buffers.get(day)
+            if lines is None:
+                lines = buffers[day] = []
+            lines.append(line)
+        self._size += len(text)
+        if self._size >= self.buffer_bytes:
+            self._spill()
+
+    def _spill(self) -> None:
+        """Append every buffered date to its spill file"""
+        for day, lines in self._buffers.items():
+            spill = self._spilled.get(day)
+            if spill is None:
+                final = partition_path(self.path, day)
+                os.makedirs(os.path.dirname(final), exist_ok=True)
+                directory, name = os.path.split(final)
+                spill = self._spilled[day] = os.path.join(directory, f".{name}.spill")
+            with open(spill, 'a') as f:
+                f.write(''.join(lines))
+        self._buffers = {}
+        self._size = 0
+
+    def _publish(self, day: str, lines: List[str]) -> None:
+        """Write one date's file in the output format from its spill file and remaining lines"""
+        final = partition_path(self.path, day)
+        spill = self._spilled.get(day)
+        if spill is not None and self.output.name == "jsonl":
+            with open(spill, 'a') as f:
+                f.write(''.join(lines))
+            os.replace(spill, final)
+        else:
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            with self.output.open(final, self.table) as sink:
+                if spill is not None:
+                    with open(spill) as f:
+                        for chunk in iter(lambda: f.readlines(SPILL_READ_BYTES), []):
+                            sink.write(''.join(chunk))
+                    os.remove(spill)
+                if lines:
+                    sink.write(''.join(lines))
+        self.stored_bytes += os.path.getsize(final)
+        self.partitions += 1
+
+    def close(self) -> None:
+        for day in sorted(self._buffers.keys() | self._spilled.keys()):
+            self._publish(day, self._buffers.get(day, []))
+        self._buffers = {}
+        self._spilled = {}
+        self._size = 0
+
+    def __enter__(self) -> "PartitionedSink":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def layout(output_dir: str, table: str, filename: str, output: OutputFormat,
+           by_date: bool) -> Tuple[str, Callable[[str], Any]]:
+    """
+    Path and opener of one landing file.
+
+    Returns:
+        (path, opener): <output_dir>/<filename> and output.open, or for a table in
+        PARTITION_COLUMNS with by_date, <output_dir>/<table>/<filename> and a
+        PartitionedSink that writes it as <output_dir>/<table>/event_date=*/<filename>
+    """
+    if by_date and table in PARTITION_COLUMNS:
+        return os.path.join(output_dir, table, filename), partial(PartitionedSink, table=table, output=output)
+    return os.path.join(output_dir, filename), partial(output.open, table=table)
@@ -0,0 +1,208 @@
+"""
+Per-record generation engine: one dict per record, drawn through the global random module
+from the samplers compiled from psp.json (distributions.py). Entity ids come from an ids.IdAllocator; see batch.py for the numpy engine. Parent rows
+are drawn uniformly unless a skew.Skew says otherwise. With --transaction-events a
+transaction is a list of state events rather than one record (see lifecycle).
+"""
+
+import random
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from distributions import (
+    CUSTOMERS, DISPUTES, MERCHANTS, ORDER_END_DATE, ORDERS, PAYMENTS, PAYOUTS, STATE_MACHINE, TRANSACTIONS,
+    check_fields,
+)
+from ids import IdAllocator
+from keys import KeyTable
+from skew import Bursts, Skew
+
+def draw(fields: Dict[str, Any], *names: str) -> Dict[str, Any]:
+    """One drawn value per named field"""
+    return {name: fields[name].draw() for name in names}
+
+def random_date(start: datetime, end: datetime) -> str:
+    """Random ISO8601 timestamp with second precision in [start, end]"""
+    seconds = random.randint(int(start.replace(tzinfo=timezone.utc).timestamp()),
+                             int(end.replace(tzinfo=timezone.utc).timestamp()))
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def generate_merchants(ids: Iterator[str]) -> Iterator[Dict[str, Any]]:
+    """Generate merchant records"""
+    fields = MERCHANTS.fields
+    while True:
+        yield {
+            "merchant_id": next(ids),
+            **draw(fields, "legal_name", "mcc", "country", "kyb_status", "pricing_tier", "risk_level", "created_at"),
+        }
+
+def generate_customers(ids: Iterator[str]) -> Iterator[Dict[str, Any]]:
+    """Generate customer records"""
+    fields = CUSTOMERS.fields
+    while True:
+        yield {"customer_id": next(ids), **draw(fields, "email_hash", "phone_hash", "customer_type", "created_at")}
+
+def generate_payments(ids: Iterator[str], customers: KeyTable) -> Iterator[Dict[str, Any]]:
+    """Generate payment records referencing customers"""
+    fields = PAYMENTS.fields
+    while True:
+        yield {
+            "payment_id": next(ids),
+            "customer_id": customers.get(customers.sample(), "customer_id"),
+            **draw(fields, "brand", "bin", "last4", "expiry_month", "expiry_year", "wallet_type", "status",
+                   "first_seen_at"),
+        }
+
+def generate_orders(ids: Iterator[str], merchants: KeyTable, customers: KeyTable,
+                    bursts: Optional[Bursts] = None) -> Iterator[Dict[str, Any]]:
+    """Generate order records referencing merchants and customers"""
+    fields = ORDERS.fields
+    while True:
+        variables = {name: spec.draw() for name, spec in ORDERS.vars.items()}
+        tax_cents = fields["tax_cents"].evaluate(variables)
+        tip_cents = fields["tip_cents"].evaluate(variables)
+        burst = bursts.draw(len(merchants)) if bursts else None
+
+        yield {
+            "order_id": next(ids),
+            "merchant_id": merchants.get(burst[0] if burst else merchants.sample(), "merchant_id"),
+            "customer_id": customers.get(customers.sample(), "customer_id"),
+            "currency": fields["currency"].draw(),
+            "subtotal_cents": variables["subtotal_cents"],
+            "tax_cents": tax_cents,
+            "tip_cents": tip_cents,
+            # the sum of the rounded parts, not psp.json's total rounded once, so silver's valid_amounts holds
+            "total_amount_cents": variables["subtotal_cents"] + tax_cents + tip_cents,
+            "channel": fields["channel"].draw(),
+            "created_at": random_date(*burst[1:]) if burst else fields["created_at"].draw()
+        }
+
+# Transaction lifecycles stop at the generation window's end (milliseconds, like state.timestamp)
+LIFECYCLE_END_MS = int(ORDER_END_DATE.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+def lifecycle(authorized_ms: int, end_ms: Optional[int] = LIFECYCLE_END_MS) -> List[Dict[str, Any]]:
+    """Walk the state machine from pending, one state per transition with its timestamp.
+
+    Each state is reached its psp.json delay after the previous one; transitions that would
+    happen after end_ms (ORDER_END_DATE by default) have not happened yet, so the
+    transaction is still in flight.
+    """
+    current_state, timestamp = STATE_MACHINE.initial, authorized_ms
+    states = [{"state_name": current_state, "timestamp": timestamp}]
+    while STATE_MACHINE.transitions[current_state] is not None:
+        next_state = STATE_MACHINE.transitions[current_state].draw()
+        timestamp += STATE_MACHINE.delays[next_state].draw()
+        if end_ms is not None and timestamp > end_ms:
+            break
+        states.append({"state_name": next_state, "timestamp": timestamp})
+        current_state = next_state
+    return states
+
+def final_state() -> str:
+    state = STATE_MACHINE.initial
+    while STATE_MACHINE.transitions[state] is not None:
+        state = STATE_MACHINE.transitions[state].draw()
+    return state
+
+def generate_transactions(ids: Iterator[str], orders: KeyTable, payments: KeyTable,
+                          events: bool = False, end_ms: Optional[int] = LIFECYCLE_END_MS) -> Iterator[Any]:
+    """Generate transaction records referencing orders and payments.
+
+    psp.json forks one transaction per order; its auth_timestamp var is replaced by the
+    order's created_at so a transaction never precedes its order. With events, each item is
+    the list of one transaction's state events (same record, one state each, see lifecycle)
+    instead of a single record carrying its final state.
+    """
+    fields = TRANSACTIONS.fields
+    while True:
+        order_id, total_amount_cents, currency, created_at = orders.row(orders.sample())
+        payment_id = payments.get(payments.sample(), "payment_id")
+
+        auth_timestamp = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        authorized_ms = int(auth_timestamp.timestamp() * 1000)
+        if events:
+            states = lifecycle(authorized_ms, end_ms)
+        else:
+            states = [{"state_name": final_state(), "timestamp": authorized_ms}]
+
+        variables = {name: TRANSACTIONS.vars[name].draw() for name in ("base_fee_rate", "fixed_fee")}
+        transaction = {
+            "txn_id": next(ids),
+            "order_id": order_id,
+            "payment_id": payment_id,
+            "amount_cents": total_amount_cents,
+            "currency": currency,
+            "state": states[-1],
+            **draw(fields, "response_code", "three_ds"),
+            "authorized_at": auth_timestamp.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            "fees_total_cents": fields["fees_total_cents"].evaluate(
+                variables, {("orders", "total_amount_cents"): total_amount_cents}
+            ),
+            **draw(fields, "network_fee_cents", "processor_name"),
+        }
+        yield [dict(transaction, state=state) for state in states] if events else transaction
+
+def generate_payouts(ids: Iterator[str], merchants: KeyTable) -> Iterator[Dict[str, Any]]:
+    """Generate payout records referencing merchants"""
+    fields = PAYOUTS.fields
+    while True:
+        variables = {name: spec.draw() for name, spec in PAYOUTS.vars.items()}
+        fees_cents = fields["fees_cents"].evaluate(variables)
+        reserve_cents = fields["reserve_cents"].evaluate(variables)
+        paid_at = fields["paid_at"]
+
+        yield {
+            "payout_id": next(ids),
+            "merchant_id": merchants.get(merchants.sample(), "merchant_id"),
+            "batch_day": fields["batch_day"].render(variables["batch_date_ms"]),
+            "currency": fields["currency"].draw(),
+            "gross_cents": variables["gross_amount"],
+            "fees_cents": fees_cents,
+            "reserve_cents": reserve_cents,
+            "net_cents": variables["gross_amount"] - fees_cents - reserve_cents,  # see orders' total
+            "status": fields["status"].draw(),
+            "paid_at": paid_at.render(paid_at.ms.evaluate(variables)),
+            "transaction_count": fields["transaction_count"].draw(),
+        }
+
+def generate_disputes(ids: Iterator[str], transactions: KeyTable) -> Iterator[Dict[str, Any]]:
+    """Generate dispute records referencing transactions"""
+    fields = DISPUTES.fields
+    while True:
+        txn_id, amount_cents = transactions.row(transactions.sample())
+        yield {
+            "dispute_id": next(ids),
+            "txn_id": txn_id,
+            "reason_code": fields["reason_code"].draw(),
+            "amount_cents": amount_cents,
+            **draw(fields, "stage", "opened_at", "closed_at", "liability", "status"),
+        }
+
+GENERATORS = {
+    "merchants": generate_merchants,
+    "customers": generate_customers,
+    "payments": generate_payments,
+    "orders": generate_orders,
+    "transactions": generate_transactions,
+    "payouts": generate_payouts,
+    "disputes": generate_disputes,
+}
+
+def checked(table: str, records: Iterator[Any]) -> Iterator[Any]:
+    """records, after failing unless the first one has exactly psp.json's fields of table"""
+    first = next(records)
+    check_fields("record", table, list(first[0] if isinstance(first, list) else first))
+    yield first
+    yield from records
+
+def source(table: str, parents: List[KeyTable], ids: IdAllocator,
+           skew: Skew = Skew(), events: bool = False,
+           lifecycle_end_ms: Optional[int] = LIFECYCLE_END_MS) -> Iterator[Any]:
+    """Endless record stream for one table, sampling foreign keys from the given parent tables.
+
+    With events, transactions come as lists of state events (see generate_transactions).
+    """
+    options = {"bursts": skew.bursts} if table == "orders" and skew.bursts else {}
+    if table == "transactions" and events:
+        options.update(events=True, end_ms=lifecycle_end_ms)
+    return checked(table, GENERATORS[table](iter(ids), *skew.parents(table, parents), **options))
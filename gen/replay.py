@@ -0,0 +1,187 @@
+"""
+Continuous micro-batch replay into an Auto Loader landing directory (gen.py --replay).
+
+Every --interval seconds the events due at --rate events/sec are generated, split across
+entities by REPLAY_MIX, stamped with the current wall-clock time and appended to one
+rolling part file per entity (writer.RollingWriter). Within a tick tables are generated
+in dependency order; transactions only reference orders, and disputes only transactions,
+from the last --recent-seconds. A part is published together with the open parts of
+every entity it can reference, parents first, so the pipeline never sees a child before
+its parent.
+
+Every --log-every seconds the achieved rate, the backlog (how far generation runs behind
+the target rate) and the publish lag (event time until the part file becomes visible)
+are printed. src/jobs/replay_lag.py reports the other end: the rate bronze ingests at and
+the end-to-end lag, bronze ingestion_timestamp minus the event time.
+Parent skew applies as in batch generation, except that burst orders are stamped with the
+current time like every other event, so hot merchants get a steady share instead of bursts.
+
+With --transaction-events a transaction's pending event is emitted at once and every later
+state event when it falls due: its generated delay divided by --lifecycle-speedup (a day
+of settlement passes in 24 s at the default 3600). Events still pending at shutdown are
+dropped, leaving those transactions in flight.
+"""
+
+import heapq
+import json
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import ids
+import record
+from distributions import REPLAY_MIX
+from keys import PARENTS, TABLES, key_tables
+from skew import Skew
+from writer import PublishedPart, RollingWriter
+
+# Entities whose children only reference rows from the last recent_seconds
+RECENT = ("orders", "transactions")
+
+
+def stamp(table: str, record: Dict[str, Any], now: datetime) -> None:
+    """Move the event time of a generated record to now"""
+    timestamp = now.strftime('%Y-%m-%dT%H:%M:%SZ')
+    if table in ("merchants", "customers", "orders"):
+        record["created_at"] = timestamp
+    elif table == "payments":
+        record["first_seen_at"] = timestamp
+    elif table == "transactions":
+        record["authorized_at"] = timestamp
+        record["state"]["timestamp"] = int(now.timestamp()) * 1000
+    elif table == "payouts":
+        record["batch_day"] = now.strftime('%Y-%m-%d')
+        record["paid_at"] = timestamp
+    elif table == "disputes":
+        record["opened_at"] = timestamp
+        record["closed_at"] = None
+
+def schedule(events: List[Dict[str, Any]], now: float, speedup: float) -> List[Tuple[float, str]]:
+    """Restamp one transaction's state events from now on; returns (due time, line) per event"""
+    first = events[0]["state"]["timestamp"]
+    authorized_at = datetime.fromtimestamp(now, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    lines: List[Tuple[float, str]] = []
+    for event in events:
+        due = now + (event["state"]["timestamp"] - first) / 1000 / speedup
+        if lines:
+            # keep transitions a second apart, as generated: silver orders them by the second
+            due = max(due, lines[-1][0] + 1)
+        event["authorized_at"] = authorized_at
+        event["state"] = dict(event["state"], timestamp=int(due * 1000))
+        lines.append((due, json.dumps(event) + '\n'))
+    return lines
+
+def ancestors(table: str) -> Set[str]:
+    """Every entity a table references, directly or through its parents"""
+    found: Set[str] = set()
+    for parent in PARENTS[table]:
+        found |= {parent} | ancestors(parent)
+    return found
+
+def publish_due(writers: Dict[str, RollingWriter], now: float, flush: bool = False) -> List[PublishedPart]:
+    """Publish due parts, plus the open parts of their ancestors, in dependency order"""
+    due = {table for table, writer in writers.items() if flush or writer.due(now)}
+    for table in list(due):
+        due |= ancestors(table)
+    return [part for part in (writers[table].publish() for table in TABLES if table in due) if part]
+
+def replay(output_dir: str, rate: float, interval: float = 1.0, file_bytes: int = 1024 * 1024,
+           file_seconds: float = 10.0, duration: Optional[float] = None, recent_seconds: float = 300.0,
+           log_every: float = 10.0, seed: int = 42, skew: Skew = Skew(), events: bool = False,
+           lifecycle_speedup: float = 3600.0) -> Dict[str, int]:
+    """Emit events at rate events/sec until duration (or Ctrl-C); returns events per table
+
+    With events, the transactions count is of transactions, not of their state events.
+    """
+    random.seed(seed)
+    manifest = ids.load_manifest(output_dir)
+    tables = key_tables()
+    allocators = {table: ids.allocator(table, ids.reserved(manifest, table, "next_id")) for table in TABLES}
+    streams = {
+        # replayed orders are stamped now, so lifecycles run past the generation window
+        table: record.source(table, [tables[parent] for parent in PARENTS[table]], allocators[table], skew,
+                             events, lifecycle_end_ms=None)
+        for table in TABLES
+    }
+    later: List[Tuple[float, int, str]] = []  # state events not due yet: (due time, sequence, line)
+    sequence = 0
+    writers = {
+        table: RollingWriter(output_dir, table, ids.reserved(manifest, table, "next_part"),
+                             file_bytes, file_seconds)
+        for table in TABLES
+    }
+    windows: Dict[str, Deque[Tuple[float, int]]] = {table: deque() for table in RECENT}
+    mix_total = sum(REPLAY_MIX.values())
+    emitted = dict.fromkeys(TABLES, 0)
+
+    started = time.time()
+    last_log, logged_events = started, 0
+    published: List[PublishedPart] = []
+    print(f"Replaying {rate:,.0f} events/s into {output_dir} "
+          f"(parts of {file_bytes / (1024 * 1024):.2f} MB or {file_seconds:g}s, Ctrl-C to stop)")
+    try:
+        while duration is None or time.time() - started < duration:
+            now = time.time()
+            event_time = datetime.fromtimestamp(now, timezone.utc)
+            for table in TABLES:
+                count = int(rate * (now - started) * REPLAY_MIX[table] / mix_total) - emitted[table]
+                parents = [tables[parent] for parent in PARENTS[table]]
+                if count <= 0 or not all(len(parent) for parent in parents):
+                    count = 0  # not due yet, or waiting for the first parent rows
+                keys = tables.get(table)
+                lines = []
+                for _ in range(count):
+                    event = next(streams[table])
+                    if isinstance(event, list):
+                        (_, line), *pending = schedule(event, int(now), lifecycle_speedup)
+                        for due, pending_line in pending:
+                            heapq.heappush(later, (due, sequence, pending_line))
+                            sequence += 1
+                        event = event[0]
+                    else:
+                        stamp(table, event, event_time)
+                        line = json.dumps(event) + '\n'
+                    lines.append(line)
+                    if keys is not None:
+                        keys.append(event)
+                if table == "transactions":
+                    # state events fall due on every tick, whether or not new transactions do
+                    while later and later[0][0] <= now:
+                        lines.append(heapq.heappop(later)[2])
+                writers[table].write(lines, now)
+                emitted[table] += count
+                if table in windows and count:
+                    windows[table].append((now, count))
+
+            for table, window in windows.items():
+                while window and window[0][0] < now - recent_seconds:
+                    tables[table].drop_oldest(window.popleft()[1])
+
+            done = time.time()
+            published += publish_due(writers, done)
+            if done - last_log >= log_every:
+                total = sum(emitted.values())
+                lags = [part.published_at - part.oldest_event for part in published]
+                backlog = max(rate * (done - started) - total, 0) / rate
+                print(f"  [{done - started:7.0f}s] {(total - logged_events) / (done - last_log):,.0f} events/s "
+                      f"(target {rate:,.0f}), {total} events, {len(published)} parts published, "
+                      f"publish lag avg {sum(lags) / len(lags) if lags else 0:.1f}s "
+                      f"max {max(lags, default=0):.1f}s, backlog {backlog:.1f}s", flush=True)
+                last_log, logged_events, published = done, total, []
+
+            next_tick = started + (int((done - started) / interval) + 1) * interval
+            time.sleep(max(next_tick - time.time(), 0))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publish_due(writers, time.time(), flush=True)
+        for table in TABLES:
+            ids.record_run(manifest, table, allocators[table].next_counter, writers[table].next_part)
+        ids.save_manifest(output_dir, manifest)
+
+    elapsed = time.time() - started
+    print(f"Replayed {sum(emitted.values())} events in {elapsed:.0f}s "
+          f"({sum(emitted.values()) / elapsed:,.0f} events/s)")
+    return emitted
@@ -0,0 +1,310 @@
+"""
+Schema registry: typed columns for every entity, derived from the generators in psp.json.
+
+Each generator's data fields are typed from their ShadowTraffic spec - strings, choices,
+formatDateTime (date or timestamp by format), uniformDistribution (bigint when decimals
+is 0), math, vars, fork keys, lookups into other generators, and the transaction
+stateMachine, which becomes a struct of state_name and the states' fields. Unknown
+generators raise instead of guessing.
+
+The same schema drives the Parquet writer (formats.COLUMN_TYPES), the "schema" option of
+the bronze cloud_files() sources, so Auto Loader parses against fixed types instead of
+inferring them, and the validation of generated landing files.
+
+    python3 schema.py                       # print the schemas
+    python3 schema.py --check-bronze        # bronze SQL schemas match psp.json (exit 1 if not)
+    python3 schema.py --sync-bronze         # rewrite them from psp.json
+    python3 schema.py --validate ./output   # check generated files against the schemas
+"""
+
+import argparse
+import gzip
+import io
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG = os.path.join(HERE, "psp.json")
+BRONZE_DIR = os.path.join(os.path.dirname(HERE), "src", "psp-payment-system-analytics", "bronze")
+
+Columns = List[Tuple[str, str]]
+
+
+class Registry:
+    """Column types of the generators in a ShadowTraffic config, keyed by table (keyPrefix)"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.generators = {
+            generator["containerConfigs"]["keyPrefix"].strip("/"): generator
+            for generator in config["generators"]
+        }
+        self._types: Dict[str, Columns] = {}
+
+    def tables(self) -> List[str]:
+        return list(self.generators)
+
+    def columns(self, table: str) -> Columns:
+        if table not in self._types:
+            generator = self.generators[table]
+            self._types[table] = [
+                (name, self.type_of(spec, generator, f"{table}.{name}"))
+                for name, spec in generator["data"].items()
+            ]
+        return self._types[table]
+
+    def field_type(self, table: str, path: List[str]) -> str:
+        """Type of a lookup path such as ["data", "order_id"] into another generator"""
+        if len(path) != 2 or path[0] != "data":
+            raise ValueError(f"unsupported lookup path {path} into {table}")
+        return dict(self.columns(table))[path[1]]
+
+    def type_of(self, spec: Any, generator: Dict[str, Any], where: str) -> Optional[str]:
+        """Spark SQL type of a spec; None for a null literal or a value only known at runtime"""
+        if spec is None:
+            return None
+        if isinstance(spec, bool):
+            return "boolean"
+        if isinstance(spec, int):
+            return "bigint"
+        if isinstance(spec, float):
+            return "double"
+        if isinstance(spec, str):
+            return "string"
+        if not isinstance(spec, dict) or "_gen" not in spec:
+            raise ValueError(f"{where}: cannot type {spec!r}")
+
+        kind = spec["_gen"]
+        if kind == "string":
+            return "string"
+        if kind in ("oneOf", "weightedOneOf"):
+            values = [choice["value"] if kind == "weightedOneOf" else choice for choice in spec["choices"]]
+            return merge([self.type_of(value, generator, where) for value in values], where)
+        if kind == "formatDateTime":
+            return "timestamp" if "H" in spec["format"] else "date"
+        if kind == "uniformDistribution":
+            return "bigint" if spec.get("decimals") == 0 else "double"
+        if kind == "now":
+            return "bigint"
+        if kind == "math":
+            if spec.get("format") == "#":
+                return "bigint"
+            names = [self.type_of(value, generator, where) for value in spec.get("names", {}).values()]
+            return merge(names, where) or "double"
+        if kind == "var":
+            if spec["var"] == "forkKey":
+                return self.type_of(generator["fork"]["key"], generator, where)
+            return self.type_of(generator["vars"][spec["var"]], generator, where)
+        if kind == "lookup":
+            return self.field_type(spec["keyPrefix"].strip("/"), spec["path"])
+        if kind == "previousEvent":
+            return None
+        if kind == "stateMachine":
+            fields: Dict[str, List[Optional[str]]] = {"state_name": ["string"]}
+            for state in spec["states"].values():
+                for name, value in state.items():
+                    fields.setdefault(name, []).append(self.type_of(value, generator, f"{where}.{name}"))
+            return "struct<" + ",".join(f"{name}:{merge(types, where)}" for name, types in fields.items()) + ">"
+        raise ValueError(f"{where}: unsupported generator {kind!r}")
+
+def merge(types: List[Optional[str]], where: str) -> Optional[str]:
+    known = {value for value in types if value is not None}
+    if known == {"bigint", "double"}:
+        return "double"
+    if len(known) > 1:
+        raise ValueError(f"{where}: conflicting types {sorted(known)}")
+    return known.pop() if known else None
+
+def load(path: str = CONFIG) -> Registry:
+    with open(path) as f:
+        return Registry(json.load(f))
+
+def column_types(path: str = CONFIG) -> Dict[str, Columns]:
+    registry = load(path)
+    return {table: registry.columns(table) for table in registry.tables()}
+
+
+def ddl_type(spark_type: str) -> str:
+    if spark_type.startswith("struct<"):
+        fields = [field.split(":", 1) for field in spark_type[len("struct<"):-1].split(",")]
+        return "STRUCT<" + ", ".join(f"{name}: {ddl_type(value)}" for name, value in fields) + ">"
+    return spark_type.upper()
+
+def ddl(columns: Columns) -> str:
+    """Spark DDL schema string, as used by the cloud_files "schema" option"""
+    return ", ".join(f"{name} {ddl_type(spark_type)}" for name, spark_type in columns)
+
+SCHEMA_OPTION = re.compile(r'("schema",\s*")([^"]*)(")')
+
+def bronze_path(table: str, bronze_dir: str = BRONZE_DIR) -> str:
+    return os.path.join(bronze_dir, f"{table}.sql")
+
+def check_bronze(types: Dict[str, Columns], bronze_dir: str = BRONZE_DIR, sync: bool = False) -> List[str]:
+    """Tables whose bronze cloud_files "schema" option differs from psp.json (rewritten when sync)"""
+    stale = []
+    for table, columns in types.items():
+        path = bronze_path(table, bronze_dir)
+        with open(path) as f:
+            text = f.read()
+        match = SCHEMA_OPTION.search(text)
+        expected = ddl(columns)
+        if match is None:
+            raise ValueError(f"{path} has no \"schema\" option in cloud_files()")
+        if match.group(2) == expected:
+            continue
+        stale.append(table)
+        if sync:
+            with open(path, 'w') as f:
+                f.write(text[:match.start(2)] + expected + text[match.end(2):])
+    return stale
+
+
+TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?Z$")
+DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+def value_error(value: Any, spark_type: str) -> Optional[str]:
+    """Why value does not parse as spark_type, or None (NULL parses as every type)"""
+    if value is None:
+        return None
+    if spark_type.startswith("struct<"):
+        if not isinstance(value, dict):
+            return "not an object"
+        fields = dict(field.split(":", 1) for field in spark_type[len("struct<"):-1].split(","))
+        extra = sorted(set(value) - set(fields))
+        if extra:
+            return f"unexpected fields {extra}"
+        for name, field_type in fields.items():
+            problem = value_error(value.get(name), field_type)
+            if problem:
+                return f"{name}: {problem}"
+        return None
+    valid = {
+        "string": lambda: isinstance(value, str),
+        "bigint": lambda: isinstance(value, int) and not isinstance(value, bool),
+        "double": lambda: isinstance(value, (int, float)) and not isinstance(value, bool),
+        "boolean": lambda: isinstance(value, bool),
+        "timestamp": lambda: isinstance(value, str) and TIMESTAMP.match(value) is not None,
+        "date": lambda: isinstance(value, str) and DATE.match(value) is not None,
+    }[spark_type]()
+    return None if valid else f"{type(value).__name__} is not {spark_type}"
+
+def record_errors(record: Dict[str, Any], columns: Columns) -> Iterator[Tuple[str, str]]:
+    types = dict(columns)
+    for name in record:
+        if name not in types:
+            yield name, "unexpected column"
+    for name, spark_type in columns:
+        if name not in record:
+            yield name, "missing"
+            continue
+        problem = value_error(record[name], spark_type)
+        if problem:
+            yield name, problem
+
+def json_lines(path: str) -> Iterator[Dict[str, Any]]:
+    if path.endswith(".zst"):
+        import zstandard
+
+        with open(path, 'rb') as raw:
+            reader = zstandard.ZstdDecompressor().stream_reader(raw)
+            for line in io.TextIOWrapper(reader, encoding="utf-8"):
+                yield json.loads(line)
+        return
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rt') as f:
+        for line in f:
+            yield json.loads(line)
+
+def parquet_errors(path: str, columns: Columns, result: Dict[str, Any]) -> List[Tuple[str, str]]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from formats import arrow_type
+
+    result["records"] += pq.read_metadata(path).num_rows
+    actual = pq.read_schema(path)
+    expected = pa.schema([(name, arrow_type(pa, spark_type)) for name, spark_type in columns])
+    if actual.names != expected.names:
+        return [("*", f"columns {actual.names} != {expected.names}")]
+    return [
+        (field.name, f"{field.type} is not {expected.field(field.name).type}")
+        for field in actual if field.type != expected.field(field.name).type
+    ]
+
+def records_errors(path: str, columns: Columns, result: Dict[str, Any], limit: Optional[int],
+                   ) -> Iterator[Tuple[str, str]]:
+    for record in json_lines(path):
+        if limit is not None and result["records"] >= limit:
+            return
+        result["records"] += 1
+        yield from record_errors(record, columns)
+
+def landing_files(directory: str, tables: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """(table, path) of every landing file, including the files under <table>/event_date=*/"""
+    # names starting with "_" or "." are skipped, as Spark does (manifests, spill files)
+    tables = list(tables)
+    for filename in sorted(os.listdir(directory)):
+        table = next((name for name in tables if filename.startswith(name)), None)
+        if table is None or filename.startswith(("_", ".")):
+            continue
+        path = os.path.join(directory, filename)
+        if not os.path.isdir(path):
+            yield table, path
+            continue
+        for root, folders, files in os.walk(path):
+            folders[:] = sorted(folder for folder in folders if not folder.startswith(("_", ".")))
+            for name in sorted(files):
+                if not name.startswith(("_", ".")):
+                    yield table, os.path.join(root, name)
+
+def validate_dir(directory: str, types: Dict[str, Columns], limit: Optional[int] = None,
+                 ) -> Dict[str, Dict[str, Any]]:
+    """Per table: files and records checked, and problem counts per column and problem"""
+    results: Dict[str, Dict[str, Any]] = {}
+    for table, path in landing_files(directory, types):
+        result = results.setdefault(table, {"files": 0, "records": 0, "problems": {}})
+        result["files"] += 1
+        if path.endswith(".parquet"):
+            problems = parquet_errors(path, types[table], result)
+        else:
+            problems = records_errors(path, types[table], result, limit)
+        for column, problem in problems:
+            key = f"{column}: {problem}"
+            result["problems"][key] = result["problems"].get(key, 0) + 1
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Typed schemas derived from psp.json")
+    parser.add_argument("--config", default=CONFIG)
+    parser.add_argument("--bronze-dir", default=BRONZE_DIR, help="bronze SQL files with a cloud_files schema")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--check-bronze", action="store_true", help="exit 1 if a bronze schema is stale")
+    action.add_argument("--sync-bronze", action="store_true", help="rewrite stale bronze schemas")
+    action.add_argument("--validate", metavar="DIR", help="validate generated landing files")
+    parser.add_argument("--limit", type=int, help="records to validate per table")
+    args = parser.parse_args(argv)
+
+    types = column_types(args.config)
+    if args.check_bronze or args.sync_bronze:
+        stale = check_bronze(types, args.bronze_dir, sync=args.sync_bronze)
+        verb = "rewrote" if args.sync_bronze else "stale"
+        print(f"{len(stale)} bronze schemas {verb}: {', '.join(stale) or '-'}")
+        return 1 if stale and args.check_bronze else 0
+    if args.validate:
+        failed = 0
+        for table, result in validate_dir(args.validate, types, args.limit).items():
+            problems = sum(result["problems"].values())
+            failed += problems
+            print(f"{table:14} {result['files']:>4} files {result['records']:>10,} records {problems:>8,} problems")
+            for problem, count in sorted(result["problems"].items()):
+                print(f"    {count:>10,}  {problem}")
+        return 1 if failed else 0
+    for table, columns in types.items():
+        print(f"{table}: {ddl(columns)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
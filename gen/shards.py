@@ -0,0 +1,177 @@
+"""
+Multi-process sharded generation.
+
+Each table is split into shards generated in a process pool, one part file per shard
+(orders-00000.jsonl, orders-00001.jsonl, ...), or with by_date one part file per shard in
+every event date partition (partitions.py). Tables are processed in dependency
+levels (merchants/customers, then payments/orders/payouts, then transactions, then
+disputes); once a level is written its key tables are published to shared memory and
+every worker of the next level samples foreign keys from the complete parent tables,
+so every reference resolves across shards.
+
+Each shard draws from its own seed derived from (seed, table, shard), so the output
+does not depend on worker scheduling. Shards interleave the table's id counters (shard s
+of S takes start + s, start + s + S, ...), so ids never collide across part files. Parent
+skew (skew.Skew) is passed to every shard; power-law ranks index the complete parent tables,
+so the heavy parents are the same rows in every shard.
+"""
+
+import os
+import random
+import time
+from functools import partial
+from multiprocessing import Pool, resource_tracker
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from formats import OutputFormat
+from ids import allocator, record_run, reserved
+from keys import KEY_COLUMNS, PARENTS, TABLES, KeyTable, key_tables
+from partitions import PARTITION_COLUMNS, PartitionedSink, layout, pattern
+from skew import Skew
+from writer import WRITERS, WriteStats, report_written
+
+
+class ShardTask(NamedTuple):
+    table: str
+    shard: int
+    engine: str
+    seed: int
+    batch_size: int
+    path: str
+    target_bytes: Optional[int]
+    target_records: Optional[int]
+    parents: List[Dict[str, Any]]
+    id_start: int
+    shards: int
+    output: OutputFormat
+    skew: Skew
+    events: bool
+    by_date: bool = False
+
+
+class ShardResult(NamedTuple):
+    stats: WriteStats
+    keys: Optional[Dict[str, bytes]]
+    next_id: int
+
+
+_attached: Dict[Tuple[str, ...], KeyTable] = {}
+
+
+def dependency_levels() -> List[List[str]]:
+    """Group tables so every table's parents are in an earlier level"""
+    levels: List[List[str]] = []
+    placed: Dict[str, int] = {}
+    for table in TABLES:
+        level = max((placed[parent] + 1 for parent in PARENTS[table]), default=0)
+        placed[table] = level
+        if level == len(levels):
+            levels.append([])
+        levels[level].append(table)
+    return levels
+
+def split_target(total: Optional[int], shards: int, shard: int) -> Optional[int]:
+    """Share of a per-table target for one shard (remainder goes to the first shards)"""
+    if total is None:
+        return None
+    return total // shards + (1 if shard < total % shards else 0)
+
+def attach(descriptor: Dict[str, Any]) -> KeyTable:
+    """Attach a shared parent table once per worker process"""
+    token = tuple(sorted(descriptor["blocks"].values()))
+    if token not in _attached:
+        _attached[token] = KeyTable.attach(descriptor)
+    return _attached[token]
+
+def run_shard(task: ShardTask) -> ShardResult:
+    """Generate one part file; runs inside a pool worker"""
+    parents = [attach(descriptor) for descriptor in task.parents]
+    keys = KeyTable(task.table, KEY_COLUMNS[task.table]) if task.table in KEY_COLUMNS else None
+    ids = allocator(task.table, task.id_start, task.shard, task.shards)
+
+    if task.engine == "batch":
+        import batch
+        rng = batch.np.random.default_rng([task.seed, TABLES.index(task.table), task.shard])
+        records = batch.source(task.table, parents, ids, rng, task.batch_size, task.skew, task.events)
+    else:
+        import record
+        random.seed(f"{task.seed}/{task.table}/{task.shard}")
+        records = record.source(task.table, parents, ids, task.skew, task.events)
+
+    if task.by_date:
+        opener = partial(PartitionedSink, table=task.table, output=task.output)
+    else:
+        opener = partial(task.output.open, table=task.table)
+    stats = WRITERS[task.engine](task.path, records, keys, task.target_bytes, task.target_records, opener)
+    return ShardResult(stats, keys.raw_columns() if keys is not None else None, ids.next_counter)
+
+def run_sharded(output_dir: str, workers: int, shards: int, engine: str = "record", seed: int = 42,
+                batch_size: int = 16384, target_bytes: Optional[int] = None,
+                target_records: Optional[int] = None, manifest: Optional[Dict[str, Any]] = None,
+                append: bool = False, output: OutputFormat = OutputFormat(),
+                skew: Skew = Skew(), events: bool = False, by_date: bool = False) -> Dict[str, int]:
+    """Generate every table as part files with a pool of workers; returns record counts per table.
+
+    Id counters start after the ranges reserved in manifest, which is advanced in place;
+    with append, part numbering also continues after the existing part files.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    tables = key_tables()
+    shared: Dict[str, Dict[str, Any]] = {}
+    blocks = []
+    counts: Dict[str, int] = {}
+    manifest = {} if manifest is None else manifest
+    first_part = {table: reserved(manifest, table, "next_part") if append else 0 for table in TABLES}
+
+    # Workers must share the parent's resource tracker; otherwise each starts its own and
+    # unlinks the attached blocks as "leaked" when it exits.
+    resource_tracker.ensure_running()
+    try:
+        with Pool(workers) as pool:
+            for level in dependency_levels():
+                tasks = [
+                    ShardTask(
+                        table, shard, engine, seed, batch_size,
+                        layout(output_dir, table, f"{table}-{first_part[table] + shard:05d}{output.extension}",
+                               output, by_date)[0],
+                        split_target(target_bytes, shards, shard),
+                        split_target(target_records, shards, shard),
+                        [shared[parent] for parent in PARENTS[table]],
+                        reserved(manifest, table, "next_id"), shards, output, skew, events,
+                        by_date and table in PARTITION_COLUMNS,
+                    )
+                    for table in level for shard in range(shards)
+                ]
+                for table in level:
+                    print(f"Generating {table} ({shards} shards)...")
+
+                started = time.perf_counter()
+                results = pool.map(run_shard, tasks, chunksize=1)
+                elapsed = time.perf_counter() - started
+
+                for table in level:
+                    table_results = [r for task, r in zip(tasks, results) if task.table == table]
+                    keys = tables.get(table)
+                    if keys is not None:
+                        for result in table_results:
+                            keys.extend_raw(result.keys, result.stats.records)
+                        shared[table], table_blocks = keys.share()
+                        blocks.extend(table_blocks)
+                    path = layout(output_dir, table, f"{table}-*{output.extension}", output, by_date)[0]
+                    total = WriteStats(
+                        pattern(path) if by_date and table in PARTITION_COLUMNS else path,
+                        sum(r.stats.records for r in table_results),
+                        sum(r.stats.bytes for r in table_results),
+                        elapsed,
+                        sum(r.stats.stored_bytes for r in table_results),
+                    )
+                    counts[table] = total.records
+                    record_run(manifest, table, max(r.next_id for r in table_results),
+                               first_part[table] + shards)
+                    report_written(total, keys, parts=shards)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return counts
@@ -0,0 +1,130 @@
+"""
+Heavy-tailed parent selection for the generators (gen.py --skew / --hot-merchants).
+
+By default every foreign key is drawn uniformly from the parent rows. A relationship,
+named child.parent as in keys.PARENTS (e.g. orders.merchants), can instead draw parent
+rows by rank from a power law:
+
+- zipf:S    row k (0-based, in generation order) gets a weight of about 1/(k+1)^S
+- pareto:A  the rank-size law of Pareto(A) distributed volumes, i.e. zipf:1/A
+            (pareto:1.16 is the 80/20 rule)
+
+Ranks come from inverting the continuous power law over [1, n+1), so a draw is O(1), works
+on the same formula for the record and batch engines, and needs no per-row weights on a
+parent table that is still growing (replay). Ids are not sequential, so the heavy parents
+are not recognizable by their id.
+
+Hot-merchant bursts (--hot-merchants N) send --burst-share of the orders to N merchants,
+each inside its own --burst-hours window of the order date range, on top of any
+orders.merchants skew. Hot merchants are spread evenly over the merchant rows, so they are
+not the steady heavy hitters, and their windows are derived from the seed, so every shard
+sees the same bursts.
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from distributions import ORDER_START_DATE, ORDER_END_DATE
+from keys import PARENTS, KeyTable
+
+DISTRIBUTIONS = ("uniform", "zipf", "pareto")
+EPOCH = datetime(1970, 1, 1)
+
+
+def rank(u: Any, n: int, exponent: float) -> Any:
+    """Continuous power-law rank in [1, n + 1) for uniform u in [0, 1) (a float or numpy array)"""
+    if exponent == 1:
+        return (n + 1) ** u
+    power = 1 - exponent
+    return (((n + 1) ** power - 1) * u + 1) ** (1 / power)
+
+def parse_relationship(spec: str) -> Tuple[str, float]:
+    """child.parent=uniform|zipf:S|pareto:A -> (child.parent, power-law exponent)"""
+    relationship, _, distribution = spec.partition("=")
+    child, _, parent = relationship.partition(".")
+    if parent not in PARENTS.get(child, []):
+        known = ", ".join(f"{table}.{p}" for table, parents in PARENTS.items() for p in parents)
+        raise ValueError(f"--skew {spec!r}: unknown relationship {relationship!r} (one of {known})")
+    kind, _, parameter = distribution.partition(":")
+    if kind not in DISTRIBUTIONS or (kind == "uniform") != (parameter == ""):
+        raise ValueError(f"--skew {spec!r}: expected uniform, zipf:S or pareto:A")
+    if kind == "uniform":
+        return relationship, 0.0
+    try:
+        value = float(parameter)
+    except ValueError:
+        raise ValueError(f"--skew {spec!r}: {parameter!r} is not a number") from None
+    if value <= 0:
+        raise ValueError(f"--skew {spec!r}: the parameter must be positive")
+    return relationship, value if kind == "zipf" else 1 / value
+
+
+class SkewedKeys:
+    """A parent KeyTable whose rows are sampled by power-law rank instead of uniformly"""
+
+    def __init__(self, table: KeyTable, exponent: float):
+        self.table = table
+        self.exponent = exponent
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.table, name)
+
+    def sample(self) -> int:
+        """Pick a row index by rank (record engine, global random stream)"""
+        size = len(self.table)
+        if not size:
+            raise IndexError(f"cannot sample from empty key table {self.table.name}")
+        return min(int(rank(random.random(), size, self.exponent)) - 1, size - 1)
+
+
+class Bursts(NamedTuple):
+    """Hot merchants with one order burst window each"""
+    share: float
+    starts: Tuple[int, ...]  # window start per hot merchant, epoch seconds
+    seconds: int
+
+    @classmethod
+    def build(cls, merchants: int, share: float, hours: float, seed: int) -> "Bursts":
+        seconds = int(hours * 3600)
+        first = int((ORDER_START_DATE - EPOCH).total_seconds())
+        last = max(int((ORDER_END_DATE - EPOCH).total_seconds()) - seconds, first)
+        rng = random.Random(f"{seed}/bursts")
+        return cls(share, tuple(rng.randint(first, last) for _ in range(merchants)), seconds)
+
+    def row(self, hot: int, size: int) -> int:
+        """Merchant row of hot merchant number hot, spread evenly over size rows"""
+        return min(int((hot + 0.5) * size / len(self.starts)), size - 1)
+
+    def draw(self, size: int) -> Optional[Tuple[int, datetime, datetime]]:
+        """(merchant row, window start, window end) for a burst order, or None (record engine)"""
+        if random.random() >= self.share:
+            return None
+        hot = random.randrange(len(self.starts))
+        start = EPOCH + timedelta(seconds=self.starts[hot])
+        return self.row(hot, size), start, start + timedelta(seconds=self.seconds)
+
+
+class Skew(NamedTuple):
+    """Parent selection of one generation run; the default is uniform everywhere"""
+    exponents: Dict[str, float] = {}  # child.parent -> power-law exponent
+    bursts: Optional[Bursts] = None
+
+    def parents(self, table: str, tables: List[KeyTable]) -> List[Any]:
+        """The parent key tables of table, wrapped where the relationship is skewed"""
+        return [
+            SkewedKeys(parent, self.exponents[f"{table}.{name}"])
+            if self.exponents.get(f"{table}.{name}") else parent
+            for name, parent in zip(PARENTS[table], tables)
+        ]
+
+    def describe(self) -> str:
+        parts = [f"{relationship} ~ rank^-{exponent:g}" for relationship, exponent in self.exponents.items()
+                 if exponent]
+        if self.bursts is not None:
+            parts.append(f"{self.bursts.share:.0%} of orders in bursts of {len(self.bursts.starts)} "
+                         f"hot merchants ({self.bursts.seconds / 3600:g}h each)")
+        return "; ".join(parts) or "uniform"
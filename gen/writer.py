@@ -0,0 +1,181 @@
+"""
+Streaming JSONL writers with a running byte counter.
+
+Records (record engine) or pre-rendered batches (batch engine) are written straight
+to disk until an exact byte or record target is reached; key columns of the rows that
+were actually written are appended to the entity's KeyTable. Targets count JSON bytes;
+an opener from formats.OutputFormat can compress the lines or turn them into Parquet.
+A transaction written as state events (--transaction-events) is one record of several lines.
+RollingWriter keeps appending to part files for the long-running replay mode (replay.py).
+"""
+
+import json
+import os
+import time
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from keys import KeyTable
+
+
+class WriteStats(NamedTuple):
+    path: str
+    records: int
+    bytes: int
+    seconds: float
+    stored_bytes: int
+
+
+def open_text(filepath: str) -> Any:
+    return open(filepath, 'w', buffering=1024 * 1024)
+
+def stored_size(sink: Any, filepath: str) -> int:
+    """Bytes on disk after closing sink; a partitioned sink (partitions.py) counts its own files"""
+    stored = getattr(sink, "stored_bytes", None)
+    return os.path.getsize(filepath) if stored is None else stored
+
+
+def write_jsonl(filepath: str, records: Iterator[Dict[str, Any]], keys: Optional[KeyTable] = None,
+                target_bytes: Optional[int] = None, target_records: Optional[int] = None,
+                opener: Callable[[str], Any] = open_text) -> WriteStats:
+    """Stream records to a JSONL file until the byte or record target is reached"""
+    if target_bytes is None and target_records is None:
+        raise ValueError("write_jsonl needs target_bytes or target_records")
+
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    count = 0
+    written = 0
+    started = time.perf_counter()
+    with opener(filepath) as f:
+        while target_records is None or count < target_records:
+            record = next(records)
+            if isinstance(record, list):
+                # one transaction's state events: a single record for targets and keys
+                line = ''.join(json.dumps(event) + '\n' for event in record)
+                record = record[0]
+            else:
+                line = json.dumps(record) + '\n'
+            # json.dumps escapes non-ASCII by default, so characters == bytes
+            if target_bytes is not None and written + len(line) > target_bytes:
+                break
+            f.write(line)
+            written += len(line)
+            count += 1
+            if keys is not None:
+                keys.append(record)
+
+    return WriteStats(filepath, count, written, time.perf_counter() - started, stored_size(f, filepath))
+
+def write_batches(filepath: str, batches: Iterator[Any], keys: Optional[KeyTable] = None,
+                  target_bytes: Optional[int] = None, target_records: Optional[int] = None,
+                  opener: Callable[[str], Any] = open_text) -> WriteStats:
+    """Stream pre-rendered RecordBatches (see batch.py) to a JSONL file until the target is reached"""
+    if target_bytes is None and target_records is None:
+        raise ValueError("write_batches needs target_bytes or target_records")
+
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    count = 0
+    written = 0
+    started = time.perf_counter()
+    with opener(filepath) as f:
+        while target_records is None or count < target_records:
+            batch = next(batches)
+            lines = batch.lines
+            take = len(lines)
+            if target_records is not None and take > target_records - count:
+                take = target_records - count
+                lines = lines[:take]
+            size = sum(map(len, lines))
+            if target_bytes is not None and written + size > target_bytes:
+                # only the batch that crosses the target pays for per-line offsets
+                take = bisect_right(list(accumulate(map(len, lines))), target_bytes - written)
+                lines = lines[:take]
+                size = sum(map(len, lines))
+            f.write(''.join(lines))
+            written += size
+            count += take
+            if keys is not None:
+                keys.extend_raw(batch.keys, take)
+            if take < len(batch.lines):
+                break
+
+    return WriteStats(filepath, count, written, time.perf_counter() - started, stored_size(f, filepath))
+
+
+class PublishedPart(NamedTuple):
+    path: str
+    records: int
+    bytes: int
+    oldest_event: float
+    published_at: float
+
+
+class RollingWriter:
+    """Appends lines to a hidden part file and publishes it as {table}-NNNNN.jsonl.
+
+    The rename is atomic, so Auto Loader never lists a partial file; the caller decides
+    when to publish (see due) so parent parts can be made visible before their children.
+    """
+
+    def __init__(self, directory: str, table: str, first_part: int, max_bytes: int, max_seconds: float):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.table = table
+        self.next_part = first_part
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self._file = None
+        self._records = 0
+        self._bytes = 0
+        self._oldest_event = 0.0
+
+    def _pending_path(self) -> str:
+        return os.path.join(self.directory, f".{self.table}-{self.next_part:05d}.jsonl.tmp")
+
+    @property
+    def pending(self) -> bool:
+        return self._file is not None
+
+    def write(self, lines: List[str], event_time: float) -> None:
+        """Append lines of events stamped at event_time (epoch seconds) to the open part"""
+        if not lines:
+            return
+        if self._file is None:
+            self._file = open(self._pending_path(), 'w', buffering=1024 * 1024)
+            self._oldest_event = event_time
+        text = ''.join(lines)
+        self._file.write(text)
+        self._records += len(lines)
+        self._bytes += len(text)
+
+    def due(self, now: float) -> bool:
+        """Whether the open part reached max_bytes or has been open for max_seconds"""
+        return self.pending and (self._bytes >= self.max_bytes or now - self._oldest_event >= self.max_seconds)
+
+    def publish(self) -> Optional[PublishedPart]:
+        """Close and rename the open part into place"""
+        if self._file is None:
+            return None
+        self._file.close()
+        path = os.path.join(self.directory, f"{self.table}-{self.next_part:05d}.jsonl")
+        os.replace(self._pending_path(), path)
+        part = PublishedPart(path, self._records, self._bytes, self._oldest_event, time.time())
+        self.next_part += 1
+        self._file = None
+        self._records = self._bytes = 0
+        return part
+
+
+def report_written(stats: WriteStats, keys: Optional[KeyTable] = None, parts: int = 1) -> None:
+    """Print size, record count and throughput for one written table"""
+    rate = stats.records / stats.seconds if stats.seconds > 0 else float('inf')
+    part_info = f" in {parts} parts" if parts > 1 else ""
+    key_info = f", {keys.nbytes() / 1024:.0f} KB keys" if keys is not None else ""
+    stored_info = ""
+    if stats.stored_bytes != stats.bytes:
+        stored_info = f" JSON, {stats.stored_bytes / (1024 * 1024):.2f} MB stored"
+    print(f"  Wrote {stats.path}{part_info} ({stats.bytes / (1024 * 1024):.2f} MB{stored_info}, "
+          f"{stats.records} records, {rate:,.0f} records/s{key_info})")
+
+WRITERS = {"record": write_jsonl, "batch": write_batches}
@@ -0,0 +1,165 @@
+"""
+Backfill of the incremental gold tables over a date range, in parallel chunks of days.
+
+The pipeline's gold LIVE TABLEs recompute the whole history on every update, so restating a
+month (late or corrected silver data, a rule change) would mean reprocessing everything.
+This job rebuilds only the days of --start .. --end in the tables of the incremental jobs,
+and replaces only their partitions of those days:
+
+- merchant_performance: the transaction_date partitions of a chunk are recomputed from the
+  chunk's silver transactions and payouts (merchant_performance_incremental.recompute);
+  groups that no longer have transactions disappear with the partition they were in
+- payout_reconciliation: the reconciliation_date partitions of a chunk, from the window +
+  chunk days of silver data they depend on (payout_reconciliation_incremental.replace_days)
+- metrics_rollup: the day rows of the range and the month rows of its months
+  (metrics_rollup_incremental.replace_days). The table is partitioned by rollup_level, so
+  concurrent writes to it would conflict; it is written once, after the day partitions
+
+The range is cut into chunks of --chunk-days. Each (table, chunk) task reads its days in one
+pass and overwrites their partitions in one replaceWhere write. The reads are date-pruned:
+silver_transactions is partitioned by transaction_date, and silver_transaction_events is
+filtered on its Z-ORDER column state_timestamp. silver_orders has no date layout that
+matches (a transaction's order can be older than the transaction), so each task still scans
+it once to look up merchants. Larger chunks mean fewer orders scans, and smaller ones more
+parallelism. Tasks are dispatched to --workers threads, each submitting its Spark jobs from
+its own session (spark.newSession(): the temp views of recompute stay apart) to the shared
+cluster. Delta allows concurrent replaceWhere writes to disjoint partitions.
+
+The target tables must exist (run each job once, or with --full-refresh). The jobs' change
+data feed state is left alone: their next run still picks up the changes since their last run.
+
+    backfill.py --start 2025-05-01 --end 2025-05-31 --workers 4 --chunk-days 8
+    backfill.py --start 2025-05-01 --end 2025-05-31 --table payout_reconciliation --settlement-window-days 7
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pyspark.sql import SparkSession
+from pyspark.sql import functions as F
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import merchant_performance_incremental
+import metrics_rollup_incremental
+import payout_reconciliation_incremental
+from merchant_performance_incremental import KEYS, table_name
+
+# --table name -> the job that creates and owns the target table, and its default target
+JOBS = {
+    "merchant_performance": ("merchant_performance_incremental.py", "gold_merchant_performance_incremental"),
+    "payout_reconciliation": ("payout_reconciliation_incremental.py", "gold_payout_reconciliation_incremental"),
+    "metrics_rollup": ("metrics_rollup_incremental.py", "gold_metrics_rollup_incremental"),
+}
+
+
+def days_between(start: date, end: date) -> List[date]:
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+def chunks(start: date, end: date, size: int) -> List[Tuple[date, date]]:
+    """start .. end as consecutive (first, last) ranges of at most size days"""
+    days = days_between(start, end)
+    return [(days[offset], days[min(offset + size, len(days)) - 1]) for offset in range(0, len(days), size)]
+
+def replace_merchant_performance(spark: SparkSession, args: argparse.Namespace, target: str,
+                                 start: date, end: date) -> None:
+    """Overwrite the transaction_date partitions of start .. end with their recomputed groups"""
+    keys = (
+        spark.table(table_name(args, "silver_transactions"))
+        .where(F.col("transaction_date").between(F.lit(start), F.lit(end)))
+        .join(spark.table(table_name(args, "silver_orders")).select("order_id", "merchant_id"), "order_id")
+        .select(*KEYS)
+        .distinct()
+    )
+    (merchant_performance_incremental.recompute(spark, args, keys).write.format("delta").mode("overwrite")
+     .option("replaceWhere", f"transaction_date BETWEEN '{start.isoformat()}' AND '{end.isoformat()}'")
+     .saveAsTable(target))
+
+def replace_payout_reconciliation(spark: SparkSession, args: argparse.Namespace, target: str,
+                                  start: date, end: date) -> None:
+    payout_reconciliation_incremental.replace_days(spark, args, target, days_between(start, end))
+
+# Tables written one chunk of date partitions per task
+PARTITIONED: Dict[str, Callable[[SparkSession, argparse.Namespace, str, date, date], None]] = {
+    "merchant_performance": replace_merchant_performance,
+    "payout_reconciliation": replace_payout_reconciliation,
+}
+
+
+def target_table(args: argparse.Namespace, table: str) -> str:
+    return table_name(args, getattr(args, f"{table}_target"))
+
+def run_chunk(spark: SparkSession, args: argparse.Namespace, table: str, start: date, end: date) -> float:
+    """Replace one chunk of date partitions of one table in a session of its own; returns seconds"""
+    started = time.perf_counter()
+    PARTITIONED[table](spark.newSession(), args, target_table(args, table), start, end)
+    return time.perf_counter() - started
+
+def backfill(spark: SparkSession, args: argparse.Namespace) -> None:
+    if args.end < args.start:
+        raise SystemExit(f"--end {args.end} is before --start {args.start}")
+    if args.chunk_days < 1:
+        raise SystemExit(f"--chunk-days must be at least 1, got {args.chunk_days}")
+    for table in args.table:
+        if not spark.catalog.tableExists(target_table(args, table)):
+            raise SystemExit(f"{target_table(args, table)} does not exist; create it with "
+                             f"{JOBS[table][0]} --full-refresh first")
+
+    days = days_between(args.start, args.end)
+    partitioned = [table for table in args.table if table in PARTITIONED]
+    tasks: List[Tuple[str, date, date]] = [
+        (table, first, last) for table in partitioned for first, last in chunks(args.start, args.end, args.chunk_days)
+    ]
+    started = time.perf_counter()
+    failed: List[Tuple[str, date, date, Exception]] = []
+    if tasks:
+        print(f"Backfilling {len(days)} days of {', '.join(partitioned)} "
+              f"({len(tasks)} chunks of up to {args.chunk_days} days, {args.workers} workers)")
+        with ThreadPoolExecutor(args.workers) as pool:
+            futures = {pool.submit(run_chunk, spark, args, *task): task for task in tasks}
+            for future in as_completed(futures):
+                table, first, last = futures[future]
+                try:
+                    print(f"  {table:24} {first} .. {last}  {future.result():8.1f}s")
+                except Exception as exc:
+                    failed.append((table, first, last, exc))
+                    print(f"  {table:24} {first} .. {last}  FAILED: {exc}")
+
+    if "metrics_rollup" in args.table:
+        rollup_started = time.perf_counter()
+        metrics_rollup_incremental.replace_days(spark, args, target_table(args, "metrics_rollup"), days)
+        print(f"  {'metrics_rollup':24} {len(days)} days, "
+              f"{len({day.replace(day=1) for day in days})} months {time.perf_counter() - rollup_started:8.1f}s")
+
+    print(f"Backfilled {args.start} .. {args.end} in {time.perf_counter() - started:.1f}s; "
+          f"{len(failed)} chunks failed")
+    if failed:
+        raise SystemExit(1)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Rebuild the date partitions of the incremental gold tables")
+    parser.add_argument("--catalog", default="psp")
+    parser.add_argument("--schema", default="analytics")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, required=True, help="last day, inclusive")
+    parser.add_argument("--table", action="append", choices=list(JOBS),
+                        help="table to backfill (repeatable, default all)")
+    parser.add_argument("--workers", type=int, default=4, help="chunks rebuilt at the same time")
+    parser.add_argument("--chunk-days", type=int, default=7,
+                        help="days read in one pass and replaced in one write per task")
+    for table, (_, default) in JOBS.items():
+        parser.add_argument(f"--{table.replace('_', '-')}-target", default=default, help=f"{table} table to write")
+    parser.add_argument("--settlement-window-days", type=int, default=7,
+                        help="psp.reconciliation.settlement_window_days of the pipeline")
+    parser.add_argument("--tolerance-cents", type=int, default=0, help="psp.reconciliation.tolerance_cents")
+    args = parser.parse_args(argv)
+    args.table = args.table or list(JOBS)
+    return args
+
+if __name__ == "__main__":
+    backfill(SparkSession.builder.getOrCreate(), parse_args(sys.argv[1:]))
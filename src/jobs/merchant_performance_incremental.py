@@ -0,0 +1,294 @@
+"""
+Incremental refresh of gold_merchant_performance, keyed by (merchant_id, transaction_date).
+
+Runs as a Lakeflow job task after each pipeline update. The change data feed of the bronze
+tables (delta.enableChangeDataFeed) says which rows arrived or changed since the last run;
+those are mapped to the (merchant_id, transaction_date) groups they feed, and only those
+groups are recomputed from silver with the query in gold/merchant_performance.sql and merged
+into the target table. Groups that no longer have transactions are deleted.
+
+- transactions / orders: the day of every transaction touched, directly or via its order
+- payouts: (merchant_id, batch_day)
+- merchants: the denormalized merchant attribute columns of every row of the merchant are
+  updated in place from silver_merchants, without re-aggregating; only a merchant that has
+  no rows yet (its transactions arrived before it) has its days recomputed
+
+Late data is recomputed when its day is within --lookback-days of the latest transaction
+day; older groups are skipped and counted (run with --full-refresh to rebuild them). The
+bronze table versions processed so far are kept in <target>_state. The target is rebuilt
+instead when a source has no saved version yet, or when its history shows an overwrite,
+truncate or replace since then (a pipeline full refresh): the change data feed of such a
+version does not say which of the old rows are gone.
+
+    merchant_performance_incremental.py --catalog psp --schema analytics --lookback-days 3
+"""
+
+import argparse
+import os
+import re
+import sys
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from pyspark.sql import DataFrame, SparkSession
+from pyspark.sql import functions as F
+
+GOLD_SQL = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "psp-payment-system-analytics", "gold", "merchant_performance.sql"
+)
+SOURCES = ["bronze_transactions", "bronze_orders", "bronze_merchants", "bronze_payouts"]
+KEYS = ["merchant_id", "transaction_date"]
+# gold column -> silver_merchants column, as gold/merchant_performance.sql denormalizes them
+MERCHANT_ATTRIBUTES = {
+    "merchant_legal_name": "legal_name",
+    "merchant_category_code": "merchant_category_code",
+    "merchant_country": "country_code",
+    "merchant_kyb_status": "kyb_status",
+    "merchant_pricing_tier": "pricing_tier",
+    "merchant_risk_level": "risk_level",
+    "is_kyb_approved": "is_kyb_approved",
+    "is_high_risk": "is_high_risk",
+    "is_enterprise": "is_enterprise",
+}
+LIVE_REF = re.compile(r"LIVE\.(\w+)")
+# DESCRIBE HISTORY operations that replace a table's rows rather than change some of them
+REPLACING_OPERATIONS = {
+    "TRUNCATE", "CREATE OR REPLACE TABLE", "REPLACE TABLE",
+    "CREATE OR REPLACE TABLE AS SELECT", "REPLACE TABLE AS SELECT",
+}
+
+
+def table_name(args: argparse.Namespace, name: str) -> str:
+    return f"{args.catalog}.{args.schema}.{name}"
+
+def gold_query() -> str:
+    """The SELECT of gold/merchant_performance.sql, reading silver through __incremental_* views"""
+    with open(GOLD_SQL) as f:
+        text = f.read()
+    query = re.split(r"^AS\s*$", text, maxsplit=1, flags=re.M)[1].strip().rstrip(";")
+    return LIVE_REF.sub(lambda match: f"__incremental_{match.group(1)}", query)
+
+def latest_version(spark: SparkSession, name: str) -> int:
+    return spark.sql(f"DESCRIBE HISTORY {name} LIMIT 1").first()["version"]
+
+def processed_versions(spark: SparkSession, state_table: str) -> Dict[str, int]:
+    if not spark.catalog.tableExists(state_table):
+        return {}
+    return {row["source_table"]: row["last_version"] for row in spark.table(state_table).collect()}
+
+def save_versions(spark: SparkSession, state_table: str, versions: Dict[str, int]) -> None:
+    state = spark.createDataFrame(list(versions.items()), "source_table STRING, last_version BIGINT")
+    state.withColumn("updated_at", F.current_timestamp()).write.mode("overwrite").saveAsTable(state_table)
+
+def changes(spark: SparkSession, name: str, start: int, end: int) -> DataFrame:
+    """Inserted, updated (both images) and deleted rows of a bronze table between two versions"""
+    return (
+        spark.read.format("delta")
+        .option("readChangeFeed", "true")
+        .option("startingVersion", start)
+        .option("endingVersion", end)
+        .table(name)
+    )
+
+def replaced(spark: SparkSession, name: str, since: int) -> bool:
+    """Whether a table was overwritten, truncated or replaced at version since or later"""
+    parameters = F.col("operationParameters")
+    history = spark.sql(f"DESCRIBE HISTORY {name}").where(F.col("version") >= since).select(
+        "operation", parameters.getItem("mode").alias("mode"), parameters.getItem("outputMode").alias("output_mode")
+    )
+    return any(
+        row["operation"] in REPLACING_OPERATIONS or row["mode"] == "Overwrite" or row["output_mode"] == "Complete"
+        for row in history.collect()
+    )
+
+def changed_sources(spark: SparkSession, args: argparse.Namespace, processed: Dict[str, int],
+                    latest: Dict[str, int]) -> Optional[Dict[str, DataFrame]]:
+    """
+    Change data feed of every source with versions after the processed one.
+
+    Returns:
+        {source: changes} of the sources that changed, or None when the target has to be
+        rebuilt: a source has no processed version, went back in version (recreated), or
+        was overwritten, truncated or replaced since its processed version
+    """
+    changed = {}
+    for source, version in latest.items():
+        start = processed.get(source, -1) + 1
+        name = table_name(args, source)
+        if start == 0 or version < start - 1 or (version >= start and replaced(spark, name, start)):
+            return None
+        if version >= start:
+            changed[source] = changes(spark, name, start, version)
+    return changed
+
+def changed_keys(spark: SparkSession, args: argparse.Namespace, changed: Dict[str, DataFrame]) -> DataFrame:
+    """(merchant_id, transaction_date) groups fed by the changed bronze transactions, orders and payouts"""
+    transactions = spark.table(table_name(args, "silver_transactions")).select(
+        "order_id", "transaction_date"
+    )
+    orders = spark.table(table_name(args, "silver_orders")).select("order_id", "merchant_id")
+    keys: List[DataFrame] = []
+
+    if "bronze_transactions" in changed:
+        keys.append(
+            changed["bronze_transactions"]
+            .select("order_id", F.to_date("authorized_at").alias("transaction_date"))
+            .join(orders, "order_id")
+            .select(*KEYS)
+        )
+    if "bronze_orders" in changed:
+        keys.append(
+            changed["bronze_orders"].select("order_id", "merchant_id")
+            .join(transactions, "order_id")
+            .select(*KEYS)
+        )
+    if "bronze_payouts" in changed:
+        keys.append(
+            changed["bronze_payouts"].select("merchant_id", F.to_date("batch_day").alias("transaction_date"))
+        )
+
+    if not keys:
+        return spark.createDataFrame([], "merchant_id STRING, transaction_date DATE")
+    union = keys[0]
+    for frame in keys[1:]:
+        union = union.unionByName(frame)
+    return union.where(F.col("merchant_id").isNotNull() & F.col("transaction_date").isNotNull()).distinct()
+
+def recompute(spark: SparkSession, args: argparse.Namespace, keys: Optional[DataFrame]) -> DataFrame:
+    """gold_merchant_performance rows for the given groups (all groups when keys is None)"""
+    silver = {
+        name: spark.table(table_name(args, name))
+        for name in ["silver_transactions", "silver_orders", "silver_merchants", "silver_payouts"]
+    }
+    if keys is not None:
+        # every input is cut down to the groups before the gold query aggregates anything; the
+        # day set is broadcast, so the joins prune transaction files at run time (no driver list)
+        days = F.broadcast(keys.select("transaction_date").distinct())
+        merchants = keys.select("merchant_id").distinct()
+        orders = silver["silver_orders"].join(merchants, "merchant_id", "left_semi")
+        transactions = (
+            silver["silver_transactions"].join(days, "transaction_date", "left_semi")
+            .join(orders.select("order_id", "merchant_id"), "order_id")
+            .join(keys, KEYS, "left_semi")
+            .drop("merchant_id")
+        )
+        silver["silver_transactions"] = transactions
+        silver["silver_orders"] = orders.join(transactions.select("order_id").distinct(), "order_id", "left_semi")
+        silver["silver_merchants"] = silver["silver_merchants"].join(merchants, "merchant_id", "left_semi")
+        silver["silver_payouts"] = silver["silver_payouts"].join(
+            keys.withColumnRenamed("transaction_date", "payout_batch_date"),
+            ["merchant_id", "payout_batch_date"], "left_semi"
+        )
+
+    for name, frame in silver.items():
+        frame.createOrReplaceTempView(f"__incremental_{name}")
+    return spark.sql(gold_query())
+
+def merchant_days(spark: SparkSession, args: argparse.Namespace, merchants: DataFrame) -> DataFrame:
+    """Every (merchant_id, transaction_date) group of the given merchants"""
+    orders = (
+        spark.table(table_name(args, "silver_orders")).select("order_id", "merchant_id")
+        .join(merchants, "merchant_id", "left_semi")
+    )
+    return (
+        spark.table(table_name(args, "silver_transactions")).select("order_id", "transaction_date")
+        .join(orders, "order_id")
+        .select(*KEYS)
+        .distinct()
+    )
+
+def update_merchants(spark: SparkSession, args: argparse.Namespace, target: str, merchants: DataFrame) -> None:
+    """Set the denormalized attribute columns of the given merchants' rows from silver_merchants"""
+    (spark.table(table_name(args, "silver_merchants"))
+     .join(merchants, "merchant_id", "left_semi")
+     .select("merchant_id", *[F.col(source).alias(column) for column, source in MERCHANT_ATTRIBUTES.items()])
+     .createOrReplaceTempView("__incremental_merchants"))
+    assignments = ", ".join(f"target.{column} = source.{column}" for column in MERCHANT_ATTRIBUTES)
+    spark.sql(f"""
+        MERGE INTO {target} AS target
+        USING __incremental_merchants AS source
+        ON target.merchant_id = source.merchant_id
+        WHEN MATCHED THEN UPDATE SET {assignments}, target.metrics_calculated_at = current_timestamp()
+    """)
+
+def merge(spark: SparkSession, target: str, keys: DataFrame, rows: DataFrame) -> None:
+    """Upsert the recomputed groups and delete groups that no longer have any transactions"""
+    rows.createOrReplaceTempView("__incremental_rows")
+    keys.join(rows.select(*KEYS), KEYS, "left_anti").createOrReplaceTempView("__incremental_vanished")
+    on = " AND ".join(f"target.{key} = source.{key}" for key in KEYS)
+    spark.sql(f"""
+        MERGE INTO {target} AS target
+        USING __incremental_rows AS source
+        ON {on}
+        WHEN MATCHED THEN UPDATE SET *
+        WHEN NOT MATCHED THEN INSERT *
+    """)
+    spark.sql(f"""
+        MERGE INTO {target} AS target
+        USING __incremental_vanished AS source
+        ON {on}
+        WHEN MATCHED THEN DELETE
+    """)
+
+def refresh(spark: SparkSession, args: argparse.Namespace) -> None:
+    target = table_name(args, args.target)
+    state_table = f"{target}_state"
+    processed = {} if args.full_refresh else processed_versions(spark, state_table)
+    latest = {source: latest_version(spark, table_name(args, source)) for source in SOURCES}
+    changed = changed_sources(spark, args, processed, latest) if spark.catalog.tableExists(target) else None
+
+    if changed is None:
+        print(f"Full refresh of {target}")
+        (recompute(spark, args, None).write.format("delta").mode("overwrite")
+         .option("overwriteSchema", "true").partitionBy("transaction_date").saveAsTable(target))
+        save_versions(spark, state_table, latest)
+        return
+
+    if not changed:
+        print("No bronze changes since the last run")
+        return
+
+    keys = changed_keys(spark, args, changed).cache()
+    latest_day = spark.table(table_name(args, "silver_transactions")).agg(F.max("transaction_date")).first()[0]
+    if latest_day is None:
+        print("silver_transactions is empty; nothing to recompute")
+        return
+    cutoff = latest_day - timedelta(days=args.lookback_days)
+    # late transactions are recomputed only within the lookback; merchant changes apply to every day
+    in_scope = keys.where(F.col("transaction_date") >= F.lit(cutoff))
+    updated = 0
+    if "bronze_merchants" in changed:
+        merchants = changed["bronze_merchants"].select("merchant_id").distinct().cache()
+        present = spark.table(target).select("merchant_id").distinct()
+        arrived = merchants.join(present, "merchant_id", "left_anti")
+        in_scope = in_scope.unionByName(merchant_days(spark, args, arrived))
+        updated = merchants.join(present, "merchant_id", "left_semi").count()
+        update_merchants(spark, args, target, merchants)
+        merchants.unpersist()
+    in_scope = in_scope.distinct().cache()
+    skipped = keys.join(in_scope, KEYS, "left_anti").count()
+
+    group_count = in_scope.count()
+    if group_count:
+        rows = recompute(spark, args, in_scope).cache()
+        merge(spark, target, in_scope, rows)
+        rows.unpersist()
+    save_versions(spark, state_table, latest)
+    print(f"Recomputed {group_count} (merchant_id, transaction_date) groups from "
+          f"{', '.join(sorted(changed))}; updated the attributes of {updated} merchants; "
+          f"{skipped} groups before {cutoff} skipped (outside lookback)")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Incrementally refresh gold_merchant_performance")
+    parser.add_argument("--catalog", default="psp")
+    parser.add_argument("--schema", default="analytics")
+    parser.add_argument("--target", default="gold_merchant_performance_incremental",
+                        help="table to merge into (the pipeline owns gold_merchant_performance)")
+    parser.add_argument("--lookback-days", type=int, default=3,
+                        help="recompute late data for days within this many days of the latest transaction day")
+    parser.add_argument("--full-refresh", action="store_true", help="rebuild every group")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    refresh(SparkSession.builder.getOrCreate(), parse_args(sys.argv[1:]))
@@ -0,0 +1,122 @@
+"""
+Incremental refresh of gold_metrics_rollup, by transaction day.
+
+Runs as a Lakeflow job task after each pipeline update, like merchant_performance_incremental.py.
+The change data feed of silver_unified_transactions (delta.enableChangeDataFeed) says which
+transaction days gained, lost or changed rows since the last run. For those days only:
+
+- the day levels are rebuilt from the day's unified rows (psp_rollup.day_rows) and replace
+  the day rows of the target (replaceWhere)
+- the month levels of their months are merged again from the day rows now in the target
+  (psp_rollup.month_rows), without reading any transactions
+
+Merchant, customer and payment attributes (merchant_risk_level feeds risk_band) are read
+from the current silver rows when a day is rebuilt; --full-refresh rebuilds every day after
+dimension changes. The silver_unified_transactions version processed so far is kept in
+<target>_state; as in merchant_performance_incremental.changed_sources, no saved version or
+an overwrite of the table since then (a pipeline full refresh) rebuilds everything.
+
+    metrics_rollup_incremental.py --catalog psp --schema analytics
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+from typing import List, Optional
+
+from pyspark.sql import DataFrame, SparkSession
+from pyspark.sql import functions as F
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from merchant_performance_incremental import (
+    changed_sources, latest_version, processed_versions, save_versions, table_name,
+)
+from psp_rollup import day_rows, month_rows
+from psp_unified import CONSUMERS, DIMENSIONS, late_columns
+
+SOURCE = "silver_unified_transactions"
+COLUMNS = CONSUMERS["metrics_rollup"]
+
+
+def unified_rows(spark: SparkSession, args: argparse.Namespace, days: Optional[List[date]]) -> DataFrame:
+    """The unified_metrics_rollup columns of the given days, with late attributes in the narrow layout"""
+    unified = spark.table(table_name(args, SOURCE))
+    if days is not None:
+        unified = unified.where(F.col("transaction_date").isin(days))
+    if set(COLUMNS) <= set(unified.columns):
+        return unified.select(*COLUMNS)
+    late = late_columns(COLUMNS)
+    frame = unified.alias("u")
+    for alias in sorted({column.source for column in late if not column.derived}):
+        table, key = DIMENSIONS[alias]
+        lookup = spark.table(table_name(args, table)).alias(alias)
+        frame = frame.join(lookup, F.col(f"u.{key}") == F.col(f"{alias}.{key}"), "left")
+    frame = frame.select("u.*", *[
+        F.col(f"{column.source}.{column.expression}").alias(column.name)
+        for column in late if not column.derived
+    ])
+    frame = frame.select("*", *[F.expr(column.expression).alias(column.name) for column in late if column.derived])
+    return frame.select(*COLUMNS)
+
+def in_list(values: List[date]) -> str:
+    return ", ".join(repr(value.isoformat()) for value in values)
+
+def replace_days(spark: SparkSession, args: argparse.Namespace, target: str, days: List[date]) -> None:
+    """Rebuild the day rows of days, then the month rows of their months"""
+    (day_rows(unified_rows(spark, args, days)).select("*", F.current_timestamp().alias("gold_created_at"))
+     .write.format("delta").mode("overwrite")
+     .option("replaceWhere", f"period_grain = 'day' AND period_start IN ({in_list(days)})")
+     .saveAsTable(target))
+
+    months = sorted({day.replace(day=1) for day in days})
+    month_days = (
+        spark.table(target)
+        .where((F.col("period_grain") == "day")
+               & F.trunc("period_start", "month").cast("date").isin(months))
+        .drop("gold_created_at")
+    )
+    (month_rows(month_days).select("*", F.current_timestamp().alias("gold_created_at"))
+     .write.format("delta").mode("overwrite")
+     .option("replaceWhere", f"period_grain = 'month' AND period_start IN ({in_list(months)})")
+     .saveAsTable(target))
+
+def refresh(spark: SparkSession, args: argparse.Namespace) -> None:
+    target = table_name(args, args.target)
+    state_table = f"{target}_state"
+    processed = {} if args.full_refresh else processed_versions(spark, state_table)
+    latest = {SOURCE: latest_version(spark, table_name(args, SOURCE))}
+    changed = changed_sources(spark, args, processed, latest) if spark.catalog.tableExists(target) else None
+
+    if changed is None:
+        print(f"Full refresh of {target}")
+        days = day_rows(unified_rows(spark, args, None))
+        (days.unionByName(month_rows(days)).select("*", F.current_timestamp().alias("gold_created_at"))
+         .write.format("delta").mode("overwrite").option("overwriteSchema", "true")
+         .partitionBy("rollup_level").saveAsTable(target))
+        save_versions(spark, state_table, latest)
+        return
+
+    if not changed:
+        print(f"No {SOURCE} changes since the last run")
+        return
+
+    days = sorted(row[0] for row in changed[SOURCE].select("transaction_date").distinct().collect()
+                  if row[0] is not None)
+    if days:
+        replace_days(spark, args, target, days)
+    save_versions(spark, state_table, latest)
+    print(f"Rebuilt {len(days)} days and {len({day.replace(day=1) for day in days})} months of {target}")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Incrementally refresh gold_metrics_rollup")
+    parser.add_argument("--catalog", default="psp")
+    parser.add_argument("--schema", default="analytics")
+    parser.add_argument("--target", default="gold_metrics_rollup_incremental",
+                        help="table to write (the pipeline owns gold_metrics_rollup)")
+    parser.add_argument("--full-refresh", action="store_true", help="rebuild every day and month")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    refresh(SparkSession.builder.getOrCreate(), parse_args(sys.argv[1:]))
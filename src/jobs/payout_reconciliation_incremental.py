@@ -0,0 +1,173 @@
+"""
+Incremental refresh of gold_payout_reconciliation, one reconciliation day at a time.
+
+Runs as a Lakeflow job task after each pipeline update, like merchant_performance_incremental.py.
+The rows of reconciliation day D depend only on the payouts and settled transactions of
+D - window .. D (psp_reconciliation.input_days), so each day is rebuilt from window + 1
+days of silver data and replaces its own reconciliation_date partition (replaceWhere). A
+daily run costs about one day of data per day it touches, whatever the size of the table.
+
+Days to rebuild:
+
+- --day DATE (repeatable): exactly those days, e.g. the batch day a scheduled run closes
+- otherwise from the change data feed of the bronze tables since the last run: the
+  batch_day of every changed payout, and the days of the settled, completed and chargeback
+  events (psp_reconciliation.SETTLEMENT_STATES) of a changed transaction or of the transactions
+  of a changed order, each expanded to the days d .. d + window it affects
+  (psp_reconciliation.affected_days)
+
+Days more than --lookback-days before the latest payout batch day are skipped and counted
+(run with --full-refresh to rebuild them). The bronze table versions processed so far are
+kept in <target>_state; as in merchant_performance_incremental.changed_sources, a source
+without a saved version or overwritten since then rebuilds every day. --settlement-window-days and --tolerance-cents must match the
+pipeline's psp.reconciliation.* settings for the rows to agree with the pipeline table.
+
+    payout_reconciliation_incremental.py --catalog psp --schema analytics --lookback-days 14
+    payout_reconciliation_incremental.py --day 2025-05-31
+"""
+
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Set
+
+from pyspark.sql import DataFrame, SparkSession
+from pyspark.sql import functions as F
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from merchant_performance_incremental import (
+    changed_sources, latest_version, processed_versions, save_versions, table_name,
+)
+from psp_reconciliation import SETTLED, SETTLEMENT_STATES, SNAPSHOT_SETTLED, affected_days, input_days, reconcile
+
+SOURCES = ["bronze_payouts", "bronze_transactions", "bronze_orders"]
+
+
+def changed_days(spark: SparkSession, args: argparse.Namespace, changed: Dict[str, DataFrame]) -> Set[date]:
+    """Payout batch days and settlement or chargeback days touched by the changed bronze rows"""
+    days: Set[date] = set()
+    if "bronze_payouts" in changed:
+        days.update(row[0] for row in changed["bronze_payouts"].select("batch_day").distinct().collect())
+
+    txn_ids: List[DataFrame] = []
+    if "bronze_transactions" in changed:
+        txn_ids.append(changed["bronze_transactions"].select("txn_id"))
+    if "bronze_orders" in changed:
+        txn_ids.append(
+            spark.table(table_name(args, "silver_transactions"))
+            .join(changed["bronze_orders"].select("order_id"), "order_id", "left_semi")
+            .select("txn_id")
+        )
+    if txn_ids:
+        touched = txn_ids[0]
+        for frame in txn_ids[1:]:
+            touched = touched.unionByName(frame)
+        settled = (
+            spark.table(table_name(args, "silver_transaction_events"))
+            .where(F.col("transaction_state").isin(SETTLEMENT_STATES))
+            .join(touched.distinct(), "txn_id", "left_semi")
+            .select(F.to_date("state_timestamp").alias("settlement_date"))
+            .distinct()
+        )
+        days.update(row[0] for row in settled.collect())
+    return {day for day in days if day is not None}
+
+def recompute(spark: SparkSession, args: argparse.Namespace, days: Optional[List[date]]) -> DataFrame:
+    """gold_payout_reconciliation rows of the given reconciliation days (all days when None)"""
+    payouts = spark.table(table_name(args, "silver_payouts"))
+    events = spark.table(table_name(args, "silver_transaction_events"))
+    orders = spark.table(table_name(args, "silver_orders"))
+    settled_ids = None
+    if days is not None:
+        inputs = sorted({day for target in days for day in input_days(target, args.settlement_window_days)})
+        payouts = payouts.where(F.col("payout_batch_date").isin(inputs))
+        # the string range on the Z-ORDER column lets Delta skip files; to_date keeps only the input days
+        window = events.where(
+            (F.col("state_timestamp") >= inputs[0].isoformat())
+            & (F.col("state_timestamp") < (inputs[-1] + timedelta(days=1)).isoformat())
+            & F.to_date("state_timestamp").isin(inputs)
+        )
+        # a completed event of these days counts only if its transaction never had a settled event
+        settled_ids = (
+            events.where(F.col("transaction_state") == SETTLED)
+            .join(window.where(F.col("transaction_state") == SNAPSHOT_SETTLED).select("txn_id"),
+                  "txn_id", "left_semi")
+            .select("txn_id")
+        )
+        events = window
+        orders = orders.join(events.select("order_id").distinct(), "order_id", "left_semi")
+
+    rows = reconcile(payouts, events, orders, args.settlement_window_days, args.tolerance_cents,
+                     settled_ids).select(
+        "*",
+        F.current_timestamp().alias("gold_created_at"),
+        F.current_date().alias("snapshot_date")
+    )
+    return rows if days is None else rows.where(F.col("reconciliation_date").isin(days))
+
+def replace_days(spark: SparkSession, args: argparse.Namespace, target: str, days: List[date]) -> None:
+    """Overwrite the reconciliation_date partitions of days with their recomputed rows"""
+    condition = f"reconciliation_date IN ({', '.join(repr(day.isoformat()) for day in days)})"
+    (recompute(spark, args, days).write.format("delta").mode("overwrite")
+     .option("replaceWhere", condition).saveAsTable(target))
+
+def refresh(spark: SparkSession, args: argparse.Namespace) -> None:
+    target = table_name(args, args.target)
+    state_table = f"{target}_state"
+
+    if args.day and spark.catalog.tableExists(target):
+        days = sorted(set(args.day))
+        replace_days(spark, args, target, days)
+        print(f"Recomputed {len(days)} reconciliation days: {', '.join(day.isoformat() for day in days)}")
+        return
+
+    processed = {} if args.full_refresh else processed_versions(spark, state_table)
+    latest = {source: latest_version(spark, table_name(args, source)) for source in SOURCES}
+    changed = changed_sources(spark, args, processed, latest) if spark.catalog.tableExists(target) else None
+
+    if changed is None:
+        print(f"Full refresh of {target}")
+        (recompute(spark, args, None).write.format("delta").mode("overwrite")
+         .option("overwriteSchema", "true").partitionBy("reconciliation_date").saveAsTable(target))
+        save_versions(spark, state_table, latest)
+        return
+
+    if not changed:
+        print("No bronze changes since the last run")
+        return
+
+    latest_day = spark.table(table_name(args, "silver_payouts")).agg(F.max("payout_batch_date")).first()[0]
+    if latest_day is None:
+        print("silver_payouts is empty; nothing to reconcile")
+        return
+    cutoff = latest_day - timedelta(days=args.lookback_days)
+    touched = {day for changed_day in changed_days(spark, args, changed)
+               for day in affected_days(changed_day, args.settlement_window_days)}
+    days = sorted(day for day in touched if day >= cutoff)
+
+    if days:
+        replace_days(spark, args, target, days)
+    save_versions(spark, state_table, latest)
+    print(f"Recomputed {len(days)} reconciliation days from {', '.join(sorted(changed))}; "
+          f"{len(touched) - len(days)} days before {cutoff} skipped (outside lookback)")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Incrementally refresh gold_payout_reconciliation")
+    parser.add_argument("--catalog", default="psp")
+    parser.add_argument("--schema", default="analytics")
+    parser.add_argument("--target", default="gold_payout_reconciliation_incremental",
+                        help="table to write (the pipeline owns gold_payout_reconciliation)")
+    parser.add_argument("--settlement-window-days", type=int, default=7,
+                        help="psp.reconciliation.settlement_window_days of the pipeline")
+    parser.add_argument("--tolerance-cents", type=int, default=0, help="psp.reconciliation.tolerance_cents")
+    parser.add_argument("--day", action="append", type=date.fromisoformat, default=[],
+                        help="reconciliation day to rebuild (YYYY-MM-DD, repeatable); skips the change feed")
+    parser.add_argument("--lookback-days", type=int, default=14,
+                        help="rebuild days within this many days of the latest payout batch day")
+    parser.add_argument("--full-refresh", action="store_true", help="rebuild every day")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    refresh(SparkSession.builder.getOrCreate(), parse_args(sys.argv[1:]))
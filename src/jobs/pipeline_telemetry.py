@@ -0,0 +1,84 @@
+"""
+Collect per-table pipeline telemetry and export it as JSON and Prometheus text.
+
+Reads the pipeline event log (the event_log() table-valued function, by pipeline id or by
+one of the pipeline's tables) or a JSONL file of the same events written by the local
+runner (bench/run.py / bench/state.py --events). For each table and update it reports
+rows written, rows dropped per expectation, drop rate, processing time, throughput,
+source backlog and streaming state size (psp_telemetry.collect), then checks the alert
+thresholds (psp_telemetry.DEFAULT_THRESHOLDS or --thresholds).
+
+    pipeline_telemetry.py --table psp.analytics.silver_unified_transactions --since-hours 168 \\
+        --json telemetry.json --prometheus telemetry.prom
+    pipeline_telemetry.py --events-file bench/.data/events.jsonl --fail-on-alert
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psp_telemetry import collect, evaluate, load_thresholds, to_json, to_prometheus
+
+
+def read_events_file(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def read_event_log(args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    from pyspark.sql import SparkSession
+
+    spark = SparkSession.builder.getOrCreate()
+    source = f"TABLE({args.table})" if args.table else f"'{args.pipeline_id}'"
+    query = f"""
+        SELECT id, timestamp, event_type, origin, details
+        FROM event_log({source})
+        WHERE event_type = 'flow_progress'
+          AND timestamp >= current_timestamp() - INTERVAL {args.since_hours} HOURS
+        ORDER BY timestamp
+    """
+    for row in spark.sql(query).toLocalIterator():
+        event = row.asDict(recursive=True)
+        event["timestamp"] = event["timestamp"].isoformat()
+        yield event
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export per-table pipeline telemetry and check alert thresholds")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--table", help="read the event log of the pipeline that owns this table")
+    source.add_argument("--pipeline-id", help="read the event log of this pipeline")
+    source.add_argument("--events-file", help="JSONL events from the local runner")
+    parser.add_argument("--since-hours", type=int, default=24 * 7, help="event log window (event log sources)")
+    parser.add_argument("--thresholds", help="JSON list of alert thresholds (default: built-in)")
+    parser.add_argument("--json", dest="json_path", help="write the series and alerts as JSON")
+    parser.add_argument("--prometheus", help="write the latest values in Prometheus text format")
+    parser.add_argument("--fail-on-alert", action="store_true", help="exit with code 1 when an alert is raised")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    events = read_events_file(args.events_file) if args.events_file else read_event_log(args)
+    points = collect(events)
+    alerts = evaluate(points, load_thresholds(args.thresholds))
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(to_json(points, alerts), f, indent=2)
+            f.write('\n')
+    if args.prometheus:
+        with open(args.prometheus, 'w') as f:
+            f.write(to_prometheus(points, alerts))
+
+    tables = sorted({item.table for item in points})
+    print(f"{len(points)} table updates across {len(tables)} tables")
+    for alert in alerts:
+        print(f"  ALERT {alert.message()}")
+    return 1 if alerts and args.fail_on_alert else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
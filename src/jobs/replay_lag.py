@@ -0,0 +1,88 @@
+"""
+Achieved ingest rate and end-to-end lag of a replay run (gen.py --replay), from the bronze tables.
+
+gen.py --replay stamps every event with the wall-clock time it was generated, and bronze
+stamps every row with the ingestion_timestamp of the micro-batch that read it. Per table
+and per --bucket-seconds of ingestion time this job reports the rows ingested per second
+and the end-to-end lag (ingestion_timestamp minus the event time: generation, part file
+publishing, Auto Loader discovery and the bronze micro-batch) as p50 / p95 / max. Replay's
+own log only covers the first part, until a part file is published.
+
+    replay_lag.py --catalog psp --schema analytics --since-minutes 30
+    replay_lag.py --since-minutes 10 --bucket-seconds 10 --json lag.json
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+from pyspark.sql import SparkSession
+
+# Bronze table -> its event time as replay stamps it (replay.stamp / replay.schedule)
+EVENT_TIME = {
+    "bronze_merchants": "created_at",
+    "bronze_customers": "created_at",
+    "bronze_payments": "first_seen_at",
+    "bronze_orders": "created_at",
+    "bronze_transactions": "timestamp_millis(state.timestamp)",
+    "bronze_payouts": "paid_at",
+    "bronze_disputes": "opened_at",
+}
+
+
+def table_name(args: argparse.Namespace, name: str) -> str:
+    return f"{args.catalog}.{args.schema}.{name}"
+
+def lag_query(args: argparse.Namespace, table: str) -> str:
+    """Rows per second and lag percentiles of one bronze table, per bucket of ingestion time"""
+    return f"""
+        SELECT window(ingestion_timestamp, '{args.bucket_seconds} seconds').start AS bucket,
+               count(*) / {args.bucket_seconds} AS rows_per_sec,
+               percentile_approx(lag, 0.5) AS lag_p50,
+               percentile_approx(lag, 0.95) AS lag_p95,
+               max(lag) AS lag_max
+        FROM (
+            SELECT ingestion_timestamp,
+                   (unix_millis(ingestion_timestamp) - unix_millis({EVENT_TIME[table]})) / 1000.0 AS lag
+            FROM {table_name(args, table)}
+            WHERE ingestion_timestamp >= current_timestamp() - INTERVAL {args.since_minutes} MINUTES
+        )
+        GROUP BY 1
+        ORDER BY 1
+    """
+
+def collect(spark: SparkSession, args: argparse.Namespace) -> Dict[str, List[Dict[str, Any]]]:
+    series = {}
+    for table in args.table or list(EVENT_TIME):
+        rows = spark.sql(lag_query(args, table)).collect()
+        series[table] = [dict(row.asDict(), bucket=row["bucket"].isoformat()) for row in rows]
+    return series
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ingest rate and end-to-end lag of a replay run")
+    parser.add_argument("--catalog", default="psp")
+    parser.add_argument("--schema", default="analytics")
+    parser.add_argument("--table", action="append", choices=list(EVENT_TIME),
+                        help="bronze table (repeatable, default all)")
+    parser.add_argument("--since-minutes", type=int, default=60, help="ingestion time window")
+    parser.add_argument("--bucket-seconds", type=int, default=60, help="seconds per reported bucket")
+    parser.add_argument("--json", dest="json_path", help="write the series as JSON")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    series = collect(SparkSession.builder.getOrCreate(), args)
+    for table, points in series.items():
+        print(table)
+        for point in points:
+            print(f"  {point['bucket']}  {point['rows_per_sec']:>10,.1f} rows/s  lag p50 {point['lag_p50']:7.1f}s "
+                  f"p95 {point['lag_p95']:7.1f}s max {point['lag_max']:7.1f}s")
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(series, f, indent=2)
+            f.write('\n')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,12 +11,14 @@ AS SELECT
   phone_hash,
   customer_type,
   created_at,
+  _rescued_data,
   current_timestamp() AS ingestion_timestamp,
   _metadata.file_path AS source_file
 FROM cloud_files(
   "/Volumes/psp/analytics/vol-landing-zone/customers*",
   "json",
   map(
-    "cloudFiles.inferColumnTypes", "true"
+    "schema", "customer_id STRING, email_hash STRING, phone_hash STRING, customer_type STRING, created_at TIMESTAMP",
+    "rescuedDataColumn", "_rescued_data"
   )
 );
@@ -15,12 +15,14 @@ AS SELECT
   closed_at,
   liability,
   status,
+  _rescued_data,
   current_timestamp() AS ingestion_timestamp,
   _metadata.file_path AS source_file
 FROM cloud_files(
   "/Volumes/psp/analytics/vol-landing-zone/disputes*",
   "json",
   map(
-    "cloudFiles.inferColumnTypes", "true"
+    "schema", "dispute_id STRING, txn_id STRING, reason_code STRING, amount_cents BIGINT, stage STRING, opened_at TIMESTAMP, closed_at TIMESTAMP, liability STRING, status STRING",
+    "rescuedDataColumn", "_rescued_data"
   )
 );
@@ -14,12 +14,14 @@ AS SELECT
   pricing_tier,
   risk_level,
   created_at,
+  _rescued_data,
   current_timestamp() AS ingestion_timestamp,
   _metadata.file_path AS source_file
 FROM cloud_files(
   "/Volumes/psp/analytics/vol-landing-zone/merchants*",
   "json",
   map(
-    "cloudFiles.inferColumnTypes", "true"
+    "schema", "merchant_id STRING, legal_name STRING, mcc STRING, country STRING, kyb_status STRING, pricing_tier STRING, risk_level STRING, created_at TIMESTAMP",
+    "rescuedDataColumn", "_rescued_data"
   )
 );
@@ -16,12 +16,14 @@ AS SELECT
   total_amount_cents,
   channel,
   created_at,
+  _rescued_data,
   current_timestamp() AS ingestion_timestamp,
   _metadata.file_path AS source_file
 FROM cloud_files(
   "/Volumes/psp/analytics/vol-landing-zone/orders*",
   "json",
   map(
-    "cloudFiles.inferColumnTypes", "true"
+    "schema", "order_id STRING, merchant_id STRING, customer_id STRING, currency STRING, subtotal_cents BIGINT, tax_cents BIGINT, tip_cents BIGINT, total_amount_cents BIGINT, channel STRING, created_at TIMESTAMP",
+    "rescuedDataColumn", "_rescued_data"
   )
 );
@@ -16,14 +16,14 @@ AS SELECT
   wallet_type,
   status,
   first_seen_at,
+  _rescued_data,
   current_timestamp() AS ingestion_timestamp,
   _metadata.file_path AS source_file
 FROM cloud_files(
   "/Volumes/psp/analytics/vol-landing-zone/payments*",
   "json",
   map(
-    "cloudFiles.inferColumnTypes", "true",
-    "cloudFiles.schemaHints", "payment_id STRING, customer_id STRING, first_seen_at TIMESTAMP",
-    "cloudFiles.schemaLocation", "/Volumes/psp/default/vol_schema/payments"
+    "schema", "payment_id STRING, customer_id STRING, brand STRING, bin STRING, last4 STRING, expiry_month BIGINT, expiry_year BIGINT, wallet_type STRING, status STRING, first_seen_at TIMESTAMP",
+    "rescuedDataColumn", "_rescued_data"
   )
 );
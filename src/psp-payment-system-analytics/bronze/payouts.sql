@@ -17,12 +17,14 @@ AS SELECT
   status,
   paid_at,
   transaction_count,
+  _rescued_data,
   current_timestamp() AS ingestion_timestamp,
   _metadata.file_path AS source_file
 FROM cloud_files(
   "/Volumes/psp/analytics/vol-landing-zone/payouts*",
   "json",
   map(
-    "cloudFiles.inferColumnTypes", "true"
+    "schema", "payout_id STRING, merchant_id STRING, batch_day DATE, currency STRING, gross_cents BIGINT, fees_cents BIGINT, reserve_cents BIGINT, net_cents BIGINT, status STRING, paid_at TIMESTAMP, transaction_count BIGINT",
+    "rescuedDataColumn", "_rescued_data"
   )
 );
@@ -20,12 +20,14 @@ AS SELECT
   fees_total_cents,
   network_fee_cents,
   processor_name,
+  _rescued_data,
   current_timestamp() AS ingestion_timestamp,
   _metadata.file_path AS source_file
 FROM cloud_files(
   "/Volumes/psp/analytics/vol-landing-zone/transactions*",
   "json",
   map(
-    "cloudFiles.inferColumnTypes", "true"
+    "schema", "txn_id STRING, order_id STRING, payment_id STRING, amount_cents BIGINT, currency STRING, state STRUCT<state_name: STRING, timestamp: BIGINT>, response_code STRING, three_ds STRING, authorized_at TIMESTAMP, fees_total_cents BIGINT, network_fee_cents BIGINT, processor_name STRING",
+    "rescuedDataColumn", "_rescued_data"
   )
 );
@@ -0,0 +1,29 @@
+CREATE OR REFRESH LIVE TABLE gold_customer_lifetime_sketches
+COMMENT "Customer lifetime counters and distinct-count estimates merged from the monthly sketches"
+TBLPROPERTIES (
+  "quality" = "gold",
+  "sketch.lg_config_k" = "12",
+  "sketch.relative_standard_error_pct" = "1.6"
+)
+AS
+SELECT
+  customer_id,
+
+  SUM(transaction_count) AS lifetime_transaction_count,
+  SUM(successful_transactions) AS successful_transactions,
+  SUM(declined_transactions) AS declined_transactions,
+  SUM(gross_value) AS lifetime_gross_value,
+  SUM(net_value) AS lifetime_net_value,
+  SUM(total_disputes) AS total_disputes,
+  MIN(first_transaction_date) AS first_transaction_date,
+  MAX(last_transaction_date) AS last_transaction_date,
+  COUNT(*) AS active_months,
+
+  hll_sketch_estimate(hll_union_agg(order_sketch)) AS lifetime_order_count_est,
+  hll_sketch_estimate(hll_union_agg(merchant_sketch)) AS unique_merchants_est,
+  hll_sketch_estimate(hll_union_agg(payment_sketch)) AS unique_payment_methods_est,
+
+  current_timestamp() AS gold_created_at
+
+FROM LIVE.gold_customer_monthly_sketches
+GROUP BY customer_id;
@@ -0,0 +1,34 @@
+CREATE OR REFRESH LIVE TABLE gold_customer_monthly_sketches
+COMMENT "Monthly customer counters with HLL sketches of merchants and payment methods - merge across months for lifetime figures"
+TBLPROPERTIES (
+  "quality" = "gold",
+  "sketch.lg_config_k" = "12",
+  "sketch.relative_standard_error_pct" = "1.6"
+)
+AS
+SELECT
+  customer_id,
+  CAST(date_trunc('MONTH', transaction_date) AS DATE) AS month_start,
+
+  COUNT(*) AS transaction_count,
+  SUM(CASE WHEN is_successful_transaction THEN 1 ELSE 0 END) AS successful_transactions,
+  SUM(CASE WHEN is_declined THEN 1 ELSE 0 END) AS declined_transactions,
+  SUM(transaction_amount) AS gross_value,
+  SUM(CASE WHEN is_successful_transaction THEN transaction_amount ELSE 0 END) AS net_value,
+  SUM(CASE WHEN has_dispute THEN 1 ELSE 0 END) AS total_disputes,
+  MIN(transaction_date) AS first_transaction_date,
+  MAX(transaction_date) AS last_transaction_date,
+
+  hll_sketch_agg(order_id, 12) AS order_sketch,
+  hll_sketch_agg(merchant_id, 12) AS merchant_sketch,
+  hll_sketch_agg(payment_id, 12) AS payment_sketch,
+
+  hll_sketch_estimate(hll_sketch_agg(merchant_id, 12)) AS unique_merchants_est,
+  hll_sketch_estimate(hll_sketch_agg(payment_id, 12)) AS unique_payment_methods_est,
+
+  current_timestamp() AS gold_created_at
+
+FROM LIVE.unified_customer_monthly_sketches
+GROUP BY
+  customer_id,
+  CAST(date_trunc('MONTH', transaction_date) AS DATE);
@@ -0,0 +1,38 @@
+CREATE OR REFRESH LIVE TABLE gold_merchant_daily_sketches
+COMMENT "Daily merchant counters with HLL sketches of orders, customers and payment instruments - merge across days for any date range"
+TBLPROPERTIES (
+  "quality" = "gold",
+  "sketch.lg_config_k" = "12",
+  "sketch.relative_standard_error_pct" = "1.6"
+)
+AS
+SELECT
+  merchant_id,
+  transaction_date,
+
+  COUNT(*) AS transaction_count,
+  SUM(CASE WHEN is_successful_transaction THEN 1 ELSE 0 END) AS successful_transactions,
+  SUM(CASE WHEN is_failed_transaction THEN 1 ELSE 0 END) AS failed_transactions,
+  SUM(CASE WHEN is_declined THEN 1 ELSE 0 END) AS declined_transactions,
+  SUM(CASE WHEN is_3ds_authenticated THEN 1 ELSE 0 END) AS authenticated_3ds_count,
+  SUM(CASE WHEN has_dispute THEN 1 ELSE 0 END) AS disputed_transactions,
+
+  SUM(transaction_amount) AS gross_transaction_amount,
+  SUM(fees_total_amount) AS total_fees,
+  SUM(network_fee_amount) AS network_fees,
+  SUM(net_amount) AS net_revenue,
+
+  hll_sketch_agg(order_id, 12) AS order_sketch,
+  hll_sketch_agg(customer_id, 12) AS customer_sketch,
+  hll_sketch_agg(payment_id, 12) AS payment_sketch,
+
+  hll_sketch_estimate(hll_sketch_agg(order_id, 12)) AS order_count_est,
+  hll_sketch_estimate(hll_sketch_agg(customer_id, 12)) AS unique_customers_est,
+  hll_sketch_estimate(hll_sketch_agg(payment_id, 12)) AS unique_payment_instruments_est,
+
+  current_timestamp() AS gold_created_at
+
+FROM LIVE.unified_merchant_daily_sketches
+GROUP BY
+  merchant_id,
+  transaction_date;
@@ -0,0 +1,50 @@
+CREATE OR REFRESH LIVE TABLE gold_merchant_period_sketches
+COMMENT "Weekly and monthly merchant roll-ups merged from the daily sketches"
+TBLPROPERTIES (
+  "quality" = "gold",
+  "sketch.lg_config_k" = "12",
+  "sketch.relative_standard_error_pct" = "1.6"
+)
+AS
+WITH periods AS (
+  SELECT 'week' AS period_grain, CAST(date_trunc('WEEK', transaction_date) AS DATE) AS period_start, *
+  FROM LIVE.gold_merchant_daily_sketches
+  UNION ALL
+  SELECT 'month' AS period_grain, CAST(date_trunc('MONTH', transaction_date) AS DATE) AS period_start, *
+  FROM LIVE.gold_merchant_daily_sketches
+)
+
+SELECT
+  merchant_id,
+  period_grain,
+  period_start,
+
+  COUNT(*) AS active_days,
+  SUM(transaction_count) AS transaction_count,
+  SUM(successful_transactions) AS successful_transactions,
+  SUM(failed_transactions) AS failed_transactions,
+  SUM(declined_transactions) AS declined_transactions,
+  ROUND(SUM(successful_transactions) * 100.0 / SUM(transaction_count), 2) AS success_rate_pct,
+  SUM(authenticated_3ds_count) AS authenticated_3ds_count,
+  SUM(disputed_transactions) AS disputed_transactions,
+
+  SUM(gross_transaction_amount) AS gross_transaction_amount,
+  SUM(total_fees) AS total_fees,
+  SUM(network_fees) AS network_fees,
+  SUM(net_revenue) AS net_revenue,
+
+  hll_union_agg(order_sketch) AS order_sketch,
+  hll_union_agg(customer_sketch) AS customer_sketch,
+  hll_union_agg(payment_sketch) AS payment_sketch,
+
+  hll_sketch_estimate(hll_union_agg(order_sketch)) AS order_count_est,
+  hll_sketch_estimate(hll_union_agg(customer_sketch)) AS unique_customers_est,
+  hll_sketch_estimate(hll_union_agg(payment_sketch)) AS unique_payment_instruments_est,
+
+  current_timestamp() AS gold_created_at
+
+FROM periods
+GROUP BY
+  merchant_id,
+  period_grain,
+  period_start;
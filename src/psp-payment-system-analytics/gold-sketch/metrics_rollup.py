@@ -0,0 +1,35 @@
+import os
+import sys
+
+import dlt
+from pyspark.sql import functions as F
+
+sys.path.append(os.path.abspath(os.path.join(os.getcwd(), "..", "..")))
+
+from psp_rollup import build
+from psp_rollup.cube import SKETCH_LG_CONFIG_K
+
+@dlt.table(
+    name="gold_metrics_rollup",
+    comment="Additive merchant and risk metrics at several grouping levels, for dashboard queries (psp_rollup.rollup_query)",
+    partition_cols=["rollup_level"],
+    table_properties={
+        "quality": "gold",
+        "sketch.lg_config_k": str(SKETCH_LG_CONFIG_K),
+        "pipelines.autoOptimize.zOrderCols": "period_start,merchant_id"
+    }
+)
+def gold_metrics_rollup():
+    """
+    Rollup cube over silver_unified_transactions, one partition per level (psp_rollup.LEVELS).
+
+    Transactions are banded with the psp_risk rules and aggregated once, to the finest level
+    (day x merchant, channel, card brand, processor and risk band). Every coarser level is
+    merged from rows of a finer one, so the transactions are scanned once per refresh.
+    src/jobs/metrics_rollup_incremental.py maintains the same rows for changed days only.
+
+    Returns:
+        DataFrame: One row per level, period and dimension combination
+    """
+
+    return build(dlt.read("unified_metrics_rollup")).select("*", F.current_timestamp().alias("gold_created_at"))
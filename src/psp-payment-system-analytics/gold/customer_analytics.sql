@@ -87,7 +87,7 @@ WITH customer_transactions AS (
     SUM(CASE WHEN DATEDIFF(CURRENT_DATE(), transaction_date) <= 90 THEN 1 ELSE 0 END) AS transactions_last_90d,
     SUM(CASE WHEN DATEDIFF(CURRENT_DATE(), transaction_date) <= 90 THEN transaction_amount ELSE 0 END) AS spend_last_90d
 
-  FROM LIVE.silver_unified_transactions
+  FROM LIVE.unified_customer_analytics
   GROUP BY
     customer_id,
     customer_type,
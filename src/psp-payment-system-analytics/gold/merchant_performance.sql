@@ -2,18 +2,12 @@ CREATE OR REFRESH LIVE TABLE gold_merchant_performance
 COMMENT "Daily merchant performance analytics - transaction volume, revenue, fees, payouts"
 TBLPROPERTIES ("quality" = "gold")
 AS
-WITH daily_transactions AS (
+-- Transactions are aggregated per (merchant_id, day) before the merchant attributes are
+-- joined on, so the only merchant-keyed work on raw rows is a partial aggregation and hot
+-- merchants do not pile up on one join task (see daily_transactions below).
+WITH merchant_daily AS (
   SELECT
-    m.merchant_id,
-    m.legal_name AS merchant_legal_name,
-    m.merchant_category_code,
-    m.country_code AS merchant_country,
-    m.kyb_status AS merchant_kyb_status,
-    m.pricing_tier AS merchant_pricing_tier,
-    m.risk_level AS merchant_risk_level,
-    m.is_kyb_approved,
-    m.is_high_risk,
-    m.is_enterprise,
+    o.merchant_id,
     t.transaction_date,
 
     COUNT(DISTINCT t.txn_id) AS daily_transaction_count,
@@ -71,20 +65,26 @@ WITH daily_transactions AS (
 
   FROM LIVE.silver_transactions t
   INNER JOIN LIVE.silver_orders o ON t.order_id = o.order_id
-  INNER JOIN LIVE.silver_merchants m ON o.merchant_id = m.merchant_id
 
   GROUP BY
-    m.merchant_id,
-    m.legal_name,
+    o.merchant_id,
+    t.transaction_date
+),
+
+daily_transactions AS (
+  SELECT
+    md.*,
+    m.legal_name AS merchant_legal_name,
     m.merchant_category_code,
-    m.country_code,
-    m.kyb_status,
-    m.pricing_tier,
-    m.risk_level,
+    m.country_code AS merchant_country,
+    m.kyb_status AS merchant_kyb_status,
+    m.pricing_tier AS merchant_pricing_tier,
+    m.risk_level AS merchant_risk_level,
     m.is_kyb_approved,
     m.is_high_risk,
-    m.is_enterprise,
-    t.transaction_date
+    m.is_enterprise
+  FROM merchant_daily md
+  INNER JOIN LIVE.silver_merchants m ON md.merchant_id = m.merchant_id
 ),
 
 daily_payouts AS (
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import dlt
+from pyspark.sql import functions as F
+
+sys.path.append(os.path.abspath(os.path.join(os.getcwd(), "..", "..")))
+
+from psp_pipeline import setting
+from psp_reconciliation import reconcile
+
+# Pipeline settings (configuration keys) and their defaults
+SETTLEMENT_WINDOW_DAYS = ("psp.reconciliation.settlement_window_days", "7")
+TOLERANCE_CENTS = ("psp.reconciliation.tolerance_cents", "0")
+
+
+@dlt.table(
+    name="gold_payout_reconciliation",
+    comment="Payout batches matched to the settled transactions they pay out, with gaps and over/under-payments",
+    table_properties={
+        "quality": "gold",
+        "pipelines.autoOptimize.zOrderCols": "merchant_id,reconciliation_date"
+    }
+)
+def gold_payout_reconciliation():
+    """
+    Reconciliation of silver_payouts against the settled transactions of silver_transaction_events.
+
+    A merchant's payouts of one currency and batch day are one batch, covering the
+    settlement days since the previous batch, at most psp.reconciliation.settlement_window_days
+    back. Settled events, less chargebacks, are summed per (merchant_id, currency, day) and
+    each batch is expanded into its covered days, so they meet in an equi-join on that bucket
+    (psp_reconciliation.reconcile). src/jobs/payout_reconciliation_incremental.py maintains the
+    same rows one reconciliation day at a time.
+
+    Returns:
+        DataFrame: One row per payout batch, and per settlement day no batch covered
+    """
+
+    rows = reconcile(
+        dlt.read("silver_payouts"),
+        dlt.read("silver_transaction_events"),
+        dlt.read("silver_orders"),
+        int(setting(SETTLEMENT_WINDOW_DAYS)),
+        int(setting(TOLERANCE_CENTS)),
+    )
+    return rows.select(
+        "*",
+        F.current_timestamp().alias("gold_created_at"),
+        F.current_date().alias("snapshot_date")
+    )
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import dlt
+from pyspark.sql import functions as F
+
+sys.path.append(os.path.abspath(os.path.join(os.getcwd(), "..", "..")))
+
+from psp_risk import rules, velocity
+from psp_unified import RISK_PASSTHROUGH
+
+VELOCITY_COLUMNS = [velocity.column_name(entity, feature) for entity, feature in velocity.RISK_COLUMNS]
+
+def velocity_features():
+    """silver_velocity_features pivoted to one row per txn_id, e.g. customer_txn_count_1h"""
+    features = dlt.read("silver_velocity_features")
+    return features.groupBy("txn_id").agg(*[
+        F.max(F.when(F.col("entity") == entity, F.col(feature))).alias(velocity.column_name(entity, feature))
+        for entity, feature in velocity.RISK_COLUMNS
+    ])
+
+@dlt.table(
+    name="gold_risk_fraud_monitoring",
+    comment="Transaction-level risk scoring and fraud detection indicators",
+    table_properties={"quality": "gold"}
+)
+def gold_risk_fraud_monitoring():
+    """
+    Transaction-level risk scores, fraud indicators and recommended action.
+
+    The rules live in psp_risk.rules and are shared with the online scorer
+    (psp_risk.scorer); here they are applied as Spark SQL expressions. Velocity
+    features (silver_velocity_features) are joined on as columns, NULL for
+    transactions the velocity stage has not seen. The unified columns come from the
+    unified_risk_fraud_monitoring projection (psp_unified.CONSUMERS).
+
+    Returns:
+        DataFrame: One scored row per unified transaction
+    """
+
+    unified = dlt.read("unified_risk_fraud_monitoring").join(velocity_features(), "txn_id", "left")
+    scored = unified.select(
+        "*",
+        *[F.expr(expression).alias(name) for name, expression in rules.sql_columns()]
+    )
+
+    derived = dict(rules.sql_derived_columns())
+    return scored.select(
+        *RISK_PASSTHROUGH,
+        F.col("psp_revenue").alias("transaction_fees"),
+        F.col("merchant_net_revenue"),
+        *[
+            F.expr(derived[name]).alias(name) if name in derived else F.col(name)
+            for name in rules.OUTPUT_COLUMNS
+        ],
+        *VELOCITY_COLUMNS,
+        F.current_timestamp().alias("gold_created_at"),
+        F.current_date().alias("snapshot_date"),
+        F.current_timestamp().alias("metrics_calculated_at")
+    )
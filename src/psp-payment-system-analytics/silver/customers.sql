@@ -3,12 +3,13 @@ CREATE OR REFRESH STREAMING LIVE TABLE silver_customers (
   CONSTRAINT valid_email_hash EXPECT (email_hash IS NOT NULL AND email_hash LIKE 'hash_%') ON VIOLATION DROP ROW,
   CONSTRAINT valid_phone_hash EXPECT (phone_hash IS NOT NULL AND phone_hash LIKE 'hash_%') ON VIOLATION DROP ROW,
   CONSTRAINT valid_customer_created_at EXPECT (customer_created_at IS NOT NULL) ON VIOLATION DROP ROW,
-  CONSTRAINT valid_customer_type EXPECT (customer_type IN ('individual', 'business', 'vip', 'flagged')) ON VIOLATION DROP ROW
+  CONSTRAINT valid_customer_type EXPECT (customer_type IN ('regular', 'individual', 'business', 'vip', 'flagged')) ON VIOLATION DROP ROW
 )
 COMMENT "Cleaned and conformed customer profile data"
 TBLPROPERTIES (
   "quality" = "silver",
-  "pipelines.autoOptimize.zOrderCols" = "customer_id,customer_type"
+  "pipelines.autoOptimize.zOrderCols" = "customer_id,customer_type",
+  "delta.enableChangeDataFeed" = "true"
 )
 AS SELECT
   customer_id,
@@ -6,7 +6,7 @@ CREATE OR REFRESH STREAMING LIVE TABLE silver_disputes (
   CONSTRAINT valid_dispute_stage EXPECT (dispute_stage IN ('inquiry', 'chargeback', 'pre_arbitration', 'arbitration')) ON VIOLATION DROP ROW,
   CONSTRAINT valid_dispute_opened_at EXPECT (dispute_opened_at IS NOT NULL) ON VIOLATION DROP ROW,
   CONSTRAINT valid_closed_dates EXPECT (dispute_closed_at IS NULL OR dispute_closed_at >= dispute_opened_at) ON VIOLATION DROP ROW,
-  CONSTRAINT valid_dispute_status EXPECT (dispute_status IN ('open', 'pending', 'won', 'lost', 'expired', 'withdrawn')) ON VIOLATION DROP ROW,
+  CONSTRAINT valid_dispute_status EXPECT (dispute_status IN ('open', 'pending', 'pending_evidence', 'won', 'lost', 'expired', 'withdrawn')) ON VIOLATION DROP ROW,
   CONSTRAINT valid_liability EXPECT (liability_party IN ('merchant', 'issuer', 'network', 'shared')) ON VIOLATION DROP ROW
 )
 COMMENT "Cleaned and conformed dispute and chargeback data"
@@ -4,14 +4,15 @@ CREATE OR REFRESH STREAMING LIVE TABLE silver_merchants (
   CONSTRAINT valid_country_code EXPECT (country_code IN ('US', 'GB', 'CA', 'AU')) ON VIOLATION DROP ROW,
   CONSTRAINT valid_mcc EXPECT (length(merchant_category_code) = 4 AND merchant_category_code RLIKE '^[0-9]{4}$') ON VIOLATION DROP ROW,
   CONSTRAINT valid_merchant_created_at EXPECT (merchant_created_at IS NOT NULL) ON VIOLATION DROP ROW,
-  CONSTRAINT valid_kyb_status EXPECT (kyb_status IN ('pending', 'approved', 'rejected', 'under_review')) ON VIOLATION DROP ROW,
-  CONSTRAINT valid_pricing_tier EXPECT (pricing_tier IN ('starter', 'growth', 'enterprise', 'custom')) ON VIOLATION DROP ROW,
+  CONSTRAINT valid_kyb_status EXPECT (kyb_status IN ('pending', 'approved', 'rejected', 'review', 'under_review')) ON VIOLATION DROP ROW,
+  CONSTRAINT valid_pricing_tier EXPECT (pricing_tier IN ('standard', 'premium', 'starter', 'growth', 'enterprise', 'custom')) ON VIOLATION DROP ROW,
   CONSTRAINT valid_risk_level EXPECT (risk_level IN ('low', 'medium', 'high', 'critical')) ON VIOLATION DROP ROW
 )
 COMMENT "Cleaned and conformed merchant account data"
 TBLPROPERTIES (
   "quality" = "silver",
-  "pipelines.autoOptimize.zOrderCols" = "merchant_id,country"
+  "pipelines.autoOptimize.zOrderCols" = "merchant_id,country",
+  "delta.enableChangeDataFeed" = "true"
 )
 AS SELECT
   merchant_id,
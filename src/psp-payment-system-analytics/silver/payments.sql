@@ -10,7 +10,8 @@ CREATE OR REFRESH STREAMING LIVE TABLE silver_payments (
 COMMENT "Cleaned and conformed payment instrument data"
 TBLPROPERTIES (
   "quality" = "silver",
-  "pipelines.autoOptimize.zOrderCols" = "payment_id,customer_id,brand"
+  "pipelines.autoOptimize.zOrderCols" = "payment_id,customer_id,brand",
+  "delta.enableChangeDataFeed" = "true"
 )
 AS SELECT
   payment_id,
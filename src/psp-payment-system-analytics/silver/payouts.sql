@@ -5,7 +5,7 @@ CREATE OR REFRESH STREAMING LIVE TABLE silver_payouts (
   CONSTRAINT valid_payout_currency EXPECT (payout_currency IN ('USD', 'GBP', 'CAD', 'AUD')) ON VIOLATION DROP ROW,
   CONSTRAINT valid_amounts EXPECT (gross_cents > 0 AND net_cents = gross_cents - fees_cents - reserve_cents) ON VIOLATION DROP ROW,
   CONSTRAINT valid_payout_paid_at EXPECT (payout_paid_at IS NOT NULL) ON VIOLATION DROP ROW,
-  CONSTRAINT valid_payout_status EXPECT (payout_status IN ('pending', 'processing', 'paid', 'failed', 'canceled', 'returned')) ON VIOLATION DROP ROW
+  CONSTRAINT valid_payout_status EXPECT (payout_status IN ('pending', 'processing', 'in_transit', 'paid', 'failed', 'canceled', 'returned')) ON VIOLATION DROP ROW
 )
 COMMENT "Cleaned and conformed merchant payout and settlement data"
 TBLPROPERTIES (
@@ -1,4 +1,4 @@
-CREATE OR REFRESH STREAMING LIVE TABLE silver_transactions (
+CREATE OR REFRESH STREAMING LIVE TABLE silver_transaction_events (
   CONSTRAINT valid_txn_id EXPECT (txn_id IS NOT NULL) ON VIOLATION DROP ROW,
   CONSTRAINT valid_order_id EXPECT (order_id IS NOT NULL) ON VIOLATION DROP ROW,
   CONSTRAINT valid_payment_id EXPECT (payment_id IS NOT NULL) ON VIOLATION DROP ROW,
@@ -8,12 +8,12 @@ CREATE OR REFRESH STREAMING LIVE TABLE silver_transactions (
   CONSTRAINT valid_response_code EXPECT (response_code IS NOT NULL) ON VIOLATION DROP ROW,
   CONSTRAINT valid_transaction_authorized_at EXPECT (transaction_authorized_at IS NOT NULL) ON VIOLATION DROP ROW,
   CONSTRAINT valid_processor EXPECT (processor_name IN ('mastercard_network', 'discover_network', 'visa_network', 'amex_network')) ON VIOLATION DROP ROW,
-  CONSTRAINT valid_three_ds_status EXPECT (three_ds_status IN ('none', 'attempted', 'frictionless', 'challenge', 'failed')) ON VIOLATION DROP ROW
+  CONSTRAINT valid_three_ds_status EXPECT (three_ds_status IN ('none', 'attempted', 'frictionless', 'challenge', 'failed', 'not_supported')) ON VIOLATION DROP ROW
 )
-COMMENT "Cleaned and conformed payment transaction data with state lifecycle"
+COMMENT "Cleaned and conformed transaction state events, append-only (one row per bronze transaction line)"
 TBLPROPERTIES (
   "quality" = "silver",
-  "pipelines.autoOptimize.zOrderCols" = "txn_id,order_id,payment_id,state_name"
+  "pipelines.autoOptimize.zOrderCols" = "txn_id,state_timestamp"
 )
 AS SELECT
   txn_id,
@@ -25,6 +25,25 @@ AS SELECT
   round(amount_cents / 100.0, 2) AS transaction_amount,
   lower(state_name) AS transaction_state,
   from_unixtime(state_timestamp / 1000) AS state_timestamp,
+  state_timestamp AS state_timestamp_ms,
+  -- position in the state machine, to order two states of a transaction with the same timestamp
+  CASE lower(state_name)
+    WHEN 'pending' THEN 0
+    WHEN 'authorized' THEN 1
+    WHEN 'declined' THEN 1
+    WHEN 'captured' THEN 2
+    WHEN 'void' THEN 2
+    WHEN 'failed' THEN 2
+    WHEN 'settled' THEN 3
+    WHEN 'refund_pending' THEN 3
+    WHEN 'cancelled' THEN 3
+    WHEN 'disputed' THEN 4
+    WHEN 'refunded' THEN 4
+    WHEN 'under_review' THEN 5
+    WHEN 'completed' THEN 6
+    WHEN 'chargeback' THEN 6
+    WHEN 'closed' THEN 7
+  END AS state_ordinal,
 
   CASE
     WHEN state_name IN ('completed', 'closed') THEN 'terminal_success'
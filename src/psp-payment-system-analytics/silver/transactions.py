@@ -0,0 +1,31 @@
+import dlt
+from pyspark.sql import functions as F
+
+# Orders the state events of one transaction: the latest transition wins (by its millisecond
+# timestamp; state_timestamp has one-second resolution and transitions can be milliseconds
+# apart), the later state of the lifecycle on an exact tie, and a re-sent event replaces its
+# earlier copy
+STATE_SEQUENCE = ["state_timestamp_ms", "state_ordinal", "ingestion_timestamp"]
+
+dlt.create_streaming_table(
+    name="silver_transactions",
+    comment="Current state per transaction, upserted from the silver_transaction_events log",
+    # backfill.py reads date ranges of it; txn_ids are permuted, so the Z-ORDER does not prune dates
+    partition_cols=["transaction_date"],
+    table_properties={
+        "quality": "silver",
+        "pipelines.autoOptimize.zOrderCols": "txn_id,order_id,payment_id"
+    }
+)
+
+# A transaction's state events arrive over days (authorized, captured, settled, ...); each
+# one updates the transaction's row in place instead of the table being rebuilt from a
+# snapshot. A landing file of final states (the generator without --transaction-events) is
+# the special case of one event per transaction.
+dlt.apply_changes(
+    target="silver_transactions",
+    source="silver_transaction_events",
+    keys=["txn_id"],
+    sequence_by=F.struct(*STATE_SEQUENCE),
+    stored_as_scd_type=1
+)
@@ -1,205 +1,420 @@
+import os
+import sys
+
 import dlt
 from pyspark.sql import functions as F
 from pyspark.sql.window import Window
 
+sys.path.append(os.path.abspath(os.path.join(os.getcwd(), "..", "..")))
+
+from psp_pipeline import listed, setting
+from psp_unified import CONSUMERS, DIMENSIONS, DISPUTE_COLUMNS, STATE_COLUMNS, late_columns, stored
+
+# Pipeline settings (configuration keys) and their defaults
+JOIN_MODE = ("psp.unified.join_mode", "stream")
+TXN_WATERMARK = ("psp.unified.transaction_watermark", "30 minutes")
+ORDER_WATERMARK = ("psp.unified.order_watermark", "30 minutes")
+AUTH_WINDOW = ("psp.unified.auth_window", "1 hour")
+BROADCAST_DIMS = ("psp.unified.broadcast_dims", "merchants")
+UNIFIED_LAYOUT = ("psp.unified.layout", "wide")
+SKEW_SALT = ("psp.unified.skew_salt", "0")
+SKEW_DIMS = ("psp.unified.skew_dims", "merchants")
+
+
+def broadcast_listed(frame, name):
+    """frame broadcast if the dimension is listed in psp.unified.broadcast_dims"""
+    if listed(BROADCAST_DIMS, name):
+        return F.broadcast(frame)
+    return frame
+
+def join_dimension(facts, frame, name, alias, fact_key, lookup):
+    """
+    facts inner-joined with one dimension (frame, aliased alias) on fact_key.
+
+    A stream-static lookup (lookup) is broadcast if listed in psp.unified.broadcast_dims. A
+    dimension listed in psp.unified.skew_dims is otherwise salted when psp.unified.skew_salt
+    is set: every dimension row is replicated into skew_salt buckets and each fact picks one
+    by a hash of its txn_id, so a hot key is spread over skew_salt tasks (and join state
+    partitions) instead of landing on one. Broadcast joins do not shuffle and are not salted.
+    """
+    key = fact_key.split(".")[-1]
+    broadcast = lookup and listed(BROADCAST_DIMS, name)
+    buckets = 0 if broadcast or not listed(SKEW_DIMS, name) else int(setting(SKEW_SALT))
+    if buckets > 1:
+        frame = frame.withColumn("skew_salt", F.explode(F.sequence(F.lit(0), F.lit(buckets - 1))))
+    frame = (F.broadcast(frame) if broadcast else frame).alias(alias)
+    condition = F.col(fact_key) == F.col(f"{alias}.{key}")
+    if buckets > 1:
+        condition = condition & (F.pmod(F.xxhash64("t.txn_id"), F.lit(buckets)) == F.col(f"{alias}.skew_salt"))
+    return facts.join(frame, condition, how="inner")
+
 @dlt.table(
-    name="silver_unified_transactions",
-    comment="Unified transaction domain table at transaction grain - combines all PSP entities",
+    name="silver_unified_transactions_base",
+    comment="Transactions joined with their order, merchant, customer and payment, before dispute enrichment",
     table_properties={
         "quality": "silver",
         "layer": "silver_l2",
         "grain": "transaction",
-        "pipelines.autoOptimize.zOrderCols": "txn_id,transaction_date,merchant_id,customer_id"
+        "pipelines.autoOptimize.zOrderCols": "txn_id"
     }
 )
 @dlt.expect_or_drop("valid_txn_id", "txn_id IS NOT NULL")
 @dlt.expect_or_drop("valid_order_id", "order_id IS NOT NULL")
 @dlt.expect_or_drop("valid_merchant_id", "merchant_id IS NOT NULL")
 @dlt.expect_or_drop("valid_customer_id", "customer_id IS NOT NULL")
-def silver_unified_transactions():
+def silver_unified_transactions_base():
     """
-    Unified transaction table combining all PSP entities with derived business metrics.
+    Append-only transaction join that silver_unified_transactions is built from.
 
     Join Strategy:
     - INNER JOIN: Required entities (orders, merchants, customers, payments)
-    - LEFT JOIN: Optional entities (disputes - not all transactions have disputes)
+    - Disputes are merged on afterwards by txn_id (see silver_unified_transactions)
+
+    Streaming Semantics (psp.unified.join_mode):
+    - stream (default): streaming-to-streaming joins for all required entities; join state
+      keeps every row of all five streams
+    - bounded: transactions and orders are watermarked on transaction_authorized_at /
+      order_created_at and joined only within psp.unified.auth_window of the order, so
+      their state is evicted; merchants, customers and payments are stream-static lookups.
+      Rows that never join are kept in silver_unified_transactions_late. In stream mode
+      that table only lists transactions still waiting for a missing parent
+
+    State events (silver_transaction_events):
+    - a transaction is joined once, on the first of its state events to arrive (deduplicated
+      by txn_id; in bounded mode within the transaction watermark, which all events of a
+      transaction share through transaction_authorized_at). Its later states are merged onto
+      the unified row by silver_unified_transactions
 
-    Streaming Semantics:
-    - Uses STREAM() for all Silver L1 tables to maintain end-to-end streaming
-    - Streaming-to-streaming joins for required entities
-    - Streaming-to-batch join for disputes (infrequent updates)
+    Skew (psp.unified.skew_salt, psp.unified.skew_dims):
+    - a few merchants carry most transactions, so the merchant join (stream-stream, or a
+      shuffled lookup when not broadcast) puts their rows on one task; with skew_salt = N the
+      listed dimensions are replicated N times and facts spread over the copies by txn_id
+
+    Layout (psp.unified.layout, columns in psp_unified.columns):
+    - wide (default): every merchant, customer and payment attribute is stored
+    - narrow: only the fact columns (transaction and order columns, entity keys, card_bin);
+      consumers get the other attributes from their unified_<consumer> projection
 
     Returns:
-        DataFrame: Unified transaction records at transaction grain
+        DataFrame: Joined transaction records at transaction grain, without dispute columns
     """
 
-    transactions = dlt.read_stream("silver_transactions").alias("t")
-    orders = dlt.read_stream("silver_orders").alias("o")
-    merchants = dlt.read_stream("silver_merchants").alias("m")
-    customers = dlt.read_stream("silver_customers").alias("c")
-    payments = dlt.read_stream("silver_payments").alias("p")
-    disputes = dlt.read("silver_disputes").alias("d")
+    bounded = setting(JOIN_MODE) == "bounded"
+    transactions = dlt.read_stream("silver_transaction_events")
+    orders = dlt.read_stream("silver_orders")
+    if bounded:
+        transactions = (
+            transactions.withWatermark("transaction_authorized_at", setting(TXN_WATERMARK))
+            .dropDuplicatesWithinWatermark(["txn_id"])
+        )
+        orders = orders.withWatermark("order_created_at", setting(ORDER_WATERMARK))
+        merchants = dlt.read("silver_merchants")
+        customers = dlt.read("silver_customers")
+        payments = dlt.read("silver_payments")
+    else:
+        transactions = transactions.dropDuplicates(["txn_id"])
+        merchants = dlt.read_stream("silver_merchants")
+        customers = dlt.read_stream("silver_customers")
+        payments = dlt.read_stream("silver_payments")
+    transactions = transactions.alias("t")
+    orders = orders.alias("o")
+
+    order_match = transactions.order_id == orders.order_id
+    if bounded:
+        order_match = order_match & F.col("t.transaction_authorized_at").between(
+            F.col("o.order_created_at"),
+            F.col("o.order_created_at") + F.expr(f"INTERVAL {setting(AUTH_WINDOW)}")
+        )
 
     txn_orders = transactions.join(
         orders,
-        transactions.order_id == orders.order_id,
+        order_match,
         how="inner"
     )
 
-    txn_orders_merchants = txn_orders.join(
-        merchants,
-        F.col("o.merchant_id") == merchants.merchant_id,
-        how="inner"
+    txn_orders_merchants = join_dimension(txn_orders, merchants, "merchants", "m", "o.merchant_id", bounded)
+    txn_orders_merchants_customers = join_dimension(
+        txn_orders_merchants, customers, "customers", "c", "o.customer_id", bounded
     )
+    txn_full = join_dimension(txn_orders_merchants_customers, payments, "payments", "p", "t.payment_id", bounded)
 
-    txn_orders_merchants_customers = txn_orders_merchants.join(
-        customers,
-        F.col("o.customer_id") == customers.customer_id,
-        how="inner"
+    columns = stored(setting(UNIFIED_LAYOUT))
+    return txn_full.select(*[
+        F.col(f"{column.source}.{column.expression}").alias(column.name)
+        for column in columns if not column.derived
+    ]).select("*", *[
+        F.expr(column.expression).alias(column.name) for column in columns if column.derived
+    ])
+
+
+# Orders the disputes of one transaction: the most recently opened wins, and a re-sent
+# dispute replaces its earlier version
+DISPUTE_SEQUENCE = ["dispute_opened_at", "ingestion_timestamp", "dispute_id"]
+
+dlt.create_streaming_table(
+    name="silver_disputes_latest",
+    comment="Latest dispute per transaction, upserted from silver_disputes",
+    table_properties={
+        "quality": "silver",
+        "layer": "silver_l2",
+        "grain": "transaction",
+        "pipelines.autoOptimize.zOrderCols": "txn_id"
+    }
+)
+
+dlt.apply_changes(
+    target="silver_disputes_latest",
+    source="silver_disputes",
+    keys=["txn_id"],
+    sequence_by=F.struct(*DISPUTE_SEQUENCE),
+    stored_as_scd_type=1
+)
+
+
+def by_txn(alias):
+    """Join condition of the unified rows u with the txn_id-keyed rows of alias"""
+    return F.col("u.txn_id") == F.col(f"{alias}.txn_id")
+
+def with_changes(rows):
+    """
+    Unified rows u with the state columns of s (where s matched), the dispute columns of d
+    and the sequence their upsert is ordered by
+    """
+    epoch = F.lit("1970-01-01 00:00:00").cast("timestamp")
+    state = {name: F.coalesce(F.col(f"s.{name}"), F.col(f"u.{name}")) for name in STATE_COLUMNS}
+    return rows.select(
+        *[
+            state[column.name].alias(column.name) if column.name in state else F.col(f"u.{column.name}")
+            for column in stored(setting(UNIFIED_LAYOUT))
+        ],
+        *[F.col(f"d.{source}").alias(name) for source, name in DISPUTE_COLUMNS],
+        F.col("d.dispute_id").isNotNull().alias("has_dispute"),
+        # a later state wins first, ordered like STATE_SEQUENCE of silver/transactions.py (a
+        # row without s has only the base row's second); rows without a dispute sort before
+        # every dispute of the transaction in the same state
+        F.struct(
+            F.coalesce(F.col("s.state_timestamp_ms"), F.unix_timestamp(F.col("u.state_timestamp")) * 1000)
+            .alias("state_timestamp_ms"),
+            F.coalesce(F.col("s.state_ordinal"), F.lit(-1)).alias("state_ordinal"),
+            F.coalesce(F.col("d.dispute_opened_at"), epoch).alias("dispute_opened_at"),
+            F.coalesce(F.col("d.ingestion_timestamp"), epoch).alias("ingestion_timestamp"),
+            F.coalesce(F.col("d.dispute_id"), F.lit("")).alias("dispute_id")
+        ).alias("change_sequence")
     )
 
-    txn_full = txn_orders_merchants_customers.join(
-        payments,
-        F.col("t.payment_id") == payments.payment_id,
-        how="inner"
+@dlt.view(
+    name="unified_transaction_changes",
+    comment="Upserts into silver_unified_transactions: new transactions, state events and dispute events"
+)
+def unified_transaction_changes():
+    """
+    Change rows for the silver_unified_transactions upsert, keyed by txn_id.
+
+    - new base rows, with the transaction's current state and latest dispute so far
+      (stream-static lookups of the compact silver_transactions and silver_disputes_latest,
+      at most one row per transaction each)
+    - new silver_transaction_events rows, with the base row of their transaction (a
+      stream-static lookup of silver_unified_transactions_base, z-ordered by txn_id) and its
+      latest dispute; the event's state replaces the state columns
+    - new silver_disputes rows, with the base row and current state of their transaction
+
+    Events and disputes whose transaction has not been joined yet are picked up by the
+    first path instead. A state event and a dispute of the same transaction processed in
+    the same update may each miss the other until the transaction's next change.
+
+    Returns:
+        DataFrame: Base rows with current state, dispute columns and change_sequence
+    """
+
+    base = dlt.read("silver_unified_transactions_base").alias("u")
+    states = dlt.read("silver_transactions").alias("s")
+    disputes = broadcast_listed(dlt.read("silver_disputes_latest"), "disputes_latest").alias("d")
+
+    new_transactions = with_changes(
+        dlt.read_stream("silver_unified_transactions_base").alias("u")
+        .join(states, by_txn("s"), "left")
+        .join(disputes, by_txn("d"), "left")
+    )
+    new_states = with_changes(
+        dlt.read_stream("silver_transaction_events").alias("s")
+        .join(base, by_txn("s"))
+        .join(disputes, by_txn("d"), "left")
+    )
+    new_disputes = with_changes(
+        dlt.read_stream("silver_disputes").alias("d")
+        .join(base, by_txn("d"))
+        .join(states, by_txn("s"), "left")
+    )
+    return new_transactions.unionByName(new_states).unionByName(new_disputes)
+
+dlt.create_streaming_table(
+    name="silver_unified_transactions",
+    comment="Unified transaction domain table at transaction grain - combines all PSP entities",
+    table_properties={
+        "quality": "silver",
+        "layer": "silver_l2",
+        "grain": "transaction",
+        "pipelines.autoOptimize.zOrderCols": "txn_id,transaction_date,merchant_id,customer_id",
+        "delta.enableChangeDataFeed": "true"
+    }
+)
+
+# One row per transaction: a later state, a later dispute, or a later update of the same
+# dispute is merged onto the row already emitted instead of adding another row
+dlt.apply_changes(
+    target="silver_unified_transactions",
+    source="unified_transaction_changes",
+    keys=["txn_id"],
+    sequence_by="change_sequence",
+    except_column_list=["change_sequence"],
+    stored_as_scd_type=1
+)
+
+
+def project(unified, dimensions, names):
+    """
+    The names columns of silver_unified_transactions for one consumer.
+
+    In the wide layout this is a plain projection. In the narrow layout the merchant,
+    customer and payment attributes are looked up by key in their current silver rows
+    (dimensions, by alias) and the columns derived from them are computed; only the
+    dimensions the consumer reads are joined.
+    """
+    if setting(UNIFIED_LAYOUT) != "narrow":
+        return unified.select(*names)
+    late = late_columns(names)
+    frame = unified.alias("u")
+    for alias in sorted({column.source for column in late if not column.derived}):
+        table, key = DIMENSIONS[alias]
+        lookup = broadcast_listed(dimensions[alias], table[len("silver_"):]).alias(alias)
+        frame = frame.join(lookup, F.col(f"u.{key}") == F.col(f"{alias}.{key}"), "left")
+    frame = frame.select("u.*", *[
+        F.col(f"{column.source}.{column.expression}").alias(column.name)
+        for column in late if not column.derived
+    ])
+    frame = frame.select("*", *[F.expr(column.expression).alias(column.name) for column in late if column.derived])
+    return frame.select(*names)
+
+def unified_view(consumer):
+    @dlt.view(
+        name=f"unified_{consumer}",
+        comment=f"silver_unified_transactions columns read by {consumer}, in either psp.unified.layout"
     )
+    def projection():
+        dimensions = {
+            "m": dlt.read("silver_merchants"),
+            "c": dlt.read("silver_customers"),
+            "p": dlt.read("silver_payments"),
+        }
+        return project(dlt.read("silver_unified_transactions"), dimensions, CONSUMERS[consumer])
+    return projection
+
+for consumer in CONSUMERS:
+    unified_view(consumer)
+
+
+@dlt.table(
+    name="silver_unified_transactions_late",
+    comment="Transactions the unified join dropped (bounded mode) or is waiting on a missing parent for, with the reason",
+    table_properties={
+        "quality": "silver",
+        "layer": "silver_l2",
+        "grain": "transaction"
+    }
+)
+def silver_unified_transactions_late():
+    """
+    Side table for transactions the unified join (silver_unified_transactions_base) has not
+    emitted one join horizon after they were authorized.
 
+    In bounded mode the join drops them, and this table keeps them instead of losing them
+    silently. In stream mode the join drops nothing: it keeps every row in state and emits a
+    transaction whenever its last parent arrives. Only transactions with a missing parent
+    are listed then (the *_missing reasons), as waiting rather than lost; they still reach
+    silver_unified_transactions once the parent arrives.
 
-    txn_complete = txn_full.join(
-        disputes,
-        F.col("t.txn_id") == disputes.txn_id,
-        how="left"
+    Incremental: the transactions stream (silver_transaction_events, one row per txn_id) is
+    left-outer-joined with the stream of base rows on txn_id, both watermarked on
+    transaction_authorized_at with the join horizon (the transaction watermark plus the auth
+    window). A transaction is emitted only once the watermark passes it without a base row,
+    so rows still waiting in join state are not reported and the join state holds one
+    horizon of transactions, not the history. A base row that arrives behind that watermark
+    is dropped from this join, and its transaction stays reported. The reason is looked up
+    in the current silver tables when the row is emitted:
+    - order_missing / merchant_missing / customer_missing / payment_missing: no parent row
+    - outside_auth_window: authorized outside psp.unified.auth_window of the order (bounded mode)
+    - late: every parent exists now, but the row arrived behind the watermark or before a
+      dimension row it looks up (bounded mode)
+
+    A batch read (the local bench runners) sees every row at once and applies the same
+    horizon as a filter against the latest transaction_authorized_at.
+
+    Returns:
+        DataFrame: One row per unjoined transaction
+    """
+
+    bounded = setting(JOIN_MODE) == "bounded"
+    horizon = f"{setting(TXN_WATERMARK)} {setting(AUTH_WINDOW)}"
+    events = dlt.read_stream("silver_transaction_events")
+    base = dlt.read_stream("silver_unified_transactions_base")
+    transactions = (
+        events.withWatermark("transaction_authorized_at", horizon)
+        .dropDuplicatesWithinWatermark(["txn_id"])
+        .select("txn_id", "order_id", "payment_id", "transaction_authorized_at")
     )
+    joined = base.withWatermark("transaction_authorized_at", horizon).select(
+        F.col("txn_id").alias("joined_txn_id"),
+        F.col("transaction_authorized_at").alias("joined_authorized_at")
+    )
+    # the base row carries its transaction's transaction_authorized_at, so the time range is one instant
+    unjoined = (
+        transactions
+        .join(joined, (F.col("txn_id") == F.col("joined_txn_id")) & F.col("joined_authorized_at").between(
+            F.col("transaction_authorized_at"), F.col("transaction_authorized_at")
+        ), "left_outer")
+        .where(F.col("joined_txn_id").isNull())
+        .drop("joined_txn_id", "joined_authorized_at")
+    )
+    if not events.isStreaming:
+        delay = F.expr(f"INTERVAL {setting(TXN_WATERMARK)}") + F.expr(f"INTERVAL {setting(AUTH_WINDOW)}")
+        latest = transactions.agg(F.max("transaction_authorized_at").alias("horizon"))
+        unjoined = (
+            unjoined.crossJoin(latest)
+            .where(F.col("transaction_authorized_at") < F.col("horizon") - delay)
+            .drop("horizon")
+        )
 
-    return txn_complete.select(
-        F.col("t.txn_id"),
-        F.col("t.transaction_state"),
-        F.col("t.transaction_state_category"),
-        F.col("t.state_timestamp"),
-        F.col("t.transaction_amount"),
-        F.col("t.amount_cents"),
-        F.col("t.transaction_currency"),
-        F.col("t.response_code"),
-        F.col("t.response_code_description"),
-        F.col("t.three_ds_status"),
-        F.col("t.is_3ds_authenticated"),
-        F.col("t.fees_total_amount"),
-        F.col("t.fees_total_cents"),
-        F.col("t.network_fee_amount"),
-        F.col("t.network_fee_cents"),
-        F.col("t.effective_fee_rate_pct"),
-        F.col("t.net_amount"),
-        F.col("t.net_amount_cents"),
-        F.col("t.processor_name"),
-        F.col("t.is_successful_transaction"),
-        F.col("t.is_failed_transaction"),
-        F.col("t.is_disputed_transaction"),
-        F.col("t.is_declined"),
-        F.col("t.transaction_authorized_at"),
-        F.col("t.transaction_date"),
-        F.col("t.transaction_hour"),
-        F.col("t.transaction_day_of_week"),
-        F.col("o.order_id"),
-        F.col("o.order_currency"),
-        F.col("o.subtotal_amount"),
-        F.col("o.subtotal_cents"),
-        F.col("o.tax_amount"),
-        F.col("o.tax_cents"),
-        F.col("o.tip_amount"),
-        F.col("o.tip_cents"),
-        F.col("o.total_amount").alias("order_total_amount"),
-        F.col("o.total_amount_cents").alias("order_total_amount_cents"),
-        F.col("o.tax_rate"),
-        F.col("o.tip_rate"),
-        F.col("o.order_channel"),
-        F.col("o.is_ecommerce_order"),
-        F.col("o.has_tip"),
-        F.col("o.is_high_value_order"),
-        F.col("o.order_size_category"),
-        F.col("o.order_created_at"),
-        F.col("o.order_date"),
-        F.col("o.order_hour"),
-        F.col("o.order_day_of_week"),
-        F.col("m.merchant_id"),
-        F.col("m.legal_name").alias("merchant_legal_name"),
-        F.col("m.merchant_category_code"),
-        F.col("m.country_code").alias("merchant_country"),
-        F.col("m.kyb_status").alias("merchant_kyb_status"),
-        F.col("m.pricing_tier").alias("merchant_pricing_tier"),
-        F.col("m.risk_level").alias("merchant_risk_level"),
-        F.col("m.is_kyb_approved").alias("is_merchant_kyb_approved"),
-        F.col("m.is_high_risk").alias("is_merchant_high_risk"),
-        F.col("m.is_enterprise").alias("is_merchant_enterprise"),
-        F.col("m.merchant_created_at"),
-        F.col("c.customer_id"),
-        F.col("c.email_hash").alias("customer_email_hash"),
-        F.col("c.phone_hash").alias("customer_phone_hash"),
-        F.col("c.customer_type"),
-        F.col("c.is_vip_customer"),
-        F.col("c.is_flagged_customer"),
-        F.col("c.customer_tenure_days"),
-        F.col("c.customer_created_at"),
-        F.col("p.payment_id"),
-        F.col("p.card_brand"),
-        F.col("p.card_bin"),
-        F.col("p.card_last4_masked"),
-        F.col("p.card_expiry_month"),
-        F.col("p.card_expiry_year"),
-        F.col("p.wallet_type"),
-        F.col("p.payment_status"),
-        F.col("p.is_active_payment"),
-        F.col("p.is_wallet_payment"),
-        F.col("p.is_expired").alias("is_payment_expired"),
-        F.col("p.card_network_tier"),
-        F.col("p.payment_first_seen_at"),
-        F.col("d.dispute_id"),
-        F.col("d.dispute_reason_code"),
-        F.col("d.dispute_stage"),
-        F.col("d.dispute_category"),
-        F.col("d.liability_party"),
-        F.col("d.dispute_status"),
-        F.col("d.dispute_amount"),
-        F.col("d.dispute_amount_cents"),
-        F.col("d.dispute_opened_at"),
-        F.col("d.dispute_closed_at"),
-        F.col("d.dispute_age_days"),
-        F.col("d.is_dispute_closed"),
-        F.col("d.is_dispute_won"),
-        F.col("d.is_dispute_lost"),
-        F.col("d.is_merchant_liable"),
-        F.col("d.is_fraud_dispute"),
-        F.col("d.is_escalated").alias("is_dispute_escalated"),
-        F.col("d.stage_severity_level").alias("dispute_severity_level"),
-
-        F.when(F.col("d.dispute_id").isNotNull(), True)
-         .otherwise(False)
-         .alias("has_dispute"),
-
-        F.datediff(
-            F.col("t.transaction_date"),
-            F.col("c.customer_created_at")
-        ).alias("days_since_customer_created"),
-
-        F.datediff(
-            F.col("t.transaction_date"),
-            F.col("m.merchant_created_at")
-        ).alias("days_since_merchant_created"),
-
-        F.datediff(
-            F.col("t.transaction_date"),
-            F.col("p.payment_first_seen_at")
-        ).alias("days_since_payment_first_seen"),
-
-        (
-            F.unix_timestamp(F.col("t.transaction_authorized_at")) -
-            F.unix_timestamp(F.col("o.order_created_at"))
-        ).alias("order_to_auth_seconds"),
-
-        F.col("t.net_amount").alias("merchant_net_revenue"),
-        F.col("t.fees_total_amount").alias("psp_revenue"),
-        (
-            F.col("o.total_amount") - F.col("t.net_amount")
-        ).alias("total_psp_fees"),
-
-        F.current_timestamp().alias("unified_created_at")
+    orders = dlt.read("silver_orders").select("order_id", "merchant_id", "customer_id", "order_created_at")
+    merchants = dlt.read("silver_merchants").select(F.col("merchant_id").alias("known_merchant_id"))
+    customers = dlt.read("silver_customers").select(F.col("customer_id").alias("known_customer_id"))
+    payments = dlt.read("silver_payments").select(F.col("payment_id").alias("known_payment_id"))
+    missing = (
+        unjoined
+        .join(orders, "order_id", "left")
+        .join(merchants, F.col("merchant_id") == F.col("known_merchant_id"), "left")
+        .join(customers, F.col("customer_id") == F.col("known_customer_id"), "left")
+        .join(payments, F.col("payment_id") == F.col("known_payment_id"), "left")
+    )
+
+    in_window = F.col("transaction_authorized_at").between(
+        F.col("order_created_at"),
+        F.col("order_created_at") + F.expr(f"INTERVAL {setting(AUTH_WINDOW)}")
+    )
+    rows = missing.select(
+        "txn_id",
+        "order_id",
+        "payment_id",
+        "merchant_id",
+        "customer_id",
+        "transaction_authorized_at",
+        "order_created_at",
+        F.when(F.col("order_created_at").isNull(), "order_missing")
+         .when(F.col("known_merchant_id").isNull(), "merchant_missing")
+         .when(F.col("known_customer_id").isNull(), "customer_missing")
+         .when(F.col("known_payment_id").isNull(), "payment_missing")
+         .when(F.lit(bounded) & ~in_window, "outside_auth_window")
+         .otherwise("late")
+         .alias("late_reason"),
+        F.current_timestamp().alias("late_detected_at")
     )
+    return rows if bounded else rows.where(F.col("late_reason") != "late")
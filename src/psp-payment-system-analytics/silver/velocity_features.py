@@ -0,0 +1,77 @@
+import os
+import sys
+
+import dlt
+from pyspark.sql import functions as F
+
+sys.path.append(os.path.abspath(os.path.join(os.getcwd(), "..", "..")))
+
+from psp_pipeline import setting
+from psp_risk import velocity
+
+# Pipeline settings (configuration keys) and their defaults
+VELOCITY_WATERMARK = ("psp.velocity.watermark", "10 minutes")
+
+OUTPUT_SCHEMA = ", ".join(
+    ["txn_id STRING", "entity STRING", "entity_value STRING", "event_time_ms BIGINT"]
+    + [f"{feature} BIGINT" for feature in velocity.FEATURES]
+)
+
+
+@dlt.table(
+    name="silver_velocity_features",
+    comment="Sliding-window transaction velocity (1m/1h/24h) per payment, customer, card BIN and merchant",
+    table_properties={
+        "quality": "silver",
+        "layer": "silver_l2",
+        "grain": "transaction_entity",
+        "pipelines.autoOptimize.zOrderCols": "txn_id"
+    }
+)
+def silver_velocity_features():
+    """
+    Velocity features of every joined transaction, one row per (txn_id, entity).
+
+    Each transaction is fanned out to its payment_id, customer_id, card_bin and
+    merchant_id keys; a stateful stage per key (psp_risk.velocity) emits the count and
+    amount of the key's transactions in the trailing 1m/1h/24h windows, including the
+    transaction itself, and the number of distinct payments seen in 24h. Features are
+    computed once, when the transaction arrives.
+
+    Streaming Semantics:
+    - Watermark of psp.velocity.watermark on transaction_authorized_at; later rows are dropped
+    - Per-key state holds the last hour of events plus minute buckets and distinct payment
+      ids for 24h, evicted behind the watermark; idle keys expire 24h after their last event
+
+    Returns:
+        DataFrame: One row per transaction and key with its window counters
+    """
+
+    unified = (
+        dlt.read_stream("silver_unified_transactions_base")
+        .withWatermark("transaction_authorized_at", setting(VELOCITY_WATERMARK))
+    )
+    keyed = unified.select(
+        "txn_id",
+        "transaction_authorized_at",
+        F.unix_millis("transaction_authorized_at").alias("event_time_ms"),
+        F.col("amount_cents").cast("bigint").alias("amount_cents"),
+        "payment_id",
+        F.explode(F.array(*[
+            F.struct(F.lit(entity).alias("entity"), F.col(entity).cast("string").alias("entity_value"))
+            for entity in velocity.ENTITIES
+        ])).alias("key")
+    ).select("*", "key.entity", "key.entity_value").drop("key").where(F.col("entity_value").isNotNull())
+
+    return (
+        keyed.groupBy("entity", "entity_value")
+        .applyInPandasWithState(
+            velocity.update_group,
+            outputStructType=OUTPUT_SCHEMA,
+            stateStructType=velocity.STATE_SCHEMA,
+            outputMode="append",
+            timeoutConf="EventTimeTimeout",
+        )
+        .withColumn("transaction_authorized_at", F.timestamp_millis("event_time_ms"))
+        .withColumn("silver_processed_at", F.current_timestamp())
+    )
@@ -0,0 +1,12 @@
+"""
+Helpers shared by the pipeline's Python sources (src/psp-payment-system-analytics).
+
+The pipeline runs each source file with the file's folder as the working directory, so a
+source puts src on sys.path from there before importing the psp_* packages:
+
+    sys.path.append(os.path.abspath(os.path.join(os.getcwd(), "..", "..")))
+"""
+
+from .settings import listed, setting
+
+__all__ = ["listed", "setting"]
@@ -0,0 +1,20 @@
+"""
+Pipeline settings: Spark conf keys of the pipeline configuration with their defaults.
+
+A setting is declared in the source that reads it as a (key, default) tuple, e.g.
+JOIN_MODE = ("psp.unified.join_mode", "stream"); bench/local.py finds the declarations there.
+"""
+
+from typing import Tuple
+
+from pyspark.sql import SparkSession
+
+
+def setting(key_default: Tuple[str, str]) -> str:
+    """The configured value of a setting, or its default"""
+    key, default = key_default
+    return SparkSession.getActiveSession().conf.get(key, default)
+
+def listed(key_default: Tuple[str, str], name: str) -> bool:
+    """Whether name is in a comma-separated setting"""
+    return name in [item.strip() for item in setting(key_default).split(",")]
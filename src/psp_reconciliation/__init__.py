@@ -0,0 +1,11 @@
+"""Payout reconciliation, shared by gold_payout_reconciliation and the incremental job."""
+
+from .payouts import (
+    OUTPUT_COLUMNS, REVERSED, SETTLED, SETTLEMENT_STATES, SNAPSHOT_SETTLED, STATUSES, affected_days, input_days,
+    payout_batches, reconcile, settled_daily, status_sql,
+)
+
+__all__ = [
+    "OUTPUT_COLUMNS", "REVERSED", "SETTLED", "SETTLEMENT_STATES", "SNAPSHOT_SETTLED", "STATUSES", "affected_days",
+    "input_days", "payout_batches", "reconcile", "settled_daily", "status_sql",
+]
@@ -0,0 +1,202 @@
+"""
+Payout-to-transaction reconciliation, shared by gold_payout_reconciliation and the incremental job.
+
+A payout batch is the payouts of one merchant in one currency with the same batch day. It
+settles the merchant's transactions settled since its previous batch, at most window_days
+back: the batch of day B covers the settlement days max(previous batch day + 1,
+B - window_days + 1) .. B. Windows of consecutive batches do not overlap, so each
+settlement day belongs to at most one batch.
+
+Settlement is read from the state events (silver_transaction_events), not the current
+state: a transaction settles on the day of its settled event, and a chargeback reverses it
+on the day of its chargeback event, so a later dispute neither moves the settlement nor
+hides it. Refunds are issued before settlement (captured -> refund_pending -> refunded ->
+closed), so a refunded transaction never counts. Snapshot landing files carry only the
+final state; there a completed transaction without a settled event settles on its
+completed day, and a closed one (refunded, or charged back after settling) nets to zero.
+
+Both sides are bucketed by (merchant_id, currency, day) before they meet. Transactions are
+summed into daily settled totals, and each batch is expanded into the days it covers (at
+most window_days rows), so the join is an equi-join on the bucket key. There is no range
+join between payouts and raw transactions, and a merchant's work stays within its buckets.
+
+One row per reconciliation item (reconciliation_type):
+
+- payout: a batch, dated its batch day, compared with the settled totals of its window
+- unpaid: a settlement day with settled transactions that no batch covered, dated
+  settlement day + window_days, the first batch day whose window no longer reaches it
+
+A reconciliation day D therefore depends only on the payouts and settlement days in
+D - window_days .. D (input_days), and a change on day d affects the reconciliation days
+d .. d + window_days (affected_days). That is what lets the job recompute single days.
+"""
+
+from datetime import date, timedelta
+from typing import List
+
+SETTLED = "settled"
+# a snapshot line carries only the final state, and completed is only reached after settled
+SNAPSHOT_SETTLED = "completed"
+REVERSED = "chargeback"
+# State events that add to or deduct from the daily settled totals
+SETTLEMENT_STATES = [SETTLED, SNAPSHOT_SETTLED, REVERSED]
+# reconciliation_status values, in the order they are checked for a payout row
+STATUSES = ["no_transactions", "overpaid", "underpaid", "count_mismatch", "matched", "unpaid"]
+OUTPUT_COLUMNS = [
+    "reconciliation_date", "reconciliation_type", "merchant_id", "currency",
+    "payout_ids", "payout_count", "failed_payout_count", "payout_batch_date",
+    "coverage_start_date", "coverage_end_date",
+    "payout_gross_cents", "payout_fees_cents", "payout_transaction_count",
+    "settled_gross_cents", "settled_fees_cents", "settled_transaction_count", "settled_days",
+    "gross_difference_cents", "transaction_count_difference", "reconciliation_status",
+]
+
+
+def input_days(day: date, window_days: int) -> List[date]:
+    """Payout batch and settlement days that reconciliation day `day` is computed from"""
+    return [day - timedelta(days=offset) for offset in range(window_days, -1, -1)]
+
+def affected_days(day: date, window_days: int) -> List[date]:
+    """Reconciliation days whose rows change when a payout or settled transaction of `day` changes"""
+    return [day + timedelta(days=offset) for offset in range(window_days + 1)]
+
+def status_sql(tolerance_cents: int) -> str:
+    """reconciliation_status of a payout row, over its *_difference and settled columns"""
+    return f"""CASE
+        WHEN settled_transaction_count = 0 THEN 'no_transactions'
+        WHEN gross_difference_cents > {tolerance_cents} THEN 'overpaid'
+        WHEN gross_difference_cents < -{tolerance_cents} THEN 'underpaid'
+        WHEN transaction_count_difference != 0 THEN 'count_mismatch'
+        ELSE 'matched'
+    END"""
+
+def settled_daily(events, orders, settled_ids=None):
+    """
+    Net settled totals per (merchant_id, currency, settlement_date) bucket, chargebacks deducted.
+
+    settled_ids (txn_id) are the transactions with a settled event anywhere; by default those
+    of events. A caller passing only some days of events passes them from the whole table, so
+    a completed event is not counted for a transaction settled before those days.
+    """
+    from pyspark.sql import functions as F
+
+    state = F.col("transaction_state")
+    relevant = events.where(state.isin(SETTLEMENT_STATES)).dropDuplicates(["txn_id", "transaction_state"])
+    with_settled = relevant.where(state == SETTLED).select("txn_id") if settled_ids is None else settled_ids
+    entries = relevant.where(state != SNAPSHOT_SETTLED).unionByName(
+        relevant.where(state == SNAPSHOT_SETTLED).join(with_settled, "txn_id", "left_anti")
+    )
+    sign = F.when(state == REVERSED, -1).otherwise(1)
+    settled = (
+        entries.select(
+            "order_id",
+            F.col("transaction_currency").alias("currency"),
+            F.to_date("state_timestamp").alias("settlement_date"),
+            sign.alias("sign"),
+            (F.col("amount_cents") * sign).alias("amount_cents"),
+            (F.col("fees_total_cents") * sign).alias("fees_total_cents"),
+        )
+    )
+    return (
+        settled.join(orders.select("order_id", "merchant_id"), "order_id")
+        .groupBy("merchant_id", "currency", "settlement_date")
+        .agg(
+            F.sum("sign").alias("settled_transaction_count"),
+            F.sum("amount_cents").alias("settled_gross_cents"),
+            F.sum("fees_total_cents").alias("settled_fees_cents"),
+        )
+    )
+
+def payout_batches(payouts, window_days: int):
+    """One row per batch with its coverage window"""
+    from pyspark.sql import Window
+    from pyspark.sql import functions as F
+
+    batches = payouts.groupBy(
+        "merchant_id", F.col("payout_currency").alias("currency"), "payout_batch_date"
+    ).agg(
+        F.array_sort(F.collect_list("payout_id")).alias("payout_ids"),
+        F.count("*").alias("payout_count"),
+        F.sum(F.col("is_payout_failed").cast("int")).alias("failed_payout_count"),
+        F.sum("gross_cents").alias("payout_gross_cents"),
+        F.sum("fees_cents").alias("payout_fees_cents"),
+        F.sum("payout_transaction_count").alias("payout_transaction_count"),
+    )
+    previous = F.lag("payout_batch_date").over(
+        Window.partitionBy("merchant_id", "currency").orderBy("payout_batch_date")
+    )
+    earliest = F.date_sub("payout_batch_date", window_days - 1)
+    return batches.withColumn(
+        "coverage_start_date",
+        F.when(previous.isNull(), earliest).otherwise(F.greatest(F.date_add(previous, 1), earliest))
+    ).withColumn("coverage_end_date", F.col("payout_batch_date"))
+
+def reconcile(payouts, events, orders, window_days: int, tolerance_cents: int, settled_ids=None):
+    """
+    Reconciliation rows of silver_payouts against the settlements in silver_transaction_events.
+
+    Args:
+        payouts: silver_payouts rows
+        events: silver_transaction_events rows (one per state event)
+        orders: silver_orders rows, for the merchant of each transaction
+        window_days: the most settlement days one batch covers, including its batch day
+        tolerance_cents: gross differences within +/- this amount count as matched
+        settled_ids: txn_ids with a settled event, when events holds only some days (settled_daily)
+
+    Returns:
+        DataFrame: OUTPUT_COLUMNS, one row per payout batch and per unpaid settlement day
+    """
+    from pyspark.sql import functions as F
+
+    daily = settled_daily(events, orders, settled_ids)
+    batches = payout_batches(payouts, window_days)
+    bucket = ["merchant_id", "currency", "settlement_date"]
+    # each batch expanded into the settlement days of its window: at most window_days rows
+    covered = batches.select(
+        "merchant_id", "currency", "payout_batch_date",
+        F.explode(F.sequence("coverage_start_date", "coverage_end_date")).alias("settlement_date"),
+    )
+    settled = covered.join(daily, bucket).groupBy("merchant_id", "currency", "payout_batch_date").agg(
+        F.sum("settled_transaction_count").alias("settled_transaction_count"),
+        F.sum("settled_gross_cents").alias("settled_gross_cents"),
+        F.sum("settled_fees_cents").alias("settled_fees_cents"),
+        F.count("*").alias("settled_days"),
+    )
+
+    paid = (
+        batches.join(settled, ["merchant_id", "currency", "payout_batch_date"], "left")
+        .fillna(0, ["settled_transaction_count", "settled_gross_cents", "settled_fees_cents", "settled_days"])
+        .withColumn("reconciliation_date", F.col("payout_batch_date"))
+        .withColumn("reconciliation_type", F.lit("payout"))
+        .withColumn("gross_difference_cents", F.col("payout_gross_cents") - F.col("settled_gross_cents"))
+        .withColumn("transaction_count_difference",
+                    F.col("payout_transaction_count") - F.col("settled_transaction_count"))
+        .withColumn("reconciliation_status", F.expr(status_sql(tolerance_cents)))
+    )
+
+    unpaid = (
+        daily.join(covered.select(*bucket), bucket, "left_anti")
+        .select(
+            F.date_add("settlement_date", window_days).alias("reconciliation_date"),
+            F.lit("unpaid").alias("reconciliation_type"),
+            "merchant_id",
+            "currency",
+            F.lit(None).cast("array<string>").alias("payout_ids"),
+            F.lit(0).cast("bigint").alias("payout_count"),
+            F.lit(0).cast("bigint").alias("failed_payout_count"),
+            F.lit(None).cast("date").alias("payout_batch_date"),
+            F.col("settlement_date").alias("coverage_start_date"),
+            F.col("settlement_date").alias("coverage_end_date"),
+            F.lit(0).cast("bigint").alias("payout_gross_cents"),
+            F.lit(0).cast("bigint").alias("payout_fees_cents"),
+            F.lit(0).cast("bigint").alias("payout_transaction_count"),
+            "settled_gross_cents",
+            "settled_fees_cents",
+            "settled_transaction_count",
+            F.lit(1).cast("bigint").alias("settled_days"),
+            (-F.col("settled_gross_cents")).alias("gross_difference_cents"),
+            (-F.col("settled_transaction_count")).alias("transaction_count_difference"),
+            F.lit("unpaid").alias("reconciliation_status"),
+        )
+    )
+    return paid.select(*OUTPUT_COLUMNS).unionByName(unpaid)
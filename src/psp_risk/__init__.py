@@ -0,0 +1,9 @@
+"""Risk rules shared by gold_risk_fraud_monitoring and the online scorer."""
+
+from .rules import INPUT_COLUMNS, OUTPUT_COLUMNS, score, score_frame, sql_columns, sql_derived_columns
+from .scorer import LookupCache, RiskScorer, follow_change_feed, spark_scorer
+
+__all__ = [
+    "INPUT_COLUMNS", "OUTPUT_COLUMNS", "score", "score_frame", "sql_columns", "sql_derived_columns",
+    "LookupCache", "RiskScorer", "follow_change_feed", "spark_scorer",
+]
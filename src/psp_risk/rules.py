@@ -0,0 +1,351 @@
+"""
+Risk rules of gold_risk_fraud_monitoring, defined once and evaluated three ways:
+
+- sql_columns(): Spark SQL expressions, used by the gold table (and runnable by any SQL engine)
+- score_frame(): vectorized over a pandas DataFrame (local batches, Spark mapInPandas)
+- score(): one transaction as a dict of silver_unified_transactions columns (online scorer)
+
+Conditions follow SQL three-valued logic: a comparison with NULL is unknown, NOT of unknown
+is unknown, and a CASE branch or flag fires only when its condition is true.
+"""
+
+import operator
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+Row = Mapping[str, Any]
+
+SQL_OPERATORS = {"=": operator.eq, "<": operator.lt, ">": operator.gt}
+
+
+def sql_literal(value: Any) -> str:
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+class Column(NamedTuple):
+    """A boolean column"""
+    name: str
+
+    def sql(self) -> str:
+        return self.name
+
+    def compile(self) -> Callable[[Row], Optional[bool]]:
+        name = self.name
+        return lambda row: row.get(name)
+
+    def frame(self, df: Any) -> Any:
+        return df[self.name].astype("boolean")
+
+
+class Compare(NamedTuple):
+    """column <op> literal, unknown when the column is NULL"""
+    name: str
+    op: str
+    value: Any
+
+    def sql(self) -> str:
+        return f"{self.name} {self.op} {sql_literal(self.value)}"
+
+    def compile(self) -> Callable[[Row], Optional[bool]]:
+        name, compare, value = self.name, SQL_OPERATORS[self.op], self.value
+        def evaluate(row: Row) -> Optional[bool]:
+            current = row.get(name)
+            return None if current is None else compare(current, value)
+        return evaluate
+
+    def frame(self, df: Any) -> Any:
+        column = df[self.name]
+        result = SQL_OPERATORS[self.op](column, self.value).astype("boolean")
+        return result.mask(column.isna())
+
+
+class Not(NamedTuple):
+    term: Any
+
+    def sql(self) -> str:
+        return f"NOT {wrap(self.term)}"
+
+    def compile(self) -> Callable[[Row], Optional[bool]]:
+        term = self.term.compile()
+        def evaluate(row: Row) -> Optional[bool]:
+            value = term(row)
+            return None if value is None else not value
+        return evaluate
+
+    def frame(self, df: Any) -> Any:
+        return ~self.term.frame(df)
+
+
+class And(NamedTuple):
+    terms: Tuple[Any, ...]
+
+    def sql(self) -> str:
+        return " AND ".join(wrap(term) for term in self.terms)
+
+    def compile(self) -> Callable[[Row], Optional[bool]]:
+        terms = [term.compile() for term in self.terms]
+        def evaluate(row: Row) -> Optional[bool]:
+            result: Optional[bool] = True
+            for term in terms:
+                value = term(row)
+                if value is None:
+                    result = None
+                elif not value:
+                    return False
+            return result
+        return evaluate
+
+    def frame(self, df: Any) -> Any:
+        result = self.terms[0].frame(df)
+        for term in self.terms[1:]:
+            result = result & term.frame(df)
+        return result
+
+
+class Or(NamedTuple):
+    terms: Tuple[Any, ...]
+
+    def sql(self) -> str:
+        return " OR ".join(wrap(term) for term in self.terms)
+
+    def compile(self) -> Callable[[Row], Optional[bool]]:
+        terms = [term.compile() for term in self.terms]
+        def evaluate(row: Row) -> Optional[bool]:
+            result: Optional[bool] = False
+            for term in terms:
+                value = term(row)
+                if value is None:
+                    result = None
+                elif value:
+                    return True
+            return result
+        return evaluate
+
+    def frame(self, df: Any) -> Any:
+        result = self.terms[0].frame(df)
+        for term in self.terms[1:]:
+            result = result | term.frame(df)
+        return result
+
+
+def wrap(term: Any) -> str:
+    return f"({term.sql()})" if isinstance(term, (And, Or)) else term.sql()
+
+def col(name: str) -> Column:
+    return Column(name)
+
+def eq(name: str, value: Any) -> Compare:
+    return Compare(name, "=", value)
+
+def lt(name: str, value: Any) -> Compare:
+    return Compare(name, "<", value)
+
+def gt(name: str, value: Any) -> Compare:
+    return Compare(name, ">", value)
+
+def both(*terms: Any) -> And:
+    return And(terms)
+
+def either(*terms: Any) -> Or:
+    return Or(terms)
+
+
+class Tiers(NamedTuple):
+    """CASE WHEN c1 THEN p1 WHEN c2 THEN p2 ... ELSE 0 END"""
+    cases: Tuple[Tuple[Any, int], ...]
+
+    def sql(self) -> str:
+        branches = " ".join(f"WHEN {condition.sql()} THEN {points}" for condition, points in self.cases)
+        return f"CASE {branches} ELSE 0 END"
+
+
+class Score(NamedTuple):
+    """A risk score: the sum of its tiers"""
+    name: str
+    parts: Tuple[Tiers, ...]
+
+
+class Flag(NamedTuple):
+    """A fraud indicator: true when its condition is true, otherwise false (never NULL)"""
+    name: str
+    condition: Any
+
+
+SCORES: List[Score] = [
+    Score("merchant_risk_score", (
+        Tiers(((eq("merchant_risk_level", "critical"), 30),
+               (eq("merchant_risk_level", "high"), 20),
+               (eq("merchant_risk_level", "medium"), 10))),
+        Tiers(((Not(col("is_merchant_kyb_approved")), 10),)),
+    )),
+    Score("customer_risk_score", (
+        Tiers(((col("is_flagged_customer"), 30),
+               (lt("customer_tenure_days", 7), 20),
+               (lt("customer_tenure_days", 30), 10))),
+        Tiers(((col("is_vip_customer"), -10),)),
+    )),
+    Score("transaction_pattern_risk_score", (
+        Tiers(((gt("transaction_amount", 1000), 15),
+               (gt("transaction_amount", 500), 10),
+               (gt("transaction_amount", 100), 5))),
+        Tiers(((Not(col("is_3ds_authenticated")), 15),)),
+        Tiers(((either(lt("order_hour", 6), gt("order_hour", 23)), 10),)),
+        Tiers(((lt("days_since_payment_first_seen", 1), 10),)),
+    )),
+]
+
+FLAGS: List[Flag] = [
+    Flag("confirmed_fraud", col("is_fraud_dispute")),
+    Flag("suspected_fraud", both(col("has_dispute"), eq("dispute_category", "fraud_related"))),
+    Flag("flagged_customer_decline", both(col("is_flagged_customer"), col("is_declined"))),
+    Flag("high_value_no_auth", both(Not(col("is_3ds_authenticated")), gt("transaction_amount", 200))),
+    Flag("new_card_high_value", both(eq("days_since_payment_first_seen", 0), gt("transaction_amount", 100))),
+    Flag("new_customer_high_value", both(lt("days_since_customer_created", 1), gt("transaction_amount", 200))),
+    Flag("late_night_high_value", both(either(lt("order_hour", 2), gt("order_hour", 23)),
+                                       gt("transaction_amount", 300))),
+]
+
+MAX_TOTAL_SCORE = 100
+# total_risk_score thresholds, highest first
+CLASSIFICATION = [(70, "critical"), (50, "high"), (30, "medium")]
+DEFAULT_CLASSIFICATION = "low"
+BLOCK_INDICATOR_COUNT = 3
+MANUAL_REVIEW_SCORE = 70
+ENHANCED_MONITORING_SCORE = 50
+OPEN_DISPUTE = both(col("has_dispute"), Not(col("is_dispute_closed")))
+
+
+def columns_of(term: Any) -> Set[str]:
+    """Columns a condition reads"""
+    if isinstance(term, (Column, Compare)):
+        return {term.name}
+    if isinstance(term, Not):
+        return columns_of(term.term)
+    return set().union(*(columns_of(inner) for inner in term.terms))
+
+# Every column the rules read from silver_unified_transactions
+INPUT_COLUMNS = sorted(set().union(
+    *(columns_of(condition) for score in SCORES for tiers in score.parts for condition, _ in tiers.cases),
+    *(columns_of(flag.condition) for flag in FLAGS),
+    columns_of(OPEN_DISPUTE),
+))
+OUTPUT_COLUMNS = (
+    [score.name for score in SCORES]
+    + ["total_risk_score", "risk_classification"]
+    + [flag.name for flag in FLAGS]
+    + ["fraud_indicator_count", "recommended_action"]
+)
+
+
+def sql_columns() -> List[Tuple[str, str]]:
+    """(name, expression) for the scores and flags, over silver_unified_transactions columns"""
+    columns = [(score.name, " + ".join(f"({tiers.sql()})" for tiers in score.parts)) for score in SCORES]
+    columns += [(flag.name, f"CASE WHEN {flag.condition.sql()} THEN true ELSE false END") for flag in FLAGS]
+    return columns
+
+def sql_derived_columns() -> List[Tuple[str, str]]:
+    """(name, expression) for the columns computed from the scores and flags of sql_columns()"""
+    total = f"LEAST({' + '.join(score.name for score in SCORES)}, {MAX_TOTAL_SCORE})"
+    count = " + ".join(f"CASE WHEN {flag.name} THEN 1 ELSE 0 END" for flag in FLAGS)
+    classification = " ".join(f"WHEN {total} >= {threshold} THEN '{label}'" for threshold, label in CLASSIFICATION)
+    return [
+        ("total_risk_score", total),
+        ("risk_classification", f"CASE {classification} ELSE '{DEFAULT_CLASSIFICATION}' END"),
+        ("fraud_indicator_count", count),
+        ("recommended_action",
+         f"CASE WHEN confirmed_fraud OR ({count}) >= {BLOCK_INDICATOR_COUNT} THEN 'block_merchant' "
+         f"WHEN {total} >= {MANUAL_REVIEW_SCORE} THEN 'manual_review' "
+         f"WHEN {OPEN_DISPUTE.sql()} THEN 'monitor' "
+         f"WHEN {total} >= {ENHANCED_MONITORING_SCORE} THEN 'enhanced_monitoring' "
+         f"ELSE 'normal' END"),
+    ]
+
+def classify(total: int) -> str:
+    for threshold, label in CLASSIFICATION:
+        if total >= threshold:
+            return label
+    return DEFAULT_CLASSIFICATION
+
+def action(confirmed_fraud: bool, indicator_count: int, total: int, open_dispute: Optional[bool]) -> str:
+    if confirmed_fraud or indicator_count >= BLOCK_INDICATOR_COUNT:
+        return "block_merchant"
+    if total >= MANUAL_REVIEW_SCORE:
+        return "manual_review"
+    if open_dispute:
+        return "monitor"
+    if total >= ENHANCED_MONITORING_SCORE:
+        return "enhanced_monitoring"
+    return "normal"
+
+
+def _compile_tiers(tiers: Tiers) -> Callable[[Row], int]:
+    cases = [(condition.compile(), points) for condition, points in tiers.cases]
+    def evaluate(row: Row) -> int:
+        for condition, points in cases:
+            if condition(row):
+                return points
+        return 0
+    return evaluate
+
+_SCORES = [(score.name, [_compile_tiers(tiers) for tiers in score.parts]) for score in SCORES]
+_FLAGS = [(flag.name, flag.condition.compile()) for flag in FLAGS]
+_OPEN_DISPUTE = OPEN_DISPUTE.compile()
+
+
+def score(row: Row) -> Dict[str, Any]:
+    """Scores, flags, classification and action for one transaction"""
+    result: Dict[str, Any] = {}
+    total = 0
+    for name, parts in _SCORES:
+        value = sum(part(row) for part in parts)
+        result[name] = value
+        total += value
+    total = min(total, MAX_TOTAL_SCORE)
+    result["total_risk_score"] = total
+    result["risk_classification"] = classify(total)
+    count = 0
+    for name, condition in _FLAGS:
+        fired = condition(row) is True
+        result[name] = fired
+        count += fired
+    result["fraud_indicator_count"] = count
+    result["recommended_action"] = action(result["confirmed_fraud"], count, total, _OPEN_DISPUTE(row))
+    return result
+
+def score_frame(df: Any) -> Any:
+    """The OUTPUT_COLUMNS for every row of a pandas DataFrame of INPUT_COLUMNS"""
+    import numpy as np
+    import pandas as pd
+
+    def fires(condition: Any) -> Any:
+        return condition.frame(df).fillna(False).to_numpy(dtype=bool)
+
+    def tiers_value(tiers: Tiers) -> Any:
+        return np.select([fires(condition) for condition, _ in tiers.cases],
+                         [points for _, points in tiers.cases], default=0)
+
+    out = pd.DataFrame(index=df.index)
+    total = np.zeros(len(df), dtype=np.int64)
+    for item in SCORES:
+        value = sum(tiers_value(tiers) for tiers in item.parts)
+        out[item.name] = value
+        total += value
+    total = np.minimum(total, MAX_TOTAL_SCORE)
+    out["total_risk_score"] = total
+    out["risk_classification"] = np.select(
+        [total >= threshold for threshold, _ in CLASSIFICATION],
+        [label for _, label in CLASSIFICATION], default=DEFAULT_CLASSIFICATION,
+    )
+    count = np.zeros(len(df), dtype=np.int64)
+    for flag in FLAGS:
+        fired = fires(flag.condition)
+        out[flag.name] = fired
+        count += fired
+    out["fraud_indicator_count"] = count
+    out["recommended_action"] = np.select(
+        [out["confirmed_fraud"].to_numpy() | (count >= BLOCK_INDICATOR_COUNT),
+         total >= MANUAL_REVIEW_SCORE, fires(OPEN_DISPUTE), total >= ENHANCED_MONITORING_SCORE],
+        ["block_merchant", "manual_review", "monitor", "enhanced_monitoring"], default="normal",
+    )
+    return out[OUTPUT_COLUMNS]
@@ -0,0 +1,201 @@
+"""
+In-process risk scorer for single transactions at authorization time.
+
+Merchant, customer and payment attributes come from LRU lookup caches of the silver tables,
+kept fresh by applying their change data feed (follow_change_feed). The incoming transaction
+is turned into the silver_unified_transactions columns the rules read, with the same
+derivations as the silver SQL, and scored with rules.score() - the rules the gold table uses.
+"""
+
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+from . import rules
+
+# unified column -> silver column, per lookup table
+MERCHANT_COLUMNS = {"merchant_risk_level": "risk_level", "is_merchant_kyb_approved": "is_kyb_approved"}
+CUSTOMER_COLUMNS = {
+    "is_flagged_customer": "is_flagged_customer",
+    "is_vip_customer": "is_vip_customer",
+    "customer_tenure_days": "customer_tenure_days",
+    "customer_created_at": "customer_created_at",
+}
+PAYMENT_COLUMNS = {"payment_first_seen_at": "payment_first_seen_at"}
+AUTHENTICATED_3DS = ("frictionless", "challenge")
+
+
+class LookupCache:
+    """LRU cache of projected silver rows by key, with an optional loader for misses"""
+
+    def __init__(self, table: str, key: str, columns: Mapping[str, str], max_size: int = 100_000,
+                 loader: Optional[Callable[[str], Optional[Mapping[str, Any]]]] = None):
+        self.table = table
+        self.key = key
+        self.columns = dict(columns)
+        self.max_size = max_size
+        self.loader = loader
+        self.hits = 0
+        self.misses = 0
+        self._rows: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def project(self, row: Mapping[str, Any]) -> Dict[str, Any]:
+        return {name: row.get(source) for name, source in self.columns.items()}
+
+    def put(self, key: str, row: Mapping[str, Any]) -> None:
+        self._rows[key] = self.project(row)
+        self._rows.move_to_end(key)
+        while len(self._rows) > self.max_size:
+            self._rows.popitem(last=False)
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if key is None:
+            return None
+        row = self._rows.get(key)
+        if row is not None:
+            self.hits += 1
+            self._rows.move_to_end(key)
+            return row
+        self.misses += 1
+        if self.loader is None:
+            return None
+        loaded = self.loader(key)
+        if loaded is None:
+            return None
+        self.put(key, loaded)
+        return self._rows[key]
+
+    def warm(self, rows: Iterable[Mapping[str, Any]]) -> None:
+        for row in rows:
+            self.put(row[self.key], row)
+
+    def apply_changes(self, changes: Iterable[Mapping[str, Any]]) -> int:
+        """Apply change data feed rows: refresh cached keys, evict deleted ones; returns rows applied"""
+        applied = 0
+        for change in changes:
+            key = change[self.key]
+            kind = change.get("_change_type", "insert")
+            if kind == "delete":
+                applied += self._rows.pop(key, None) is not None
+            elif kind in ("insert", "update_postimage") and key in self._rows:
+                self._rows[key] = self.project(change)
+                applied += 1
+        return applied
+
+
+def follow_change_feed(spark: Any, table: str, cache: LookupCache, since_version: int) -> int:
+    """Apply a silver table's changes after since_version to the cache; returns the version reached"""
+    latest = spark.sql(f"DESCRIBE HISTORY {table} LIMIT 1").first()["version"]
+    if latest <= since_version:
+        return since_version
+    changes = (
+        spark.read.format("delta")
+        .option("readChangeFeed", "true")
+        .option("startingVersion", since_version + 1)
+        .option("endingVersion", latest)
+        .table(table)
+        .select(cache.key, "_change_type", *sorted(set(cache.columns.values())))
+    )
+    cache.apply_changes(row.asDict() for row in changes.toLocalIterator())
+    return latest
+
+
+def day(value: Any) -> Optional[date]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value.date() if isinstance(value, datetime) else value
+
+def hour(value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value.hour
+
+def days_between(later: Optional[date], earlier: Any) -> Optional[int]:
+    earlier = day(earlier)
+    return None if later is None or earlier is None else (later - earlier).days
+
+
+class RiskScorer:
+    """Scores one incoming transaction against the cached merchant, customer and payment rows"""
+
+    def __init__(self, merchants: LookupCache, customers: LookupCache, payments: LookupCache):
+        self.merchants = merchants
+        self.customers = customers
+        self.payments = payments
+
+    def features(self, txn: Mapping[str, Any]) -> Dict[str, Any]:
+        """The silver_unified_transactions columns the rules read, for a new transaction.
+
+        txn holds the authorization request: merchant_id, customer_id, payment_id,
+        amount_cents, three_ds, response_code, authorized_at and order_created_at.
+        """
+        merchant = self.merchants.get(txn.get("merchant_id")) or {}
+        customer = self.customers.get(txn.get("customer_id")) or {}
+        payment = self.payments.get(txn.get("payment_id")) or {}
+        transaction_date = day(txn.get("authorized_at"))
+        amount_cents = txn.get("amount_cents")
+        response_code = txn.get("response_code")
+        return {
+            "merchant_risk_level": merchant.get("merchant_risk_level"),
+            "is_merchant_kyb_approved": merchant.get("is_merchant_kyb_approved"),
+            "is_flagged_customer": customer.get("is_flagged_customer"),
+            "is_vip_customer": customer.get("is_vip_customer"),
+            "customer_tenure_days": customer.get("customer_tenure_days"),
+            "transaction_amount": None if amount_cents is None else round(amount_cents / 100.0, 2),
+            "is_3ds_authenticated": txn.get("three_ds") in AUTHENTICATED_3DS,
+            "is_declined": response_code is not None and response_code != "00",
+            "order_hour": hour(txn.get("order_created_at")),
+            "days_since_customer_created": days_between(transaction_date, customer.get("customer_created_at")),
+            "days_since_payment_first_seen": days_between(transaction_date, payment.get("payment_first_seen_at")),
+            # a transaction being authorized has no dispute yet
+            "has_dispute": False,
+            "is_fraud_dispute": None,
+            "dispute_category": None,
+            "is_dispute_closed": None,
+        }
+
+    def score(self, txn: Mapping[str, Any]) -> Dict[str, Any]:
+        """rules.score() of the transaction, plus missing_lookups naming any entity not found"""
+        result = rules.score(self.features(txn))
+        missing: List[str] = [
+            name for name, cache, key in (
+                ("merchant", self.merchants, "merchant_id"),
+                ("customer", self.customers, "customer_id"),
+                ("payment", self.payments, "payment_id"),
+            ) if txn.get(key) not in cache
+        ]
+        if missing:
+            result["missing_lookups"] = missing
+        return result
+
+
+def spark_scorer(spark: Any, catalog: str = "psp", schema: str = "analytics",
+                 cache_size: int = 100_000) -> RiskScorer:
+    """A RiskScorer whose caches are warmed from the silver tables and load misses by point lookup"""
+    def cache(table: str, key: str, columns: Mapping[str, str]) -> LookupCache:
+        name = f"{catalog}.{schema}.{table}"
+        frame = spark.table(name).select(key, *sorted(set(columns.values())))
+
+        def load(value: str) -> Optional[Mapping[str, Any]]:
+            row = frame.where(frame[key] == value).first()
+            return None if row is None else row.asDict()
+
+        lookup = LookupCache(name, key, columns, cache_size, load)
+        lookup.warm(row.asDict() for row in frame.limit(cache_size).toLocalIterator())
+        return lookup
+
+    return RiskScorer(
+        cache("silver_merchants", "merchant_id", MERCHANT_COLUMNS),
+        cache("silver_customers", "customer_id", CUSTOMER_COLUMNS),
+        cache("silver_payments", "payment_id", PAYMENT_COLUMNS),
+    )
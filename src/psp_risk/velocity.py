@@ -0,0 +1,160 @@
+"""
+Sliding-window velocity counters for one key (a payment_id, customer_id, card_bin or merchant_id).
+
+Each event gets the count and amount of the key's events in the trailing 1m, 1h and 24h
+windows, including itself, plus the number of distinct payment instruments seen in 24h.
+Events of the last hour are kept individually, so 1m and 1h figures are exact; older
+events are folded into one-minute buckets, so 24h figures have minute resolution at the
+window's trailing edge. The state per key is therefore bounded by the key's event rate
+over one hour plus 1440 buckets and its distinct payment ids, and evict() drops
+everything behind the watermark.
+
+The same Window class backs the Spark stateful stage (silver_velocity_features, via
+applyInPandasWithState) and can be used in-process next to the online scorer.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+MINUTE_MS = 60_000
+HOUR_MS = 60 * MINUTE_MS
+DAY_MS = 24 * HOUR_MS
+ENTITIES = ["payment_id", "customer_id", "card_bin", "merchant_id"]
+FEATURES = ["txn_count_1m", "txn_count_1h", "txn_count_24h", "amount_cents_1h", "amount_cents_24h",
+            "distinct_payments_24h"]
+# Spark schema of Window.to_state()
+STATE_SCHEMA = (
+    "times ARRAY<BIGINT>, amounts ARRAY<BIGINT>, "
+    "bucket_minutes ARRAY<BIGINT>, bucket_counts ARRAY<BIGINT>, bucket_amounts ARRAY<BIGINT>, "
+    "payment_ids ARRAY<STRING>, payment_last_seen ARRAY<BIGINT>"
+)
+
+
+def column_name(entity: str, feature: str) -> str:
+    """Name of a feature column on the risk table, e.g. card_bin + txn_count_1h -> card_bin_txn_count_1h"""
+    return f"{entity[:-3] if entity.endswith('_id') else entity}_{feature}"
+
+# (entity, feature) pairs joined onto the risk table; distinct payments of a payment_id is always 1
+RISK_COLUMNS: List[Tuple[str, str]] = [
+    (entity, feature) for entity in ENTITIES for feature in FEATURES
+    if not (entity == "payment_id" and feature == "distinct_payments_24h")
+]
+
+
+class Window:
+    """Trailing-window counters of one key"""
+
+    def __init__(self, state: Optional[Sequence[Any]] = None):
+        if state is None:
+            state = ([], [], [], [], [], [], [])
+        times, amounts, minutes, counts, bucket_amounts, payment_ids, last_seen = (list(part) for part in state)
+        # parallel lists sorted by time / minute, so every window is a bisect away
+        self.times: List[int] = times
+        self.amounts: List[int] = amounts
+        self.minutes: List[int] = minutes
+        self.counts: List[int] = counts
+        self.bucket_amounts: List[int] = bucket_amounts
+        self.payments: Dict[str, int] = dict(zip(payment_ids, last_seen))
+        self.seen: List[int] = sorted(self.payments.values())
+
+    def to_state(self) -> Tuple[List[Any], ...]:
+        payment_ids = list(self.payments)
+        return (
+            self.times, self.amounts, self.minutes, self.counts, self.bucket_amounts,
+            payment_ids, [self.payments[payment] for payment in payment_ids],
+        )
+
+    def __len__(self) -> int:
+        return len(self.times) + len(self.minutes) + len(self.payments)
+
+    def add(self, time_ms: int, amount_cents: int, payment_id: Optional[str]) -> Dict[str, int]:
+        """Record one event and return its features"""
+        position = bisect_right(self.times, time_ms)
+        self.times.insert(position, time_ms)
+        self.amounts.insert(position, amount_cents)
+        minute = time_ms // MINUTE_MS
+        slot = bisect_left(self.minutes, minute)
+        if slot == len(self.minutes) or self.minutes[slot] != minute:
+            self.minutes.insert(slot, minute)
+            self.counts.insert(slot, 0)
+            self.bucket_amounts.insert(slot, 0)
+        self.counts[slot] += 1
+        self.bucket_amounts[slot] += amount_cents
+        if payment_id is not None:
+            previous = self.payments.get(payment_id)
+            if previous is None or previous < time_ms:
+                if previous is not None:
+                    del self.seen[bisect_left(self.seen, previous)]
+                insort(self.seen, time_ms)
+                self.payments[payment_id] = time_ms
+
+        end = position + 1
+        start_1m = bisect_right(self.times, time_ms - MINUTE_MS, 0, end)
+        start_1h = bisect_right(self.times, time_ms - HOUR_MS, 0, end)
+        first_slot = bisect_right(self.minutes, (time_ms - DAY_MS) // MINUTE_MS)
+        return {
+            "txn_count_1m": end - start_1m,
+            "txn_count_1h": end - start_1h,
+            "txn_count_24h": sum(self.counts[first_slot:slot + 1]),
+            "amount_cents_1h": sum(self.amounts[start_1h:end]),
+            "amount_cents_24h": sum(self.bucket_amounts[first_slot:slot + 1]),
+            "distinct_payments_24h": len(self.seen) - bisect_right(self.seen, time_ms - DAY_MS),
+        }
+
+    def evict(self, watermark_ms: int) -> None:
+        """Drop what no event at or after the watermark can still count"""
+        keep = bisect_left(self.times, watermark_ms - HOUR_MS + 1)
+        del self.times[:keep]
+        del self.amounts[:keep]
+        keep = bisect_right(self.minutes, (watermark_ms - DAY_MS) // MINUTE_MS)
+        del self.minutes[:keep]
+        del self.counts[:keep]
+        del self.bucket_amounts[:keep]
+        keep = bisect_right(self.seen, watermark_ms - DAY_MS)
+        if keep:
+            cutoff = self.seen[keep - 1]
+            del self.seen[:keep]
+            for payment in [payment for payment, seen in self.payments.items() if seen <= cutoff]:
+                del self.payments[payment]
+
+    def latest_ms(self) -> Optional[int]:
+        if self.times:
+            return self.times[-1]
+        return self.minutes[-1] * MINUTE_MS + MINUTE_MS - 1 if self.minutes else None
+
+
+def update_group(key: Tuple[str, str], frames: Any, state: Any) -> Any:
+    """applyInPandasWithState function: features for each new event of one (entity, value) key.
+
+    Input frames carry txn_id, event_time_ms, amount_cents and payment_id; the output has
+    txn_id, entity, entity_value, event_time_ms and the FEATURES.
+    """
+    import pandas as pd
+
+    if state.hasTimedOut:
+        state.remove()
+        return
+
+    window = Window(state.get if state.exists else None)
+    entity, value = key
+    rows = []
+    for frame in frames:
+        for txn_id, time_ms, amount, payment_id in frame.sort_values("event_time_ms")[
+            ["txn_id", "event_time_ms", "amount_cents", "payment_id"]
+        ].itertuples(index=False):
+            features = window.add(int(time_ms), int(amount), payment_id)
+            rows.append({"txn_id": txn_id, "entity": entity, "entity_value": value,
+                         "event_time_ms": int(time_ms), **features})
+
+    watermark = state.getCurrentWatermarkMs()
+    if watermark > 0:
+        window.evict(watermark)
+    latest = window.latest_ms()
+    if latest is None:
+        state.remove()
+    else:
+        state.update(window.to_state())
+        # an idle key expires once its newest event leaves every window
+        state.setTimeoutTimestamp(max(latest + DAY_MS, watermark + 1))
+    if rows:
+        yield pd.DataFrame(rows, columns=["txn_id", "entity", "entity_value", "event_time_ms", *FEATURES])
@@ -0,0 +1,9 @@
+"""Rollup cube of gold_metrics_rollup and the query helper that reads it."""
+
+from .cube import DIMENSIONS, LEVELS, MEASURES, Level, Measure, build, day_rows, month_rows, roll_up, source_level
+from .query import choose_level, rollup_query
+
+__all__ = [
+    "DIMENSIONS", "LEVELS", "MEASURES", "Level", "Measure", "build", "day_rows", "month_rows", "roll_up",
+    "source_level", "choose_level", "rollup_query",
+]
@@ -0,0 +1,161 @@
+"""
+Rollup levels and measures of gold_metrics_rollup, shared by the pipeline, the incremental
+job and the query helper (query.py).
+
+Every row holds additive measures of the transactions of one period (a day or a month) and
+one combination of the level's dimensions: counters, sums of cents and HLL sketches. A
+dimension the level does not group by is NULL. Additive measures can be merged again, so
+any coarser answer comes from summing and unioning rows, never from rescanning transactions:
+
+- the finest level (day x every dimension) is aggregated from the transactions
+- every other day level is merged from the finest level
+- a month level is merged from the day level with the same dimensions
+
+risk_band is the risk_classification of psp_risk.rules (low, medium, high, critical), so the
+cube and gold_risk_fraud_monitoring band a transaction the same way.
+"""
+
+from typing import List, NamedTuple, Tuple
+
+from psp_risk import rules
+
+SKETCH_LG_CONFIG_K = 12
+DIMENSIONS = ["merchant_id", "order_channel", "card_brand", "processor_name", "risk_band"]
+SLICES = ("order_channel", "card_brand", "processor_name", "risk_band")
+
+
+class Level(NamedTuple):
+    name: str
+    grain: str  # "day" or "month"
+    dimensions: Tuple[str, ...]
+
+
+# Coarsest first (fewest rows per period); the query helper takes the first level that answers
+LEVELS: List[Level] = [
+    Level("month", "month", ()),
+    Level("day", "day", ()),
+    Level("month_slice", "month", SLICES),
+    Level("day_slice", "day", SLICES),
+    Level("month_merchant", "month", ("merchant_id",)),
+    Level("day_merchant", "day", ("merchant_id",)),
+    Level("month_merchant_slice", "month", tuple(DIMENSIONS)),
+    Level("day_merchant_slice", "day", tuple(DIMENSIONS)),
+]
+BY_NAME = {level.name: level for level in LEVELS}
+FINEST = BY_NAME["day_merchant_slice"]
+
+
+class Measure(NamedTuple):
+    name: str
+    aggregate: str  # Spark SQL over scored transactions
+    merge: str  # Spark SQL over rollup rows
+    estimate: str = ""  # for a sketch: the name of its distinct count estimate
+
+
+def counter(name: str, condition: str) -> Measure:
+    return Measure(name, f"SUM(CASE WHEN {condition} THEN 1 ELSE 0 END)", f"SUM({name})")
+
+def total(name: str, column: str) -> Measure:
+    return Measure(name, f"SUM({column})", f"SUM({name})")
+
+def sketch(name: str, column: str, estimate: str) -> Measure:
+    return Measure(name, f"hll_sketch_agg({column}, {SKETCH_LG_CONFIG_K})", f"hll_union_agg({name})", estimate)
+
+MEASURES: List[Measure] = [
+    Measure("transaction_count", "COUNT(*)", "SUM(transaction_count)"),
+    counter("successful_transactions", "is_successful_transaction"),
+    counter("failed_transactions", "is_failed_transaction"),
+    counter("declined_transactions", "is_declined"),
+    counter("authenticated_3ds_count", "is_3ds_authenticated"),
+    counter("disputed_transactions", "has_dispute"),
+    counter("fraud_disputes", "is_fraud_dispute"),
+    counter("flagged_transactions", "fraud_indicator_count > 0"),
+    total("gross_amount_cents", "amount_cents"),
+    total("fees_cents", "fees_total_cents"),
+    total("net_amount_cents", "net_amount_cents"),
+    total("total_risk_score_sum", "total_risk_score"),
+    sketch("customer_sketch", "customer_id", "unique_customers_est"),
+    sketch("payment_sketch", "payment_id", "unique_payment_instruments_est"),
+    sketch("merchant_sketch", "merchant_id", "unique_merchants_est"),
+]
+
+# unified columns a cube is built from (psp_unified.CONSUMERS["metrics_rollup"])
+INPUT_COLUMNS = list(dict.fromkeys(
+    ["transaction_date", "merchant_id", "order_channel", "card_brand", "processor_name", "customer_id",
+     "payment_id", "is_successful_transaction", "is_failed_transaction", "is_declined", "is_3ds_authenticated",
+     "has_dispute", "is_fraud_dispute", "amount_cents", "fees_total_cents", "net_amount_cents"]
+    + rules.INPUT_COLUMNS
+))
+OUTPUT_COLUMNS = ["rollup_level", "period_grain", "period_start"] + DIMENSIONS + [m.name for m in MEASURES]
+
+
+def source_level(level: Level) -> Level:
+    """The level a level is merged from: the finest level for days, the same dimensions by day for months"""
+    if level.grain == "day":
+        return FINEST
+    return next(other for other in LEVELS if other.grain == "day" and other.dimensions == level.dimensions)
+
+def period_sql(level: Level, column: str = "period_start") -> str:
+    return column if level.grain == "day" else f"CAST(date_trunc('MONTH', {column}) AS DATE)"
+
+def score(transactions):
+    """The unified rows with risk_band, total_risk_score and fraud_indicator_count (rules)"""
+    from pyspark.sql import functions as F
+
+    scored = transactions.select("*", *[F.expr(expression).alias(name) for name, expression in rules.sql_columns()])
+    derived = dict(rules.sql_derived_columns())
+    return scored.select(
+        *INPUT_COLUMNS,
+        F.expr(derived["risk_classification"]).alias("risk_band"),
+        F.expr(derived["total_risk_score"]).alias("total_risk_score"),
+        F.expr(derived["fraud_indicator_count"]).alias("fraud_indicator_count"),
+    )
+
+def aggregate(level: Level, rows, merged: bool):
+    """Rows of level from scored transactions (merged=False) or from source_level rows (merged=True)"""
+    from pyspark.sql import functions as F
+
+    period = period_sql(level) if merged else period_sql(level, "transaction_date")
+    grouped = rows.groupBy(F.expr(period).alias("period_start"), *level.dimensions).agg(
+        *[F.expr(measure.merge if merged else measure.aggregate).alias(measure.name) for measure in MEASURES]
+    )
+    return grouped.select(
+        F.lit(level.name).alias("rollup_level"),
+        F.lit(level.grain).alias("period_grain"),
+        "period_start",
+        *[F.col(name) if name in level.dimensions else F.lit(None).cast("string").alias(name) for name in DIMENSIONS],
+        *[measure.name for measure in MEASURES],
+    )
+
+def roll_up(rows, levels: List[Level]):
+    """The rows of levels, each merged from its source_level rows in rows"""
+    parts = [
+        aggregate(level, rows.where(rows.rollup_level == source_level(level).name), merged=True)
+        for level in levels
+    ]
+    result = parts[0]
+    for part in parts[1:]:
+        result = result.unionByName(part)
+    return result
+
+def day_rows(transactions):
+    """The day levels: the finest aggregated from unified rows with INPUT_COLUMNS, the others merged from it"""
+    finest = aggregate(FINEST, score(transactions), merged=False)
+    return finest.unionByName(roll_up(finest, [level for level in LEVELS if level.grain == "day" and level != FINEST]))
+
+def month_rows(days):
+    """The month levels, merged from day level rows of whole months"""
+    return roll_up(days, [level for level in LEVELS if level.grain == "month"])
+
+def build(transactions):
+    """
+    Every level of the cube.
+
+    Args:
+        transactions: unified rows with INPUT_COLUMNS
+
+    Returns:
+        DataFrame: OUTPUT_COLUMNS, one row per level, period and dimension combination
+    """
+    days = day_rows(transactions)
+    return days.unionByName(month_rows(days))
@@ -0,0 +1,111 @@
+"""
+Dashboard queries over gold_metrics_rollup: pick the coarsest level that answers a query
+and render the SQL that merges its rows.
+
+A level answers a query when it groups by every dimension the query filters or groups
+on, and its grain fits the time buckets: a month level serves monthly (or no) time
+buckets over whole months only; a day level serves everything. The first such level in
+cube.LEVELS, which runs from coarsest to finest, is used, so a query over years of history
+reads a few rows per month instead of one row per transaction.
+
+    sql = rollup_query("psp.analytics.gold_metrics_rollup", group_by=["card_brand"],
+                       filters={"order_channel": ["ecommerce", "mobile"]},
+                       start=date(2024, 1, 1), end=date(2024, 12, 31), time_bucket="month")
+    spark.sql(sql).show()
+"""
+
+from datetime import date, timedelta
+from typing import Any, Iterable, List, Mapping, Optional, Sequence
+
+from .cube import DIMENSIONS, LEVELS, MEASURES, Level
+
+TIME_BUCKETS = (None, "day", "month")
+
+
+def literal(value: Any) -> str:
+    if value is None:
+        raise ValueError("None has no SQL literal; a None filter value is rendered as IS NULL")
+    if isinstance(value, date):
+        return f"DATE '{value.isoformat()}'"
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+def whole_months(start: Optional[date], end: Optional[date]) -> bool:
+    """True when [start, end] starts on a month's first day and ends on a month's last day"""
+    return (start is None or start.day == 1) and (end is None or (end + timedelta(days=1)).day == 1)
+
+def choose_level(group_by: Sequence[str] = (), filters: Optional[Mapping[str, Any]] = None,
+                 start: Optional[date] = None, end: Optional[date] = None,
+                 time_bucket: Optional[str] = None) -> Level:
+    """The coarsest level that answers a query"""
+    needed = set(group_by) | set(filters or {})
+    unknown = needed - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"unknown dimensions {', '.join(sorted(unknown))} (one of {', '.join(DIMENSIONS)})")
+    if time_bucket not in TIME_BUCKETS:
+        raise ValueError(f"unknown time bucket {time_bucket!r}, expected day, month or None")
+    monthly = time_bucket != "day" and whole_months(start, end)
+    for level in LEVELS:
+        if needed <= set(level.dimensions) and (level.grain == "day" or monthly):
+            return level
+    raise AssertionError("the finest level answers every query")
+
+def measure_columns(measures: Optional[Iterable[str]] = None) -> List[str]:
+    """Merged measures; a sketch becomes its estimate, e.g. customer_sketch -> unique_customers_est"""
+    by_name = {measure.name: measure for measure in MEASURES}
+    names = list(measures) if measures is not None else list(by_name)
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"unknown measures {', '.join(unknown)}")
+    return [
+        f"hll_sketch_estimate({by_name[name].merge}) AS {by_name[name].estimate}" if by_name[name].estimate
+        else f"{by_name[name].merge} AS {name}"
+        for name in names
+    ]
+
+def rollup_query(table: str, group_by: Sequence[str] = (), filters: Optional[Mapping[str, Any]] = None,
+                 start: Optional[date] = None, end: Optional[date] = None, time_bucket: Optional[str] = None,
+                 measures: Optional[Iterable[str]] = None) -> str:
+    """
+    Spark SQL answering a dashboard query from the coarsest level of the rollup table.
+
+    Args:
+        table: the gold_metrics_rollup table
+        group_by: dimensions to group by (cube.DIMENSIONS)
+        filters: dimension -> value, or a list of values; None matches NULL
+        start, end: inclusive transaction date range
+        time_bucket: None, "day" or "month": adds a period_start column
+        measures: cube.MEASURES names (default all); sketches are returned as estimates
+
+    Returns:
+        str: the query
+    """
+    level = choose_level(group_by, filters, start, end, time_bucket)
+    conditions = [f"rollup_level = {literal(level.name)}"]
+    if start is not None:
+        conditions.append(f"period_start >= {literal(start)}")
+    if end is not None:
+        conditions.append(f"period_start <= {literal(end)}")
+    for name, value in (filters or {}).items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        if not values:
+            raise ValueError(f"filter on {name} has no values")
+        present = [literal(item) for item in values if item is not None]
+        matches = [f"{name} IN ({', '.join(present)})"] if present else []
+        if len(present) < len(values):
+            matches.append(f"{name} IS NULL")
+        conditions.append(matches[0] if len(matches) == 1 else f"({' OR '.join(matches)})")
+
+    keys = list(group_by)
+    if time_bucket == "month" and level.grain == "day":
+        keys.insert(0, "CAST(date_trunc('MONTH', period_start) AS DATE)")
+    elif time_bucket is not None:
+        keys.insert(0, "period_start")
+    select = [f"{key} AS period_start" if key.startswith("CAST") else key for key in keys]
+    return (
+        f"SELECT {', '.join(select + measure_columns(measures))}\n"
+        f"FROM {table}\n"
+        f"WHERE {' AND '.join(conditions)}"
+        + (f"\nGROUP BY {', '.join(keys)}" if keys else "")
+    )
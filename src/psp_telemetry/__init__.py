@@ -0,0 +1,11 @@
+"""Pipeline telemetry: per-table series from the event log, alerts and exports."""
+
+from .alerts import DEFAULT_THRESHOLDS, Alert, evaluate, load_thresholds
+from .collector import Point, collect, series
+from .export import to_json, to_prometheus
+
+__all__ = [
+    "DEFAULT_THRESHOLDS", "Alert", "evaluate", "load_thresholds",
+    "Point", "collect", "series",
+    "to_json", "to_prometheus",
+]
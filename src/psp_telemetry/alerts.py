@@ -0,0 +1,91 @@
+"""
+Alert thresholds over the per-table series.
+
+A threshold is a dict, e.g. loaded from a JSON file:
+
+    {"metric": "duration_seconds", "growth": 1.5, "window": 5, "min_value": 10}
+    {"metric": "drop_rate", "max": 0.01, "tables": ["silver_customers"]}
+    {"metric": "expectation_failed_rate", "max": 0.05}
+
+- max: the table's latest value is above max
+- growth: the latest value is above growth x the median of the previous `window` points
+  (at least two are needed), and at least min_value
+- tables: limit the threshold to these tables (default: all)
+
+expectation_failed_rate is evaluated per expectation, as failed / (passed + failed).
+"""
+
+import json
+import statistics
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional
+
+from .collector import Point, series
+
+DEFAULT_THRESHOLDS: List[Dict[str, Any]] = [
+    {"metric": "duration_seconds", "growth": 1.5, "window": 5, "min_value": 10},
+    {"metric": "state_rows", "growth": 2.0, "window": 5},
+    {"metric": "drop_rate", "max": 0.01},
+    {"metric": "expectation_failed_rate", "max": 0.05},
+    {"metric": "backlog_files", "max": 1000},
+]
+
+
+class Alert(NamedTuple):
+    table: str
+    update_id: str
+    metric: str
+    value: float
+    limit: float
+    rule: str  # "max" or "growth"
+    expectation: Optional[str] = None
+
+    def message(self) -> str:
+        subject = f"{self.table} {self.metric}" + (f" [{self.expectation}]" if self.expectation else "")
+        return f"{subject} = {self.value:g} over {self.rule} limit {self.limit:g} (update {self.update_id})"
+
+
+def load_thresholds(path: Optional[str]) -> List[Dict[str, Any]]:
+    if path is None:
+        return list(DEFAULT_THRESHOLDS)
+    with open(path) as f:
+        thresholds = json.load(f)
+    for threshold in thresholds:
+        if "metric" not in threshold or not ("max" in threshold or "growth" in threshold):
+            raise ValueError(f"threshold needs a metric and max or growth: {threshold}")
+    return thresholds
+
+def values(item: Point, metric: str) -> Dict[Optional[str], float]:
+    """The metric of one point; per expectation for expectation_failed_rate"""
+    if metric == "expectation_failed_rate":
+        return {
+            name: failed / (passed + failed)
+            for name, (passed, failed) in item.expectations.items() if passed + failed
+        }
+    return {None: item.metrics[metric]} if metric in item.metrics else {}
+
+def evaluate(points: Iterable[Point], thresholds: Iterable[Mapping[str, Any]]) -> List[Alert]:
+    """Alerts raised by the latest point of each table"""
+    alerts = []
+    by_table = series(points)
+    for threshold in thresholds:
+        metric = threshold["metric"]
+        tables = threshold.get("tables")
+        for table, history in by_table.items():
+            if tables and table not in tables:
+                continue
+            latest = history[-1]
+            for expectation, value in values(latest, metric).items():
+                if "max" in threshold and value > threshold["max"]:
+                    alerts.append(Alert(table, latest.update_id, metric, value, threshold["max"], "max", expectation))
+                if "growth" in threshold:
+                    window = threshold.get("window", 5)
+                    previous = [
+                        earlier[expectation] for earlier in (values(item, metric) for item in history[-window - 1:-1])
+                        if expectation in earlier
+                    ]
+                    if len(previous) < 2 or value < threshold.get("min_value", 0):
+                        continue
+                    limit = threshold["growth"] * statistics.median(previous)
+                    if value > limit:
+                        alerts.append(Alert(table, latest.update_id, metric, value, limit, "growth", expectation))
+    return alerts
@@ -0,0 +1,128 @@
+"""
+Per-table time series from pipeline event logs.
+
+Input events have the shape of the Lakeflow / DLT event log: id, timestamp, event_type,
+origin (update_id, flow_name, dataset_name) and details, a JSON string or dict. The
+flow_progress events of one flow in one update become one Point:
+
+- counters summed over the update's events: num_output_rows, num_upserted_rows,
+  num_deleted_rows, dropped records and per-expectation passed / failed records
+- gauges, last value wins: backlog_bytes / backlog_files / backlog_records, and
+  state_rows / state_memory_bytes where the runner reports them
+- duration: the sum of metrics.duration_ms when present (the local runner reports it per
+  batch), otherwise the time between the first and the last event
+
+bench/events.py writes the same events for the local runner, so both feed collect().
+"""
+
+import json
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+# flow_progress.metrics key -> Point metric
+COUNTERS = {
+    "num_output_rows": "output_rows",
+    "num_upserted_rows": "upserted_rows",
+    "num_deleted_rows": "deleted_rows",
+    "dropped_by_watermark": "dropped_by_watermark",
+}
+GAUGES = {
+    "backlog_bytes": "backlog_bytes",
+    "backlog_files": "backlog_files",
+    "backlog_records": "backlog_records",
+    "state_rows": "state_rows",
+    "state_memory_bytes": "state_memory_bytes",
+}
+
+
+class Point(NamedTuple):
+    """Metrics of one table (flow) in one pipeline update"""
+    table: str
+    update_id: str
+    timestamp: str  # ISO time of the update's last event for the flow
+    status: Optional[str]
+    metrics: Dict[str, float]
+    expectations: Dict[str, Tuple[int, int]]  # name -> (passed, failed)
+
+
+def parse_time(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+def details_of(event: Mapping[str, Any]) -> Dict[str, Any]:
+    details = event.get("details") or {}
+    return json.loads(details) if isinstance(details, str) else dict(details)
+
+def flow_name(event: Mapping[str, Any]) -> Optional[str]:
+    origin = event.get("origin") or {}
+    name = origin.get("dataset_name") or origin.get("flow_name")
+    # flows of a table are reported as <catalog>.<schema>.<table>
+    return name.split(".")[-1].strip("`") if name else None
+
+def collect(events: Iterable[Mapping[str, Any]]) -> List[Point]:
+    """One Point per (update, table), in time order"""
+    groups: "OrderedDict[Tuple[str, str], List[Tuple[datetime, Dict[str, Any]]]]" = OrderedDict()
+    for event in events:
+        if event.get("event_type") != "flow_progress":
+            continue
+        table = flow_name(event)
+        update_id = (event.get("origin") or {}).get("update_id") or ""
+        progress = details_of(event).get("flow_progress")
+        if table is None or progress is None:
+            continue
+        groups.setdefault((update_id, table), []).append((parse_time(event["timestamp"]), progress))
+
+    points = []
+    for (update_id, table), progress_events in groups.items():
+        progress_events.sort(key=lambda item: item[0])
+        points.append(point(table, update_id, progress_events))
+    points.sort(key=lambda item: (item.timestamp, item.table))
+    return points
+
+def point(table: str, update_id: str, progress_events: List[Tuple[datetime, Dict[str, Any]]]) -> Point:
+    counters: Dict[str, float] = {}
+    gauges: Dict[str, float] = {}
+    expectations: Dict[str, List[int]] = {}
+    dropped = 0
+    duration_ms = 0.0
+    has_duration = False
+    status = None
+    for _, progress in progress_events:
+        status = progress.get("status") or status
+        metrics = progress.get("metrics") or {}
+        for key, name in COUNTERS.items():
+            if metrics.get(key) is not None:
+                counters[name] = counters.get(name, 0) + metrics[key]
+        for key, name in GAUGES.items():
+            if metrics.get(key) is not None:
+                gauges[name] = metrics[key]
+        if metrics.get("duration_ms") is not None:
+            duration_ms += metrics["duration_ms"]
+            has_duration = True
+        quality = progress.get("data_quality") or {}
+        dropped += quality.get("dropped_records") or 0
+        for expectation in quality.get("expectations") or []:
+            totals = expectations.setdefault(expectation["name"], [0, 0])
+            totals[0] += expectation.get("passed_records") or 0
+            totals[1] += expectation.get("failed_records") or 0
+
+    first, last = progress_events[0][0], progress_events[-1][0]
+    seconds = duration_ms / 1000 if has_duration else (last - first).total_seconds()
+    output_rows = counters.get("output_rows", 0) + counters.get("upserted_rows", 0)
+    metrics_out: Dict[str, float] = {**counters, **gauges, "dropped_records": dropped,
+                                     "duration_seconds": round(seconds, 3)}
+    if output_rows + dropped:
+        metrics_out["drop_rate"] = dropped / (output_rows + dropped)
+    if seconds > 0:
+        metrics_out["rows_per_second"] = round(output_rows / seconds, 1)
+    return Point(table, update_id, last.isoformat(), status, metrics_out,
+                 {name: (passed, failed) for name, (passed, failed) in expectations.items()})
+
+def series(points: Iterable[Point]) -> Dict[str, List[Point]]:
+    """Points grouped by table, each list in time order"""
+    by_table: Dict[str, List[Point]] = {}
+    for item in sorted(points, key=lambda item: item.timestamp):
+        by_table.setdefault(item.table, []).append(item)
+    return by_table
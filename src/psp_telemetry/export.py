@@ -0,0 +1,100 @@
+"""
+JSON and Prometheus text exports of the collected series and alerts.
+
+The JSON document holds every point (the time series); the Prometheus exposition holds the
+latest point per table as gauges, labelled by table (and expectation), plus one
+psp_pipeline_alert sample per raised alert, for a textfile collector or a push gateway.
+"""
+
+import math
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List
+
+from .alerts import Alert
+from .collector import Point, series
+
+PREFIX = "psp_pipeline"
+HELP = {
+    "output_rows": "Rows written by the flow in the update",
+    "upserted_rows": "Rows upserted by the flow in the update",
+    "deleted_rows": "Rows deleted by the flow in the update",
+    "dropped_records": "Rows dropped by expectations in the update",
+    "dropped_by_watermark": "Rows dropped behind the watermark in the update",
+    "drop_rate": "Dropped rows / (written + dropped rows)",
+    "duration_seconds": "Processing time of the flow in the update",
+    "rows_per_second": "Written rows per second of processing time",
+    "backlog_bytes": "Unprocessed source bytes at the end of the update",
+    "backlog_files": "Unprocessed source files at the end of the update",
+    "backlog_records": "Unprocessed source records at the end of the update",
+    "state_rows": "Rows in the flow's streaming state store",
+    "state_memory_bytes": "Memory used by the flow's streaming state store",
+    "expectation_passed_records": "Rows that passed the expectation in the update",
+    "expectation_failed_records": "Rows that failed the expectation in the update",
+}
+
+
+def to_json(points: Iterable[Point], alerts: Iterable[Alert]) -> Dict[str, Any]:
+    return {
+        "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "tables": {
+            table: [
+                {
+                    "update_id": item.update_id,
+                    "timestamp": item.timestamp,
+                    "status": item.status,
+                    "metrics": item.metrics,
+                    "expectations": {
+                        name: {"passed_records": passed, "failed_records": failed}
+                        for name, (passed, failed) in item.expectations.items()
+                    },
+                }
+                for item in history
+            ]
+            for table, history in series(points).items()
+        },
+        "alerts": [{**alert._asdict(), "message": alert.message()} for alert in alerts],
+    }
+
+def label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def number(value: float) -> str:
+    """A sample value without rounding: ints exactly, floats by repr, NaN and infinities as Prometheus spells them"""
+    if isinstance(value, int):
+        return str(int(value))
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+def metric_name(name: str) -> str:
+    return f"{PREFIX}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}"
+
+def to_prometheus(points: Iterable[Point], alerts: Iterable[Alert]) -> str:
+    latest = [history[-1] for history in series(points).values()]
+    samples: Dict[str, List[str]] = {}
+    for item in latest:
+        labels = f'table="{label(item.table)}"'
+        for name, value in item.metrics.items():
+            samples.setdefault(name, []).append(f"{metric_name(name)}{{{labels}}} {number(value)}")
+        for expectation, (passed, failed) in item.expectations.items():
+            expectation_labels = f'{labels},expectation="{label(expectation)}"'
+            samples.setdefault("expectation_passed_records", []).append(
+                f"{metric_name('expectation_passed_records')}{{{expectation_labels}}} {number(passed)}")
+            samples.setdefault("expectation_failed_records", []).append(
+                f"{metric_name('expectation_failed_records')}{{{expectation_labels}}} {number(failed)}")
+
+    lines = []
+    for name, rows in samples.items():
+        description = HELP.get(name, name.replace("_", " ").capitalize())
+        lines += [f"# HELP {metric_name(name)} {description}", f"# TYPE {metric_name(name)} gauge", *rows]
+    alert_rows = [
+        f'{metric_name("alert")}{{table="{label(alert.table)}",metric="{label(alert.metric)}",'
+        f'rule="{label(alert.rule)}",expectation="{label(alert.expectation or "")}"}} {number(alert.value)}'
+        for alert in alerts
+    ]
+    lines += [f"# HELP {metric_name('alert')} Value of a metric over its alert threshold",
+              f"# TYPE {metric_name('alert')} gauge", *alert_rows]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,11 @@
+"""Column layout of silver_unified_transactions, shared by the pipeline and the local runners."""
+
+from .columns import (
+    COLUMNS, CONSUMERS, DIMENSIONS, DISPUTE_COLUMNS, LAYOUTS, RISK_PASSTHROUGH, STATE_COLUMNS, UnifiedColumn,
+    late_columns, stored,
+)
+
+__all__ = [
+    "COLUMNS", "CONSUMERS", "DIMENSIONS", "DISPUTE_COLUMNS", "LAYOUTS", "RISK_PASSTHROUGH", "STATE_COLUMNS",
+    "UnifiedColumn", "late_columns", "stored",
+]
@@ -0,0 +1,253 @@
+"""
+Column layout of silver_unified_transactions and the column lists of its consumers.
+
+Every unified column comes from one joined entity - t (silver_transactions), o
+(silver_orders), m (silver_merchants), c (silver_customers), p (silver_payments) - or is
+derived from other unified columns by a Spark SQL expression. Dispute columns are merged on
+by txn_id afterwards (DISPUTE_COLUMNS), and so are state changes (STATE_COLUMNS).
+
+psp.unified.layout picks what the table stores:
+- wide: every column
+- narrow: the fact columns only - transaction and order columns, the merchant, customer,
+  payment and card_bin keys, and the columns derived from them. Merchant, customer and
+  payment attributes are joined on late, by the per-consumer projections (CONSUMERS)
+"""
+
+import re
+from typing import Dict, List, NamedTuple, Sequence
+
+LAYOUTS = ("wide", "narrow")
+FACT_SOURCES = ("t", "o")
+# Dimension alias -> (silver table, key shared with the fact)
+DIMENSIONS = {
+    "m": ("silver_merchants", "merchant_id"),
+    "c": ("silver_customers", "customer_id"),
+    "p": ("silver_payments", "payment_id"),
+}
+
+
+class UnifiedColumn(NamedTuple):
+    name: str
+    source: str  # entity alias, or "" for a derived column
+    expression: str  # the entity's column, or Spark SQL over unified columns if derived
+    fact: bool  # stored by the narrow layout
+
+    @property
+    def derived(self) -> bool:
+        return not self.source
+
+def entity(source: str, column: str, name: str = "", fact: bool = False) -> UnifiedColumn:
+    return UnifiedColumn(name or column, source, column, fact or source in FACT_SOURCES)
+
+ENTITY_COLUMNS = [
+    entity("t", "txn_id"),
+    entity("t", "transaction_state"),
+    entity("t", "transaction_state_category"),
+    entity("t", "state_timestamp"),
+    entity("t", "transaction_amount"),
+    entity("t", "amount_cents"),
+    entity("t", "transaction_currency"),
+    entity("t", "response_code"),
+    entity("t", "response_code_description"),
+    entity("t", "three_ds_status"),
+    entity("t", "is_3ds_authenticated"),
+    entity("t", "fees_total_amount"),
+    entity("t", "fees_total_cents"),
+    entity("t", "network_fee_amount"),
+    entity("t", "network_fee_cents"),
+    entity("t", "effective_fee_rate_pct"),
+    entity("t", "net_amount"),
+    entity("t", "net_amount_cents"),
+    entity("t", "processor_name"),
+    entity("t", "is_successful_transaction"),
+    entity("t", "is_failed_transaction"),
+    entity("t", "is_disputed_transaction"),
+    entity("t", "is_declined"),
+    entity("t", "transaction_authorized_at"),
+    entity("t", "transaction_date"),
+    entity("t", "transaction_hour"),
+    entity("t", "transaction_day_of_week"),
+    entity("o", "order_id"),
+    entity("o", "order_currency"),
+    entity("o", "subtotal_amount"),
+    entity("o", "subtotal_cents"),
+    entity("o", "tax_amount"),
+    entity("o", "tax_cents"),
+    entity("o", "tip_amount"),
+    entity("o", "tip_cents"),
+    entity("o", "total_amount", "order_total_amount"),
+    entity("o", "total_amount_cents", "order_total_amount_cents"),
+    entity("o", "tax_rate"),
+    entity("o", "tip_rate"),
+    entity("o", "order_channel"),
+    entity("o", "is_ecommerce_order"),
+    entity("o", "has_tip"),
+    entity("o", "is_high_value_order"),
+    entity("o", "order_size_category"),
+    entity("o", "order_created_at"),
+    entity("o", "order_date"),
+    entity("o", "order_hour"),
+    entity("o", "order_day_of_week"),
+    entity("m", "merchant_id", fact=True),
+    entity("m", "legal_name", "merchant_legal_name"),
+    entity("m", "merchant_category_code"),
+    entity("m", "country_code", "merchant_country"),
+    entity("m", "kyb_status", "merchant_kyb_status"),
+    entity("m", "pricing_tier", "merchant_pricing_tier"),
+    entity("m", "risk_level", "merchant_risk_level"),
+    entity("m", "is_kyb_approved", "is_merchant_kyb_approved"),
+    entity("m", "is_high_risk", "is_merchant_high_risk"),
+    entity("m", "is_enterprise", "is_merchant_enterprise"),
+    entity("m", "merchant_created_at"),
+    entity("c", "customer_id", fact=True),
+    entity("c", "email_hash", "customer_email_hash"),
+    entity("c", "phone_hash", "customer_phone_hash"),
+    entity("c", "customer_type"),
+    entity("c", "is_vip_customer"),
+    entity("c", "is_flagged_customer"),
+    entity("c", "customer_tenure_days"),
+    entity("c", "customer_created_at"),
+    entity("p", "payment_id", fact=True),
+    entity("p", "card_brand"),
+    # a velocity key (silver_velocity_features), so it stays on the fact
+    entity("p", "card_bin", fact=True),
+    entity("p", "card_last4_masked"),
+    entity("p", "card_expiry_month"),
+    entity("p", "card_expiry_year"),
+    entity("p", "wallet_type"),
+    entity("p", "payment_status"),
+    entity("p", "is_active_payment"),
+    entity("p", "is_wallet_payment"),
+    entity("p", "is_expired", "is_payment_expired"),
+    entity("p", "card_network_tier"),
+    entity("p", "payment_first_seen_at"),
+]
+
+def inputs(expression: str) -> List[str]:
+    """Unified columns a derived expression reads"""
+    names = {column.name for column in ENTITY_COLUMNS}
+    return [token for token in dict.fromkeys(re.findall(r"\b[a-z_][a-z0-9_]*\b", expression)) if token in names]
+
+def derived(name: str, expression: str) -> UnifiedColumn:
+    facts = {column.name for column in ENTITY_COLUMNS if column.fact}
+    return UnifiedColumn(name, "", expression, all(column in facts for column in inputs(expression)))
+
+DERIVED_COLUMNS = [
+    derived("days_since_customer_created", "datediff(transaction_date, customer_created_at)"),
+    derived("days_since_merchant_created", "datediff(transaction_date, merchant_created_at)"),
+    derived("days_since_payment_first_seen", "datediff(transaction_date, payment_first_seen_at)"),
+    derived("order_to_auth_seconds",
+            "unix_timestamp(transaction_authorized_at) - unix_timestamp(order_created_at)"),
+    derived("merchant_net_revenue", "net_amount"),
+    derived("psp_revenue", "fees_total_amount"),
+    derived("total_psp_fees", "order_total_amount - net_amount"),
+    derived("unified_created_at", "current_timestamp()"),
+]
+COLUMNS = ENTITY_COLUMNS + DERIVED_COLUMNS
+BY_NAME = {column.name: column for column in COLUMNS}
+
+# silver_transactions columns that follow the transaction through its states: the unified
+# row keeps them current as state events arrive, while the other columns are fixed at the join
+STATE_COLUMNS = [
+    "transaction_state", "transaction_state_category", "state_timestamp",
+    "is_successful_transaction", "is_failed_transaction", "is_disputed_transaction",
+]
+
+# silver_disputes columns carried onto unified rows, as (source, unified name)
+DISPUTE_COLUMNS = [
+    ("dispute_id", "dispute_id"),
+    ("dispute_reason_code", "dispute_reason_code"),
+    ("dispute_stage", "dispute_stage"),
+    ("dispute_category", "dispute_category"),
+    ("liability_party", "liability_party"),
+    ("dispute_status", "dispute_status"),
+    ("dispute_amount", "dispute_amount"),
+    ("dispute_amount_cents", "dispute_amount_cents"),
+    ("dispute_opened_at", "dispute_opened_at"),
+    ("dispute_closed_at", "dispute_closed_at"),
+    ("dispute_age_days", "dispute_age_days"),
+    ("is_dispute_closed", "is_dispute_closed"),
+    ("is_dispute_won", "is_dispute_won"),
+    ("is_dispute_lost", "is_dispute_lost"),
+    ("is_merchant_liable", "is_merchant_liable"),
+    ("is_fraud_dispute", "is_fraud_dispute"),
+    ("is_escalated", "is_dispute_escalated"),
+    ("stage_severity_level", "dispute_severity_level"),
+]
+
+# silver_unified_transactions columns gold_risk_fraud_monitoring carries over, in output order
+RISK_PASSTHROUGH = [
+    "txn_id", "transaction_date", "transaction_authorized_at", "order_id",
+    "merchant_id", "merchant_legal_name", "merchant_category_code", "merchant_country",
+    "merchant_risk_level", "is_merchant_high_risk",
+    "customer_id", "customer_type", "is_vip_customer", "is_flagged_customer", "customer_tenure_days",
+    "payment_id", "card_brand", "card_bin", "wallet_type", "is_wallet_payment",
+    "transaction_amount", "transaction_currency", "transaction_state", "transaction_state_category",
+    "response_code", "response_code_description",
+    "is_successful_transaction", "is_failed_transaction", "is_declined",
+    "three_ds_status", "is_3ds_authenticated",
+    "has_dispute", "dispute_id", "dispute_reason_code", "dispute_category", "dispute_stage",
+    "dispute_status", "liability_party", "is_dispute_won", "is_dispute_lost", "is_merchant_liable",
+    "is_fraud_dispute", "is_dispute_escalated", "dispute_severity_level", "dispute_amount",
+    "dispute_opened_at", "dispute_closed_at", "dispute_age_days",
+    "order_channel", "is_ecommerce_order", "order_size_category", "is_high_value_order",
+    "order_hour", "order_day_of_week",
+    "days_since_customer_created", "days_since_merchant_created", "days_since_payment_first_seen",
+]
+
+def _risk_columns() -> List[str]:
+    from psp_risk import rules
+
+    return list(dict.fromkeys(RISK_PASSTHROUGH + ["psp_revenue", "merchant_net_revenue"] + rules.INPUT_COLUMNS))
+
+def _rollup_columns() -> List[str]:
+    from psp_rollup.cube import INPUT_COLUMNS
+
+    return list(INPUT_COLUMNS)
+
+# Columns each consumer reads, exposed as the view unified_<consumer>
+CONSUMERS: Dict[str, List[str]] = {
+    "customer_analytics": [
+        "customer_id", "customer_type", "customer_email_hash", "customer_phone_hash", "is_vip_customer",
+        "is_flagged_customer", "customer_tenure_days", "customer_created_at",
+        "txn_id", "order_id", "merchant_id", "payment_id", "transaction_date", "transaction_currency",
+        "is_successful_transaction", "is_failed_transaction", "is_declined", "is_3ds_authenticated",
+        "transaction_amount", "order_total_amount", "tip_amount", "tip_rate", "has_tip",
+        "is_ecommerce_order", "order_channel", "is_high_value_order",
+        "is_wallet_payment", "card_brand", "merchant_legal_name", "merchant_country",
+        "has_dispute", "is_fraud_dispute", "dispute_amount",
+    ],
+    "risk_fraud_monitoring": _risk_columns(),
+    "merchant_daily_sketches": [
+        "merchant_id", "transaction_date", "order_id", "customer_id", "payment_id",
+        "is_successful_transaction", "is_failed_transaction", "is_declined", "is_3ds_authenticated",
+        "has_dispute", "transaction_amount", "fees_total_amount", "network_fee_amount", "net_amount",
+    ],
+    "customer_monthly_sketches": [
+        "customer_id", "transaction_date", "order_id", "merchant_id", "payment_id",
+        "is_successful_transaction", "is_declined", "transaction_amount", "has_dispute",
+    ],
+    "metrics_rollup": _rollup_columns(),
+}
+
+
+def stored(layout: str) -> List[UnifiedColumn]:
+    """Columns silver_unified_transactions_base stores in a layout, before the dispute columns"""
+    if layout not in LAYOUTS:
+        raise ValueError(f"unknown psp.unified.layout {layout!r}, expected one of {LAYOUTS}")
+    return [column for column in COLUMNS if layout == "wide" or column.fact]
+
+def late_columns(names: Sequence[str]) -> List[UnifiedColumn]:
+    """Non-stored columns a narrow projection of names computes, with the derived ones' inputs"""
+    needed: Dict[str, UnifiedColumn] = {}
+    for name in names:
+        column = BY_NAME.get(name)
+        if column is None or column.fact:
+            continue
+        if column.derived:
+            for source in inputs(column.expression):
+                if not BY_NAME[source].fact:
+                    needed[source] = BY_NAME[source]
+        needed[name] = column
+    # entity columns first: derived expressions read them
+    return sorted(needed.values(), key=lambda column: column.derived)